@@ -0,0 +1,125 @@
+"""
+Discord 投遞基準測試
+對本機 Discord Webhook 替身（預設與 Discord webhook 相同的每 2 秒 5 則限制）發送一批 alerts，
+比較投遞引擎（embed 打包 + bucket 追蹤）與逐則發送、吃到 429 才等待的做法，確認全部送達且沒有 429 風暴。
+
+用法：
+    python benchmarks/bench_discord.py [--alerts 300] [--limit 5] [--window 2] [--naive-alerts 40]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from discord_delivery import DiscordDelivery, Outbox, alert_payloads  # noqa: E402
+from standins import DiscordStandin  # noqa: E402
+
+OUTPUT_FILE = ROOT / "output" / "benchmarks" / "discord.json"
+
+
+def synthetic_alerts(count: int) -> List[Dict]:
+    return [
+        {
+            "type": "New listing / campaign",
+            "project": f"Project {i}",
+            "token": f"T{i}",
+            "priority": ("high", "medium", "low")[i % 3],
+            "source": "bench",
+            "exchange": "binance",
+            "pair": f"T{i}/USDT",
+            "notes": f"Detected new listing/campaign for Project {i}. " * (1 + i % 12),
+            "links": {"details": f"https://example.com/{i}"},
+        }
+        for i in range(count)
+    ]
+
+
+def measure_engine(alerts: List[Dict], args) -> Dict:
+    with DiscordStandin(limit=args.limit, window=args.window) as d, tempfile.TemporaryDirectory() as tmp:
+        outbox = Outbox(Path(tmp) / "outbox.json")
+        payloads = alert_payloads(alerts, f"{len(alerts)} alerts")
+        outbox.add("bench", payloads)
+        start = time.perf_counter()
+        result = DiscordDelivery({"bench": d.webhook_url()}, outbox, metrics_section="bench_discord").deliver()
+        elapsed = time.perf_counter() - start
+        return {
+            "seconds": round(elapsed, 3),
+            "messages": len(d.messages),
+            "embeds_delivered": sum(len(m.get("embeds", [])) for m in d.messages),
+            "requests": d.request_count,
+            "rate_limited": d.rate_limited,
+            "pending": result["pending"],
+        }
+
+
+def measure_naive(alerts: List[Dict], args) -> Dict:
+    """每個 alert 一則訊息，不看 bucket header，收到 429 才依 retry_after 等待"""
+    import requests
+
+    with DiscordStandin(limit=args.limit, window=args.window) as d:
+        session = requests.Session()
+        start = time.perf_counter()
+        for a in alerts:
+            while True:
+                resp = session.post(d.webhook_url(), json={"content": f"{a['project']}: {a['notes'][:200]}"})
+                if resp.status_code != 429:
+                    break
+                time.sleep(resp.json()["retry_after"])
+        elapsed = time.perf_counter() - start
+        return {
+            "seconds": round(elapsed, 3),
+            "messages": len(d.messages),
+            "requests": d.request_count,
+            "rate_limited": d.rate_limited,
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="量測 Discord 投遞引擎")
+    parser.add_argument("--alerts", type=int, default=300)
+    parser.add_argument("--naive-alerts", type=int, default=40, help="逐則發送對照組的 alert 數（0 略過）")
+    parser.add_argument("--limit", type=int, default=5, help="替身 bucket 每個時間窗的訊息數")
+    parser.add_argument("--window", type=float, default=2.0, help="替身 bucket 時間窗（秒）")
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE, help="結果 JSON 輸出路徑")
+    parser.add_argument("--no-fail", action="store_true", help="有未送達或 429 時不回傳非零結束碼")
+    args = parser.parse_args()
+
+    import logging
+    logging.basicConfig(level=logging.ERROR)
+
+    alerts = synthetic_alerts(args.alerts)
+    engine = measure_engine(alerts, args)
+    naive = measure_naive(alerts[:args.naive_alerts], args) if args.naive_alerts else None
+
+    violations = []
+    if engine["embeds_delivered"] != args.alerts or engine["pending"]:
+        violations.append(f"只送達 {engine['embeds_delivered']}/{args.alerts} 個 alert，outbox 剩餘 {engine['pending']} 則")
+    if engine["rate_limited"]:
+        violations.append(f"投遞引擎收到 {engine['rate_limited']} 次 429")
+
+    results = {"python": sys.version.split()[0], "alerts": args.alerts, "limit": args.limit, "window": args.window,
+               "engine": engine, "naive": naive, "violations": violations}
+    args.output.parent.mkdir(exist_ok=True, parents=True)
+    args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(f"{args.alerts} 個 alert，bucket 每 {args.window:g} 秒 {args.limit} 則")
+    print(f"  投遞引擎: {engine['messages']} 則訊息 / {engine['requests']} 個請求，{engine['seconds']:.2f}s，"
+          f"429 {engine['rate_limited']} 次")
+    if naive:
+        per_alert = naive["seconds"] / max(args.naive_alerts, 1)
+        print(f"  逐則發送（{args.naive_alerts} 個 alert）: {naive['requests']} 個請求，{naive['seconds']:.2f}s，"
+              f"429 {naive['rate_limited']} 次；外推 {args.alerts} 個約 {per_alert * args.alerts:.0f}s")
+    for v in violations:
+        print(f"✗ {v}")
+    print(f"結果已寫入 {args.output}")
+    return 1 if violations and not args.no_fail else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
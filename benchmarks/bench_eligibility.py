@@ -0,0 +1,179 @@
+"""
+活動資格矩陣基準測試
+以合成資料量測 scripts/eligibility.py 對 錢包 × 活動 的評分時間（預設 10k × 1k），
+並以逐對 Python 迴圈評估一小部分錢包，外推比較向量化前的成本。
+
+用法：
+    python benchmarks/bench_eligibility.py [--wallets 10000] [--campaigns 1000] [--budget-seconds 5] [--no-fail]
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import eligibility  # noqa: E402
+
+OUTPUT_FILE = ROOT / "output" / "benchmarks" / "eligibility.json"
+
+CHAINS = ["ethereum", "arbitrum", "optimism", "base", "polygon", "zksync", "linea", "scroll"]
+PROTOCOLS = [f"protocol_{i}" for i in range(60)]
+# 逐對迴圈只評估這麼多個錢包，再依比例外推
+NAIVE_SAMPLE = 200
+
+
+def synthetic_wallets(count: int, rng: random.Random) -> List[Dict]:
+    epoch = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    wallets = []
+    for i in range(count):
+        first = epoch + timedelta(days=rng.randint(0, 1200))
+        last = first + timedelta(days=rng.randint(0, 500))
+        wallets.append({
+            "name": f"w{i}",
+            "address": f"0x{i:040x}",
+            "chain": rng.choice(CHAINS),
+            "tx_count": rng.randint(0, 400),
+            "history": {
+                "unique_contracts": rng.randint(0, 80),
+                "active_months": rng.randint(0, 36),
+                "bridge_tx": rng.choice([0, 0, 0, 1, 2, 5]),
+                "protocols": rng.sample(PROTOCOLS, rng.randint(0, 8)),
+                "first_tx_at": first.isoformat(),
+                "last_tx_at": last.isoformat(),
+            },
+        })
+    return wallets
+
+
+def synthetic_campaigns(count: int, rng: random.Random) -> List[Dict]:
+    campaigns = []
+    for i in range(count):
+        camp = {
+            "id": f"c{i}",
+            "chains": rng.sample(CHAINS, rng.randint(1, 4)),
+            "min_tx": rng.choice([0, 5, 10, 50, 100]),
+            "min_unique_contracts": rng.choice([0, 3, 10, 20]),
+            "min_active_months": rng.choice([0, 2, 6, 12]),
+            "weight": rng.choice([0.5, 1.0, 1.5]),
+        }
+        if rng.random() < 0.5:
+            camp["protocols_any"] = rng.sample(PROTOCOLS, rng.randint(1, 3))
+        if rng.random() < 0.3:
+            camp["min_bridge_tx"] = 1
+        if rng.random() < 0.3:
+            camp["first_tx_before"] = f"{rng.randint(2022, 2024)}-01-01"
+        if rng.random() < 0.3:
+            camp["active_after"] = f"{rng.randint(2022, 2024)}-06-01"
+        campaigns.append(camp)
+    return campaigns
+
+
+def naive_eligible(wallet: Dict, camp: Dict) -> bool:
+    """逐對判斷資格（與 score_matrix 的資格條件相同），作為向量化前的參考實作"""
+    history = wallet.get("history") or {}
+    if wallet["chain"] not in camp["chains"]:
+        return False
+    if camp.get("protocols_any") and not set(camp["protocols_any"]) & set(history.get("protocols", [])):
+        return False
+    for feature, key in eligibility.ACTIVITY_CRITERIA:
+        if eligibility._wallet_feature(wallet, feature) < (camp.get(key) or 0):
+            return False
+    after = eligibility._to_epoch(camp.get("active_after"))
+    last = eligibility._to_epoch(history.get("last_tx_at"))
+    if after is not None and (last is None or last < after):
+        return False
+    before = eligibility._to_epoch(camp.get("first_tx_before"))
+    first = eligibility._to_epoch(history.get("first_tx_at"))
+    if before is not None and (first is None or first >= before):
+        return False
+    return True
+
+
+def measure(wallets: List[Dict], campaigns: List[Dict], repeat: int) -> Dict:
+    build, score, total = [], [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        m = eligibility.build_matrices(wallets, campaigns)
+        built = time.perf_counter()
+        eligibility.score_matrix(m)
+        build.append(built - start)
+        score.append(time.perf_counter() - built)
+
+        start = time.perf_counter()
+        eligibility.top_campaigns(wallets, campaigns)
+        total.append(time.perf_counter() - start)
+    return {
+        "build_s": round(statistics.median(build), 4),
+        "score_s": round(statistics.median(score), 4),
+        "top_k_total_s": round(statistics.median(total), 4),
+    }
+
+
+def verify_against_naive(wallets: List[Dict], campaigns: List[Dict]) -> Dict:
+    """以逐對迴圈檢查前 NAIVE_SAMPLE 個錢包的資格結果一致，並外推逐對迴圈的總耗時"""
+    sample = wallets[:NAIVE_SAMPLE]
+    start = time.perf_counter()
+    expected = [[naive_eligible(w, c) for c in campaigns] for w in sample]
+    elapsed = time.perf_counter() - start
+
+    eligible, _ = eligibility.score_matrix(eligibility.build_matrices(sample, campaigns))
+    mismatches = int(sum(bool(eligible[i, j]) != expected[i][j]
+                         for i in range(len(sample)) for j in range(len(campaigns))))
+    return {
+        "sample_wallets": len(sample),
+        "mismatches": mismatches,
+        "naive_estimate_s": round(elapsed * len(wallets) / max(len(sample), 1), 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="量測活動資格矩陣的評分時間")
+    parser.add_argument("--wallets", type=int, default=10_000)
+    parser.add_argument("--campaigns", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=3, help="重複次數（取中位數）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--budget-seconds", type=float, default=5.0, help="top_k_total_s 的上限")
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE, help="結果 JSON 輸出路徑")
+    parser.add_argument("--no-fail", action="store_true", help="超出預算時不回傳非零結束碼")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    wallets = synthetic_wallets(args.wallets, rng)
+    campaigns = synthetic_campaigns(args.campaigns, rng)
+
+    results = {
+        "python": sys.version.split()[0],
+        "wallets": args.wallets,
+        "campaigns": args.campaigns,
+        **measure(wallets, campaigns, args.repeat),
+        **verify_against_naive(wallets, campaigns),
+    }
+    results["violations"] = []
+    if results["top_k_total_s"] > args.budget_seconds:
+        results["violations"].append(f"top_k_total_s: {results['top_k_total_s']:.2f}s > {args.budget_seconds}s")
+    if results["mismatches"]:
+        results["violations"].append(f"與逐對迴圈的資格結果有 {results['mismatches']} 處不一致")
+
+    args.output.parent.mkdir(exist_ok=True, parents=True)
+    args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(f"{args.wallets} 個錢包 × {args.campaigns} 個活動")
+    print(f"建立矩陣 {results['build_s']:.3f}s, 評分 {results['score_s']:.3f}s, 含 top-k 共 {results['top_k_total_s']:.3f}s")
+    print(f"逐對迴圈外推約 {results['naive_estimate_s']:.1f}s（抽樣 {results['sample_wallets']} 個錢包，"
+          f"{results['mismatches']} 處不一致）")
+    for v in results["violations"]:
+        print(f"✗ {v}")
+    print(f"結果已寫入 {args.output}")
+
+    return 1 if results["violations"] and not args.no_fail else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+GitHub Issue 寫入基準測試
+對本機 GitHub API 替身（scripts/standins.py）建立大量 issue，比較不同寫入執行緒數的吞吐量，
+替身可模擬每個請求的延遲與次要速率限制（Retry-After），確認限制回應會被遵守且沒有寫入失敗。
+寫入間隔預設與正式環境相同（github_api.WRITE_INTERVAL，每秒最多一個寫入），此時吞吐量約 1 個/秒，與執行緒數無關；
+--write-interval 0 才是只看並行與速率限制處理的上限。
+
+用法：
+    python benchmarks/bench_github_issues.py [--alerts 30] [--workers 1,4,8] [--latency 0.05] [--secondary-every 25]
+        [--write-interval 1.0]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import metrics  # noqa: E402
+import notify_github  # noqa: E402
+from github_api import WRITE_INTERVAL, GitHubClient, RateLimiter  # noqa: E402
+from standins import GitHubStandin  # noqa: E402
+
+OUTPUT_FILE = ROOT / "output" / "benchmarks" / "github_issues.json"
+
+
+def synthetic_alerts(count: int) -> List[Dict]:
+    return [
+        {
+            "type": "listing",
+            "token": f"T{i}",
+            "project": f"Project {i}",
+            "source": "bench",
+            "priority": "high" if i % 5 == 0 else "medium",
+            "labels": ["airdrop", "launchpool"] if i % 2 else ["airdrop", "wallet-profile"],
+        }
+        for i in range(count)
+    ]
+
+
+def measure(alerts: List[Dict], workers: int, args) -> Dict:
+    """以全新的替身與索引執行一次建立 + 一次部分更新"""
+    before = metrics.snapshot().get("github_issues", {})
+    with GitHubStandin(secondary_every=args.secondary_every, retry_after=args.retry_after,
+                       latency=args.latency) as gh, tempfile.TemporaryDirectory() as tmp:
+        index_path = Path(tmp) / "index.json"
+
+        def run(batch):
+            client = GitHubClient("bench", gh.repo, api_url=gh.url,
+                                  limiter=RateLimiter(write_interval=args.write_interval))
+            start = time.perf_counter()
+            notify_github.notify(batch, workers=workers, client=client, index_path=index_path)
+            return time.perf_counter() - start
+
+        create_s = run(alerts)
+        changed = [dict(a, notes="updated") if i % 10 == 0 else a for i, a in enumerate(alerts)]
+        update_s = run(changed)
+        after = metrics.snapshot().get("github_issues", {})
+        stats = {k: after.get(k, 0) - before.get(k, 0) for k in ("api_requests", "throttled", "failed")}
+        return {
+            "workers": workers,
+            "create_s": round(create_s, 3),
+            "create_per_second": round(len(alerts) / create_s, 1),
+            "update_s": round(update_s, 3),
+            "issues": len(gh.issues),
+            "max_in_flight": gh.max_in_flight,
+            **stats,
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="量測 GitHub Issue 寫入吞吐量")
+    parser.add_argument("--alerts", type=int, default=30)
+    parser.add_argument("--workers", default="1,4,8", help="逗號分隔的執行緒數")
+    parser.add_argument("--latency", type=float, default=0.05, help="替身每個請求的延遲（秒）")
+    parser.add_argument("--secondary-every", type=int, default=25, help="每第 N 個寫入請求回傳次要限制（0 停用）")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="次要限制的 Retry-After（秒）")
+    parser.add_argument("--write-interval", type=float, default=WRITE_INTERVAL,
+                        help="寫入請求最小間隔（秒，預設與正式環境相同；0 停用）")
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE, help="結果 JSON 輸出路徑")
+    parser.add_argument("--no-fail", action="store_true", help="有寫入失敗或 issue 數不符時不回傳非零結束碼")
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger().setLevel(logging.WARNING)
+
+    alerts = synthetic_alerts(args.alerts)
+    runs = [measure(alerts, int(w), args) for w in args.workers.split(",")]
+
+    violations = []
+    for r in runs:
+        if r["failed"] or r["issues"] != args.alerts:
+            violations.append(f"workers={r['workers']}: {r['issues']} 個 issue, {r['failed']} 個失敗")
+
+    results = {"python": sys.version.split()[0], "alerts": args.alerts, "latency": args.latency,
+               "secondary_every": args.secondary_every, "write_interval": args.write_interval, "runs": runs,
+               "violations": violations}
+    args.output.parent.mkdir(exist_ok=True, parents=True)
+    args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(f"{args.alerts} 個 alert，替身延遲 {args.latency * 1000:.0f}ms，每 {args.secondary_every} 個寫入觸發次要限制，"
+          f"寫入間隔 {args.write_interval:g}s")
+    for r in runs:
+        print(f"  workers={r['workers']}: 建立 {r['create_s']:.2f}s（{r['create_per_second']:.1f}/s），"
+              f"更新 10% {r['update_s']:.2f}s，並行 {r['max_in_flight']}，限制 {r['throttled']} 次，"
+              f"{r['api_requests']} 個請求")
+    for v in violations:
+        print(f"✗ {v}")
+    print(f"結果已寫入 {args.output}")
+    return 1 if violations and not args.no_fail else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+啟動時間基準測試
+以 `python -X importtime` 量測每個腳本的 import 成本，並量測無事可做的執行（no-op run）
+的總耗時，與 benchmarks/startup_budget.json 比較以偵測啟動時間退化。
+
+用法：
+    python benchmarks/bench_startup.py [--repeat 5] [--no-fail]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = ROOT / "scripts"
+BUDGET_FILE = Path(__file__).resolve().parent / "startup_budget.json"
+OUTPUT_FILE = ROOT / "output" / "benchmarks" / "startup.json"
+
+MODULES = ["fetch_sources", "check_wallets", "aggregate", "notify_github", "notify_discord", "pipeline"]
+
+# 這些相依只應在實際需要時載入，出現在 import 階段即視為退化
+HEAVY_DEPS = ("requests", "yaml", "bs4", "numpy", "orjson")
+
+# 無事可做的執行：清掉對應的環境變數，腳本應立即結束
+NOOP_RUNS = {
+    "notify_discord": ["DISCORD_WEBHOOK_URL"],
+    "notify_github": ["GITHUB_TOKEN", "GITHUB_REPOSITORY"],
+}
+
+
+def _env_without(keys: List[str]) -> Dict[str, str]:
+    env = {k: v for k, v in os.environ.items() if k not in keys}
+    env["PYTHONPATH"] = str(SCRIPTS_DIR)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """解析 `-X importtime` 輸出：每行 `import time: self | cumulative | name`"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            rows.append({
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            })
+        except ValueError:
+            continue
+    return rows
+
+
+def measure_import(module: str, repeat: int) -> Dict:
+    """量測單一腳本模組的 import 成本（取多次執行的中位數）"""
+    samples = []
+    rows: List[Dict] = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=SCRIPTS_DIR, env=_env_without([]), capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} 失敗:\n{proc.stderr[-2000:]}")
+        rows = parse_importtime(proc.stderr)
+        own = [r for r in rows if r["module"] == module]
+        samples.append(own[-1]["cumulative_ms"] if own else 0.0)
+
+    loaded = {r["module"].split(".")[0] for r in rows}
+    heaviest = sorted((r for r in rows if r["module"] != module), key=lambda r: r["self_ms"], reverse=True)[:10]
+    return {
+        "import_ms": round(statistics.median(samples), 3),
+        "heavy_deps_loaded": sorted(d for d in HEAVY_DEPS if d in loaded),
+        "top_self_ms": [{"module": r["module"], "self_ms": r["self_ms"]} for r in heaviest],
+    }
+
+
+def measure_noop(module: str, unset: List[str], repeat: int) -> float:
+    """量測無事可做時整支腳本（含直譯器啟動）的牆鐘時間中位數，單位 ms"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / f"{module}.py")],
+            cwd=ROOT, env=_env_without(unset), capture_output=True,
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def measure_interpreter(repeat: int) -> float:
+    """量測空直譯器啟動時間，作為 no-op 時間的參考基準"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], capture_output=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def check_budget(results: Dict, budget: Dict) -> List[str]:
+    """比較結果與預算，回傳違規訊息列表"""
+    violations = []
+    for module, data in results["imports"].items():
+        limit = budget.get("import_ms", {}).get(module)
+        if limit is not None and data["import_ms"] > limit:
+            violations.append(f"import {module}: {data['import_ms']:.1f}ms > {limit}ms")
+        if data["heavy_deps_loaded"]:
+            violations.append(f"import {module} 載入了重量級相依: {', '.join(data['heavy_deps_loaded'])}")
+    for module, elapsed in results["noop_runs"].items():
+        limit = budget.get("noop_overhead_ms", {}).get(module)
+        overhead = elapsed - results["interpreter_ms"]
+        if limit is not None and overhead > limit:
+            violations.append(f"no-op {module}: 扣除直譯器後 {overhead:.1f}ms > {limit}ms")
+    return violations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="量測腳本啟動時間並與預算比較")
+    parser.add_argument("--repeat", type=int, default=5, help="每項量測的重複次數（取中位數）")
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE, help="結果 JSON 輸出路徑")
+    parser.add_argument("--budget", type=Path, default=BUDGET_FILE, help="預算 JSON 路徑")
+    parser.add_argument("--no-fail", action="store_true", help="超出預算時不回傳非零結束碼")
+    args = parser.parse_args()
+
+    results = {
+        "python": sys.version.split()[0],
+        "interpreter_ms": measure_interpreter(args.repeat),
+        "imports": {m: measure_import(m, args.repeat) for m in MODULES},
+        "noop_runs": {m: measure_noop(m, unset, args.repeat) for m, unset in NOOP_RUNS.items()},
+    }
+
+    budget = json.loads(args.budget.read_text(encoding="utf-8")) if args.budget.exists() else {}
+    results["violations"] = check_budget(results, budget)
+
+    args.output.parent.mkdir(exist_ok=True, parents=True)
+    args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(f"直譯器啟動: {results['interpreter_ms']:.1f}ms")
+    for module, data in results["imports"].items():
+        print(f"import {module:<16} {data['import_ms']:>8.1f}ms")
+    for module, elapsed in results["noop_runs"].items():
+        print(f"no-op  {module:<16} {elapsed:>8.1f}ms")
+    for v in results["violations"]:
+        print(f"✗ {v}")
+    print(f"結果已寫入 {args.output}")
+
+    return 1 if results["violations"] and not args.no_fail else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+基準測試用的合成資料
+產生與實際 pipeline 輸出相同形狀的 events / rules / tokens / wallets / alerts，結果只由參數決定（可重現）。
+列表來源的合成網頁見 scripts/standins.py 的 synthetic_listing。
+"""
+from typing import Dict, Iterator, List, Tuple
+
+CHAINS = ("ethereum", "arbitrum", "optimism", "base", "polygon", "solana")
+PROTOCOLS = ("uniswap", "aave", "curve", "stargate", "hop", "gmx")
+PRIORITIES = ("high", "medium", "low")
+SOURCES = ("airdrops_io", "cmc_airdrops", "airdrop_checklist", "airdropsalert", "binance")
+
+
+def synthetic_tokens(count: int) -> List[Dict]:
+    return [{"symbol": f"TK{i}", "watch": {"launchpool": True, "listings": i % 2 == 0}} for i in range(count)]
+
+
+def synthetic_events(count: int, token_space: int = 1000) -> List[Dict]:
+    """約一半是 launchpool / earn 類事件（會進入規則引擎的 watchlist 比對），token 在 token_space 內循環"""
+    categories = ("launchpool", "earn", "airdrop", "")
+    events = []
+    for i in range(count):
+        token = f"TK{(i * 7) % token_space}"
+        events.append({
+            "token": token,
+            "project": f"Project {i}",
+            "campaign_name": f"Project {i}",
+            "source": ("airdrops_io", "cmc_airdrops", "binance", "bybit")[i % 4],
+            "category": categories[i % 4],
+            "exchange": ("binance", "bybit", "okx")[i % 3],
+            "pair": f"{token}/USDT",
+            "status": ("active", "upcoming", "ended")[i % 3],
+            "type": "airdrop",
+            "links": {"details": f"https://example.com/project-{i}"},
+        })
+    return events
+
+
+def synthetic_rules(count: int) -> List[Dict]:
+    """listing 與 wallet_activity 規則交錯，條件取自 config/rules.yml 的形狀"""
+    rules = []
+    for i in range(count):
+        if i % 2 == 0:
+            rules.append({
+                "id": f"listing_{i}",
+                "type": "listing",
+                "priority": PRIORITIES[i % 3],
+                "match": {"category": "launchpool", "token_in_watchlist": True},
+            })
+        else:
+            rules.append({
+                "id": f"wallet_{i}",
+                "type": "wallet_activity",
+                "priority": PRIORITIES[i % 3],
+                "match": {
+                    "chain_in": list(CHAINS[:3 + i % 3]),
+                    "tx_count_min": 5 * (i % 6),
+                    "has_defi_activity": i % 3 == 0,
+                    "unique_contracts_min": i % 8,
+                    "protocols_any": [PROTOCOLS[i % len(PROTOCOLS)]] if i % 5 == 0 else None,
+                },
+            })
+    return rules
+
+
+def synthetic_wallets(count: int) -> List[Dict]:
+    """check_wallets 輸出形狀的錢包報告（含交易歷史特徵）"""
+    return [
+        {
+            "name": f"wallet-{i}",
+            "chain": CHAINS[i % len(CHAINS)],
+            "address": f"0x{i + 1:040x}",
+            "tx_count": (i * 13) % 400,
+            "has_defi_activity": i % 3 != 0,
+            "balance_eth": round((i % 17) * 0.37, 6),
+            "history": {
+                "unique_contracts": i % 25,
+                "active_months": i % 12,
+                "bridge_tx": i % 4,
+                "protocols": list(PROTOCOLS[i % 3:i % 3 + 1 + i % 4]),
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def synthetic_subscriptions(count: int, tokens: int, wallets: int) -> List[Dict]:
+    """每個訂閱者追蹤 5 個幣種與 2 個錢包，並限制一個 event 類別或鏈（config_store 驗證後的形狀）"""
+    categories = ("launchpool", "earn")
+    subscriptions = []
+    for i in range(count):
+        subscriptions.append({
+            "id": f"sub-{i}",
+            "tokens": [f"TK{(i * 5 + k) % tokens}" for k in range(5)],
+            "wallets": [f"wallet-{(i * 2 + k) % wallets}" for k in range(2)],
+            "chains": [CHAINS[i % len(CHAINS)]] if i % 3 == 0 else None,
+            "categories": [categories[i % 2]] if i % 2 == 0 else None,
+            "rules": None,
+            "min_priority": PRIORITIES[i % 3],
+            "discord": f"DISCORD_WEBHOOK_SUB{i % 10}",
+            "github": i % 4 == 0,
+            "github_labels": [],
+        })
+    return subscriptions
+
+
+def synthetic_alerts(count: int) -> List[Dict]:
+    """listing / 錢包 profile / 活動資格三種 alert 交錯"""
+    alerts = []
+    for i in range(count):
+        kind = i % 3
+        base = {"priority": PRIORITIES[i % 3], "notes": f"Synthetic alert {i}. " * (1 + i % 4)}
+        if kind == 0:
+            alerts.append({
+                **base,
+                "token": f"TK{i}", "project": f"Project {i}", "type": "New listing / campaign",
+                "source": "binance", "exchange": "binance", "pair": f"TK{i}/USDT", "status": "active",
+                "links": {"details": f"https://example.com/project-{i}", "official": f"https://project-{i}.io"},
+                "labels": ["airdrop", "launchpool"],
+            })
+        elif kind == 1:
+            alerts.append({
+                **base,
+                "token": "MULTI", "project": "Generic Airdrop Profile",
+                "type": "Wallet potentially qualifies for retroactive airdrops", "source": "wallets_report",
+                "wallet_name": f"wallet-{i}", "wallet_address": f"0x{i + 1:040x}", "wallet_chain": CHAINS[i % 6],
+                "tx_count": i % 400, "labels": ["airdrop", "wallet-profile"],
+            })
+        else:
+            picks = [
+                {"id": f"c{i}-{k}", "name": f"Campaign {i}-{k}", "score": 1.0 - k * 0.1,
+                 "priority": PRIORITIES[k % 3], "url": f"https://campaign-{k}.io"}
+                for k in range(3)
+            ]
+            alerts.append({
+                **base,
+                "token": "MULTI", "project": picks[0]["name"], "type": "Wallet eligible for airdrop campaigns",
+                "source": "eligibility", "wallet_name": f"wallet-{i}", "wallet_address": f"0x{i + 1:040x}",
+                "wallet_chain": CHAINS[i % 6], "tx_count": i % 400, "eligible_campaigns": picks,
+                "labels": ["airdrop", "eligibility"],
+            })
+    return alerts
+
+
+def synthetic_history(snapshots: int, live: int, start: int = 1767225600) -> Iterator[Tuple[int, List[Dict]]]:
+    """
+    每小時一個快照的 events（產生器，逐個快照產生 (ts, events)）
+
+    每個活動持續 240 個快照（10 天），同時約有 live 個活動：先在一個來源以 upcoming 出現，
+    12 個快照後轉為 active，24 個快照後第二個來源也列出，最後 24 個快照為 ended。
+    """
+    lifetime = 240
+    step = max(1, lifetime // live)
+    for t in range(snapshots):
+        events = []
+        for c in range(max(0, (t - lifetime) // step + 1), t // step + 1):
+            age = t - c * step
+            status = "upcoming" if age < 12 else "ended" if age >= lifetime - 24 else "active"
+            sources = [SOURCES[c % len(SOURCES)]]
+            if age >= 24:
+                sources.append(SOURCES[(c + 1) % len(SOURCES)])
+            for source in sources:
+                events.append({"project": f"Project {c}", "token": f"TK{c % 1000}", "source": source,
+                               "status": status, "type": "airdrop"})
+        yield start + t * 3600, events
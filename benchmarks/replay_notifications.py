@@ -0,0 +1,201 @@
+"""
+通知帳本重播測試
+依時間順序重播一週的 alerts 快照（預設每小時一份合成快照，也可用 --snapshots 指定下載的 pipeline-reports
+artifact 中的 alerts.json），比較三種發送策略的 webhook 訊息數：
+
+- top3：舊版每次執行送出前 3 個高優先級 alert
+- resend_all：每次執行送出所有 alert
+- ledger：通知帳本（新 / 有實質變化才送，低優先級合併成摘要）
+
+並檢查帳本策略沒有重複送出同一版本、立即類 alert 在第一次出現的那次執行就送出、
+其餘 alert 都在一個摘要間隔內送出或被更新版本取代。
+
+用法：
+    python benchmarks/replay_notifications.py [--hours 168] [--seed 7] [--digest-hours 24]
+    python benchmarks/replay_notifications.py --snapshots path/to/snapshots --interval-minutes 60
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from discord_delivery import alert_payloads, digest_payloads  # noqa: E402
+from issue_index import alert_fingerprint  # noqa: E402
+from notification_ledger import SentLedger, material_version  # noqa: E402
+
+OUTPUT_FILE = ROOT / "output" / "benchmarks" / "notification_replay.json"
+START = datetime(2026, 1, 5, tzinfo=timezone.utc)
+
+
+def synthetic_snapshots(hours: int, rng: random.Random) -> List[List[Dict]]:
+    """
+    合成每小時的 alerts 快照
+
+    上市 / 活動 alert 陸續出現並在數小時到數天後消失，途中狀態由 upcoming 變成 active；
+    錢包 alert 一直存在，notes 中的交易數每小時變動（非實質變化），符合的活動偶爾改變（實質變化）。
+    """
+    listings = []
+    for i in range(int(hours * 1.5)):
+        start = rng.randint(0, hours - 1)
+        listings.append({
+            "start": start,
+            "end": start + rng.randint(6, 72),
+            "active_at": start + rng.randint(1, 24),
+            "priority": rng.choices(["high", "medium", "low"], weights=[2, 3, 5])[0],
+            "token": f"T{i}",
+        })
+    wallets = [{"name": f"wallet{i}", "chain": rng.choice(["ethereum", "arbitrum", "base"])} for i in range(10)]
+
+    snapshots = []
+    for hour in range(hours):
+        alerts = []
+        for ev in listings:
+            if ev["start"] <= hour < ev["end"]:
+                status = "active" if hour >= ev["active_at"] else "upcoming"
+                alerts.append({
+                    "token": ev["token"],
+                    "project": f"Project {ev['token']}",
+                    "type": "New listing / campaign",
+                    "priority": ev["priority"],
+                    "source": "binance_launchpool",
+                    "exchange": "binance",
+                    "pair": f"{ev['token']}/USDT",
+                    "status": status,
+                    "notes": f"Detected new listing/campaign ({ev['token']}/USDT). Status: {status}.",
+                    "links": {"details": f"https://example.com/{ev['token']}"},
+                })
+        for w_i, w in enumerate(wallets):
+            campaign_id = f"c{(hour // 48 + w_i) % 5}"
+            campaigns = [{"id": campaign_id, "name": f"Campaign {campaign_id}", "score": 1.0, "priority": "medium"}]
+            alerts.append({
+                "token": "MULTI",
+                "project": "Generic Airdrop Profile",
+                "type": "Wallet eligible for airdrop campaigns",
+                "priority": "medium",
+                "source": "eligibility",
+                "wallet_name": w["name"],
+                "wallet_chain": w["chain"],
+                "eligible_campaigns": campaigns,
+                "notes": f"Wallet {w['name']} has {100 + hour * 3 + w_i} txs.",
+            })
+        snapshots.append(alerts)
+    return snapshots
+
+
+def load_snapshots(directory: Path) -> List[List[Dict]]:
+    return [json.loads(p.read_text(encoding="utf-8")) for p in sorted(directory.glob("*.json"))]
+
+
+def replay(snapshots: List[List[Dict]], policy: Dict, interval: timedelta) -> Dict:
+    immediate_priorities = set(policy["immediate_priorities"])
+    digest_interval = timedelta(hours=policy["digest"]["interval_hours"])
+    counts = {"top3": {"messages": 0, "alerts": 0}, "resend_all": {"messages": 0, "alerts": 0},
+              "ledger": {"messages": 0, "alerts": 0, "digests": 0}}
+    first_seen: Dict[tuple, datetime] = {}
+    latest_version: Dict[str, tuple] = {}
+    delivered: Dict[tuple, datetime] = {}
+    violations: List[str] = []
+    max_digest_delay = timedelta(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = SentLedger(Path(tmp) / "ledger.json")
+        for i, alerts in enumerate(snapshots):
+            now = START + interval * i
+            high = [a for a in alerts if a.get("priority") == "high"][:3]
+            if high:
+                counts["top3"]["messages"] += 1
+                counts["top3"]["alerts"] += len(high)
+            if alerts:
+                counts["resend_all"]["messages"] += len(alert_payloads(alerts, "header"))
+                counts["resend_all"]["alerts"] += len(alerts)
+
+            for a in alerts:
+                key = (alert_fingerprint(a), material_version(a))
+                first_seen.setdefault(key, now)
+                latest_version[key[0]] = key
+
+            plan = ledger.plan("replay", alerts, policy, now=now)
+            if plan.immediate:
+                counts["ledger"]["messages"] += len(alert_payloads(plan.immediate, "header"))
+            if plan.digest:
+                counts["ledger"]["messages"] += len(digest_payloads(plan.digest, "header"))
+                counts["ledger"]["digests"] += 1
+            for a in plan.immediate + plan.digest:
+                key = (alert_fingerprint(a), material_version(a))
+                if key in delivered:
+                    violations.append(f"重複送出 {a.get('project')}（{now:%m-%d %H:%M}）")
+                delivered[key] = now
+                counts["ledger"]["alerts"] += 1
+                if a in plan.immediate and first_seen[key] != now:
+                    violations.append(f"立即類 alert 延遲送出: {a.get('project')}")
+                if a in plan.digest:
+                    max_digest_delay = max(max_digest_delay, now - first_seen[key])
+
+    end = START + interval * (len(snapshots) - 1)
+    missed = 0
+    for key, seen_at in first_seen.items():
+        if key in delivered:
+            continue
+        superseded = latest_version[key[0]] != key and latest_version[key[0]] in delivered
+        still_queued = end - seen_at < digest_interval + interval
+        if not superseded and not still_queued:
+            missed += 1
+    if missed:
+        violations.append(f"{missed} 個 alert 版本未在摘要間隔內送出")
+    if max_digest_delay > digest_interval + interval:
+        violations.append(f"摘要延遲 {max_digest_delay} 超過間隔 {digest_interval}")
+
+    return {
+        "runs": len(snapshots),
+        "alert_versions": len(first_seen),
+        "strategies": counts,
+        "max_digest_delay_hours": round(max_digest_delay.total_seconds() / 3600, 2),
+        "immediate_priorities": sorted(immediate_priorities),
+        "violations": violations[:20],
+        "violation_count": len(violations),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="重播 alerts 快照，比較通知策略的訊息量")
+    parser.add_argument("--snapshots", type=Path, help="alerts 快照目錄（*.json，依檔名排序）；省略時使用合成資料")
+    parser.add_argument("--interval-minutes", type=int, default=60, help="快照之間的間隔")
+    parser.add_argument("--hours", type=int, default=168, help="合成快照的小時數")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--digest-hours", type=float, help="覆蓋 notifications.yml 的 digest.interval_hours")
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE, help="結果 JSON 輸出路徑")
+    parser.add_argument("--no-fail", action="store_true", help="有違規時不回傳非零結束碼")
+    args = parser.parse_args()
+
+    import config_store
+
+    policy = json.loads(json.dumps(config_store.load_config()["notifications"]["discord"]))
+    if args.digest_hours:
+        policy["digest"]["interval_hours"] = args.digest_hours
+    snapshots = load_snapshots(args.snapshots) if args.snapshots else synthetic_snapshots(args.hours, random.Random(args.seed))
+
+    results = replay(snapshots, policy, timedelta(minutes=args.interval_minutes))
+    args.output.parent.mkdir(exist_ok=True, parents=True)
+    args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    s = results["strategies"]
+    print(f"重播 {results['runs']} 次執行，{results['alert_versions']} 個 alert 版本")
+    print(f"  top3:       {s['top3']['messages']:5d} 則訊息（只涵蓋 {s['top3']['alerts']} 次高優先級提及）")
+    print(f"  resend_all: {s['resend_all']['messages']:5d} 則訊息")
+    print(f"  ledger:     {s['ledger']['messages']:5d} 則訊息（{s['ledger']['alerts']} 個 alert，"
+          f"{s['ledger']['digests']} 次摘要，最長摘要延遲 {results['max_digest_delay_hours']}h）")
+    for v in results["violations"]:
+        print(f"✗ {v}")
+    print(f"結果已寫入 {args.output}")
+    return 1 if results["violation_count"] and not args.no_fail else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+"""
+熱路徑基準測試套件
+以合成資料（benchmarks/fixtures.py 與 scripts/standins.py）離線量測各熱路徑在不同規模下的耗時與記憶體峰值：
+
+- fetch.*：各 fetch_* 解析 10～10,000 張卡片的列表頁（經本機網頁替身，含 HTTP 往返）；
+  fetch.cmc_airdrops_json 為同一份 CMC 頁面加上 __NEXT_DATA__，以 sources.yml 的 embedded_json extractor 擷取；
+  fetch.cmc_airdrops_api 為相同專案的 CoinMarketCap airdrops API 回應，fetch.feed 為 RSS feed
+- rules.apply：apply_rules 隨 events / 規則 / 追蹤幣種數成長
+- rules.fanout：同樣的 events 分送給 1～10,000 個訂閱者（倒排索引，成本應隨符合數而非訂閱者數成長）
+- report.render：write_human_report 產生報告
+- wallets.rpc：check_wallets_via_rpc 對本機 JSON-RPC 替身的 batch 查詢
+- stream.events：events 經有界佇列流過寫檔、統計與規則評估（記憶體峰值應與 events 數無關）
+- history.query：一個月 / 一年的每小時快照（已壓縮為月份區段）上的查詢：活動首次出現、單一 token 的完整歷史、
+  一週的時間範圍與一個月的活動摘要（每次重新開啟歷史資料庫，含載入區段）
+
+每個案例先暖身一次，再分別以 --repeat 次量測耗時、以 --memory-repeat 次（開啟 tracemalloc）量測記憶體峰值，
+結果（p50 / p90 / p99）寫到 output/benchmarks/suite.json，並與 benchmarks/suite_baseline.json 比較；
+超過容許範圍時以非零結束碼回報。
+
+用法：
+    python benchmarks/suite.py                     # 全部案例
+    python benchmarks/suite.py --quick -k fetch    # 略過最大規模，只跑名稱含 fetch 的案例
+    python benchmarks/suite.py --update-baseline   # 以本次結果更新基準（只更新有執行的案例）
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import aggregate  # noqa: E402
+import config_store  # noqa: E402
+import event_history  # noqa: E402
+import fetch_sources  # noqa: E402
+import streaming  # noqa: E402
+from check_wallets import check_wallets_via_rpc  # noqa: E402
+from fixtures import (synthetic_alerts, synthetic_events, synthetic_history, synthetic_rules,  # noqa: E402
+                      synthetic_subscriptions, synthetic_tokens, synthetic_wallets)
+from standins import (JsonRpcStandin, PageStandin, synthetic_accounts, synthetic_cmc_airdrops,  # noqa: E402
+                      synthetic_feed, synthetic_listing, synthetic_next_data)
+
+BASELINE_FILE = Path(__file__).resolve().parent / "suite_baseline.json"
+OUTPUT_FILE = ROOT / "output" / "benchmarks" / "suite.json"
+
+# 基準檔未指定時的容許範圍：p50 耗時 / 記憶體峰值超過基準的比例，且差距超過最小絕對值才算退化
+DEFAULT_TOLERANCE = {"time": 0.5, "memory": 0.25, "min_time_delta_ms": 5.0, "min_memory_delta_kb": 256.0}
+DEFAULT_REPEAT = 5
+DEFAULT_MEMORY_REPEAT = 3
+# 規模較大的案例減少重複次數
+LARGE_REPEAT = 3
+
+FETCH_CARDS = (10, 100, 1000, 10000)
+# (events, rules, tokens)
+RULES_GRID = ((100, 4, 10), (1000, 4, 100), (10000, 4, 100), (10000, 16, 100), (10000, 4, 1000))
+RULES_WALLETS = 200
+FANOUT_SUBSCRIBERS = (1, 100, 1000, 10000)
+FANOUT_EVENTS = 10000
+REPORT_ALERTS = (100, 1000, 10000)
+REPORT_WALLETS = 100
+# (wallets, batch_size)；batch_size=1 等同逐一地址查詢
+WALLET_GRID = ((100, 1), (100, 50), (1000, 50), (5000, 100))
+STREAM_EVENTS = (1000, 10000, 100000)
+STREAM_RULES = 4
+HISTORY_SNAPSHOTS = (720, 8760)
+HISTORY_LIVE = 50
+
+# fetch_* 皆為產生器
+FETCHERS: Dict[str, Callable[[str], Iterator[Dict]]] = {
+    "airdrops_io": lambda url: fetch_sources.fetch_airdrops_io({"enabled": True, "urls": {"active": url}}),
+    "cmc_airdrops": lambda url: fetch_sources.fetch_cmc_airdrops({"enabled": True, "urls": {"main": url}}),
+    "cmc_airdrops_json": lambda url: fetch_sources.fetch_cmc_airdrops({
+        "enabled": True, "urls": {"main": url},
+        "extractor": config_store.load_config()["sources"]["cmc_airdrops"]["extractor"]}),
+    # API 的網址以頁面網址為 base（替身不看查詢參數）；ttl 0 讓每次都實際請求
+    "cmc_airdrops_api": lambda url: fetch_sources.fetch_cmc_airdrops({
+        "enabled": True, "urls": {"main": url},
+        "api": {"type": "cmc_airdrops", "url": url.rsplit("/v1/", 1)[0], "statuses": ["active"], "ttl": 0}}),
+    "feed": lambda url: fetch_sources.fetch_airdrops_io({
+        "enabled": True, "urls": {}, "api": {"type": "feed", "url": url, "ttl": 0}}),
+    "airdrop_checklist": lambda url: fetch_sources.fetch_airdrop_checklist({"enabled": True, "urls": {"main": url}}),
+    "generic": lambda url: fetch_sources.fetch_generic_list_site(
+        "airdropsalert", {"enabled": True, "urls": {"main": url}}, *fetch_sources.GENERIC_SOURCES["airdropsalert"]),
+}
+# 未列出的 fetcher 使用 synthetic_listing(site, cards)
+LISTING_PAGES: Dict[str, Callable[[int], str]] = {
+    "cmc_airdrops_json": synthetic_next_data,
+    "cmc_airdrops_api": synthetic_cmc_airdrops,
+    "feed": synthetic_feed,
+}
+# 頁面路徑（未列出的為 /{fetcher 名稱}）
+LISTING_PATHS = {
+    "cmc_airdrops_api": "/v1/cryptocurrency/airdrops",
+}
+# 執行期間設定的環境變數
+FETCH_ENV = {
+    "cmc_airdrops_api": {"CMC_API_KEY": "standin"},
+}
+
+
+@dataclass
+class Case:
+    """
+    一個基準案例
+
+    setup 為 context manager：進入時準備資料與替身，產出被量測的函式；該函式回傳處理的項目數，
+    與 expect 不符時視為案例失敗（避免量測到「很快但什麼都沒做」的結果）。
+    """
+    name: str
+    params: Dict
+    setup: Callable[[], ContextManager[Callable[[], int]]]
+    expect: Optional[int] = None
+    large: bool = False
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """線性內插百分位數（q 介於 0～100）"""
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "min": round(min(samples), 3),
+        "p50": round(percentile(samples, 50), 3),
+        "p90": round(percentile(samples, 90), 3),
+        "p99": round(percentile(samples, 99), 3),
+        "max": round(max(samples), 3),
+    }
+
+
+# ---- 案例 ----
+
+def fetch_case(site: str, cards: int) -> Case:
+    @contextmanager
+    def setup():
+        page = LISTING_PAGES[site](cards) if site in LISTING_PAGES else synthetic_listing(site, cards)
+        path = LISTING_PATHS.get(site, f"/{site}")
+        env = FETCH_ENV.get(site, {})
+        saved = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        try:
+            with PageStandin({path: page}) as pages:
+                url = pages.page_url(path)
+                yield lambda: sum(1 for _ in FETCHERS[site](url))
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+    return Case(f"fetch.{site}[cards={cards}]", {"site": site, "cards": cards}, setup,
+                expect=cards, large=cards >= 10000)
+
+
+def rules_case(events: int, rules: int, tokens: int) -> Case:
+    @contextmanager
+    def setup():
+        ev, rl, tk = synthetic_events(events), synthetic_rules(rules), synthetic_tokens(tokens)
+        wallets = synthetic_wallets(RULES_WALLETS)
+        yield lambda: len(aggregate.apply_rules(ev, wallets, rl, tk))
+
+    return Case(f"rules.apply[events={events},rules={rules},tokens={tokens}]",
+                {"events": events, "rules": rules, "tokens": tokens, "wallets": RULES_WALLETS}, setup,
+                large=events * rules * tokens >= 10000 * 4 * 1000)
+
+
+def fanout_case(subscribers: int) -> Case:
+    @contextmanager
+    def setup():
+        ev, rl, tk = synthetic_events(FANOUT_EVENTS), synthetic_rules(4), synthetic_tokens(1000)
+        wallets = synthetic_wallets(RULES_WALLETS)
+        subs = synthetic_subscriptions(subscribers, 1000, RULES_WALLETS)
+        yield lambda: len(aggregate.apply_rules(ev, wallets, rl, tk, subscriptions=subs))
+
+    return Case(f"rules.fanout[events={FANOUT_EVENTS},subscribers={subscribers}]",
+                {"events": FANOUT_EVENTS, "subscribers": subscribers, "wallets": RULES_WALLETS}, setup,
+                large=subscribers >= 10000)
+
+
+def report_case(alerts: int) -> Case:
+    @contextmanager
+    def setup():
+        data, wallets = synthetic_alerts(alerts), synthetic_wallets(REPORT_WALLETS)
+        sources_cfg = {
+            "earndrop": {"enabled": True, "urls": {"main": "https://earndrop.io/"}},
+            "bankless_claimables": {"enabled": True, "urls": {"main": "https://claimables.bankless.com"}},
+        }
+        original = aggregate.OUTPUT_DIR
+        with tempfile.TemporaryDirectory() as tmp:
+            # 報告寫到暫存目錄，不覆蓋 output/latest_report.md
+            aggregate.OUTPUT_DIR = Path(tmp)
+            try:
+                def render() -> int:
+                    aggregate.write_human_report(data, wallets, sources_cfg, {})
+                    return len(data)
+                yield render
+            finally:
+                aggregate.OUTPUT_DIR = original
+
+    return Case(f"report.render[alerts={alerts}]", {"alerts": alerts, "wallets": REPORT_WALLETS}, setup,
+                expect=alerts, large=alerts >= 10000)
+
+
+def wallets_case(count: int, batch_size: int) -> Case:
+    @contextmanager
+    def setup():
+        accounts = synthetic_accounts(count)
+        wallets = [{"name": f"w{i}", "chain": "ethereum", "address": addr} for i, addr in enumerate(accounts)]
+        with JsonRpcStandin(accounts=accounts) as rpc:
+            chain_cfg = {"rpc": [rpc.url], "hedge": False, "batch_size": batch_size}
+
+            def check() -> int:
+                reports = check_wallets_via_rpc(f"bench-{count}-{batch_size}", wallets, chain_cfg)
+                return sum(1 for r in reports if not r.get("error"))
+            yield check
+
+    return Case(f"wallets.rpc[wallets={count},batch={batch_size}]", {"wallets": count, "batch_size": batch_size},
+                setup, expect=count, large=count >= 5000)
+
+
+def stream_case(events: int) -> Case:
+    @contextmanager
+    def setup():
+        rules, tokens = synthetic_rules(STREAM_RULES), synthetic_tokens(100)
+        with tempfile.TemporaryDirectory() as tmp:
+            def stream() -> int:
+                # events 由產生器逐筆產生，不先建立 list
+                source = (ev for batch in range(0, events, 1000) for ev in synthetic_events(min(1000, events - batch)))
+                engine, stats = aggregate.RuleEngine(rules, tokens), aggregate.EventStats()
+                with streaming.RecordWriter(Path(tmp) / "events_sources.json") as writer:
+                    aggregate.consume_events(streaming.produce(source), engine, stats, writer)
+                return stats.total
+            yield stream
+
+    return Case(f"stream.events[events={events}]", {"events": events, "rules": STREAM_RULES}, setup,
+                expect=events, large=events >= 100000)
+
+
+def history_case(snapshots: int) -> Case:
+    @contextmanager
+    def setup():
+        with tempfile.TemporaryDirectory() as tmp:
+            # 與 pipeline 相同：每小時 record 一次，過期的快照（此處每天一次）壓縮進月份區段
+            store = event_history.EventHistory(Path(tmp))
+            for ts, events in synthetic_history(snapshots, HISTORY_LIVE):
+                store.record(events, [], ts=ts, run_id=str(ts))
+                if (ts // 3600) % 24 == 0:
+                    store.compact(before=ts - event_history.COMPACT_AFTER)
+            store.close()
+            end = ts
+
+            def query() -> int:
+                history = event_history.EventHistory(Path(tmp))
+                try:
+                    found = [history.first_seen(f"Project {snapshots // 24}")]
+                    found += history.query(token="TK7")
+                    found += history.query(end - 14 * 86400, end - 7 * 86400)
+                    found += history.campaigns(end - 30 * 86400, end)
+                    return len(found)
+                finally:
+                    history.close()
+            yield query
+
+    return Case(f"history.query[snapshots={snapshots}]", {"snapshots": snapshots, "live": HISTORY_LIVE}, setup,
+                large=snapshots >= 8760)
+
+
+def build_cases() -> List[Case]:
+    cases = [fetch_case(site, cards) for site in FETCHERS for cards in FETCH_CARDS]
+    cases += [rules_case(*params) for params in RULES_GRID]
+    cases += [fanout_case(subscribers) for subscribers in FANOUT_SUBSCRIBERS]
+    cases += [report_case(alerts) for alerts in REPORT_ALERTS]
+    cases += [wallets_case(*params) for params in WALLET_GRID]
+    cases += [stream_case(events) for events in STREAM_EVENTS]
+    cases += [history_case(snapshots) for snapshots in HISTORY_SNAPSHOTS]
+    return cases
+
+
+# ---- 量測 ----
+
+def run_case(case: Case, repeat: int, memory_repeat: int) -> Dict:
+    with case.setup() as fn:
+        items = fn()  # 暖身（lazy import、連線建立等）
+        if case.expect is not None and items != case.expect:
+            raise RuntimeError(f"{case.name}: 預期 {case.expect} 個項目，實際 {items} 個")
+
+        times = []
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - start) * 1000)
+
+        peaks = []
+        for _ in range(memory_repeat):
+            gc.collect()
+            tracemalloc.start()
+            try:
+                fn()
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+            finally:
+                tracemalloc.stop()
+
+    return {
+        "params": case.params,
+        "items": items,
+        "repeat": repeat,
+        "time_ms": summarize(times),
+        "peak_kb": summarize(peaks),
+        "items_per_second": round(items / (percentile(times, 50) / 1000), 1) if items and times else None,
+    }
+
+
+def compare(cases: Dict[str, Dict], baseline: Dict, overrides: Dict) -> List[str]:
+    """與基準比較 p50 耗時與 p50 記憶體峰值，回傳退化訊息列表"""
+    regressions = []
+    for name, result in cases.items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None:
+            continue
+        tol = {**DEFAULT_TOLERANCE, **baseline.get("tolerance", {}), **base.get("tolerance", {}), **overrides}
+        t, bt = result["time_ms"]["p50"], base["time_ms_p50"]
+        if t > bt * (1 + tol["time"]) and t - bt > tol["min_time_delta_ms"]:
+            regressions.append(f"{name}: p50 {t:.1f}ms > 基準 {bt:.1f}ms +{tol['time']:.0%}")
+        m, bm = result["peak_kb"]["p50"], base["peak_kb_p50"]
+        if m > bm * (1 + tol["memory"]) and m - bm > tol["min_memory_delta_kb"]:
+            regressions.append(f"{name}: 記憶體峰值 {m:.0f}KB > 基準 {bm:.0f}KB +{tol['memory']:.0%}")
+    return regressions
+
+
+def update_baseline(path: Path, baseline: Dict, cases: Dict[str, Dict]):
+    """以本次結果覆寫對應案例的基準，保留其他案例與容許範圍設定"""
+    baseline.setdefault("tolerance", dict(DEFAULT_TOLERANCE))
+    stored = baseline.setdefault("cases", {})
+    for name, result in cases.items():
+        entry = stored.setdefault(name, {})
+        entry["time_ms_p50"] = result["time_ms"]["p50"]
+        entry["peak_kb_p50"] = result["peak_kb"]["p50"]
+    baseline["python"] = sys.version.split()[0]
+    baseline["cases"] = dict(sorted(stored.items()))
+    path.write_text(json.dumps(baseline, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="熱路徑基準測試套件（離線）")
+    parser.add_argument("-k", "--filter", action="append", default=[], help="只執行名稱包含此字串的案例（可重複）")
+    parser.add_argument("--quick", action="store_true", help="略過最大規模的案例")
+    parser.add_argument("--list", action="store_true", help="列出案例後結束")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="耗時量測次數")
+    parser.add_argument("--memory-repeat", type=int, default=DEFAULT_MEMORY_REPEAT, help="記憶體量測次數")
+    parser.add_argument("--time-tolerance", type=float, help="p50 耗時可超過基準的比例（覆寫基準檔設定）")
+    parser.add_argument("--memory-tolerance", type=float, help="記憶體峰值可超過基準的比例（覆寫基準檔設定）")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="基準 JSON 路徑")
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE, help="結果 JSON 輸出路徑")
+    parser.add_argument("--update-baseline", action="store_true", help="以本次結果更新基準")
+    parser.add_argument("--no-fail", action="store_true", help="有退化時不回傳非零結束碼")
+    args = parser.parse_args()
+
+    # 被量測的函式會逐次記錄 INFO 日誌，避免輸出本身影響量測
+    logging.getLogger().setLevel(logging.WARNING)
+
+    cases = [c for c in build_cases()
+             if (not args.filter or any(f in c.name for f in args.filter)) and not (args.quick and c.large)]
+    if args.list:
+        for c in cases:
+            print(c.name)
+        return 0
+
+    results: Dict[str, Dict] = {}
+    for case in cases:
+        repeat = min(args.repeat, LARGE_REPEAT) if case.large else args.repeat
+        results[case.name] = run_case(case, max(repeat, 1), max(args.memory_repeat, 1))
+        r = results[case.name]
+        print(f"{case.name:<58} p50 {r['time_ms']['p50']:>9.1f}ms  p90 {r['time_ms']['p90']:>9.1f}ms"
+              f"  peak {r['peak_kb']['p50'] / 1024:>7.1f}MB")
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+    overrides = {}
+    if args.time_tolerance is not None:
+        overrides["time"] = args.time_tolerance
+    if args.memory_tolerance is not None:
+        overrides["memory"] = args.memory_tolerance
+    regressions = compare(results, baseline, overrides)
+
+    output = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "baseline_python": baseline.get("python"),
+        "cases": results,
+        "missing_baseline": sorted(n for n in results if n not in baseline.get("cases", {})),
+        "regressions": regressions,
+    }
+    args.output.parent.mkdir(exist_ok=True, parents=True)
+    args.output.write_text(json.dumps(output, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if output["missing_baseline"]:
+        print(f"? {len(output['missing_baseline'])} 個案例沒有基準（以 --update-baseline 建立）")
+    for r in regressions:
+        print(f"✗ {r}")
+    print(f"結果已寫入 {args.output}")
+    if args.update_baseline:
+        update_baseline(args.baseline, baseline, results)
+        print(f"基準已更新: {args.baseline}")
+        return 0
+
+    return 1 if regressions and not args.no_fail else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,20 @@
 """
 規則引擎與報告生成器
-整合事件與錢包報告，根據規則產生 alerts 和人類可讀報告
+整合事件與錢包報告，根據規則產生 alerts 和人類可讀報告；alerts 依 subscriptions.yml 分送給符合的訂閱者
 """
-import yaml
+import argparse
 import json
 import logging
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Set
+from typing import Collection, Iterable, List, Dict, Optional, Set, Union
+
+import config_store
+import profiling
+import streaming
+import tracing
 
 # 設定日誌
 logging.basicConfig(
@@ -17,9 +25,17 @@ logger = logging.getLogger(__name__)
 
 ROOT = Path(__file__).resolve().parents[1]
 OUTPUT_DIR = ROOT / "output"
-CONFIG_RULES = ROOT / "config" / "rules.yml"
-CONFIG_SOURCES = ROOT / "config" / "sources.yml"
-CONFIG_TOKENS = ROOT / "config" / "tokens.yml"
+
+# stats.json 摘要設定
+STATUS_KEYS = ("active", "upcoming", "ended", "potential")
+PRIORITY_KEYS = ("high", "medium", "low")
+TOP_ACTIVE_N = 5
+TOP_UPCOMING_N = 3
+TOP_HIGH_ALERTS_N = 3
+WALLET_SUMMARY_N = 5
+# 規則引擎每批評估的 events 數（串流時同時也是記憶體中最多保留的 events 數）
+RULE_BATCH_SIZE = 1000
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
 
 
 def load_json(path: str) -> List[Dict]:
@@ -38,74 +54,239 @@ def load_json(path: str) -> List[Dict]:
 
 def load_rules() -> List[Dict]:
     """載入規則配置"""
-    try:
-        with open(CONFIG_RULES, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            return data.get("rules", [])
-    except Exception as e:
-        logger.error(f"載入 rules.yml 失敗: {e}")
-        return []
+    return config_store.load_config()["rules"]
 
 
 def load_sources_cfg() -> Dict:
     """載入來源配置"""
-    try:
-        with open(CONFIG_SOURCES, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            return data.get("sources", {})
-    except Exception as e:
-        logger.error(f"載入 sources.yml 失敗: {e}")
-        return {}
+    return config_store.load_config()["sources"]
 
 
 def load_tokens() -> List[Dict]:
     """載入追蹤幣種配置"""
-    try:
-        with open(CONFIG_TOKENS, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            return data.get("tokens", [])
-    except Exception as e:
-        logger.error(f"載入 tokens.yml 失敗: {e}")
-        return []
+    return config_store.load_config()["tokens"]
 
 
-def is_token_in_watchlist(token_symbol: str, tokens: List[Dict]) -> bool:
-    """檢查 token 是否在追蹤列表中"""
-    if not token_symbol:
-        return False
-    return any(t.get("symbol", "").upper() == token_symbol.upper() for t in tokens)
+def load_token_markets() -> Dict[str, Dict]:
+    """載入 fetch 階段寫出的追蹤幣種行情（symbol → 行情）；沒有時回傳空 dict"""
+    if not (OUTPUT_DIR / "token_markets.json").exists():
+        return {}
+    return load_json("token_markets.json") or {}
 
 
-def apply_rules(events: List[Dict], wallets: List[Dict], rules: List[Dict], tokens: List[Dict]) -> List[Dict]:
-    """根據規則匹配事件和錢包，產生 alerts"""
-    alerts = []
-    seen_alerts: Set[str] = set()  # 用於去重
+def load_campaigns() -> List[Dict]:
+    """載入空投活動資格條件"""
+    return config_store.load_config()["campaigns"]
 
-    # 1) 針對 events（上市、Launchpool 等）
-    for ev in events:
-        for rule in rules:
-            if rule.get("type") != "listing":
-                continue
 
-            match_conditions = rule.get("match", {})
-            
+def load_subscriptions() -> List[Dict]:
+    """載入訂閱（已補上預設值）"""
+    return config_store.load_config()["subscriptions"]
+
+
+def _listing_matches(rule: Dict, events: List[Dict], watched: Collection[str]) -> bytearray:
+    """
+    單一 listing 規則對每個 event 是否符合（1 / 0，索引與 events 相同）
+
+    watched 為任一訂閱者追蹤的 symbol（大寫）；個別訂閱者的追蹤清單在產生 alert 時由 SubscriptionIndex 篩選。
+    """
+    token_in_watchlist = rule.get("match", {}).get("token_in_watchlist", False)
+    matched = bytearray(len(events))
+    with tracing.span("rule", rule=rule.get("id"), type="listing", candidates=len(events)) as span:
+        for i, ev in enumerate(events):
             # 檢查 category
             category = ev.get("category", "").lower()
-            if "launchpool" in category or "earn" in category:
-                # 檢查 token 是否在 watchlist
-                token_in_watchlist = match_conditions.get("token_in_watchlist", False)
-                if token_in_watchlist:
-                    token_symbol = ev.get("token")
-                    if not is_token_in_watchlist(token_symbol, tokens):
-                        continue
+            if "launchpool" not in category and "earn" not in category:
+                continue
+            # 檢查 token 是否在 watchlist
+            if token_in_watchlist and (ev.get("token") or "").upper() not in watched:
+                continue
+            matched[i] = 1
+        span.set("matched", sum(matched))
+    return matched
+
+
+def _wallet_matches(rule: Dict, wallets: List[Dict]) -> bytearray:
+    """單一 wallet_activity 規則對每個錢包是否符合（1 / 0，索引與 wallets 相同）"""
+    match_conditions = rule.get("match", {})
+    chain_in = match_conditions.get("chain_in", [])
+    tx_count_min = match_conditions.get("tx_count_min", 0)
+    has_defi_activity = match_conditions.get("has_defi_activity", False)
+    protocols_any = match_conditions.get("protocols_any")
+    matched = bytearray(len(wallets))
+    with tracing.span("rule", rule=rule.get("id"), type="wallet_activity", candidates=len(wallets)) as span:
+        for i, w in enumerate(wallets):
+            history = w.get("history") or {}
+
+            # 檢查鏈別
+            if chain_in and w.get("chain") not in chain_in:
+                continue
+
+            # 檢查交易次數
+            if w.get("tx_count", 0) < tx_count_min:
+                continue
+
+            # 檢查 DeFi 活動
+            if has_defi_activity and not w.get("has_defi_activity", False):
+                continue
+
+            # 檢查交易歷史特徵（需要 chains.yml 設定 explorer）
+            if history.get("unique_contracts", 0) < match_conditions.get("unique_contracts_min", 0):
+                continue
+            if history.get("active_months", 0) < match_conditions.get("active_months_min", 0):
+                continue
+            if match_conditions.get("bridge_used") and not history.get("bridge_tx"):
+                continue
+            if protocols_any and not set(protocols_any) & set(history.get("protocols", [])):
+                continue
+            matched[i] = 1
+        span.set("matched", sum(matched))
+    return matched
+
+
+class _Facet:
+    """單一維度的倒排索引：值 → 訂閱者 id；未限制此維度的訂閱者併入每個值（結果依值快取）"""
+
+    def __init__(self, subscriptions: List[Dict], key: str, default: Optional[List[str]] = None):
+        self.by_value: Dict[str, Set[str]] = {}
+        self.any: Set[str] = set()
+        for s in subscriptions:
+            values = s.get(key) if s.get(key) is not None else default
+            if values is None:
+                self.any.add(s["id"])
+                continue
+            for value in values:
+                self.by_value.setdefault(value, set()).add(s["id"])
+        self._cache: Dict[str, frozenset] = {}
+
+    def get(self, value: Optional[str]) -> frozenset:
+        value = value or ""
+        found = self._cache.get(value)
+        if found is None:
+            found = self._cache[value] = frozenset(self.by_value.get(value, ())) | self.any
+        return found
+
+
+class SubscriptionIndex:
+    """
+    訂閱者倒排索引：token / 錢包 / 鏈 / event 類別 / 規則 / 優先級 → 訂閱者 id
+
+    規則對每個 event / 錢包只評估一次；符合時取各維度集合的交集（由小到大）得到要收到 alert 的訂閱者，
+    成本與符合的訂閱者數成正比，不必對每個訂閱者重新評估。
+    未設定 tokens 的訂閱者使用 tokens.yml 的追蹤清單；其餘維度未設定時代表全部。
+    """
+
+    def __init__(self, subscriptions: List[Dict], tokens: List[Dict], rule_ids: List[str]):
+        self.order = {s["id"]: i for i, s in enumerate(subscriptions)}
+        shared = [t["symbol"].upper() for t in tokens if t.get("symbol")]
+        self.tokens = _Facet(subscriptions, "tokens", default=shared)
+        self.wallets = _Facet(subscriptions, "wallets")
+        self.chains = _Facet(subscriptions, "chains")
+        self.categories = _Facet(subscriptions, "categories")
+        self.by_rule = {rid: frozenset(s["id"] for s in subscriptions if s["rules"] is None or rid in s["rules"])
+                        for rid in rule_ids}
+        self.by_priority = {p: frozenset(s["id"] for s in subscriptions
+                                         if rank <= PRIORITY_ORDER.get(s["min_priority"], 2))
+                            for p, rank in PRIORITY_ORDER.items()}
+
+    @property
+    def watched_tokens(self) -> Set[str]:
+        """任一訂閱者追蹤的 symbol（大寫）"""
+        return set(self.tokens.by_value)
+
+    def _intersect(self, sets: List[frozenset]) -> List[str]:
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            if not result:
+                break
+            result &= other
+        return sorted(result, key=self.order.__getitem__)
+
+    def for_event(self, rule: Dict, ev: Dict) -> List[str]:
+        """上市 / Launchpool 類 alert 的訂閱者（依 subscriptions.yml 順序）"""
+        sets = [
+            self.by_rule.get(rule.get("id"), frozenset()),
+            self.by_priority.get(rule.get("priority", "medium"), frozenset()),
+            self.categories.get((ev.get("category") or "").lower()),
+        ]
+        if rule.get("match", {}).get("token_in_watchlist", False):
+            sets.append(self.tokens.get((ev.get("token") or "").upper()))
+        return self._intersect(sets)
+
+    def for_wallet(self, rule_id: str, priority: str, wallet_name: Optional[str],
+                   chain: Optional[str]) -> List[str]:
+        """錢包類 alert 的訂閱者（依 subscriptions.yml 順序）"""
+        return self._intersect([
+            self.by_rule.get(rule_id, frozenset()),
+            self.by_priority.get(priority, frozenset()),
+            self.wallets.get(wallet_name),
+            self.chains.get((chain or "").lower()),
+        ])
+
+
+class RuleEngine:
+    """
+    串流規則引擎：events 逐批流入，錢包報告最後加入
+
+    每批內先逐條規則評估（每條規則一個 rule span），再依 event → 規則的順序產生 alerts 並以 alert key 去重，
+    結果與一次處理全部 events 相同；記憶體只與批次大小及產生的 alerts 數有關，與 events 總數無關。
+
+    每個 alert 帶有 subscribers（SubscriptionIndex 找出的訂閱者 id）；沒有訂閱者時不產生 alert。
+    同一個 alert key 的內容由第一個符合且有訂閱者的規則產生，後面符合的規則只追加訂閱者。
+    未提供 subscriptions 時使用單一預設訂閱。
+    """
+
+    def __init__(self, rules: List[Dict], tokens: List[Dict], subscriptions: Optional[List[Dict]] = None):
+        self.rules = rules
+        self.tokens = tokens
+        self.listing_rules = [r for r in rules if r.get("type") == "listing"]
+        self.wallet_rules = [r for r in rules if r.get("type") == "wallet_activity"]
+        if subscriptions is None:
+            subscriptions = [dict(config_store.DEFAULT_SUBSCRIPTION)]
+        self.subscriptions = SubscriptionIndex(
+            subscriptions, tokens, [r.get("id") for r in rules] + [config_store.ELIGIBILITY_RULE])
+        self._watched = self.subscriptions.watched_tokens
+        self.alerts: List[Dict] = []
+        self.events = 0
+        self.wallets = 0
+        self.deliveries = 0  # alerts × 訂閱者
+        self._seen: Dict[str, Dict] = {}  # alert key → alert（去重）
+
+    def _merge(self, alert_key: str, subscribers: List[str]) -> bool:
+        """alert key 已產生時追加新的訂閱者並回傳 True"""
+        alert = self._seen.get(alert_key)
+        if alert is None:
+            return False
+        existing = set(alert["subscribers"])
+        added = [sid for sid in subscribers if sid not in existing]
+        if added:
+            alert["subscribers"] = sorted(alert["subscribers"] + added, key=self.subscriptions.order.__getitem__)
+            self.deliveries += len(added)
+        return True
+
+    def _add_alert(self, alert_key: str, alert: Dict, subscribers: List[str]):
+        alert["subscribers"] = subscribers
+        self._seen[alert_key] = alert
+        self.alerts.append(alert)
+        self.deliveries += len(subscribers)
+
+    def add_events(self, events: List[Dict]):
+        """加入一批 events（上市、Launchpool 等）"""
+        self.events += len(events)
+        listing_matches = [_listing_matches(rule, events, self._watched) for rule in self.listing_rules]
+        for i, ev in enumerate(events):
+            for rule, matched in zip(self.listing_rules, listing_matches):
+                if not matched[i]:
+                    continue
 
                 # 產生 alert key 用於去重
                 alert_key = f"{ev.get('source')}_{ev.get('token')}_{ev.get('project')}"
-                if alert_key in seen_alerts:
+                subscribers = self.subscriptions.for_event(rule, ev)
+                if not subscribers or self._merge(alert_key, subscribers):
                     continue
-                seen_alerts.add(alert_key)
 
-                alerts.append({
+                self._add_alert(alert_key, {
                     "token": ev.get("token"),
                     "project": ev.get("project", ev.get("token", "Unknown")),
                     "type": "New listing / campaign",
@@ -117,58 +298,140 @@ def apply_rules(events: List[Dict], wallets: List[Dict], rules: List[Dict], toke
                     "notes": f"Detected new listing/campaign on {ev.get('exchange', 'unknown exchange')} ({ev.get('pair', 'N/A')}). Status: {ev.get('status', 'unknown')}.",
                     "links": ev.get("links", {}),
                     "labels": ["airdrop", "launchpool"],
-                })
-
-    # 2) 針對 wallets（活動量 / 潛在空投 profile）
-    for w in wallets:
-        for rule in rules:
-            if rule.get("type") != "wallet_activity":
-                continue
-
-            match_conditions = rule.get("match", {})
-            chain_in = match_conditions.get("chain_in", [])
-            tx_count_min = match_conditions.get("tx_count_min", 0)
-            has_defi_activity = match_conditions.get("has_defi_activity", False)
-
-            # 檢查鏈別
-            if chain_in and w.get("chain") not in chain_in:
-                continue
+                }, subscribers)
+                tracing.mark("alert", rule=rule.get("id"), key=alert_key, priority=rule.get("priority", "medium"),
+                             subscribers=len(subscribers))
+
+    def add_wallets(self, wallets: List[Dict], campaigns: Optional[List[Dict]] = None):
+        """加入錢包報告（活動量 / 潛在空投 profile）；有活動資格條件時另外產生每個錢包的前 k 個符合活動"""
+        self.wallets += len(wallets)
+        wallet_matches = [_wallet_matches(rule, wallets) for rule in self.wallet_rules]
+        for i, w in enumerate(wallets):
+            for rule, matched in zip(self.wallet_rules, wallet_matches):
+                if not matched[i]:
+                    continue
 
-            # 檢查交易次數
-            if w.get("tx_count", 0) < tx_count_min:
-                continue
+                # 產生 alert key 用於去重
+                alert_key = f"wallet_{w.get('name')}_{w.get('chain')}"
+                subscribers = self.subscriptions.for_wallet(rule.get("id"), rule.get("priority", "medium"),
+                                                            w.get("name"), w.get("chain"))
+                if not subscribers or self._merge(alert_key, subscribers):
+                    continue
 
-            # 檢查 DeFi 活動
-            if has_defi_activity and not w.get("has_defi_activity", False):
-                continue
+                history = w.get("history") or {}
+                notes = f"Wallet {w.get('name')} on {w.get('chain')} has {w.get('tx_count', 0)} txs."
+                if history:
+                    notes += (
+                        f" {history.get('unique_contracts', 0)} contracts, {history.get('active_months', 0)} active months"
+                        f", protocols: {', '.join(history.get('protocols', [])) or 'none'}"
+                        f", bridge txs: {history.get('bridge_tx', 0)}."
+                    )
+
+                self._add_alert(alert_key, {
+                    "token": "MULTI",
+                    "project": "Generic Airdrop Profile",
+                    "type": "Wallet potentially qualifies for retroactive airdrops",
+                    "priority": rule.get("priority", "medium"),
+                    "source": "wallets_report",
+                    "wallet_name": w.get("name"),
+                    "wallet_address": w.get("address"),
+                    "wallet_chain": w.get("chain"),
+                    "tx_count": w.get("tx_count", 0),
+                    "notes": f"{notes} May qualify for retroactive airdrops.",
+                    "labels": ["airdrop", "wallet-profile"],
+                }, subscribers)
+                tracing.mark("alert", rule=rule.get("id"), key=alert_key, priority=rule.get("priority", "medium"),
+                             subscribers=len(subscribers))
+
+        # 錢包 × 活動資格矩陣
+        if campaigns:
+            with tracing.span("rule", rule="eligibility", type="campaigns", candidates=len(wallets)) as rule_span:
+                eligible = eligibility_alerts(wallets, campaigns)
+                rule_span.set("matched", len(eligible))
+            for alert in eligible:
+                subscribers = self.subscriptions.for_wallet(config_store.ELIGIBILITY_RULE, alert["priority"],
+                                                            alert["wallet_name"], alert["wallet_chain"])
+                if subscribers:
+                    self._add_alert(f"eligibility_{alert['wallet_name']}_{alert['wallet_chain']}", alert, subscribers)
+
+
+def consume_events(events: Iterable[Dict], engine: RuleEngine, stats: "EventStats",
+                   writer: Optional["streaming.RecordWriter"] = None):
+    """
+    讓 events 串流逐批流過寫檔、統計與規則評估
+
+    一次只保留 RULE_BATCH_SIZE 筆；events 可以是產生器（例如 streaming.produce 的輸出）。
+    """
+    with tracing.span("consume") as span:
+        for batch in streaming.batched(events, RULE_BATCH_SIZE):
+            for ev in batch:
+                if writer is not None:
+                    writer.write(ev)
+                stats.add(ev)
+            engine.add_events(batch)
+        span.update(events=engine.events, alerts=len(engine.alerts))
+
+
+def apply_rules(events: Iterable[Dict], wallets: List[Dict], rules: List[Dict], tokens: List[Dict],
+                campaigns: Optional[List[Dict]] = None, subscriptions: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    根據規則匹配事件和錢包，產生 alerts；有活動資格條件時另外產生每個錢包的前 k 個符合活動
+
+    events 可以是 list 或產生器，以 RULE_BATCH_SIZE 筆為一批交給 RuleEngine；
+    同一個 alert key 由排在前面的 event 與規則產生。
+    """
+    with tracing.span("aggregate", wallets=len(wallets), rules=len(rules)) as span:
+        engine = RuleEngine(rules, tokens, subscriptions)
+        for batch in streaming.batched(events, RULE_BATCH_SIZE):
+            engine.add_events(batch)
+        engine.add_wallets(wallets, campaigns)
+        span.update(events=engine.events, alerts=len(engine.alerts), deliveries=engine.deliveries)
+        logger.info(f"規則引擎產生 {len(engine.alerts)} 個 alerts（分送 {engine.deliveries} 次）")
+        return engine.alerts
+
+
+def eligibility_alerts(wallets: List[Dict], campaigns: List[Dict]) -> List[Dict]:
+    """每個有符合活動的錢包產生一個 alert，列出分數最高的活動；優先級取其中最高者"""
+    import eligibility
+
+    scorable = [w for w in wallets if w.get("address") and not w.get("error")]
+    alerts = []
+    for w, picks in zip(scorable, eligibility.top_campaigns(scorable, campaigns)):
+        if not picks:
+            continue
+        summary = ", ".join(f"{p['name']} ({p['score']:.2f})" for p in picks)
+        alerts.append({
+            "token": "MULTI",
+            "project": picks[0]["name"],
+            "type": "Wallet eligible for airdrop campaigns",
+            "priority": min((p["priority"] for p in picks), key=lambda x: PRIORITY_ORDER.get(x, 2)),
+            "source": "eligibility",
+            "wallet_name": w.get("name"),
+            "wallet_address": w.get("address"),
+            "wallet_chain": w.get("chain"),
+            "tx_count": w.get("tx_count", 0),
+            "eligible_campaigns": picks,
+            "notes": f"Wallet {w.get('name')} on {w.get('chain')} matches: {summary}.",
+            "labels": ["airdrop", "eligibility"],
+        })
+    return alerts
 
-            # 產生 alert key 用於去重
-            alert_key = f"wallet_{w.get('name')}_{w.get('chain')}"
-            if alert_key in seen_alerts:
-                continue
-            seen_alerts.add(alert_key)
-
-            alerts.append({
-                "token": "MULTI",
-                "project": "Generic Airdrop Profile",
-                "type": "Wallet potentially qualifies for retroactive airdrops",
-                "priority": rule.get("priority", "medium"),
-                "source": "wallets_report",
-                "wallet_name": w.get("name"),
-                "wallet_address": w.get("address"),
-                "wallet_chain": w.get("chain"),
-                "tx_count": w.get("tx_count", 0),
-                "notes": f"Wallet {w.get('name')} on {w.get('chain')} has {w.get('tx_count', 0)} txs. May qualify for retroactive airdrops.",
-                "labels": ["airdrop", "wallet-profile"],
-            })
 
-    logger.info(f"規則引擎產生 {len(alerts)} 個 alerts")
-    return alerts
+def _format_usd(value) -> str:
+    if value is None:
+        return "N/A"
+    if value >= 1:
+        return f"${value:,.2f}"
+    return f"${value:.6g}"
 
 
-def write_human_report(alerts: List[Dict], wallets: List[Dict]):
-    """產生人類可讀的報告"""
-    sources_cfg = load_sources_cfg()
+def write_human_report(alerts: List[Dict], wallets: List[Dict], sources_cfg: Optional[Dict] = None,
+                       markets: Optional[Dict[str, Dict]] = None):
+    """產生人類可讀的報告（markets 為追蹤幣種行情，未提供時讀取 token_markets.json）"""
+    if sources_cfg is None:
+        sources_cfg = load_sources_cfg()
+    if markets is None:
+        markets = load_token_markets()
     lines = ["# Airdrop / Launchpool Daily Report\n"]
 
     # 1) 高優先級 alerts
@@ -207,7 +470,20 @@ def write_human_report(alerts: List[Dict], wallets: List[Dict]):
             
             lines.append("")
 
-    # 2) 錢包活動摘要
+    # 2) 追蹤幣種行情
+    if markets:
+        lines.append("## Watched Tokens\n")
+        lines.append("| Token | Price | 24h | Market Cap | Source |")
+        lines.append("|---|---|---|---|---|")
+        for symbol, m in sorted(markets.items()):
+            change = m.get("change_24h_pct")
+            source = f"[{m.get('source')}]({m['url']})" if m.get("url") else m.get("source", "N/A")
+            lines.append(f"| {symbol} | {_format_usd(m.get('price_usd'))} | "
+                         f"{'N/A' if change is None else f'{change:+.2f}%'} | "
+                         f"{_format_usd(m.get('market_cap_usd'))} | {source} |")
+        lines.append("")
+
+    # 3) 錢包活動摘要
     lines.append("## Wallet Activity Summary\n")
     if not wallets:
         lines.append("沒有配置任何錢包。\n")
@@ -221,7 +497,18 @@ def write_human_report(alerts: List[Dict], wallets: List[Dict]):
                 lines.append(f"- **Error:** {w.get('error')}")
             lines.append("")
 
-    # 3) EarnDrop / Bankless Claimables 快捷入口
+    # 4) 活動資格（每個錢包分數最高的活動）
+    eligible = [a for a in alerts if a.get("eligible_campaigns")]
+    if eligible:
+        lines.append("## Campaign Eligibility\n")
+        for a in eligible:
+            lines.append(f"### {a.get('wallet_name', 'Unknown')} ({a.get('wallet_chain', 'unknown')})")
+            for rank, c in enumerate(a["eligible_campaigns"], 1):
+                link = f" - {c['url']}" if c.get("url") else ""
+                lines.append(f"{rank}. **{c['name']}** (score {c['score']:.2f}, {c['priority']}){link}")
+            lines.append("")
+
+    # 5) EarnDrop / Bankless Claimables 快捷入口
     lines.append("## Wallet-based Tools\n")
 
     if sources_cfg.get("earndrop", {}).get("enabled"):
@@ -254,20 +541,127 @@ def write_human_report(alerts: List[Dict], wallets: List[Dict]):
         logger.error(f"寫入 latest_report.md 失敗: {e}")
 
 
-def run():
-    """主執行函式"""
-    logger.info("開始整合事件與錢包報告...")
-
-    events = load_json("events_sources.json")
-    wallets = load_json("wallets_report.json")
-    rules = load_rules()
-    tokens = load_tokens()
+def _keep_smallest(items: List[str], value: str, limit: int):
+    """items 為排序後不重複的前 limit 小字串；加入 value 後維持此性質"""
+    if len(items) >= limit and value >= items[-1]:
+        return
+    i = bisect_left(items, value)
+    if i < len(items) and items[i] == value:
+        return
+    items.insert(i, value)
+    if len(items) > limit:
+        items.pop()
+
+
+class EventStats:
+    """
+    events 的串流統計（stats.json 的 events 區段）
+
+    只保留計數與排序後的前幾個專案名稱，記憶體與 events 總數無關。
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.by_status = Counter({k: 0 for k in STATUS_KEYS})
+        self.by_source: Counter = Counter()
+        self.top_active: List[str] = []
+        self.top_upcoming: List[str] = []
+
+    def add(self, ev: Dict):
+        self.total += 1
+        status = ev.get("status") or "unknown"
+        self.by_status[status] += 1
+        self.by_source[ev.get("source") or "unknown"] += 1
+        project = ev.get("project")
+        if project:
+            if status == "active":
+                _keep_smallest(self.top_active, project, TOP_ACTIVE_N)
+            elif status == "upcoming":
+                _keep_smallest(self.top_upcoming, project, TOP_UPCOMING_N)
+
+    def to_dict(self) -> Dict:
+        return {
+            "total": self.total,
+            "by_status": dict(self.by_status),
+            "by_source": dict(sorted(self.by_source.items())),
+            # 與原本 jq 的 `unique | .[0:N]` 一致：排序後取前 N 個
+            "top_active": list(self.top_active),
+            "top_upcoming": list(self.top_upcoming),
+        }
+
+
+def compute_stats(events: Union[Iterable[Dict], EventStats], wallets: List[Dict], alerts: List[Dict]) -> Dict:
+    """
+    計算所有摘要統計（供 workflow 與網站共用）
+
+    events 可以是已串流累計的 EventStats，或 events 本身（走訪一次）。
+    """
+    if not isinstance(events, EventStats):
+        event_stats = EventStats()
+        for ev in events:
+            event_stats.add(ev)
+        events = event_stats
+
+    by_chain: Counter = Counter()
+    wallets_with_activity = 0
+    total_tx = 0
+    for w in wallets:
+        by_chain[w.get("chain") or "unknown"] += 1
+        total_tx += w.get("tx_count") or 0
+        if w.get("has_defi_activity"):
+            wallets_with_activity += 1
+
+    by_priority = Counter({k: 0 for k in PRIORITY_KEYS})
+    top_high_alerts = []
+    for a in alerts:
+        priority = a.get("priority", "medium")
+        by_priority[priority] += 1
+        if priority == "high" and len(top_high_alerts) < TOP_HIGH_ALERTS_N:
+            top_high_alerts.append({
+                "project": a.get("project", "Unknown"),
+                "type": a.get("type") or "airdrop",
+                "notes": a.get("notes") or "Check details",
+            })
 
-    logger.info(f"載入 {len(events)} 個事件, {len(wallets)} 個錢包報告, {len(rules)} 條規則")
+    return {
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "events": events.to_dict(),
+        "wallets": {
+            "total": len(wallets),
+            "with_defi_activity": wallets_with_activity,
+            "total_tx": total_tx,
+            "by_chain": dict(sorted(by_chain.items())),
+            "summary": [
+                {
+                    "name": w.get("name", "unknown"),
+                    "chain": w.get("chain", "unknown"),
+                    "tx_count": w.get("tx_count", 0),
+                    "has_defi_activity": bool(w.get("has_defi_activity", False)),
+                }
+                for w in wallets[:WALLET_SUMMARY_N]
+            ],
+        },
+        "alerts": {
+            "total": len(alerts),
+            "by_priority": dict(by_priority),
+            "top_high": top_high_alerts,
+        },
+    }
+
+
+def write_stats(stats: Dict):
+    """寫出 stats.json"""
+    output_file = OUTPUT_DIR / "stats.json"
+    try:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+        logger.info(f"成功寫入統計摘要到 {output_file}")
+    except Exception as e:
+        logger.error(f"寫入 stats.json 失敗: {e}")
 
-    alerts = apply_rules(events, wallets, rules, tokens)
 
-    # 寫出 alerts.json
+def write_alerts(alerts: List[Dict]):
+    """寫出 alerts.json"""
     output_file = OUTPUT_DIR / "alerts.json"
     try:
         with open(output_file, "w", encoding="utf-8") as f:
@@ -276,10 +670,46 @@ def run():
     except Exception as e:
         logger.error(f"寫入 alerts.json 失敗: {e}")
 
+
+def write_outputs(events: Union[Iterable[Dict], EventStats], wallets: List[Dict], alerts: List[Dict],
+                  sources_cfg: Optional[Dict] = None, markets: Optional[Dict[str, Dict]] = None):
+    """寫出 alerts.json、latest_report.md 與 stats.json（events 為 events 本身或串流時累計的 EventStats）"""
+    write_alerts(alerts)
+
     # 寫出人類可讀報告
-    write_human_report(alerts, wallets)
+    write_human_report(alerts, wallets, sources_cfg, markets)
+
+    # 寫出統計摘要（workflow mini-report 與網站 StatsPanel 使用）
+    write_stats(compute_stats(events, wallets, alerts))
+
+
+def run(profile: bool = False, trace: bool = False):
+    """主執行函式"""
+    logger.info("開始整合事件與錢包報告...")
+
+    with tracing.session("aggregate", trace), profiling.profile_stage("aggregate", profile):
+        wallets = load_json("wallets_report.json")
+        rules = load_rules()
+        engine = RuleEngine(rules, load_tokens(), load_subscriptions())
+        stats = EventStats()
+
+        # events 逐筆讀取（NDJSON），不整份載入
+        consume_events(streaming.read_records(OUTPUT_DIR / "events_sources.json"), engine, stats)
+        logger.info(f"處理 {stats.total} 個事件, {len(wallets)} 個錢包報告, {len(rules)} 條規則")
+
+        engine.add_wallets(wallets, load_campaigns())
+        logger.info(f"規則引擎產生 {len(engine.alerts)} 個 alerts（分送 {engine.deliveries} 次）")
+        write_outputs(stats, wallets, engine.alerts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="整合事件與錢包報告，產生 alerts 與報告")
+    profiling.add_argument(parser)
+    tracing.add_argument(parser)
+    args = parser.parse_args()
+    run(args.profile, args.trace)
 
 
 if __name__ == "__main__":
-    run()
+    main()
 
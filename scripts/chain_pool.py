@@ -0,0 +1,241 @@
+"""
+多端點供應者池
+每條鏈設定多個 RPC 端點，依觀察到的延遲與錯誤率排序並自動切換；
+主要端點超過其 p95 延遲仍未回應時，對次佳端點送出對沖（hedged）請求，取先成功者。
+
+只用於唯讀查詢，重複送出同一請求不會有副作用。
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TypeVar
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+STATS_FILE = ROOT / "output" / "cache" / "provider_stats.json"
+
+T = TypeVar("T")
+
+# 失敗切換：最多嘗試次數，每輪所有端點都失敗後的等待秒數
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 2  # 秒
+
+# 延遲樣本數不足時不做對沖（p95 不可靠）
+HEDGE_MIN_SAMPLES = 5
+LATENCY_WINDOW = 100
+# EWMA 平滑係數與錯誤率懲罰權重
+EWMA_ALPHA = 0.3
+ERROR_PENALTY = 4.0
+# 連續失敗達此次數後暫時降到最後順位的秒數
+COOLDOWN_AFTER_FAILURES = 3
+COOLDOWN_SECONDS = 60
+# 載入上次保存的成功 / 失敗次數時的衰減係數，避免舊錯誤永久影響排序
+SAVED_STATS_DECAY = 0.5
+
+
+class PoolExhaustedError(Exception):
+    """所有端點都嘗試失敗"""
+
+
+class EndpointStats:
+    """單一端點的延遲與錯誤統計（name 為不含密鑰的顯示名稱，用於日誌與保存的統計）"""
+
+    def __init__(self, url: str, name: Optional[str] = None):
+        self.url = url
+        self.name = name or url
+        self.latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self.ewma_ms: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, elapsed_ms: float):
+        with self._lock:
+            self.latencies.append(elapsed_ms)
+            self.ewma_ms = elapsed_ms if self.ewma_ms is None else \
+                EWMA_ALPHA * elapsed_ms + (1 - EWMA_ALPHA) * self.ewma_ms
+            self.successes += 1
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= COOLDOWN_AFTER_FAILURES:
+                self.cooldown_until = time.monotonic() + COOLDOWN_SECONDS
+
+    @property
+    def error_rate(self) -> float:
+        total = self.successes + self.failures
+        return self.failures / total if total else 0.0
+
+    def p95_ms(self) -> Optional[float]:
+        """近期成功請求的 p95 延遲；樣本不足時回傳 None"""
+        with self._lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def score(self) -> float:
+        """排序分數（越低越好）：EWMA 延遲乘上錯誤率懲罰；冷卻中的端點排最後"""
+        if time.monotonic() < self.cooldown_until:
+            return float("inf")
+        # 尚無樣本的端點給予中性分數，讓它有機會被選到
+        latency = self.ewma_ms if self.ewma_ms is not None else 500.0
+        return latency * (1 + ERROR_PENALTY * self.error_rate)
+
+    def to_dict(self) -> Dict:
+        return {
+            "ewma_ms": round(self.ewma_ms, 3) if self.ewma_ms is not None else None,
+            "p95_ms": self.p95_ms(),
+            "successes": self.successes,
+            "failures": self.failures,
+            "error_rate": round(self.error_rate, 4),
+        }
+
+
+class ProviderPool:
+    """
+    單一鏈的端點池
+
+    request(fn) 以排序後的端點呼叫 fn(url)：失敗時切換到下一個端點，
+    主要端點延遲超過 p95 時對次佳端點送出對沖請求。
+    """
+
+    def __init__(self, chain: str, urls: List[str], hedge: bool = True, max_attempts: int = MAX_ATTEMPTS,
+                 names: Optional[List[str]] = None):
+        if not urls:
+            raise ValueError(f"{chain} 沒有可用的端點")
+        self.chain = chain
+        self.endpoints = [EndpointStats(url, name) for url, name in zip(urls, names or urls)]
+        self.hedge = hedge and len(urls) > 1
+        self.max_attempts = max(max_attempts, len(urls))
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix=f"pool-{chain}")
+
+    def ranked(self) -> List[EndpointStats]:
+        """依分數排序的端點（穩定排序，分數相同時維持設定順序）"""
+        return sorted(self.endpoints, key=lambda ep: ep.score())
+
+    def _timed(self, endpoint: EndpointStats, fn: Callable[[str], T]) -> T:
+        start = time.perf_counter()
+        try:
+            result = fn(endpoint.url)
+        except Exception:
+            endpoint.record_failure()
+            raise
+        endpoint.record_success((time.perf_counter() - start) * 1000)
+        return result
+
+    def _execute(self, fn: Callable[[str], T], primary: EndpointStats, backup: Optional[EndpointStats]) -> T:
+        """呼叫主要端點；超過其 p95 仍未完成時對 backup 送出對沖請求"""
+        future = self._executor.submit(self._timed, primary, fn)
+        delay_ms = primary.p95_ms() if backup is not None else None
+        if delay_ms is None:
+            return future.result()
+
+        done, _ = wait([future], timeout=delay_ms / 1000)
+        if done:
+            return future.result()
+
+        metrics.incr("provider_pool", f"{self.chain}_hedged")
+        logger.debug(f"{self.chain} 主要端點超過 p95 ({delay_ms:.0f}ms)，對沖請求: {backup.name}")
+        pending = {future, self._executor.submit(self._timed, backup, fn)}
+        last_error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                try:
+                    result = f.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if f is not future:
+                    metrics.incr("provider_pool", f"{self.chain}_hedge_wins")
+                return result
+        raise last_error
+
+    def request(self, fn: Callable[[str], T]) -> T:
+        """
+        以端點池執行 fn(url)，回傳第一個成功的結果
+
+        Raises:
+            PoolExhaustedError: 所有嘗試都失敗
+        """
+        ranked = self.ranked()
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_attempts):
+            if attempt and attempt % len(ranked) == 0:
+                time.sleep(RETRY_DELAY * (attempt // len(ranked)))
+            primary = ranked[attempt % len(ranked)]
+            backup = ranked[(attempt + 1) % len(ranked)] if self.hedge else None
+            try:
+                return self._execute(fn, primary, backup)
+            except Exception as e:
+                last_error = e
+                metrics.incr("provider_pool", f"{self.chain}_failovers")
+                logger.warning(f"{self.chain} 端點失敗 (嘗試 {attempt + 1}/{self.max_attempts}): {primary.name} - {e}")
+        raise PoolExhaustedError(f"{self.chain} 所有端點都失敗: {last_error}") from last_error
+
+    def stats(self) -> Dict[str, Dict]:
+        return {ep.name: ep.to_dict() for ep in self.endpoints}
+
+
+_pools: Dict[str, ProviderPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _load_saved_stats() -> Dict:
+    if not STATS_FILE.exists():
+        return {}
+    try:
+        with open(STATS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"讀取端點統計失敗，重新開始量測: {e}")
+        return {}
+
+
+def get_pool(chain: str, urls: List[str], hedge: bool = True, names: Optional[List[str]] = None) -> ProviderPool:
+    """
+    取得（或建立）某條鏈的端點池；同一行程內共用，並帶入上次執行保存的延遲統計
+
+    names 為各端點不含密鑰的名稱（例如設定檔中未展開的 URL），保存的統計以此為 key。
+    """
+    with _pools_lock:
+        pool = _pools.get(chain)
+        if pool is not None and [ep.url for ep in pool.endpoints] == urls:
+            return pool
+        pool = ProviderPool(chain, urls, hedge=hedge, names=names)
+        saved = _load_saved_stats().get(chain, {})
+        for ep in pool.endpoints:
+            prev = saved.get(ep.name)
+            if prev:
+                ep.ewma_ms = prev.get("ewma_ms")
+                ep.successes = int(prev.get("successes", 0) * SAVED_STATS_DECAY)
+                ep.failures = int(prev.get("failures", 0) * SAVED_STATS_DECAY)
+        _pools[chain] = pool
+        return pool
+
+
+def save_pool_stats():
+    """保存各端點統計，讓下次執行沿用延遲排序"""
+    with _pools_lock:
+        data = _load_saved_stats()
+        for chain, pool in _pools.items():
+            data[chain] = pool.stats()
+    try:
+        STATS_FILE.parent.mkdir(exist_ok=True, parents=True)
+        with open(STATS_FILE, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        logger.warning(f"寫入端點統計失敗: {e}")
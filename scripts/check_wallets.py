@@ -1,16 +1,24 @@
 """
 錢包活動檢查器
 透過鏈上 API 查詢錢包活動指標（只讀，不操作資產）
+
+用法：
+    python scripts/check_wallets.py                               # 查詢所有錢包
+    python scripts/check_wallets.py --shard 0 --num-shards 4      # 只查詢分片 0，寫出部分報告
+    python scripts/check_wallets.py --merge [--num-shards 4]      # 合併分片報告成 wallets_report.json
 """
-import yaml
+import argparse
 import json
 import os
 import logging
 import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
-import requests
+import config_store
+import metrics
+import profiling
+import tracing
 
 # 設定日誌
 logging.basicConfig(
@@ -20,7 +28,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 ROOT = Path(__file__).resolve().parents[1]
-CONFIG_WALLETS = ROOT / "config" / "wallets.yml"
 OUTPUT_DIR = ROOT / "output"
 OUTPUT_DIR.mkdir(exist_ok=True, parents=True)
 
@@ -30,16 +37,48 @@ ETHERSCAN_API_KEY = os.environ.get("ETHERSCAN_API_KEY")
 MAX_RETRIES = 3
 RETRY_DELAY = 2  # 秒
 
+# 使用交易次數作為 DeFi 活動的粗略指標
+DEFI_ACTIVITY_TX_MIN = 20
+
 
 def load_wallets() -> List[Dict]:
     """載入錢包配置"""
-    try:
-        with open(CONFIG_WALLETS, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            return data.get("wallets", [])
-    except Exception as e:
-        logger.error(f"載入 wallets.yml 失敗: {e}")
-        return []
+    return config_store.load_config()["wallets"]
+
+
+def load_chains() -> Dict:
+    """載入鏈 RPC 配置"""
+    return config_store.load_config()["chains"]
+
+
+def resolve_rpc_endpoints(chain_cfg: Dict) -> List[Tuple[str, str]]:
+    """
+    展開 RPC URL 中的 ${ENV_VAR}，略過引用了未設定變數的 URL
+
+    Returns:
+        (設定檔中的原始 URL, 展開後的 URL) 列表；前者不含密鑰，用於日誌與統計
+    """
+    endpoints = []
+    for url in chain_cfg.get("rpc") or []:
+        expanded = os.path.expandvars(url)
+        if "$" in expanded:
+            logger.debug(f"RPC URL 引用的環境變數未設定，略過: {url}")
+            continue
+        endpoints.append((url, expanded))
+    return endpoints
+
+
+def build_wallet_report(wallet: Dict, tx_count: int, **extra) -> Dict:
+    """產生單一錢包的報告"""
+    return {
+        "name": wallet.get("name", "unknown"),
+        "chain": wallet.get("chain", "").lower(),
+        "address": wallet.get("address", ""),
+        "tx_count": tx_count,
+        # 未來可以擴充：檢查特定合約互動、NFT 持有等
+        "has_defi_activity": tx_count >= DEFI_ACTIVITY_TX_MIN,
+        **extra,
+    }
 
 
 def get_eth_tx_count(address: str) -> int:
@@ -48,6 +87,8 @@ def get_eth_tx_count(address: str) -> int:
         logger.warning("未設定 ETHERSCAN_API_KEY，跳過以太坊查詢")
         return 0
 
+    import requests
+
     url = "https://api.etherscan.io/api"
     params = {
         "module": "proxy",
@@ -86,20 +127,6 @@ def get_eth_tx_count(address: str) -> int:
     return 0
 
 
-def get_arbitrum_tx_count(address: str) -> int:
-    """使用 Arbiscan API 查詢 Arbitrum 地址的交易次數（預留擴充）"""
-    # TODO: 實作 Arbiscan API 整合
-    logger.info(f"Arbitrum 查詢尚未實作，地址: {address}")
-    return 0
-
-
-def get_optimism_tx_count(address: str) -> int:
-    """使用 Optimistic Etherscan API 查詢 Optimism 地址的交易次數（預留擴充）"""
-    # TODO: 實作 Optimistic Etherscan API 整合
-    logger.info(f"Optimism 查詢尚未實作，地址: {address}")
-    return 0
-
-
 def analyze_wallet_activity(wallet: Dict) -> Dict:
     """分析錢包活動指標"""
     chain = wallet.get("chain", "").lower()
@@ -122,55 +149,197 @@ def analyze_wallet_activity(wallet: Dict) -> Dict:
     tx_count = 0
     if chain == "ethereum":
         tx_count = get_eth_tx_count(addr)
-    elif chain == "arbitrum":
-        tx_count = get_arbitrum_tx_count(addr)
-    elif chain == "optimism":
-        tx_count = get_optimism_tx_count(addr)
     else:
-        logger.warning(f"不支援的鏈: {chain}，地址: {addr}")
+        logger.warning(f"鏈 {chain} 未在 chains.yml 設定 RPC 端點，無法查詢地址: {addr}")
 
-    # 使用交易次數作為 DeFi 活動的粗略指標
-    # 未來可以擴充：檢查特定合約互動、NFT 持有等
-    has_defi_activity = tx_count >= 20
+    result = build_wallet_report(wallet, tx_count)
+    logger.info(f"錢包 {name} 分析完成: {tx_count} 筆交易, DeFi 活動: {result['has_defi_activity']}")
+    return result
 
-    result = {
-        "name": name,
-        "chain": chain,
-        "address": addr,
-        "tx_count": tx_count,
-        "has_defi_activity": has_defi_activity,
-    }
 
-    logger.info(f"錢包 {name} 分析完成: {tx_count} 筆交易, DeFi 活動: {has_defi_activity}")
-    return result
+def safe_analyze_wallet(wallet: Dict) -> Dict:
+    """逐一地址查詢的路徑，失敗時回傳含 error 的報告"""
+    try:
+        return analyze_wallet_activity(wallet)
+    except Exception as e:
+        logger.error(f"分析錢包 {wallet.get('name', 'unknown')} 失敗: {e}")
+        return {
+            "name": wallet.get("name", "unknown"),
+            "chain": wallet.get("chain", "unknown"),
+            "address": wallet.get("address", ""),
+            "tx_count": 0,
+            "has_defi_activity": False,
+            "error": str(e),
+        }
 
 
-def run():
-    """主執行函式"""
-    logger.info("開始檢查錢包活動...")
-    wallets = load_wallets()
+def _find_unchanged(chain: str, wallets: List[Dict], client, cache, ttl: float, head: int) -> Dict[str, Dict]:
+    """
+    以廉價探測找出自上次查詢後沒有變化的錢包
+
+    先比對最新區塊高度（沒有新區塊就不可能有新交易），再對其餘未過期的快取項目做只查 nonce 的 batch 探測。
+
+    Returns:
+        address → 快取項目（可直接沿用的錢包）
+    """
+    cached = {}
+    for w in wallets:
+        entry = cache.get(chain, w["address"])
+        if entry is not None and not cache.is_expired(entry, ttl):
+            cached[w["address"]] = entry
+        elif entry is not None:
+            metrics.incr("wallet_cache", "expired")
+    if not cached:
+        return {}
+
+    unchanged = {addr: e for addr, e in cached.items() if e.get("block") == head}
+    to_probe = [addr for addr in cached if addr not in unchanged]
+    if to_probe:
+        metrics.incr("wallet_cache", "nonce_probes", len(to_probe))
+        nonces = client.get_nonces(to_probe, block=hex(head))
+        for addr in to_probe:
+            if nonces.get(addr) is not None and nonces[addr] == cached[addr]["tx_count"]:
+                unchanged[addr] = cached[addr]
+                cache.touch(chain, addr, head)
+    return unchanged
+
+
+def check_wallets_via_rpc(chain: str, wallets: List[Dict], chain_cfg: Dict, cache=None) -> List[Dict]:
+    """
+    以 JSON-RPC batch 一次查詢同一條鏈上所有錢包的 nonce 與餘額
+
+    所有 EVM 鏈共用此路徑；端點排序、失敗切換與對沖請求由該鏈的 ProviderPool 處理。
+    傳入 cache（WalletCache）時，只有探測到變化或超過 TTL（chains.yml 的 cache_ttl）的錢包才重新完整查詢。
+
+    Raises:
+        RpcError: 所有端點都無法完成 batch 請求（呼叫端改走逐一地址查詢）
+    """
+    from chain_pool import get_pool
+    from evm_rpc import EvmRpcClient, WEI_PER_ETH
+    from wallet_cache import DEFAULT_TTL
+
+    endpoints = resolve_rpc_endpoints(chain_cfg)
+    pool = get_pool(
+        chain,
+        [url for _, url in endpoints],
+        hedge=chain_cfg.get("hedge", True),
+        names=[name for name, _ in endpoints],
+    )
+    client = EvmRpcClient(pool, batch_size=chain_cfg.get("batch_size", 50))
+
+    unchanged, head = {}, None
+    if cache is not None:
+        head = client.get_block_number()
+        unchanged = _find_unchanged(chain, wallets, client, cache, chain_cfg.get("cache_ttl", DEFAULT_TTL), head)
+    to_query = [w["address"] for w in wallets if w["address"] not in unchanged]
+    if cache is not None:
+        metrics.incr("wallet_cache", "hits", len(unchanged))
+        metrics.incr("wallet_cache", "misses", len(to_query))
+
+    snapshots = {}
+    if to_query:
+        snapshots = client.get_wallet_snapshots(to_query, block=hex(head) if head is not None else "latest")
+        if cache is not None:
+            for addr, snap in snapshots.items():
+                if "error" not in snap:
+                    cache.put(chain, addr, snap["tx_count"], snap["balance_wei"], head)
+    snapshots.update(unchanged)
+
+    stats = client.stats
+    for key, value in stats.items():
+        metrics.incr("wallet_rpc", key, value)
+    logger.info(
+        f"{chain} JSON-RPC batch: {len(wallets)} 個錢包（快取命中 {len(unchanged)}）, {stats['calls']} 個呼叫, "
+        f"{stats['http_requests']} 個 HTTP 請求（省下 {stats['requests_saved']} 個）"
+    )
+
+    reports = []
+    for w in wallets:
+        snap = snapshots.get(w["address"], {})
+        if "error" in snap:
+            logger.warning(f"錢包 {w.get('name')} RPC 查詢失敗: {snap['error']}")
+            reports.append(build_wallet_report(w, 0, error=snap["error"]))
+            continue
+        reports.append(build_wallet_report(
+            w, snap["tx_count"], balance_eth=round(snap["balance_wei"] / WEI_PER_ETH, 6),
+        ))
+    return reports
+
+
+def check_wallets(wallets: List[Dict], use_cache: bool = True, sync_history: bool = True,
+                  cache_path: Optional[Path] = None, rate_shares: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """
+    分析所有錢包活動，回傳報告列表（不寫檔，順序與輸入相同）
+
+    chains.yml 設有 RPC 端點的鏈以 JSON-RPC batch 查詢（搭配 output/cache/wallet_cache.json 略過沒有變化的錢包）；
+    其餘走逐一地址查詢。設有 explorer 的鏈再增量同步交易歷史，互動特徵放在各報告的 history 欄位。
+    分片執行時以 cache_path 使用分片專用的快取檔，rate_shares 為各鏈區塊瀏覽器可使用的額度比例。
+    """
+    from chain_pool import save_pool_stats
+    from wallet_cache import WalletCache
 
     if not wallets:
         logger.warning("沒有配置任何錢包")
-        reports = []
-    else:
-        reports = []
-        for wallet in wallets:
+        return []
+
+    chains = load_chains()
+    reports: List[Optional[Dict]] = [None] * len(wallets)
+    rpc_groups: Dict[str, List[int]] = {}
+    for i, wallet in enumerate(wallets):
+        chain = wallet.get("chain", "").lower()
+        if wallet.get("address") and resolve_rpc_endpoints(chains.get(chain, {})):
+            rpc_groups.setdefault(chain, []).append(i)
+        else:
+            reports[i] = safe_analyze_wallet(wallet)
+
+    cache = (WalletCache(cache_path) if cache_path else WalletCache()) if use_cache and rpc_groups else None
+    for chain, indexes in rpc_groups.items():
+        group = [wallets[i] for i in indexes]
+        with tracing.span("chain", chain=chain, wallets=len(group)) as span:
             try:
-                report = analyze_wallet_activity(wallet)
-                reports.append(report)
+                group_reports = check_wallets_via_rpc(chain, group, chains[chain], cache=cache)
             except Exception as e:
-                logger.error(f"分析錢包 {wallet.get('name', 'unknown')} 失敗: {e}")
-                reports.append({
-                    "name": wallet.get("name", "unknown"),
-                    "chain": wallet.get("chain", "unknown"),
-                    "address": wallet.get("address", ""),
-                    "tx_count": 0,
-                    "has_defi_activity": False,
-                    "error": str(e),
-                })
-
-    # 寫出報告
+                logger.error(f"{chain} JSON-RPC batch 查詢失敗，改為逐一查詢: {e}")
+                span.set("fallback", True)
+                group_reports = [safe_analyze_wallet(w) for w in group]
+                # 逐一查詢失敗時同樣回傳 0 筆交易：無法與真的沒有交易區分，視為查詢失敗
+                for report in group_reports:
+                    if not report.get("tx_count") and not report.get("error"):
+                        report["error"] = f"JSON-RPC 查詢失敗: {e}"
+        for i, report in zip(indexes, group_reports):
+            reports[i] = report
+
+    if rpc_groups:
+        save_pool_stats()
+    if cache is not None:
+        cache.save()
+    if sync_history:
+        with tracing.span("history", wallets=len(reports)):
+            add_history_features(reports, chains, rate_shares)
+    return reports
+
+
+def count_failures(reports: List[Dict]) -> int:
+    """查詢失敗（報告含 error）的錢包數"""
+    return sum(1 for report in reports if report.get("error"))
+
+
+def add_history_features(reports: List[Dict], chains: Dict, rate_shares: Optional[Dict[str, float]] = None):
+    """同步交易歷史並加入互動特徵；使用過已知協議的錢包也視為有 DeFi 活動"""
+    from wallet_history import sync_wallets
+
+    try:
+        sync_wallets(reports, chains, config_store.load_config()["protocols_by_contract"], rate_shares=rate_shares)
+    except Exception as e:
+        logger.error(f"交易歷史同步失敗（錢包報告不含互動特徵）: {e}")
+        return
+    for report in reports:
+        if report.get("history", {}).get("protocols"):
+            report["has_defi_activity"] = True
+
+
+def write_wallets_report(reports: List[Dict]):
+    """寫出錢包報告"""
     output_file = OUTPUT_DIR / "wallets_report.json"
     try:
         with open(output_file, "w", encoding="utf-8") as f:
@@ -180,6 +349,82 @@ def run():
         logger.error(f"寫入 wallets_report.json 失敗: {e}")
 
 
+def load_wallets_report() -> List[Dict]:
+    """讀取已寫出的 wallets_report.json（例如分片合併後的結果）"""
+    with open(OUTPUT_DIR / "wallets_report.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_shard(shard: int, num_shards: int, profile: bool = False, trace: bool = False):
+    """
+    只查詢屬於 shard 的錢包，寫出部分報告到 output/shards/
+
+    分片使用各自的錢包快取檔；`<NAME>_SHARD_<i>` 環境變數覆蓋對應的 API key，
+    沒有專用 key 的區塊瀏覽器額度依分片數平均分配。
+    """
+    import wallet_shards
+    from wallet_cache import CACHE_FILE
+
+    global ETHERSCAN_API_KEY
+    overridden = wallet_shards.apply_shard_env(shard)
+    ETHERSCAN_API_KEY = os.environ.get("ETHERSCAN_API_KEY")
+
+    wallets = wallet_shards.select_shard(load_wallets(), shard, num_shards)
+    logger.info(f"開始檢查錢包活動（分片 {shard}/{num_shards}，{len(wallets)} 個錢包）...")
+    chains = load_chains()
+    rate_shares = {
+        chain: wallet_shards.rate_share((cfg.get("explorer") or {}).get("api_key", ""), overridden, num_shards)
+        for chain, cfg in chains.items()
+    }
+    cache_path = CACHE_FILE.with_name(f"wallet_cache.shard-{shard}-of-{num_shards}.json")
+    stage = f"check_wallets.shard-{shard}-of-{num_shards}"
+    with tracing.session(stage, trace), profiling.profile_stage(stage, profile):
+        reports = check_wallets(wallets, cache_path=cache_path, rate_shares=rate_shares)
+    wallet_shards.write_shard_report(reports, shard, num_shards, metrics.snapshot())
+
+
+def merge(num_shards: Optional[int] = None, allow_partial: bool = False):
+    """合併分片報告，依 wallets.yml 順序寫出 wallets_report.json，並加總各分片的指標"""
+    import wallet_shards
+
+    merged = wallet_shards.merge_shard_reports(load_wallets(), num_shards, allow_partial)
+    for section, values in merged["metrics"].items():
+        for key, value in values.items():
+            metrics.set_value(section, key, value)
+    metrics.set_value("wallet_shards", "num_shards", merged["num_shards"])
+    metrics.set_value("wallet_shards", "merged_shards", len(merged["shards"]))
+    write_wallets_report(merged["wallets"])
+    metrics.write()
+
+
+def run(profile: bool = False, trace: bool = False):
+    """主執行函式"""
+    logger.info("開始檢查錢包活動...")
+    with tracing.session("check_wallets", trace), profiling.profile_stage("check_wallets", profile):
+        write_wallets_report(check_wallets(load_wallets()))
+    metrics.write()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查詢錢包活動指標")
+    parser.add_argument("--shard", type=int, help="只查詢此分片（0 起算），需搭配 --num-shards")
+    parser.add_argument("--num-shards", type=int, help="分片總數")
+    parser.add_argument("--merge", action="store_true", help="合併 output/shards/ 的分片報告")
+    parser.add_argument("--allow-partial", action="store_true", help="合併時允許缺少分片")
+    profiling.add_argument(parser)
+    tracing.add_argument(parser)
+    args = parser.parse_args()
+
+    if args.merge:
+        merge(args.num_shards, args.allow_partial)
+    elif args.shard is not None:
+        if not args.num_shards:
+            parser.error("--shard 需要搭配 --num-shards")
+        run_shard(args.shard, args.num_shards, args.profile, args.trace)
+    else:
+        run(args.profile, args.trace)
+
+
 if __name__ == "__main__":
-    run()
+    main()
 
@@ -0,0 +1,257 @@
+"""
+Pipeline checkpoint 與執行清單（run manifest）
+每個階段、以及 fetch 階段內的每個來源完成後，把輸出原子寫到 output/cache/checkpoints/（暫存檔 + os.replace），
+並在 manifest.json 記錄狀態、內容雜湊（SHA-256）、輸入（上游 checkpoint 的雜湊）、筆數與耗時。
+
+`pipeline.py --resume` 載入上一次的 manifest：狀態為 ok、檔案雜湊相符且輸入未變的單位直接沿用輸出，
+只重新執行失敗或缺少的單位。設定檔（config/*.yml）有變更或距最初那次執行（連續 --resume 時沿用同一個起點）超過 RESUME_MAX_AGE 時不沿用，重新開始。
+
+單位名稱：階段名稱（fetch / wallets / aggregate …）與 "source:<來源>"。
+來源的 checkpoint 為 NDJSON（逐筆寫入、逐筆重播），其餘為 JSON。
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config_store
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+CHECKPOINT_DIR = ROOT / "output" / "cache" / "checkpoints"
+MANIFEST_NAME = "manifest.json"
+
+MANIFEST_VERSION = 1
+# 超過此秒數的 manifest 不沿用（資料已過時，重新抓取）
+RESUME_MAX_AGE = 6 * 3600
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def atomic_write_json(path: Path, data: Any) -> str:
+    """寫到暫存檔後以 os.replace 取代（中途中斷不會留下半個檔案），回傳內容的 SHA-256"""
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    path.parent.mkdir(exist_ok=True, parents=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(raw)
+    os.replace(tmp, path)
+    return hashlib.sha256(raw).hexdigest()
+
+
+def config_hash(config_dir: Path = config_store.CONFIG_DIR) -> str:
+    """所有設定檔內容的雜湊（設定變更時不沿用 checkpoint）"""
+    digest = hashlib.sha256()
+    for filename in sorted(config_store.CONFIG_FILES):
+        path = config_dir / filename
+        digest.update(filename.encode("utf-8") + b"\0")
+        if path.exists():
+            digest.update(path.read_bytes())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def combine(digests: Iterable[Tuple[str, Optional[str]]]) -> str:
+    """多個 (名稱, 雜湊) 合成一個雜湊（例如 fetch 階段 = 各來源 checkpoint 的雜湊）"""
+    return hashlib.sha256(json.dumps(sorted(digests), separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class RecordCheckpoint:
+    """逐筆寫入單位的 NDJSON checkpoint，同時計算雜湊；commit() 前不會取代既有檔案"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.count = 0
+        self._tmp = path.with_name(f"{path.name}.tmp")
+        self._digest = hashlib.sha256()
+        path.parent.mkdir(exist_ok=True, parents=True)
+        self._file = open(self._tmp, "wb")
+
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+        self._file.write(line)
+        self._digest.update(line)
+        self.count += 1
+
+    def commit(self) -> str:
+        self._file.close()
+        os.replace(self._tmp, self.path)
+        return self._digest.hexdigest()
+
+    def abort(self):
+        self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+def _origin_started(manifest: Dict) -> float:
+    return manifest.get("origin_started_ts") or manifest.get("started_ts", 0)
+
+
+class RunManifest:
+    """
+    單次 pipeline 執行的清單與 checkpoint 目錄
+
+    resume 為 False 時清除上一次的 checkpoint 重新開始；為 True 時沿用上一次 manifest 中仍有效的單位。
+    各階段在不同執行緒中完成，更新 manifest 時以 lock 保護，每次更新都原子寫回。
+    """
+
+    def __init__(self, resume: bool = False, directory: Path = CHECKPOINT_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.reused: Dict[str, bool] = {}
+        config = config_hash()
+        previous = self._load_previous(config) if resume else None
+        if previous is None:
+            self._clear()
+        run_id = os.environ.get("GITHUB_RUN_ID") or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        started = time.time()
+        self.data = {
+            "version": MANIFEST_VERSION,
+            "run_id": run_id,
+            "run_attempt": os.environ.get("GITHUB_RUN_ATTEMPT"),
+            "resumed_from": previous.get("run_id") if previous else None,
+            # 連續 --resume 時沿用最初那次執行的 id（本機執行或手動觸發的 run_id 每次都不同）
+            "origin_run_id": (previous.get("origin_run_id") or previous.get("run_id")) if previous else run_id,
+            "config_sha256": config,
+            "started_at": _now(),
+            "started_ts": started,
+            # 沿用的 checkpoint 可能來自最初那次執行；連續 --resume 時以此判斷是否超過 RESUME_MAX_AGE
+            "origin_started_ts": _origin_started(previous) if previous else started,
+            "finished_at": None,
+            "status": "running",
+            "units": previous["units"] if previous else {},
+        }
+        self.save()
+
+    @property
+    def units(self) -> Dict[str, Dict]:
+        return self.data["units"]
+
+    def _load_previous(self, config: str) -> Optional[Dict]:
+        path = self.directory / MANIFEST_NAME
+        if not path.exists():
+            logger.info("沒有上一次的 checkpoint，從頭執行")
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        except Exception as e:
+            logger.warning(f"讀取 checkpoint manifest 失敗，從頭執行: {e}")
+            return None
+        if previous.get("version") != MANIFEST_VERSION:
+            logger.info("checkpoint 格式已變更，從頭執行")
+            return None
+        if previous.get("config_sha256") != config:
+            logger.info("設定檔已變更，不沿用上一次的 checkpoint")
+            return None
+        if time.time() - _origin_started(previous) > RESUME_MAX_AGE:
+            logger.info(f"上一次的 checkpoint 超過 {RESUME_MAX_AGE // 3600} 小時，從頭執行")
+            return None
+        done = sorted(name for name, u in previous.get("units", {}).items() if u.get("status") == "ok")
+        logger.info(f"沿用執行 {previous.get('run_id')} 的 checkpoint（已完成: {', '.join(done) or '無'}）")
+        return previous
+
+    def _clear(self):
+        if not self.directory.exists():
+            return
+        for path in self.directory.iterdir():
+            if path.is_file():
+                path.unlink(missing_ok=True)
+
+    def path(self, unit: str, suffix: str = ".json") -> Path:
+        return self.directory / f"{unit.replace(':', '-').replace('/', '_')}{suffix}"
+
+    def save(self):
+        with self._lock:
+            atomic_write_json(self.directory / MANIFEST_NAME, self.data)
+
+    def _update(self, unit: str, entry: Dict):
+        with self._lock:
+            self.units[unit] = {**entry, "finished_at": _now()}
+        self.save()
+
+    def digest(self, unit: str) -> Optional[str]:
+        """已完成單位的內容雜湊；未完成時回傳 None"""
+        entry = self.units.get(unit)
+        return entry.get("sha256") if entry and entry.get("status") == "ok" else None
+
+    def digests(self, prefix: str) -> List[Tuple[str, Optional[str]]]:
+        """名稱以 prefix 開頭的單位與其雜湊（未完成為 None）"""
+        with self._lock:
+            return sorted((unit, self.digest(unit)) for unit in self.units if unit.startswith(prefix))
+
+    def reusable(self, unit: str, inputs: Optional[Dict[str, Optional[str]]] = None) -> bool:
+        """上一次已完成、檔案完整且輸入相同（輸入都已完成）的單位"""
+        entry = self.units.get(unit)
+        if not entry or entry.get("status") != "ok":
+            return False
+        inputs = inputs or {}
+        if any(v is None for v in inputs.values()) or entry.get("inputs", {}) != inputs:
+            return False
+        if entry.get("file"):
+            path = self.directory / entry["file"]
+            if not path.exists() or file_sha256(path) != entry["sha256"]:
+                logger.warning(f"checkpoint {unit} 檔案遺失或內容不符，重新執行")
+                return False
+        return True
+
+    def mark_reused(self, unit: str):
+        self.reused[unit] = True
+        with self._lock:
+            self.units[unit]["reused"] = True
+
+    def load(self, unit: str) -> Any:
+        with open(self.directory / self.units[unit]["file"], "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def read_records(self, unit: str) -> Iterator[Dict]:
+        with open(self.directory / self.units[unit]["file"], "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def complete(self, unit: str, data: Any, inputs: Optional[Dict[str, str]] = None, status: str = "ok",
+                 **info) -> str:
+        """原子寫出單位的輸出並記為完成，回傳內容雜湊；status 不是 ok（例如部分查詢失敗）時 --resume 會重新執行"""
+        path = self.path(unit)
+        sha = atomic_write_json(path, data)
+        self._update(unit, {"status": status, "sha256": sha, "file": path.name, "inputs": inputs or {}, **info})
+        return sha
+
+    def open_records(self, unit: str) -> RecordCheckpoint:
+        return RecordCheckpoint(self.path(unit, ".ndjson"))
+
+    def complete_records(self, unit: str, writer: RecordCheckpoint, status: str = "ok", **info) -> str:
+        """結束 NDJSON checkpoint；status 不是 ok（例如沒有資料）時 --resume 會重新執行"""
+        sha = writer.commit()
+        self._update(unit, {"status": status, "sha256": sha, "file": writer.path.name, "count": writer.count,
+                            **info})
+        return sha
+
+    def record(self, unit: str, sha: str, inputs: Optional[Dict[str, str]] = None, **info):
+        """記錄輸出不在 checkpoint 目錄中的單位（例如由來源 checkpoint 組成的 fetch 階段）"""
+        self._update(unit, {"status": "ok", "sha256": sha, "inputs": inputs or {}, **info})
+
+    def fail(self, unit: str, error: str, status: str = "failed"):
+        self._update(unit, {"status": status, "error": error})
+
+    def finish(self, ok: bool):
+        self.data["finished_at"] = _now()
+        self.data["status"] = "ok" if ok else "failed"
+        self.save()
@@ -0,0 +1,635 @@
+"""
+設定檔快照
+一次驗證 config/*.yml（tokens / sources / rules / wallets / chains / protocols / campaigns / notifications / subscriptions）的結構，編譯成含索引的二進位快照（pickle），
+以各檔案的 mtime 與 SHA-256 作為快取鍵；之後各階段都從快照載入。
+
+設定檔有誤時直接拋出 ConfigError（列出所有錯誤），不再回傳空值默默繼續。
+"""
+import hashlib
+import logging
+from datetime import date
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+CONFIG_DIR = ROOT / "config"
+CACHE_DIR = ROOT / "output" / "cache"
+SNAPSHOT_FILE = CACHE_DIR / "config_snapshot.pickle"
+
+# 快照格式或索引內容變更時遞增，讓舊快照自動失效
+SNAPSHOT_VERSION = 8
+
+VALID_SOURCE_MODES = {"list", "wallet_tool"}
+VALID_RULE_TYPES = {"listing", "wallet_activity"}
+VALID_PRIORITIES = {"high", "medium", "low"}
+VALID_PROTOCOL_CATEGORIES = {"dex", "lending", "bridge", "staking", "nft", "other"}
+VALID_EXTRACTORS = {"css", "embedded_json"}
+VALID_SOURCE_APIS = {"cmc_airdrops", "feed"}
+VALID_EVENT_STATUSES = {"active", "upcoming", "ended"}
+VALID_PAYLOADS = {"next_data", "json_ld"}  # 另可用 script:<id>
+# embedded_json extractor 的 fields 可對應的 event 欄位（另可用 links.<名稱>）
+EXTRACTOR_FIELDS = {"project", "campaign_name", "token", "status", "deadline", "est_value_usd", "reward_type",
+                    "requirements"}
+# 錢包 × 活動資格矩陣產生的 alerts 在訂閱的 rules 中使用的規則 id
+ELIGIBILITY_RULE = "eligibility"
+DEFAULT_WEBHOOK_ENV = "DISCORD_WEBHOOK_URL"
+# subscriptions.yml 沒有任何訂閱時使用：追蹤全部幣種 / 錢包 / 規則，通知送到預設 webhook 與 GitHub Issues
+DEFAULT_SUBSCRIPTION = {
+    "id": "default",
+    "tokens": None,
+    "wallets": None,
+    "chains": None,
+    "categories": None,
+    "rules": None,
+    "min_priority": "low",
+    "discord": DEFAULT_WEBHOOK_ENV,
+    "github": True,
+    "github_labels": [],
+}
+
+
+class ConfigError(Exception):
+    """設定檔不存在、無法解析或不符合結構"""
+
+
+def _check_type(errors: List[str], where: str, value, expected, required: bool = True):
+    """檢查欄位型別，錯誤訊息累加到 errors；回傳是否通過"""
+    if value is None:
+        if required:
+            errors.append(f"{where}: 缺少必要欄位")
+        return not required
+    if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+        names = expected.__name__ if isinstance(expected, type) else "/".join(t.__name__ for t in expected)
+        errors.append(f"{where}: 應為 {names}，實際為 {type(value).__name__}")
+        return False
+    return True
+
+
+def validate_tokens(data: Dict, errors: List[str]) -> List[Dict]:
+    """驗證 tokens.yml"""
+    tokens = data.get("tokens") or []
+    if not _check_type(errors, "tokens.yml tokens", tokens, list):
+        return []
+    seen = set()
+    for i, t in enumerate(tokens):
+        where = f"tokens.yml tokens[{i}]"
+        if not _check_type(errors, where, t, dict):
+            continue
+        if _check_type(errors, f"{where}.symbol", t.get("symbol"), str):
+            symbol = t["symbol"].upper()
+            if symbol in seen:
+                errors.append(f"{where}.symbol: 重複的 symbol {t['symbol']}")
+            seen.add(symbol)
+        _check_type(errors, f"{where}.coingecko_id", t.get("coingecko_id"), str, required=False)
+        _check_type(errors, f"{where}.coinmarketcap_id", t.get("coinmarketcap_id"), int, required=False)
+        watch = t.get("watch")
+        if _check_type(errors, f"{where}.watch", watch, dict, required=False) and watch:
+            for key, flag in watch.items():
+                _check_type(errors, f"{where}.watch.{key}", flag, bool)
+    return tokens
+
+
+def validate_sources(data: Dict, errors: List[str]) -> Dict:
+    """驗證 sources.yml"""
+    sources = data.get("sources") or {}
+    if not _check_type(errors, "sources.yml sources", sources, dict):
+        return {}
+    for name, cfg in sources.items():
+        where = f"sources.yml sources.{name}"
+        if not _check_type(errors, where, cfg, dict):
+            continue
+        _check_type(errors, f"{where}.enabled", cfg.get("enabled"), bool, required=False)
+        mode = cfg.get("mode")
+        if _check_type(errors, f"{where}.mode", mode, str) and mode not in VALID_SOURCE_MODES:
+            errors.append(f"{where}.mode: 不支援的 mode {mode}（可用: {', '.join(sorted(VALID_SOURCE_MODES))}）")
+        urls = cfg.get("urls")
+        if _check_type(errors, f"{where}.urls", urls, dict):
+            for key, url in urls.items():
+                if _check_type(errors, f"{where}.urls.{key}", url, str) and not url.startswith(("http://", "https://")):
+                    errors.append(f"{where}.urls.{key}: 不是 http(s) URL: {url}")
+        if cfg.get("extractor") is not None:
+            _validate_extractor(cfg["extractor"], f"{where}.extractor", errors)
+        if cfg.get("api") is not None:
+            _validate_source_api(cfg["api"], f"{where}.api", errors)
+    return sources
+
+
+def _validate_source_api(api, where: str, errors: List[str]):
+    """驗證來源的 api 區段（格式見 scripts/source_apis.py）"""
+    if not _check_type(errors, where, api, dict):
+        return
+    kind = api.get("type")
+    if _check_type(errors, f"{where}.type", kind, str) and kind not in VALID_SOURCE_APIS:
+        errors.append(f"{where}.type: 不支援的 api {kind}（可用: {', '.join(sorted(VALID_SOURCE_APIS))}）")
+    url = api.get("url")
+    if _check_type(errors, f"{where}.url", url, str, required=kind == "feed") and url is not None \
+            and not url.startswith(("http://", "https://")):
+        errors.append(f"{where}.url: 不是 http(s) URL: {url}")
+    if _check_type(errors, f"{where}.ttl", api.get("ttl"), int, required=False) and api.get("ttl", 0) < 0:
+        errors.append(f"{where}.ttl: 不可為負數")
+    statuses = api.get("statuses")
+    if _check_type(errors, f"{where}.statuses", statuses, list, required=False) and statuses is not None:
+        for status in statuses:
+            if status not in VALID_EVENT_STATUSES:
+                errors.append(f"{where}.statuses: 不支援的狀態 {status}"
+                              f"（可用: {', '.join(sorted(VALID_EVENT_STATUSES))}）")
+    status = api.get("status")
+    if _check_type(errors, f"{where}.status", status, str, required=False) and status is not None \
+            and status not in VALID_EVENT_STATUSES:
+        errors.append(f"{where}.status: 不支援的狀態 {status}（可用: {', '.join(sorted(VALID_EVENT_STATUSES))}）")
+
+
+def _check_paths(errors: List[str], where: str, value, required: bool = True):
+    """路徑欄位：字串或非空的字串列表"""
+    if isinstance(value, list):
+        if not value or not all(isinstance(v, str) for v in value):
+            errors.append(f"{where}: 路徑列表應為非空的字串列表")
+        return
+    _check_type(errors, where, value, str, required=required)
+
+
+def _validate_extractor(extractor, where: str, errors: List[str]):
+    """驗證來源的 extractor 區段（embedded_json 的格式見 scripts/embedded_json.py）"""
+    if not _check_type(errors, where, extractor, dict):
+        return
+    kind = extractor.get("type")
+    if not _check_type(errors, f"{where}.type", kind, str) or kind not in VALID_EXTRACTORS:
+        if isinstance(kind, str):
+            errors.append(f"{where}.type: 不支援的 extractor {kind}（可用: {', '.join(sorted(VALID_EXTRACTORS))}）")
+        return
+    if kind != "embedded_json":
+        return
+    payload = extractor.get("payload", "next_data")
+    if _check_type(errors, f"{where}.payload", payload, str) and payload not in VALID_PAYLOADS \
+            and not payload.startswith("script:"):
+        errors.append(f"{where}.payload: 不支援的 payload {payload}"
+                      f"（可用: {', '.join(sorted(VALID_PAYLOADS))}、script:<id>）")
+    _check_paths(errors, f"{where}.records", extractor.get("records"), required=False)
+    fields = extractor.get("fields")
+    if not _check_type(errors, f"{where}.fields", fields, dict):
+        return
+    if "project" not in fields:
+        errors.append(f"{where}.fields: 缺少 project 的對應")
+    for key, path in fields.items():
+        if key not in EXTRACTOR_FIELDS and not str(key).startswith("links."):
+            errors.append(f"{where}.fields.{key}: 不支援的 event 欄位")
+        else:
+            _check_paths(errors, f"{where}.fields.{key}", path)
+
+
+def validate_rules(data: Dict, errors: List[str]) -> List[Dict]:
+    """驗證 rules.yml"""
+    rules = data.get("rules") or []
+    if not _check_type(errors, "rules.yml rules", rules, list):
+        return []
+    seen = set()
+    for i, r in enumerate(rules):
+        where = f"rules.yml rules[{i}]"
+        if not _check_type(errors, where, r, dict):
+            continue
+        if _check_type(errors, f"{where}.id", r.get("id"), str):
+            if r["id"] in seen:
+                errors.append(f"{where}.id: 重複的規則 id {r['id']}")
+            seen.add(r["id"])
+        rule_type = r.get("type")
+        if _check_type(errors, f"{where}.type", rule_type, str) and rule_type not in VALID_RULE_TYPES:
+            errors.append(f"{where}.type: 不支援的規則類型 {rule_type}")
+        priority = r.get("priority")
+        if _check_type(errors, f"{where}.priority", priority, str, required=False) and priority \
+                and priority not in VALID_PRIORITIES:
+            errors.append(f"{where}.priority: 不支援的優先級 {priority}")
+        match = r.get("match")
+        if _check_type(errors, f"{where}.match", match, dict, required=False) and match:
+            _check_type(errors, f"{where}.match.chain_in", match.get("chain_in"), list, required=False)
+            _check_type(errors, f"{where}.match.tx_count_min", match.get("tx_count_min"), int, required=False)
+            _check_type(errors, f"{where}.match.unique_contracts_min", match.get("unique_contracts_min"), int,
+                        required=False)
+            _check_type(errors, f"{where}.match.active_months_min", match.get("active_months_min"), int,
+                        required=False)
+            _check_type(errors, f"{where}.match.bridge_used", match.get("bridge_used"), bool, required=False)
+            _check_type(errors, f"{where}.match.protocols_any", match.get("protocols_any"), list, required=False)
+    return rules
+
+
+def validate_wallets(data: Dict, errors: List[str]) -> List[Dict]:
+    """驗證 wallets.yml"""
+    wallets = data.get("wallets") or []
+    if not _check_type(errors, "wallets.yml wallets", wallets, list):
+        return []
+    seen = set()
+    for i, w in enumerate(wallets):
+        where = f"wallets.yml wallets[{i}]"
+        if not _check_type(errors, where, w, dict):
+            continue
+        if _check_type(errors, f"{where}.name", w.get("name"), str):
+            if w["name"] in seen:
+                errors.append(f"{where}.name: 重複的錢包名稱 {w['name']}")
+            seen.add(w["name"])
+        _check_type(errors, f"{where}.chain", w.get("chain"), str)
+        _check_type(errors, f"{where}.address", w.get("address"), str)
+    return wallets
+
+
+def validate_chains(data: Dict, errors: List[str]) -> Dict:
+    """驗證 chains.yml"""
+    chains = data.get("chains") or {}
+    if not _check_type(errors, "chains.yml chains", chains, dict):
+        return {}
+    for name, cfg in chains.items():
+        where = f"chains.yml chains.{name}"
+        if not _check_type(errors, where, cfg, dict):
+            continue
+        rpc = cfg.get("rpc")
+        if _check_type(errors, f"{where}.rpc", rpc, list, required=False) and rpc:
+            for i, url in enumerate(rpc):
+                if _check_type(errors, f"{where}.rpc[{i}]", url, str) and not url.startswith(("http://", "https://")):
+                    errors.append(f"{where}.rpc[{i}]: 不是 http(s) URL: {url}")
+        _check_type(errors, f"{where}.hedge", cfg.get("hedge"), bool, required=False)
+        batch_size = cfg.get("batch_size")
+        if _check_type(errors, f"{where}.batch_size", batch_size, int, required=False) and batch_size is not None \
+                and batch_size < 1:
+            errors.append(f"{where}.batch_size: 必須 >= 1")
+        explorer = cfg.get("explorer")
+        if _check_type(errors, f"{where}.explorer", explorer, dict, required=False) and explorer:
+            api = explorer.get("api")
+            if _check_type(errors, f"{where}.explorer.api", api, str) and not api.startswith(("http://", "https://")):
+                errors.append(f"{where}.explorer.api: 不是 http(s) URL: {api}")
+            _check_type(errors, f"{where}.explorer.chain_id", explorer.get("chain_id"), int, required=False)
+            _check_type(errors, f"{where}.explorer.api_key", explorer.get("api_key"), str, required=False)
+            rps = explorer.get("rps")
+            if _check_type(errors, f"{where}.explorer.rps", rps, (int, float), required=False) and rps is not None \
+                    and rps <= 0:
+                errors.append(f"{where}.explorer.rps: 必須 > 0")
+        cache_ttl = cfg.get("cache_ttl")
+        if _check_type(errors, f"{where}.cache_ttl", cache_ttl, int, required=False) and cache_ttl is not None \
+                and cache_ttl < 0:
+            errors.append(f"{where}.cache_ttl: 必須 >= 0")
+    return {name.lower(): cfg for name, cfg in chains.items()}
+
+
+def validate_protocols(data: Dict, errors: List[str]) -> Dict:
+    """驗證 protocols.yml"""
+    protocols = data.get("protocols") or {}
+    if not _check_type(errors, "protocols.yml protocols", protocols, dict):
+        return {}
+    for name, cfg in protocols.items():
+        where = f"protocols.yml protocols.{name}"
+        if not _check_type(errors, where, cfg, dict):
+            continue
+        category = cfg.get("category")
+        if _check_type(errors, f"{where}.category", category, str) and category not in VALID_PROTOCOL_CATEGORIES:
+            errors.append(f"{where}.category: 不支援的分類 {category}（可用: {', '.join(sorted(VALID_PROTOCOL_CATEGORIES))}）")
+        contracts = cfg.get("contracts")
+        if not _check_type(errors, f"{where}.contracts", contracts, dict):
+            continue
+        for chain, addresses in contracts.items():
+            if not _check_type(errors, f"{where}.contracts.{chain}", addresses, list):
+                continue
+            for i, addr in enumerate(addresses):
+                if _check_type(errors, f"{where}.contracts.{chain}[{i}]", addr, str) \
+                        and not (addr.startswith("0x") and len(addr) == 42):
+                    errors.append(f"{where}.contracts.{chain}[{i}]: 不是合約地址: {addr}")
+    return protocols
+
+
+def validate_campaigns(data: Dict, errors: List[str]) -> List[Dict]:
+    """驗證 campaigns.yml"""
+    campaigns = data.get("campaigns") or []
+    if not _check_type(errors, "campaigns.yml campaigns", campaigns, list):
+        return []
+    seen = set()
+    for i, c in enumerate(campaigns):
+        where = f"campaigns.yml campaigns[{i}]"
+        if not _check_type(errors, where, c, dict):
+            continue
+        if _check_type(errors, f"{where}.id", c.get("id"), str):
+            if c["id"] in seen:
+                errors.append(f"{where}.id: 重複的活動 id {c['id']}")
+            seen.add(c["id"])
+        _check_type(errors, f"{where}.name", c.get("name"), str, required=False)
+        chains = c.get("chains")
+        if _check_type(errors, f"{where}.chains", chains, list) and not chains:
+            errors.append(f"{where}.chains: 至少需要一條鏈")
+        _check_type(errors, f"{where}.protocols_any", c.get("protocols_any"), list, required=False)
+        for key in ("min_tx", "min_unique_contracts", "min_active_months", "min_bridge_tx"):
+            value = c.get(key)
+            if _check_type(errors, f"{where}.{key}", value, int, required=False) and value is not None and value < 0:
+                errors.append(f"{where}.{key}: 必須 >= 0")
+        for key in ("active_after", "first_tx_before"):
+            _check_type(errors, f"{where}.{key}", c.get(key), (str, date), required=False)
+        weight = c.get("weight")
+        if _check_type(errors, f"{where}.weight", weight, (int, float), required=False) and weight is not None \
+                and weight <= 0:
+            errors.append(f"{where}.weight: 必須 > 0")
+        priority = c.get("priority")
+        if _check_type(errors, f"{where}.priority", priority, str, required=False) and priority \
+                and priority not in VALID_PRIORITIES:
+            errors.append(f"{where}.priority: 不支援的優先級 {priority}")
+        _check_type(errors, f"{where}.url", c.get("url"), str, required=False)
+    return campaigns
+
+
+def validate_notifications(data: Dict, errors: List[str]) -> Dict:
+    """驗證 notifications.yml（未設定的欄位補上預設值）"""
+    discord = data.get("discord") or {}
+    if not _check_type(errors, "notifications.yml discord", discord, dict):
+        discord = {}
+    immediate = discord.get("immediate_priorities", ["high"])
+    if _check_type(errors, "notifications.yml discord.immediate_priorities", immediate, list):
+        for p in immediate:
+            if p not in VALID_PRIORITIES:
+                errors.append(f"notifications.yml discord.immediate_priorities: 不支援的優先級 {p}")
+    digest = discord.get("digest") or {}
+    if not _check_type(errors, "notifications.yml discord.digest", digest, dict):
+        digest = {}
+    _check_type(errors, "notifications.yml discord.digest.enabled", digest.get("enabled"), bool, required=False)
+    for key in ("interval_hours", "max_items"):
+        value = digest.get(key)
+        if _check_type(errors, f"notifications.yml discord.digest.{key}", value, (int, float), required=False) \
+                and value is not None and value <= 0:
+            errors.append(f"notifications.yml discord.digest.{key}: 必須 > 0")
+    return {
+        "discord": {
+            "immediate_priorities": immediate if isinstance(immediate, list) else ["high"],
+            "digest": {
+                "enabled": digest.get("enabled", True),
+                "interval_hours": digest.get("interval_hours", 24),
+                "max_items": int(digest.get("max_items", 200)),
+            },
+        },
+    }
+
+
+def _check_names(errors: List[str], where: str, value) -> bool:
+    """選填的字串列表（未設定代表全部）"""
+    if not _check_type(errors, where, value, list, required=False):
+        return False
+    if value is not None and (not value or not all(isinstance(v, str) and v for v in value)):
+        errors.append(f"{where}: 應為非空的字串列表（要包含全部時省略此欄位）")
+        return False
+    return True
+
+
+def validate_subscriptions(data: Dict, errors: List[str]) -> List[Dict]:
+    """
+    驗證 subscriptions.yml，回傳補上預設值的訂閱列表
+
+    tokens / wallets / chains / categories / rules 未設定時代表全部；沒有任何訂閱時使用 DEFAULT_SUBSCRIPTION。
+    對 tokens / wallets / rules 的參照在 validate_subscription_refs 檢查（需要其他設定檔）。
+    """
+    subs = data.get("subscriptions") or []
+    if not _check_type(errors, "subscriptions.yml subscriptions", subs, list):
+        return []
+    if not subs:
+        return [dict(DEFAULT_SUBSCRIPTION)]
+    result = []
+    seen = set()
+    for i, s in enumerate(subs):
+        where = f"subscriptions.yml subscriptions[{i}]"
+        if not _check_type(errors, where, s, dict):
+            continue
+        if _check_type(errors, f"{where}.id", s.get("id"), str):
+            if s["id"] in seen:
+                errors.append(f"{where}.id: 重複的訂閱 id {s['id']}")
+            seen.add(s["id"])
+        facets = {}
+        for key in ("tokens", "wallets", "chains", "categories", "rules"):
+            value = s.get(key)
+            facets[key] = value if _check_names(errors, f"{where}.{key}", value) else None
+        min_priority = s.get("min_priority", "low")
+        if _check_type(errors, f"{where}.min_priority", min_priority, str) and min_priority not in VALID_PRIORITIES:
+            errors.append(f"{where}.min_priority: 不支援的優先級 {min_priority}")
+
+        targets = s.get("targets") or {}
+        if not _check_type(errors, f"{where}.targets", targets, dict):
+            targets = {}
+        unknown = set(targets) - {"discord", "github"}
+        if unknown:
+            errors.append(f"{where}.targets: 不支援的通知目標 {', '.join(sorted(unknown))}")
+        discord = targets.get("discord")
+        _check_type(errors, f"{where}.targets.discord", discord, str, required=False)
+        github = targets.get("github", False)
+        labels: List[str] = []
+        if isinstance(github, dict):
+            labels = github.get("labels") or []
+            if not _check_type(errors, f"{where}.targets.github.labels", labels, list):
+                labels = []
+            elif not all(isinstance(label, str) for label in labels):
+                errors.append(f"{where}.targets.github.labels: 應為字串列表")
+                labels = []
+            github = True
+        elif not _check_type(errors, f"{where}.targets.github", github, (bool, dict)):
+            github = False
+
+        result.append({
+            "id": s.get("id"),
+            "tokens": [t.upper() for t in facets["tokens"]] if facets["tokens"] else None,
+            "wallets": facets["wallets"],
+            "chains": [c.lower() for c in facets["chains"]] if facets["chains"] else None,
+            "categories": [c.lower() for c in facets["categories"]] if facets["categories"] else None,
+            "rules": facets["rules"],
+            "min_priority": min_priority,
+            "discord": discord if isinstance(discord, str) else None,
+            "github": github,
+            "github_labels": labels,
+        })
+    return result
+
+
+def validate_subscription_refs(cfg: Dict, errors: List[str]):
+    """檢查訂閱引用的 token / 錢包 / 規則都存在於 tokens.yml、wallets.yml、rules.yml"""
+    symbols = {t["symbol"].upper() for t in cfg["tokens"] if isinstance(t, dict) and isinstance(t.get("symbol"), str)}
+    wallets = {w.get("name") for w in cfg["wallets"] if isinstance(w, dict)}
+    rule_ids = {r.get("id") for r in cfg["rules"] if isinstance(r, dict)} | {ELIGIBILITY_RULE}
+    for s in cfg["subscriptions"]:
+        where = f"subscriptions.yml {s['id']}"
+        for key, known in (("tokens", symbols), ("wallets", wallets), ("rules", rule_ids)):
+            missing = [v for v in s[key] or [] if v not in known]
+            if missing:
+                errors.append(f"{where}.{key}: 找不到 {', '.join(missing)}")
+
+
+# 檔名 → 驗證函式（回傳驗證後的頂層內容）
+CONFIG_FILES: Dict[str, Callable[[Dict, List[str]], object]] = {
+    "tokens.yml": validate_tokens,
+    "sources.yml": validate_sources,
+    "rules.yml": validate_rules,
+    "wallets.yml": validate_wallets,
+    "chains.yml": validate_chains,
+    "protocols.yml": validate_protocols,
+    "campaigns.yml": validate_campaigns,
+    "notifications.yml": validate_notifications,
+    "subscriptions.yml": validate_subscriptions,
+}
+
+
+def build_indexes(cfg: Dict) -> Dict:
+    """在驗證後的設定上建立查詢索引"""
+    rules_by_type: Dict[str, List[Dict]] = {}
+    for r in cfg["rules"]:
+        rules_by_type.setdefault(r["type"], []).append(r)
+
+    wallets_by_chain: Dict[str, List[Dict]] = {}
+    for w in cfg["wallets"]:
+        wallets_by_chain.setdefault(w["chain"].lower(), []).append(w)
+
+    # chain → 合約地址（小寫）→ {"protocol", "category"}
+    protocols_by_contract: Dict[str, Dict[str, Dict]] = {}
+    for name, p in cfg["protocols"].items():
+        for chain, addresses in p["contracts"].items():
+            for addr in addresses:
+                protocols_by_contract.setdefault(chain.lower(), {})[addr.lower()] = {
+                    "protocol": name,
+                    "category": p["category"],
+                }
+
+    return {
+        "tokens_by_symbol": {t["symbol"].upper(): t for t in cfg["tokens"]},
+        "enabled_sources": [name for name, s in cfg["sources"].items() if s.get("enabled")],
+        "rules_by_type": rules_by_type,
+        "wallets_by_chain": wallets_by_chain,
+        "protocols_by_contract": protocols_by_contract,
+    }
+
+
+def _file_fingerprint(path: Path) -> Dict:
+    """取得檔案 mtime 與大小（快速判斷是否變更）"""
+    stat = path.stat()
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _sha256(path: Path) -> str:
+    """計算檔案內容 SHA-256"""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def compile_config(config_dir: Path = CONFIG_DIR) -> Dict:
+    """解析並驗證所有設定檔，回傳含索引的快照內容"""
+    import yaml
+
+    # libyaml 可用時使用 C 實作的 loader，大型設定檔解析快很多
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+    errors: List[str] = []
+    cfg: Dict = {}
+    files: Dict[str, Dict] = {}
+    for filename, validator in CONFIG_FILES.items():
+        path = config_dir / filename
+        key = filename.rsplit(".", 1)[0]
+        if not path.exists():
+            errors.append(f"{filename}: 檔案不存在 ({path})")
+            cfg[key] = validator({}, [])
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = yaml.load(f, Loader=loader) or {}
+        except yaml.YAMLError as e:
+            errors.append(f"{filename}: YAML 解析失敗: {e}")
+            data = {}
+        if not isinstance(data, dict):
+            errors.append(f"{filename}: 頂層應為 mapping")
+            data = {}
+        cfg[key] = validator(data, errors)
+        files[filename] = {**_file_fingerprint(path), "sha256": _sha256(path)}
+
+    validate_subscription_refs(cfg, errors)
+    if errors:
+        raise ConfigError("設定檔驗證失敗:\n  - " + "\n  - ".join(errors))
+
+    cfg.update(build_indexes(cfg))
+    return {"version": SNAPSHOT_VERSION, "files": files, "config": cfg}
+
+
+def _snapshot_is_fresh(snapshot: Dict, config_dir: Path) -> Tuple[bool, bool]:
+    """
+    判斷快照是否仍有效
+
+    先比對 mtime / size（不需讀檔）；若 mtime 變了但內容 hash 相同（例如重新 checkout），
+    仍視為有效並更新快照中的 mtime。
+
+    Returns:
+        (是否有效, 是否更新了快照中的 mtime)
+    """
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        return False, False
+    files = snapshot.get("files", {})
+    if set(files) != set(CONFIG_FILES):
+        return False, False
+    touched = False
+    for filename, recorded in files.items():
+        path = config_dir / filename
+        if not path.exists():
+            return False, False
+        current = _file_fingerprint(path)
+        if current["mtime_ns"] == recorded["mtime_ns"] and current["size"] == recorded["size"]:
+            continue
+        if _sha256(path) != recorded["sha256"]:
+            return False, False
+        recorded.update(current)
+        touched = True
+    return True, touched
+
+
+def _write_snapshot(snapshot: Dict, snapshot_file: Path):
+    """原子寫入快照（先寫暫存檔再 rename）"""
+    try:
+        snapshot_file.parent.mkdir(exist_ok=True, parents=True)
+        tmp = snapshot_file.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, snapshot_file)
+    except Exception as e:
+        logger.warning(f"寫入設定快照失敗（不影響執行）: {e}")
+
+
+_lock = threading.Lock()
+# (設定目錄, 快照檔) → 設定
+_loaded: Dict[Tuple[Path, Path], Dict] = {}
+
+
+def load_config(config_dir: Path = CONFIG_DIR, snapshot_file: Path = SNAPSHOT_FILE) -> Dict:
+    """
+    取得已驗證的設定（含索引）
+
+    同一行程內每組 (config_dir, snapshot_file) 只載入一次；跨行程則優先使用磁碟上的快照，
+    設定檔有變更時才重新解析與驗證。
+
+    Raises:
+        ConfigError: 設定檔不存在、無法解析或不符合結構
+    """
+    key = (Path(config_dir).resolve(), Path(snapshot_file).resolve())
+    with _lock:
+        if key in _loaded:
+            return _loaded[key]
+
+        snapshot = None
+        if snapshot_file.exists():
+            try:
+                with open(snapshot_file, "rb") as f:
+                    snapshot = pickle.load(f)
+            except Exception as e:
+                logger.warning(f"讀取設定快照失敗，將重新編譯: {e}")
+
+        fresh, touched = _snapshot_is_fresh(snapshot, config_dir) if snapshot is not None else (False, False)
+        if fresh:
+            logger.debug("使用設定快照")
+            if touched:
+                _write_snapshot(snapshot, snapshot_file)
+        else:
+            logger.info("設定檔已變更，重新驗證並編譯快照")
+            snapshot = compile_config(config_dir)
+            _write_snapshot(snapshot, snapshot_file)
+
+        _loaded[key] = snapshot["config"]
+        return _loaded[key]
+
+
+def reset():
+    """清除行程內快取（設定檔於執行中被修改時使用）"""
+    with _lock:
+        _loaded.clear()
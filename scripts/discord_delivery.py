@@ -0,0 +1,404 @@
+"""
+Discord Webhook 投遞引擎
+把 alerts 轉成 embed，依 Discord 的長度限制打包成多則訊息，寫入持久化的 outbox 後依序投遞：
+
+- 每則訊息最多 10 個 embed、所有 embed 合計 6000 字元；單一 embed 的標題 / 描述 / 欄位各自截斷到上限
+- 依回應的 `X-RateLimit-Bucket` / `X-RateLimit-Remaining` / `X-RateLimit-Reset-After` 追蹤每個路由的 bucket，
+  額度用完時等到重置再送，而不是送出後才吃 429；收到 429 時依 `retry_after`（global 時全部暫停）等待後重試
+- 未送達的訊息留在 output/cache/discord_outbox.json，下次執行優先重送
+
+outbox 只保存頻道名稱（例如 "default"）而不保存 webhook URL，URL 含有密鑰，由執行時的環境變數提供。
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import metrics
+import tracing
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+OUTBOX_FILE = ROOT / "output" / "cache" / "discord_outbox.json"
+
+# Discord 訊息限制
+CONTENT_LIMIT = 2000
+EMBEDS_PER_MESSAGE = 10
+EMBEDS_TOTAL_CHARS = 6000
+TITLE_LIMIT = 256
+DESCRIPTION_LIMIT = 4096
+FIELDS_PER_EMBED = 25
+FIELD_NAME_LIMIT = 256
+FIELD_VALUE_LIMIT = 1024
+FOOTER_LIMIT = 2048
+
+MAX_RETRIES = 5
+# 單一訊息跨執行最多嘗試的次數與保留時間，超過後從 outbox 移除
+MAX_ATTEMPTS = 10
+MAX_AGE = timedelta(days=2)
+
+PRIORITY_COLORS = {"high": 0xE74C3C, "medium": 0xF1C40F, "low": 0x95A5A6}
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+
+def truncate(text, limit: int) -> str:
+    text = str(text or "")
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def embed_length(embed: Dict) -> int:
+    """Discord 計入 6000 字元上限的長度（title、description、欄位名稱與值、footer、author）"""
+    total = len(embed.get("title", "")) + len(embed.get("description", ""))
+    total += sum(len(f.get("name", "")) + len(f.get("value", "")) for f in embed.get("fields", []))
+    total += len((embed.get("footer") or {}).get("text", ""))
+    total += len((embed.get("author") or {}).get("name", ""))
+    return total
+
+
+def fit_embed(embed: Dict) -> Dict:
+    """把 embed 各部分截斷到 Discord 上限；總長仍超過 6000 時縮短描述"""
+    embed = dict(embed)
+    if "title" in embed:
+        embed["title"] = truncate(embed["title"], TITLE_LIMIT)
+    if "description" in embed:
+        embed["description"] = truncate(embed["description"], DESCRIPTION_LIMIT)
+    if "fields" in embed:
+        embed["fields"] = [
+            {**f, "name": truncate(f["name"], FIELD_NAME_LIMIT) or "\u200b",
+             "value": truncate(f["value"], FIELD_VALUE_LIMIT) or "\u200b"}
+            for f in embed["fields"][:FIELDS_PER_EMBED]
+        ]
+    if embed.get("footer"):
+        embed["footer"] = {**embed["footer"], "text": truncate(embed["footer"].get("text"), FOOTER_LIMIT)}
+    overflow = embed_length(embed) - EMBEDS_TOTAL_CHARS
+    if overflow > 0 and embed.get("description"):
+        embed["description"] = truncate(embed["description"], max(len(embed["description"]) - overflow, 1))
+    return embed
+
+
+def alert_embed(alert: Dict) -> Dict:
+    """單一 alert → embed（完整 notes，不再截斷到 200 字元）"""
+    priority = alert.get("priority", "medium")
+    fields = [{"name": "Type", "value": alert.get("type", "Unknown"), "inline": True},
+              {"name": "Priority", "value": priority.upper(), "inline": True}]
+    if alert.get("token"):
+        fields.append({"name": "Token", "value": alert["token"], "inline": True})
+    if alert.get("exchange"):
+        fields.append({"name": "Exchange", "value": f"{alert['exchange']} ({alert.get('pair') or 'N/A'})", "inline": True})
+    if alert.get("wallet_name"):
+        fields.append({"name": "Wallet", "value": f"{alert['wallet_name']} ({alert.get('wallet_chain') or 'N/A'})",
+                       "inline": True})
+    for campaign in alert.get("eligible_campaigns") or []:
+        fields.append({"name": f"🎯 {campaign['name']}", "value": f"score {campaign['score']:.2f}"
+                       + (f" · {campaign['url']}" if campaign.get("url") else ""), "inline": False})
+
+    embed = {
+        "title": f"[{priority.upper()}] {alert.get('project', 'Unknown')}",
+        "description": alert.get("notes") or "",
+        "color": PRIORITY_COLORS.get(priority, PRIORITY_COLORS["low"]),
+        "fields": fields,
+    }
+    details = (alert.get("links") or {}).get("details")
+    if details and str(details).startswith("http"):
+        embed["url"] = details
+    if alert.get("source"):
+        embed["footer"] = {"text": f"source: {alert['source']}"}
+    return fit_embed(embed)
+
+
+def pack_embeds(embeds: List[Dict], header: Optional[str] = None) -> List[Dict]:
+    """
+    依序把 embed 打包成訊息 payload（每則最多 10 個、合計 6000 字元）
+
+    header 只放在第一則訊息的 content。
+    """
+    payloads, batch, size = [], [], 0
+    for embed in embeds:
+        length = embed_length(embed)
+        if batch and (len(batch) >= EMBEDS_PER_MESSAGE or size + length > EMBEDS_TOTAL_CHARS):
+            payloads.append({"embeds": batch})
+            batch, size = [], 0
+        batch.append(embed)
+        size += length
+    if batch:
+        payloads.append({"embeds": batch})
+    if header and payloads:
+        payloads[0] = {"content": truncate(header, CONTENT_LIMIT), **payloads[0]}
+    # 通知內容來自外部來源，不允許觸發 @everyone / 角色提及
+    return [{**p, "allowed_mentions": {"parse": []}} for p in payloads]
+
+
+def alert_payloads(alerts: List[Dict], header: Optional[str] = None) -> List[Dict]:
+    """所有 alerts（依優先級排序）→ 訊息 payload 列表"""
+    ordered = sorted(alerts, key=lambda a: PRIORITY_ORDER.get(a.get("priority", "low"), 2))
+    return pack_embeds([alert_embed(a) for a in ordered], header)
+
+
+def digest_line(alert: Dict) -> str:
+    """摘要中單一 alert 的一行文字"""
+    line = f"• **[{alert.get('priority', 'medium').upper()}] {alert.get('project', 'Unknown')}** — {alert.get('type', 'Unknown')}"
+    details = (alert.get("links") or {}).get("details")
+    if details and str(details).startswith("http"):
+        line += f" · [link]({details})"
+    return truncate(line, 300)
+
+
+def digest_payloads(alerts: List[Dict], header: Optional[str] = None) -> List[Dict]:
+    """
+    低優先級 alerts 的摘要：每個 alert 一行，依描述長度上限切成多個 embed 後打包
+
+    比逐一 alert 的 embed 精簡許多，適合一次合併大量 alert。
+    """
+    ordered = sorted(alerts, key=lambda a: PRIORITY_ORDER.get(a.get("priority", "low"), 2))
+    # 每個 embed 的描述不超過 DESCRIPTION_LIMIT，也讓 10 個 embed 合計不超過 6000 字元時仍可分成多則訊息
+    chunk_limit = EMBEDS_TOTAL_CHARS // 2
+    chunks, lines, size = [], [], 0
+    for alert in ordered:
+        line = digest_line(alert)
+        if lines and size + len(line) + 1 > chunk_limit:
+            chunks.append(lines)
+            lines, size = [], 0
+        lines.append(line)
+        size += len(line) + 1
+    if lines:
+        chunks.append(lines)
+    embeds = [
+        {"title": f"Digest ({i + 1}/{len(chunks)})" if len(chunks) > 1 else "Digest",
+         "description": "\n".join(chunk), "color": PRIORITY_COLORS["low"]}
+        for i, chunk in enumerate(chunks)
+    ]
+    return pack_embeds([fit_embed(e) for e in embeds], header)
+
+
+class Outbox:
+    """
+    待投遞訊息的持久化佇列
+
+    messages：[{"id", "channel", "payload", "attempts", "created_at", "last_error"}]，依加入順序投遞。
+    """
+
+    def __init__(self, path: Path = OUTBOX_FILE):
+        self.path = path
+        self.messages: List[Dict] = []
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.messages = json.load(f).get("messages") or []
+        except Exception as e:
+            logger.warning(f"讀取 Discord outbox 失敗，略過未送達的訊息: {e}")
+            self.messages = []
+
+    def add(self, channel: str, payloads: List[Dict]) -> int:
+        """加入訊息；與 outbox 中相同頻道、相同內容的訊息不重複加入。回傳實際加入的數量"""
+        existing = {(m["channel"], m["id"]) for m in self.messages}
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        added = 0
+        for payload in payloads:
+            raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+            message_id = hashlib.sha256(f"{channel}\n{raw}".encode("utf-8")).hexdigest()[:16]
+            if (channel, message_id) in existing:
+                continue
+            existing.add((channel, message_id))
+            self.messages.append({"id": message_id, "channel": channel, "payload": payload,
+                                  "attempts": 0, "created_at": now, "last_error": None})
+            added += 1
+        return added
+
+    def expire(self) -> int:
+        """移除嘗試次數或存放時間超過上限的訊息，回傳移除數量"""
+        cutoff = datetime.now(timezone.utc) - MAX_AGE
+        kept = []
+        for m in self.messages:
+            created = datetime.fromisoformat(m["created_at"].replace("Z", "+00:00"))
+            if m["attempts"] >= MAX_ATTEMPTS or created < cutoff:
+                logger.warning(f"放棄投遞 Discord 訊息 {m['id']}（嘗試 {m['attempts']} 次，最後錯誤: {m['last_error']}）")
+                continue
+            kept.append(m)
+        dropped = len(self.messages) - len(kept)
+        self.messages = kept
+        return dropped
+
+    def save(self):
+        """原子寫入 outbox（沒有待送訊息時移除檔案）"""
+        try:
+            if not self.messages:
+                if self.path.exists():
+                    self.path.unlink()
+                return
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "messages": self.messages}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.error(f"寫入 Discord outbox 失敗: {e}")
+
+
+class RateLimitBuckets:
+    """
+    Discord 的路由 bucket 狀態
+
+    同一個 bucket（`X-RateLimit-Bucket`）可能由多個路由共用，因此先記錄路由 → bucket，再追蹤 bucket 的剩餘額度。
+    重置時間以 `X-RateLimit-Reset-After`（相對秒數）換算成本機 monotonic 時間，不受時鐘差異影響。
+    """
+
+    def __init__(self):
+        self.route_bucket: Dict[str, str] = {}
+        self.buckets: Dict[str, Dict] = {}
+        self.global_until = 0.0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self, route: str):
+        with self._lock:
+            now = time.monotonic()
+            delay = self.global_until - now
+            state = self.buckets.get(self.route_bucket.get(route, route))
+            if state and state["remaining"] <= 0:
+                delay = max(delay, state["reset_at"] - now)
+        if delay > 0:
+            self.waited += delay
+            time.sleep(delay)
+
+    def update(self, route: str, headers):
+        remaining, reset_after = headers.get("X-RateLimit-Remaining"), headers.get("X-RateLimit-Reset-After")
+        if remaining is None or reset_after is None:
+            return
+        with self._lock:
+            bucket = headers.get("X-RateLimit-Bucket") or route
+            self.route_bucket[route] = bucket
+            self.buckets[bucket] = {"remaining": int(remaining), "reset_at": time.monotonic() + float(reset_after)}
+
+    def limited(self, route: str, retry_after: float, is_global: bool):
+        with self._lock:
+            until = time.monotonic() + retry_after
+            if is_global:
+                self.global_until = max(self.global_until, until)
+            else:
+                bucket = self.route_bucket.get(route, route)
+                self.buckets[bucket] = {"remaining": 0, "reset_at": until}
+
+
+class DiscordDelivery:
+    """
+    依序投遞 outbox 中的訊息
+
+    webhooks：頻道名稱 → webhook URL；沒有 URL 的頻道訊息留在 outbox。
+    某個頻道投遞失敗（非 400 類的內容錯誤）時停止該頻道後續訊息，保持訊息順序。
+    """
+
+    def __init__(self, webhooks: Dict[str, str], outbox: Optional[Outbox] = None, session=None,
+                 metrics_section: str = "discord"):
+        import requests
+
+        self.webhooks = webhooks
+        self.outbox = outbox if outbox is not None else Outbox()
+        self.session = session or requests.Session()
+        self.buckets = RateLimitBuckets()
+        self.section = metrics_section
+        self.rate_limited = 0
+
+    @staticmethod
+    def _route(url: str) -> str:
+        # bucket 依 webhook id 區分；不使用含 token 的完整 URL 作為 key
+        parts = url.rstrip("/").split("/")
+        return f"webhook:{parts[-2] if len(parts) >= 2 else url}"
+
+    def send(self, url: str, payload: Dict) -> str:
+        """
+        送出一則訊息
+
+        Returns:
+            "sent"、"invalid"（內容被拒絕，重送也不會成功）或錯誤說明（可於下次執行重試）
+        """
+        import requests
+
+        route = self._route(url)
+        with tracing.span("discord.send", route=route, embeds=len(payload.get("embeds", []))) as span:
+            error = "重試次數用盡"
+            for attempt in range(MAX_RETRIES):
+                self.buckets.wait(route)
+                try:
+                    resp = self.session.post(url, params={"wait": "true"}, json=payload, timeout=10)
+                except requests.exceptions.RequestException as e:
+                    error = str(e)
+                    logger.warning(f"Discord Webhook 請求失敗 (嘗試 {attempt + 1}/{MAX_RETRIES}): {e}")
+                    time.sleep(min(2 ** attempt, 10))
+                    continue
+                self.buckets.update(route, resp.headers)
+                span.update(status=resp.status_code, retries=attempt)
+
+                if resp.status_code == 429:
+                    try:
+                        body = resp.json()
+                    except ValueError:
+                        body = {}
+                    retry_after = float(body.get("retry_after") or resp.headers.get("Retry-After") or 1)
+                    is_global = bool(body.get("global")) or resp.headers.get("X-RateLimit-Global") == "true"
+                    self.rate_limited += 1
+                    self.buckets.limited(route, retry_after, is_global)
+                    logger.warning(f"Discord 速率限制{'（global）' if is_global else ''}，{retry_after:.2f} 秒後重試")
+                    continue
+                if resp.status_code < 300:
+                    return "sent"
+                if resp.status_code >= 500:
+                    error = f"HTTP {resp.status_code}"
+                    time.sleep(min(2 ** attempt, 10))
+                    continue
+                if resp.status_code == 400:
+                    logger.error(f"Discord 拒絕訊息內容: {resp.text[:300]}")
+                    return "invalid"
+                # 401 / 403 / 404：webhook 失效或權限不足，保留訊息等設定修正
+                return f"HTTP {resp.status_code}: {resp.text[:200]}"
+            return error
+
+    def deliver(self) -> Dict[str, int]:
+        """投遞 outbox 中所有可投遞的訊息，儲存剩餘訊息並記錄指標"""
+        start = time.perf_counter()
+        counts = {"sent": 0, "embeds": 0, "invalid": 0, "failed": 0}
+        counts["expired"] = self.outbox.expire()
+        blocked = set()
+        remaining = []
+        for message in self.outbox.messages:
+            channel = message["channel"]
+            url = self.webhooks.get(channel)
+            if not url or channel in blocked:
+                remaining.append(message)
+                continue
+            result = self.send(url, message["payload"])
+            if result == "sent":
+                counts["sent"] += 1
+                counts["embeds"] += len(message["payload"].get("embeds", []))
+            elif result == "invalid":
+                counts["invalid"] += 1
+            else:
+                message["attempts"] += 1
+                message["last_error"] = result
+                counts["failed"] += 1
+                blocked.add(channel)
+                remaining.append(message)
+                logger.error(f"Discord 頻道 {channel} 投遞失敗，剩餘訊息留待下次執行: {result}")
+        self.outbox.messages = remaining
+        self.outbox.save()
+
+        elapsed = time.perf_counter() - start
+        metrics.incr(self.section, "messages_sent", counts["sent"])
+        metrics.incr(self.section, "embeds_sent", counts["embeds"])
+        metrics.incr(self.section, "rejected", counts["invalid"])
+        metrics.incr(self.section, "failed", counts["failed"])
+        metrics.incr(self.section, "expired", counts["expired"])
+        metrics.incr(self.section, "rate_limited", self.rate_limited)
+        metrics.incr(self.section, "rate_wait_seconds", round(self.buckets.waited, 3))
+        metrics.set_value(self.section, "outbox_pending", len(remaining))
+        metrics.set_value(self.section, "deliver_seconds", round(elapsed, 3))
+        return {**counts, "pending": len(remaining)}
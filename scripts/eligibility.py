@@ -0,0 +1,202 @@
+"""
+活動資格評分矩陣
+把所有錢包報告與 config/campaigns.yml 的活動條件（鏈、協議、最低活動量、時間區間）
+轉成矩陣，一次以向量運算算出 錢包 × 活動 的資格與分數，再取每個錢包分數最高的 k 個活動。
+
+numpy 只在實際評分時載入，不影響其他腳本的啟動時間。
+"""
+import logging
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 3
+# 超過門檻的倍數最多計到此值，避免單一指標極大時壓過其他條件
+RATIO_CAP = 2.0
+
+# (報告中的特徵, campaigns.yml 的門檻欄位)；門檻為「特徵 >= 門檻」
+ACTIVITY_CRITERIA = (
+    ("tx_count", "min_tx"),
+    ("unique_contracts", "min_unique_contracts"),
+    ("active_months", "min_active_months"),
+    ("bridge_tx", "min_bridge_tx"),
+)
+
+
+def _to_epoch(value) -> Optional[float]:
+    """YAML 日期 / ISO 字串 → epoch 秒；無法解析時回傳 None"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime(value.year, value.month, value.day)
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _wallet_feature(report: Dict, feature: str) -> float:
+    if feature == "tx_count":
+        return float(report.get("tx_count") or 0)
+    return float((report.get("history") or {}).get(feature) or 0)
+
+
+def build_matrices(reports: List[Dict], campaigns: List[Dict]):
+    """
+    把錢包報告與活動條件轉成評分用的矩陣
+
+    Returns:
+        dict：wallet_chain (W,)、wallet_protocols (W,P)、features (W,F)、first_ts / last_ts (W,)、
+        campaign_chains (N,C)、campaign_protocols (N,P)、needs_protocol (N,)、thresholds (N,F)、
+        active_after / first_tx_before (N,)、weights (N,)
+    """
+    import numpy as np
+
+    chains = sorted({str(r.get("chain", "")).lower() for r in reports}
+                    | {c.lower() for camp in campaigns for c in camp.get("chains", [])})
+    chain_index = {c: i for i, c in enumerate(chains)}
+    protocols = sorted({p for r in reports for p in (r.get("history") or {}).get("protocols", [])}
+                       | {p for camp in campaigns for p in camp.get("protocols_any", [])})
+    protocol_index = {p: i for i, p in enumerate(protocols)}
+
+    w, n, f = len(reports), len(campaigns), len(ACTIVITY_CRITERIA)
+    wallet_chain = np.array([chain_index[str(r.get("chain", "")).lower()] for r in reports], dtype=np.int32)
+    wallet_protocols = np.zeros((w, len(protocols)), dtype=np.float32)
+    features = np.zeros((w, f), dtype=np.float32)
+    first_ts = np.full(w, np.nan)
+    last_ts = np.full(w, np.nan)
+    for i, r in enumerate(reports):
+        history = r.get("history") or {}
+        for p in history.get("protocols", []):
+            wallet_protocols[i, protocol_index[p]] = 1.0
+        for j, (feature, _) in enumerate(ACTIVITY_CRITERIA):
+            features[i, j] = _wallet_feature(r, feature)
+        first, last = _to_epoch(history.get("first_tx_at")), _to_epoch(history.get("last_tx_at"))
+        if first is not None:
+            first_ts[i] = first
+        if last is not None:
+            last_ts[i] = last
+
+    campaign_chains = np.zeros((n, len(chains)), dtype=bool)
+    campaign_protocols = np.zeros((n, len(protocols)), dtype=np.float32)
+    thresholds = np.zeros((n, f), dtype=np.float32)
+    active_after = np.full(n, np.nan)
+    first_tx_before = np.full(n, np.nan)
+    weights = np.ones(n, dtype=np.float64)
+    for k, camp in enumerate(campaigns):
+        for c in camp.get("chains", []):
+            campaign_chains[k, chain_index[c.lower()]] = True
+        for p in camp.get("protocols_any", []):
+            campaign_protocols[k, protocol_index[p]] = 1.0
+        for j, (_, key) in enumerate(ACTIVITY_CRITERIA):
+            thresholds[k, j] = camp.get(key) or 0
+        after, before = _to_epoch(camp.get("active_after")), _to_epoch(camp.get("first_tx_before"))
+        if after is not None:
+            active_after[k] = after
+        if before is not None:
+            first_tx_before[k] = before
+        weights[k] = float(camp.get("weight", 1.0))
+
+    return {
+        "wallet_chain": wallet_chain,
+        "wallet_protocols": wallet_protocols,
+        "features": features,
+        "first_ts": first_ts,
+        "last_ts": last_ts,
+        "campaign_chains": campaign_chains,
+        "campaign_protocols": campaign_protocols,
+        "needs_protocol": campaign_protocols.any(axis=1),
+        "thresholds": thresholds,
+        "active_after": active_after,
+        "first_tx_before": first_tx_before,
+        "weights": weights,
+    }
+
+
+def score_matrix(m: Dict) -> Tuple:
+    """
+    計算 錢包 × 活動 的資格與分數
+
+    資格：錢包的鏈在活動的鏈清單內、用過任一指定協議（有指定時）、各活動量 >= 門檻、符合時間區間。
+    分數：各門檻的達成倍數（上限 RATIO_CAP）與協議覆蓋率的平均，乘上活動權重；不符資格者為 0。
+
+    Returns:
+        (eligible (W,N) bool, scores (W,N) float32)
+    """
+    import numpy as np
+
+    eligible = m["campaign_chains"][:, m["wallet_chain"]].T.copy()
+
+    overlap = m["wallet_protocols"] @ m["campaign_protocols"].T
+    required = m["campaign_protocols"].sum(axis=1)
+    eligible &= (overlap > 0) | ~m["needs_protocol"][None, :]
+
+    strength = np.zeros(eligible.shape, dtype=np.float32)
+    criteria = np.zeros(eligible.shape[1], dtype=np.float32)
+    for j in range(m["features"].shape[1]):
+        x = m["features"][:, j][:, None]
+        t = m["thresholds"][:, j][None, :]
+        eligible &= x >= t
+        has_threshold = t > 0
+        strength += np.where(has_threshold, np.minimum(x / np.where(has_threshold, t, 1.0), RATIO_CAP), 0.0)
+        criteria += has_threshold[0]
+
+    # NaN 比較結果為 False：沒有交易時間資料的錢包不符合有時間條件的活動
+    after = m["active_after"][None, :]
+    eligible &= np.isnan(after) | (m["last_ts"][:, None] >= after)
+    before = m["first_tx_before"][None, :]
+    eligible &= np.isnan(before) | (m["first_ts"][:, None] < before)
+
+    strength += np.where(m["needs_protocol"][None, :], overlap / np.maximum(required, 1.0)[None, :], 0.0)
+    criteria += m["needs_protocol"]
+    strength = np.where(criteria > 0, strength / np.maximum(criteria, 1.0), 1.0)
+
+    scores = np.where(eligible, strength * m["weights"][None, :], 0.0).astype(np.float32)
+    return eligible, scores
+
+
+def top_campaigns(reports: List[Dict], campaigns: List[Dict], k: int = TOP_K) -> List[List[Dict]]:
+    """
+    每個錢包分數最高的 k 個符合資格的活動（依分數遞減）
+
+    Returns:
+        與 reports 相同順序的列表；每個元素為 [{"id", "name", "score", "priority", "url"}, ...]
+    """
+    if not reports or not campaigns or k <= 0:
+        return [[] for _ in reports]
+
+    import numpy as np
+
+    eligible, scores = score_matrix(build_matrices(reports, campaigns))
+    k = min(k, len(campaigns))
+    # argpartition 取前 k 個（O(N)），再只對這 k 個排序
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    ranked = np.take_along_axis(candidates, order, axis=1)
+
+    results = []
+    for i in range(len(reports)):
+        picks = []
+        for idx in ranked[i]:
+            if not eligible[i, idx]:
+                continue
+            camp = campaigns[idx]
+            picks.append({
+                "id": camp["id"],
+                "name": camp.get("name", camp["id"]),
+                "score": round(float(scores[i, idx]), 3),
+                "priority": camp.get("priority", "medium"),
+                "url": camp.get("url"),
+            })
+        results.append(picks)
+    logger.info(f"資格矩陣: {len(reports)} 個錢包 × {len(campaigns)} 個活動, "
+                f"{int(eligible.sum())} 個符合資格的組合")
+    return results
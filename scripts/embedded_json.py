@@ -0,0 +1,240 @@
+"""
+Embedded JSON 擷取
+Next.js / SPA 頁面的資料通常以 JSON 嵌在 HTML 中（`<script id="__NEXT_DATA__">`、JSON-LD），
+用 CSS selector 走訪 DOM 只會看到尚未渲染的空殼。此模組直接以正規表示式找出 script 內容並解碼，
+再依 sources.yml 的欄位對應轉成 events，完全不建立 DOM。
+
+sources.yml 設定（放在來源的 extractor 下）：
+
+    extractor:
+      type: "embedded_json"
+      payload: "next_data"        # next_data | json_ld | script:<id>
+      records:                    # 資料列所在路徑，可列多個候選，使用第一個有資料的
+        - "props.pageProps.airdrops"
+        - "props.pageProps.**.airdropList"
+      fields:                     # event 欄位 → 資料列中的路徑（可列多個候選）或 "{路徑}" 樣板
+        project: ["projectName", "name"]
+        token: "symbol"
+        links.details: "/currencies/{slug}/airdrop/"
+
+路徑以 "." 分隔：數字為 list 索引、"*" 展開 list / dict 的所有值、"**" 代表任意深度（含零層）。
+有 orjson 時以 orjson 解碼，否則使用標準 json。
+"""
+import json
+import logging
+import re
+from typing import Any, Dict, Iterator, List, Optional, Union
+from urllib.parse import urljoin
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_KINDS = ("next_data", "json_ld", "script:<id>")
+
+_TEMPLATE = re.compile(r"\{([^{}]+)\}")
+_patterns: Dict[str, "re.Pattern"] = {}
+_loads = None
+
+
+def _script_pattern(attr: str, value: str) -> "re.Pattern":
+    return re.compile(
+        rf"""<script\b[^>]*\b{attr}\s*=\s*["']?{re.escape(value)}["']?[^>]*>(.*?)</script\s*>""",
+        re.IGNORECASE | re.DOTALL,
+    )
+
+
+def _pattern(payload: str) -> "re.Pattern":
+    pattern = _patterns.get(payload)
+    if pattern is None:
+        if payload == "next_data":
+            pattern = _script_pattern("id", "__NEXT_DATA__")
+        elif payload == "json_ld":
+            pattern = _script_pattern("type", "application/ld+json")
+        elif payload.startswith("script:"):
+            pattern = _script_pattern("id", payload.split(":", 1)[1])
+        else:
+            raise ValueError(f"不支援的 payload: {payload}（可用: {', '.join(PAYLOAD_KINDS)}）")
+        _patterns[payload] = pattern
+    return pattern
+
+
+def loads(text: Union[str, bytes]) -> Any:
+    """JSON 解碼：有 orjson 時使用 orjson（延遲載入）"""
+    global _loads
+    if _loads is None:
+        try:
+            import orjson
+            _loads = orjson.loads
+        except ImportError:
+            _loads = json.loads
+    return _loads(text)
+
+
+def find_payloads(html: str, payload: str) -> List[Any]:
+    """找出 HTML 中所有指定類型的 embedded JSON 並解碼；無法解碼的區塊記錄後略過"""
+    documents = []
+    for match in _pattern(payload).finditer(html):
+        text = match.group(1).strip()
+        if not text:
+            continue
+        try:
+            documents.append(loads(text))
+        except ValueError as e:
+            logger.debug(f"embedded JSON（{payload}）解碼失敗: {e}")
+    return documents
+
+
+def resolve(value: Any, path: str) -> Iterator[Any]:
+    """依路徑產生所有符合的值（"*" 展開一層、"**" 任意深度）"""
+    yield from _resolve(value, path.split(".") if path else [])
+
+
+def _children(value: Any) -> List[Any]:
+    if isinstance(value, dict):
+        return list(value.values())
+    if isinstance(value, list):
+        return value
+    return []
+
+
+def _resolve(value: Any, parts: List[str]) -> Iterator[Any]:
+    if not parts:
+        yield value
+        return
+    head, rest = parts[0], parts[1:]
+    if head == "**":
+        yield from _resolve(value, rest)
+        for child in _children(value):
+            yield from _resolve(child, parts)
+    elif head == "*":
+        for child in _children(value):
+            yield from _resolve(child, rest)
+    elif isinstance(value, dict):
+        if head in value:
+            yield from _resolve(value[head], rest)
+    elif isinstance(value, list) and head.lstrip("-").isdigit():
+        index = int(head)
+        if -len(value) <= index < len(value):
+            yield from _resolve(value[index], rest)
+
+
+def _first(record: Any, path: str) -> Any:
+    for value in resolve(record, path):
+        if value not in (None, "", [], {}):
+            return value
+    return None
+
+
+def field_value(record: Any, spec: Union[str, List[str]]) -> Any:
+    """
+    依欄位對應取值：路徑、"{路徑}" 樣板或候選列表（使用第一個有值的）
+
+    樣板中任何一個路徑沒有值時視為沒有值。
+    """
+    for candidate in ([spec] if isinstance(spec, str) else spec):
+        if "{" in candidate:
+            values = {}
+            for name in _TEMPLATE.findall(candidate):
+                values[name] = _first(record, name)
+                if values[name] is None:
+                    break
+            else:
+                return _TEMPLATE.sub(lambda m: str(values[m.group(1)]), candidate)
+            continue
+        value = _first(record, candidate)
+        if value is not None:
+            return value
+    return None
+
+
+def find_records(documents: List[Any], records: Union[str, List[str]]) -> List[Any]:
+    """在解碼後的文件中找資料列：依序嘗試候選路徑，使用第一個找到資料的路徑（路徑指到 list 時展開）"""
+    for path in ([records] if isinstance(records, str) else records):
+        found = []
+        for doc in documents:
+            for value in resolve(doc, path):
+                if isinstance(value, list):
+                    found.extend(v for v in value if isinstance(v, dict))
+                elif isinstance(value, dict):
+                    found.append(value)
+        if found:
+            return found
+    return []
+
+
+def classify_status(text: Any) -> str:
+    """與 CSS 擷取相同的狀態判斷：upcoming / ended / 其餘視為 active"""
+    text = str(text or "").lower()
+    if "upcoming" in text or "soon" in text:
+        return "upcoming"
+    if "ended" in text or "closed" in text or "expired" in text:
+        return "ended"
+    return "active"
+
+
+def to_event(record: Dict, fields: Dict[str, Union[str, List[str]]], source: str, url: str,
+             defaults: Optional[Dict] = None) -> Optional[Dict]:
+    """依欄位對應把一筆資料列轉成 event；沒有專案名稱時回傳 None"""
+    values = {key: field_value(record, spec) for key, spec in fields.items()}
+    project = values.get("project")
+    if not project:
+        return None
+    project = str(project).strip()
+
+    links = {key.split(".", 1)[1]: urljoin(url, str(v)) for key, v in values.items()
+             if key.startswith("links.") and v is not None}
+    links.setdefault("details", url)
+    requirements = values.get("requirements") or []
+    if not isinstance(requirements, list):
+        requirements = [requirements]
+
+    event = {
+        "token": values.get("token"),
+        "project": project,
+        "campaign_name": values.get("campaign_name") or project,
+        "source": source,
+        "status": classify_status(values["status"]) if values.get("status") is not None else "active",
+        "type": "airdrop",
+        "reward_type": values.get("reward_type") or "token",
+        "est_value_usd": values.get("est_value_usd"),
+        "deadline": values.get("deadline"),
+        "requirements": [str(r) for r in requirements],
+        "links": links,
+    }
+    for key, value in (defaults or {}).items():
+        if values.get(key) is None:
+            event[key] = value
+    return event
+
+
+def extract_events(html: str, spec: Dict, source: str, url: str, defaults: Optional[Dict] = None) -> List[Dict]:
+    """
+    依 extractor 設定從頁面的 embedded JSON 產生 events
+
+    找不到 payload 或資料列時回傳空 list（呼叫端可改用 CSS selector）。
+    defaults 為資料列沒有對應值時使用的欄位值（例如依 URL 決定的 status）。
+    """
+    payload = spec.get("payload", "next_data")
+    with tracing.span("parse", chars=len(html), payload=payload) as parse:
+        documents = find_payloads(html, payload)
+        parse.set("documents", len(documents))
+    if not documents:
+        logger.info(f"{source} 頁面沒有 {payload} embedded JSON")
+        return []
+
+    records = find_records(documents, spec.get("records", "*"))
+    logger.info(f"{source} embedded JSON（{payload}）找到 {len(records)} 筆資料")
+    events = []
+    with tracing.span("extract", cards=len(records)) as extract:
+        for record in records:
+            try:
+                event = to_event(record, spec.get("fields", {}), source, url, defaults)
+            except Exception as e:
+                logger.debug(f"{source} embedded JSON 資料列轉換失敗: {e}")
+                continue
+            if event is not None:
+                events.append(event)
+        extract.set("events", len(events))
+    return events
+
@@ -0,0 +1,611 @@
+"""
+Event / alert 歷史資料庫
+每次執行把當下的 events 與 alerts 記為一個快照（snapshot），累積在 output/cache/history/（只隨 pipeline cache 保存，不放進 artifact、不隨網站部署），
+可回答「這個活動最早在哪個來源出現」「活動持續多久」等問題，不必下載各次執行的 artifacts。
+
+兩層儲存：
+
+- log.sqlite：最近的快照，逐筆 append（每個快照中每個 event / alert 一列），依指紋、campaign、token、時間建索引
+- segments/<YYYY-MM>.npz：壓縮（COMPACT_AFTER 之前的快照），同一指紋在連續快照中狀態不變時合併為一個區間
+  （start / end / snapshots），以欄式（columnar）numpy 陣列壓縮保存，字串欄位以字典編碼（values + codes）
+
+查詢以檔名的月份略過時間範圍外的區段，區段內以向量化遮罩篩選，再與 log 的資料合併；
+一年份的每小時快照只需載入 12 個區段。numpy 只在壓縮與查詢區段時載入。
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from issue_index import alert_fingerprint
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+OUTPUT_DIR = ROOT / "output"
+HISTORY_DIR = OUTPUT_DIR / "cache" / "history"
+LOG_NAME = "log.sqlite"
+SEGMENT_DIR_NAME = "segments"
+
+# 超過此秒數的快照在下一次 record 時壓縮進月份區段（log 只保留最近幾次執行，查詢主要讀區段）
+COMPACT_AFTER = 6 * 3600
+SEGMENT_VERSION = 1
+
+KINDS = ("event", "alert")
+# 觀測的字串欄位（區段中字典編碼）；campaign 為正規化後的專案名稱，用來跨來源比對同一個活動
+FIELDS = ("kind", "fingerprint", "campaign", "project", "token", "source", "status", "priority")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    ts INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL UNIQUE,
+    events INTEGER NOT NULL,
+    alerts INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS observations (
+    ts INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    campaign TEXT NOT NULL,
+    project TEXT NOT NULL,
+    token TEXT NOT NULL,
+    source TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS observations_fingerprint ON observations (fingerprint, ts);
+CREATE INDEX IF NOT EXISTS observations_campaign ON observations (campaign, ts);
+CREATE INDEX IF NOT EXISTS observations_token ON observations (token, ts);
+CREATE INDEX IF NOT EXISTS observations_ts ON observations (ts);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_CAMPAIGN_NOISE = re.compile(r"\b(airdrop|campaign)s?\b")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def campaign_key(project: Optional[str], token: Optional[str] = None) -> str:
+    """跨來源比對用的活動鍵：專案名稱去掉大小寫、符號與 airdrop / campaign 字樣；沒有專案名稱時用 token"""
+    name = _NON_WORD.sub("", _CAMPAIGN_NOISE.sub("", str(project or "").lower()))
+    return name or str(token or "").strip().lower()
+
+
+def _month(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m")
+
+
+def _month_bounds(month: str) -> Tuple[int, int]:
+    """月份的 [開始, 下個月開始) epoch 秒"""
+    year, mon = (int(x) for x in month.split("-"))
+    start = datetime(year, mon, 1, tzinfo=timezone.utc)
+    end = datetime(year + mon // 12, mon % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def observation(kind: str, item: Dict) -> Tuple[str, ...]:
+    """event / alert → 觀測欄位（FIELDS 順序，缺少的欄位為空字串）"""
+    project = str(item.get("project") or "").strip()
+    token = str(item.get("token") or "").strip().upper()
+    return (
+        kind,
+        alert_fingerprint(item),
+        campaign_key(project, token),
+        project,
+        token,
+        str(item.get("source") or item.get("exchange") or "").strip(),
+        str(item.get("status") or "").strip().lower(),
+        str(item.get("priority") or "").strip().lower(),
+    )
+
+
+def build_intervals(rows: Iterable[Tuple], snapshots: List[int]) -> List[Dict]:
+    """
+    觀測列 → 區間：同一 (kind, 指紋) 在連續快照中狀態不變時合併為一個區間
+
+    rows 為 (ts, *FIELDS)，需依 kind、fingerprint、ts 排序；snapshots 為這些列所屬的快照時間（遞增）。
+    """
+    position = {ts: i for i, ts in enumerate(snapshots)}
+    intervals: List[Dict] = []
+    current: Optional[Dict] = None
+    last_pos = -2
+    for row in rows:
+        ts, fields = row[0], row[1:]
+        pos = position[ts]
+        if current is not None and current["kind"] == fields[0] and current["fingerprint"] == fields[1]:
+            if pos == last_pos:
+                continue
+            if pos == last_pos + 1 and current["status"] == fields[6]:
+                current["end"] = ts
+                current["snapshots"] += 1
+                last_pos = pos
+                continue
+        current = {**dict(zip(FIELDS, fields)), "start": ts, "end": ts, "snapshots": 1}
+        intervals.append(current)
+        last_pos = pos
+    return intervals
+
+
+class _Columns(dict):
+    """區段的欄位：第一次使用時才解壓縮（查詢通常只用到少數欄位）"""
+
+    def __init__(self, data):
+        super().__init__()
+        self._data = data
+
+    def __missing__(self, name: str):
+        self[name] = self._data[name]
+        return self[name]
+
+
+class Segment:
+    """一個月份的壓縮區段（欄式 numpy 陣列，依 start 排序）"""
+
+    def __init__(self, arrays: Dict):
+        self.arrays = arrays
+
+    @property
+    def snapshots(self):
+        return self.arrays["snapshots"]
+
+    @property
+    def start(self):
+        return self.arrays["start"]
+
+    @property
+    def end(self):
+        return self.arrays["end"]
+
+    @property
+    def count(self):
+        return self.arrays["count"]
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @classmethod
+    def load(cls, path: Path) -> "Segment":
+        import numpy as np
+
+        # 整個檔案讀進記憶體，不保持開啟的檔案（壓縮時會取代檔案）
+        arrays = _Columns(np.load(io.BytesIO(path.read_bytes()), allow_pickle=False))
+        if int(arrays["version"]) != SEGMENT_VERSION:
+            raise ValueError(f"區段 {path.name} 格式版本不符")
+        return cls(arrays)
+
+    @staticmethod
+    def write(path: Path, intervals: List[Dict], snapshots: List[int]):
+        """以暫存檔 + os.replace 原子寫出（中途中斷不會留下半個區段）"""
+        import numpy as np
+
+        intervals = sorted(intervals, key=lambda iv: (iv["start"], iv["kind"], iv["fingerprint"]))
+        arrays = {
+            "version": np.array(SEGMENT_VERSION),
+            "snapshots": np.array(snapshots, dtype=np.int64),
+            "start": np.array([iv["start"] for iv in intervals], dtype=np.int64),
+            "end": np.array([iv["end"] for iv in intervals], dtype=np.int64),
+            "count": np.array([iv["snapshots"] for iv in intervals], dtype=np.int32),
+        }
+        for field in FIELDS:
+            values, codes = np.unique(np.array([iv[field] for iv in intervals], dtype=str), return_inverse=True)
+            arrays[f"{field}_values"] = values
+            arrays[f"{field}_codes"] = codes.astype(np.int32)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        tmp = path.with_name(f"{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, path)
+
+    def select(self, since: Optional[int] = None, until: Optional[int] = None, **filters: str) -> List[Dict]:
+        """與 [since, until] 重疊且符合篩選條件的區間"""
+        import numpy as np
+
+        # start 已排序：先以二分搜尋截掉 until 之後開始的區間
+        hi = len(self) if until is None else int(np.searchsorted(self.start, until, side="right"))
+        mask = np.ones(hi, dtype=bool)
+        if since is not None:
+            mask &= self.end[:hi] >= since
+        for field, value in filters.items():
+            values = self.arrays[f"{field}_values"]
+            i = int(np.searchsorted(values, value))
+            if i >= len(values) or values[i] != value:
+                return []
+            mask &= self.arrays[f"{field}_codes"][:hi] == i
+        return self.rows(np.flatnonzero(mask))
+
+    def rows(self, indexes=None) -> List[Dict]:
+        import numpy as np
+
+        if indexes is None:
+            indexes = np.arange(len(self))
+        if not len(indexes):
+            return []
+        columns = {field: self.arrays[f"{field}_values"][self.arrays[f"{field}_codes"][indexes]].tolist()
+                   for field in FIELDS}
+        start, end, count = (self.start[indexes].tolist(), self.end[indexes].tolist(),
+                             self.count[indexes].tolist())
+        return [{**{field: columns[field][j] for field in FIELDS}, "start": start[j], "end": end[j],
+                 "snapshots": count[j]} for j in range(len(start))]
+
+
+class EventHistory:
+    """append-only 的快照 log（sqlite）加上壓縮後的月份區段"""
+
+    def __init__(self, directory: Path = HISTORY_DIR):
+        directory.mkdir(exist_ok=True, parents=True)
+        self.directory = directory
+        self.segment_dir = directory / SEGMENT_DIR_NAME
+        self._conn = sqlite3.connect(str(directory / LOG_NAME), check_same_thread=False, timeout=30)
+        # 只有 pipeline 寫入的快取：WAL 減少每次 commit 的 fsync，異常中斷最多遺失最後一個快照
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._segments: Dict[str, Tuple[int, Segment]] = {}
+
+    def close(self):
+        self._conn.close()
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def record(self, events: Iterable[Dict], alerts: Iterable[Dict], ts: Optional[int] = None,
+               run_id: Optional[str] = None) -> Dict:
+        """
+        記錄一個快照；同一個 run_id 再次記錄時（例如 --resume）取代原本的快照
+
+        快照時間必須遞增：不晚於已記錄或已壓縮的快照時，順延到其後一秒。
+        """
+        ts = int(ts if ts is not None else time.time())
+        run_id = run_id or str(ts)
+
+        def rows(kind: str, items: Iterable[Dict], counts: Dict[str, int]) -> Iterator[Tuple]:
+            seen = set()
+            for item in items:
+                obs = observation(kind, item)
+                if obs[1] in seen:
+                    continue
+                seen.add(obs[1])
+                counts[kind] += 1
+                yield (ts, *obs)
+
+        counts = {kind: 0 for kind in KINDS}
+        insert = f"INSERT INTO observations (ts, {', '.join(FIELDS)}) VALUES ({', '.join('?' * (len(FIELDS) + 1))})"
+        with self._lock, self._conn:
+            previous = self._conn.execute("SELECT ts FROM snapshots WHERE run_id = ?", (run_id,)).fetchone()
+            if previous:
+                self._conn.execute("DELETE FROM observations WHERE ts = ?", previous)
+                self._conn.execute("DELETE FROM snapshots WHERE ts = ?", previous)
+            latest = max(self._conn.execute("SELECT COALESCE(MAX(ts), 0) FROM snapshots").fetchone()[0],
+                         int(self._meta("compacted_until") or 0))
+            ts = max(ts, latest + 1)
+            self._conn.executemany(insert, rows("event", events, counts))
+            self._conn.executemany(insert, rows("alert", alerts, counts))
+            self._conn.execute("INSERT INTO snapshots (ts, run_id, events, alerts) VALUES (?, ?, ?, ?)",
+                               (ts, run_id, counts["event"], counts["alert"]))
+        logger.info(f"歷史快照 {run_id}: {counts['event']} 個 events、{counts['alert']} 個 alerts")
+        return {"ts": ts, "run_id": run_id, "events": counts["event"], "alerts": counts["alert"]}
+
+    def _segment_path(self, month: str) -> Path:
+        return self.segment_dir / f"{month}.npz"
+
+    def _segment(self, month: str) -> Optional[Segment]:
+        """載入月份區段（依檔案修改時間快取）"""
+        path = self._segment_path(month)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._segments.get(month)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        segment = Segment.load(path)
+        self._segments[month] = (mtime, segment)
+        return segment
+
+    def months(self) -> List[str]:
+        if not self.segment_dir.exists():
+            return []
+        return sorted(p.stem for p in self.segment_dir.glob("*.npz"))
+
+    def compact(self, before: Optional[int] = None) -> int:
+        """
+        把 before（預設為 COMPACT_AFTER 之前）以前的快照壓縮進月份區段並從 log 刪除，回傳壓縮的快照數
+
+        延續到區段最後一個快照的區間，與新資料第一個快照中狀態相同的區間合併。
+        """
+        before = int(before if before is not None else time.time() - COMPACT_AFTER)
+        with self._lock:
+            snapshots = [ts for (ts,) in self._conn.execute(
+                "SELECT ts FROM snapshots WHERE ts < ? ORDER BY ts", (before,))]
+        if not snapshots:
+            return 0
+
+        by_month: Dict[str, List[int]] = {}
+        for ts in snapshots:
+            by_month.setdefault(_month(ts), []).append(ts)
+        select = f"SELECT ts, {', '.join(FIELDS)} FROM observations WHERE ts BETWEEN ? AND ? ORDER BY kind, fingerprint, ts"
+        for month, month_snapshots in by_month.items():
+            with self._lock:
+                rows = self._conn.execute(select, (month_snapshots[0], month_snapshots[-1])).fetchall()
+            intervals = build_intervals(rows, month_snapshots)
+            segment = self._segment(month)
+            segment_snapshots = month_snapshots
+            if segment is not None:
+                intervals = self._extend(segment, intervals, month_snapshots[0])
+                segment_snapshots = segment.snapshots.tolist() + month_snapshots
+            Segment.write(self._segment_path(month), intervals, segment_snapshots)
+            with self._lock, self._conn:
+                span = (month_snapshots[0], month_snapshots[-1])
+                self._conn.execute("DELETE FROM observations WHERE ts BETWEEN ? AND ?", span)
+                self._conn.execute("DELETE FROM snapshots WHERE ts BETWEEN ? AND ?", span)
+                self._set_meta("compacted_until", month_snapshots[-1])
+            logger.info(f"歷史區段 {month}: {len(segment_snapshots)} 個快照、{len(intervals)} 個區間")
+        with self._lock:
+            self._conn.execute("VACUUM")
+        return len(snapshots)
+
+    @staticmethod
+    def _extend(segment: Segment, intervals: List[Dict], first_new: int) -> List[Dict]:
+        """既有區段的區間加上新區間；跨越兩者交界且狀態不變的區間合併"""
+        existing = segment.rows()
+        last = int(segment.snapshots[-1]) if len(segment.snapshots) else None
+        open_intervals = {(iv["kind"], iv["fingerprint"]): iv for iv in existing if iv["end"] == last}
+        for iv in intervals:
+            previous = open_intervals.get((iv["kind"], iv["fingerprint"])) if iv["start"] == first_new else None
+            if previous is not None and previous["status"] == iv["status"]:
+                previous["end"] = iv["end"]
+                previous["snapshots"] += iv["snapshots"]
+            else:
+                existing.append(iv)
+        return existing
+
+    def query(self, since: Optional[int] = None, until: Optional[int] = None, *, kind: Optional[str] = None,
+              fingerprint: Optional[str] = None, project: Optional[str] = None, token: Optional[str] = None,
+              source: Optional[str] = None, status: Optional[str] = None) -> List[Dict]:
+        """
+        與 [since, until]（epoch 秒，省略代表不限）重疊的區間，依開始時間排序
+
+        project 以 campaign_key 正規化後比對（涵蓋各來源對同一活動的不同寫法）。
+        區段與 log 交界處、以及跨月份的區間會接回一個區間。
+        """
+        filters = {
+            "kind": kind,
+            "fingerprint": fingerprint,
+            "campaign": campaign_key(project) if project else None,
+            "token": token.upper() if token else None,
+            "source": source,
+            "status": status.lower() if status else None,
+        }
+        filters = {k: v for k, v in filters.items() if v}
+
+        intervals: List[Dict] = []
+        # 每一段（區段或 log）的 (第一個快照, 最後一個快照)，用來接回跨段的區間
+        chunks: List[Tuple[int, int]] = []
+        for month in self.months():
+            month_start, month_end = _month_bounds(month)
+            if (until is not None and month_start > until) or (since is not None and month_end <= since):
+                continue
+            segment = self._segment(month)
+            if segment is None or not len(segment.snapshots):
+                continue
+            chunks.append((int(segment.snapshots[0]), int(segment.snapshots[-1])))
+            intervals.extend(segment.select(since, until, **filters))
+
+        log_intervals = self._query_log(filters, since, until)
+        if log_intervals is not None:
+            snapshots, found = log_intervals
+            chunks.append((snapshots[0], snapshots[-1]))
+            intervals.extend(iv for iv in found
+                             if (until is None or iv["start"] <= until) and (since is None or iv["end"] >= since))
+        return self._join(intervals, chunks)
+
+    def _query_log(self, filters: Dict[str, str], since: Optional[int] = None,
+                   until: Optional[int] = None) -> Optional[Tuple[List[int], List[Dict]]]:
+        """log 的快照時間與符合條件的區間；有時間範圍時只讀取範圍內出現過的指紋（以 ts 索引找出）"""
+        where = " AND ".join(f"{field} = ?" for field in filters) or "1"
+        params = tuple(filters.values())
+        with self._lock:
+            snapshots = [ts for (ts,) in self._conn.execute("SELECT ts FROM snapshots ORDER BY ts")]
+            if not snapshots:
+                return None
+            if (until is not None and until < snapshots[0]) or (since is not None and since > snapshots[-1]):
+                return snapshots, []
+            if since is not None or until is not None:
+                where += (" AND fingerprint IN (SELECT fingerprint FROM observations"
+                          f" WHERE ts BETWEEN ? AND ? AND {where})")
+                params += (since if since is not None else snapshots[0],
+                           until if until is not None else snapshots[-1]) + params
+            rows = self._conn.execute(
+                f"SELECT ts, {', '.join(FIELDS)} FROM observations WHERE {where} ORDER BY kind, fingerprint, ts",
+                params,
+            ).fetchall()
+        return snapshots, build_intervals(rows, snapshots)
+
+    @staticmethod
+    def _join(intervals: List[Dict], chunks: List[Tuple[int, int]]) -> List[Dict]:
+        """intervals 需依段的時間順序排列；結束於某段最後一個快照、且下一段第一個快照狀態相同的區間接成一個"""
+        chunks.sort()
+        next_snapshot = {chunks[i][1]: chunks[i + 1][0] for i in range(len(chunks) - 1)}
+        first_snapshots = set(next_snapshot.values())
+        open_intervals: Dict[Tuple[str, str], Dict] = {}
+        joined: List[Dict] = []
+        for iv in intervals:
+            key = (iv["kind"], iv["fingerprint"])
+            if iv["start"] in first_snapshots:
+                previous = open_intervals.pop(key, None)
+                if (previous is not None and previous["status"] == iv["status"]
+                        and next_snapshot[previous["end"]] == iv["start"]):
+                    previous["end"] = iv["end"]
+                    previous["snapshots"] += iv["snapshots"]
+                    iv = previous
+                else:
+                    joined.append(iv)
+            else:
+                joined.append(iv)
+            if iv["end"] in next_snapshot:
+                open_intervals[key] = iv
+        joined.sort(key=lambda iv: iv["start"])
+        return joined
+
+    def first_seen(self, project: Optional[str] = None, token: Optional[str] = None,
+                   kind: str = "event") -> Optional[Dict]:
+        """活動在任何來源最早出現的區間（時間與來源）；沒有紀錄時回傳 None"""
+        intervals = self.query(kind=kind, project=project, token=token)
+        return min(intervals, key=lambda iv: iv["start"]) if intervals else None
+
+    def campaigns(self, since: Optional[int] = None, until: Optional[int] = None, **filters) -> List[Dict]:
+        """
+        各活動（campaign_key）的摘要：首次 / 最後出現、來源、狀態，以及 active 的總時間
+
+        active 時間為各來源 active 區間的聯集（多個來源同時列出不重複計算）。
+        """
+        filters.setdefault("kind", "event")
+        summaries: Dict[str, Dict] = {}
+        active: Dict[str, List[Tuple[int, int]]] = {}
+        for iv in self.query(since, until, **filters):
+            summary = summaries.get(iv["campaign"])
+            if summary is None:
+                # 區間依開始時間排序，第一個區間即首次出現
+                summary = summaries[iv["campaign"]] = {
+                    "campaign": iv["campaign"], "project": iv["project"], "tokens": set(), "sources": set(),
+                    "statuses": set(), "first_seen": iv["start"], "first_source": iv["source"], "last_seen": iv["end"],
+                }
+            elif iv["end"] > summary["last_seen"]:
+                summary["last_seen"] = iv["end"]
+            summary["tokens"].add(iv["token"])
+            summary["sources"].add(iv["source"])
+            summary["statuses"].add(iv["status"])
+            if iv["status"] == "active":
+                active.setdefault(iv["campaign"], []).append((iv["start"], iv["end"]))
+
+        for campaign, summary in summaries.items():
+            spans = sorted(active.get(campaign, []))
+            total, current = 0, None
+            for start, end in spans:
+                if current and start <= current[1]:
+                    current[1] = max(current[1], end)
+                    continue
+                if current:
+                    total += current[1] - current[0]
+                current = [start, end]
+            if current:
+                total += current[1] - current[0]
+            summary.update(
+                tokens=sorted(filter(None, summary["tokens"])), sources=sorted(filter(None, summary["sources"])),
+                statuses=sorted(filter(None, summary["statuses"])), active_seconds=total,
+                active_from=spans[0][0] if spans else None, active_until=current[1] if current else None,
+            )
+        return sorted(summaries.values(), key=lambda s: s["first_seen"])
+
+    def stats(self) -> Dict:
+        with self._lock:
+            snapshots, first, last = self._conn.execute(
+                "SELECT COUNT(*), MIN(ts), MAX(ts) FROM snapshots").fetchone()
+            observations = self._conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+        segments = {}
+        for month in self.months():
+            segment = self._segment(month)
+            segments[month] = {"snapshots": len(segment.snapshots), "intervals": len(segment),
+                               "bytes": self._segment_path(month).stat().st_size}
+        return {"log": {"snapshots": snapshots, "observations": observations, "first": first, "last": last},
+                "segments": segments}
+
+
+def record_run(events: Iterable[Dict], alerts: Iterable[Dict], run_id: Optional[str] = None,
+               directory: Path = HISTORY_DIR) -> Dict:
+    """pipeline 用：記錄本次執行的快照並壓縮過期的快照"""
+    store = EventHistory(directory)
+    try:
+        snapshot = store.record(events, alerts, run_id=run_id)
+        snapshot["compacted"] = store.compact()
+        return snapshot
+    finally:
+        store.close()
+
+
+def _parse_time(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _iso(ts: Optional[int]) -> Optional[str]:
+    return None if ts is None else datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _readable(item: Dict) -> Dict:
+    return {k: _iso(v) if k in ("start", "end", "first_seen", "last_seen", "active_from", "active_until") else v
+            for k, v in item.items()}
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="查詢 event / alert 歷史（output/cache/history/）")
+    parser.add_argument("--since", help="開始時間（ISO 8601，例如 2026-01-01，預設 UTC）")
+    parser.add_argument("--until", help="結束時間（ISO 8601）")
+    parser.add_argument("--project", help="專案名稱（正規化後比對）")
+    parser.add_argument("--token", help="token symbol")
+    parser.add_argument("--source", help="來源名稱")
+    parser.add_argument("--fingerprint", help="event / alert 指紋")
+    parser.add_argument("--status", help="狀態（active / upcoming / ended …）")
+    parser.add_argument("--kind", choices=KINDS, help="只查 events 或 alerts")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--campaigns", action="store_true", help="輸出各活動的摘要（首次出現、來源、active 時間）")
+    mode.add_argument("--first-seen", action="store_true", help="輸出活動最早出現的時間與來源（需 --project 或 --token）")
+    mode.add_argument("--record", action="store_true", help="把 output/ 目前的 events 與 alerts 記為一個快照")
+    mode.add_argument("--compact", action="store_true", help="壓縮 COMPACT_AFTER 之前的快照")
+    mode.add_argument("--stats", action="store_true", help="輸出 log 與各區段的大小")
+    args = parser.parse_args()
+
+    store = EventHistory()
+    try:
+        if args.record:
+            import streaming
+
+            with open(OUTPUT_DIR / "alerts.json", "r", encoding="utf-8") as f:
+                alerts = json.load(f)
+            result = store.record(streaming.read_records(OUTPUT_DIR / "events_sources.json"), alerts)
+        elif args.compact:
+            result = {"compacted": store.compact()}
+        elif args.stats:
+            result = store.stats()
+        else:
+            filters = {k: getattr(args, k) for k in ("kind", "fingerprint", "project", "token", "source", "status")
+                       if getattr(args, k)}
+            since, until = _parse_time(args.since), _parse_time(args.until)
+            if args.first_seen:
+                if not (args.project or args.token):
+                    parser.error("--first-seen 需要 --project 或 --token")
+                found = store.first_seen(args.project, args.token, kind=args.kind or "event")
+                result = _readable(found) if found else None
+            elif args.campaigns:
+                result = [_readable(s) for s in store.campaigns(since, until, **filters)]
+            else:
+                result = [_readable(iv) for iv in store.query(since, until, **filters)]
+    finally:
+        store.close()
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
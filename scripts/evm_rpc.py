@@ -0,0 +1,169 @@
+"""
+EVM JSON-RPC 客戶端
+將多個地址的 eth_getTransactionCount / eth_getBalance 等呼叫合併成 JSON-RPC batch 請求，
+取代逐一地址查詢 Etherscan proxy 的作法（只讀，不送出交易）
+
+所有 EVM 鏈共用同一個客戶端，端點選擇、失敗切換與對沖請求由 chain_pool.ProviderPool 負責。
+"""
+import itertools
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from chain_pool import PoolExhaustedError, ProviderPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_TIMEOUT = 15  # 秒
+
+WEI_PER_ETH = 10 ** 18
+
+
+class RpcError(Exception):
+    """JSON-RPC 呼叫失敗（HTTP 失敗或節點回傳 error 物件）"""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+
+class EvmRpcClient:
+    """
+    以 batch 方式呼叫標準 EVM JSON-RPC 的客戶端
+
+    stats 會記錄邏輯呼叫數與實際 HTTP 請求數，差值即為相對逐一地址查詢省下的請求數。
+    pool 可傳入 ProviderPool，或單一 URL 字串（建立只有一個端點的池）。
+    """
+
+    def __init__(self, pool, batch_size: int = DEFAULT_BATCH_SIZE, timeout: int = DEFAULT_TIMEOUT, session=None):
+        import requests
+
+        self.pool = pool if isinstance(pool, ProviderPool) else ProviderPool("custom", [pool])
+        self.batch_size = max(1, int(batch_size))
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.http_requests = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """呼叫統計：calls（邏輯呼叫）、http_requests（實際請求）、requests_saved"""
+        return {
+            "calls": self.calls,
+            "http_requests": self.http_requests,
+            "requests_saved": self.calls - self.http_requests,
+        }
+
+    def _post_once(self, url: str, payload):
+        """對單一端點送出一次 HTTP POST，回傳解析後的 JSON"""
+        with self._lock:
+            self.http_requests += 1
+        resp = self.session.post(url, json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json()
+        if isinstance(data, dict) and isinstance(payload, list):
+            # 部分節點不支援 batch 或超過上限時會回傳單一 error 物件，視為此端點失敗
+            error = data.get("error") or {}
+            raise RpcError(f"節點拒絕 batch 請求: {error.get('message', data)}", error.get("code"))
+        return data
+
+    def _post(self, payload):
+        """透過端點池送出請求（失敗切換 / 對沖由池處理）"""
+        try:
+            return self.pool.request(lambda url: self._post_once(url, payload))
+        except PoolExhaustedError as e:
+            raise RpcError(str(e)) from e
+
+    def batch_call(self, calls: List[Tuple[str, list]]) -> List:
+        """
+        以 batch 送出多個 JSON-RPC 呼叫
+
+        Args:
+            calls: (method, params) 列表
+
+        Returns:
+            與 calls 相同順序的結果列表；單一呼叫失敗時該位置為 RpcError（不影響其他呼叫）
+
+        Raises:
+            RpcError: 整個 batch 請求失敗
+        """
+        results: List = []
+        for start in range(0, len(calls), self.batch_size):
+            chunk = calls[start:start + self.batch_size]
+            ids = [next(self._ids) for _ in chunk]
+            payload = [
+                {"jsonrpc": "2.0", "id": call_id, "method": method, "params": params}
+                for call_id, (method, params) in zip(ids, chunk)
+            ]
+            with self._lock:
+                self.calls += len(chunk)
+
+            data = self._post(payload)
+            # 回應順序不保證與請求相同，依 id 對應
+            by_id = {item.get("id"): item for item in data if isinstance(item, dict)}
+            for call_id in ids:
+                item = by_id.get(call_id)
+                if item is None:
+                    results.append(RpcError("回應中缺少此呼叫的結果"))
+                elif "error" in item:
+                    err = item["error"] or {}
+                    results.append(RpcError(err.get("message", "Unknown error"), err.get("code")))
+                else:
+                    results.append(item.get("result"))
+        return results
+
+    def call(self, method: str, params: list):
+        """單一 JSON-RPC 呼叫"""
+        result = self.batch_call([(method, params)])[0]
+        if isinstance(result, RpcError):
+            raise result
+        return result
+
+    def get_block_number(self) -> int:
+        """取得最新區塊高度"""
+        return int(self.call("eth_blockNumber", []), 16)
+
+    def get_nonces(self, addresses: List[str], block: str = "latest") -> Dict[str, Optional[int]]:
+        """
+        批次只查詢 nonce（作為錢包是否有新交易的廉價探測）
+
+        Returns:
+            address → nonce；該地址查詢失敗時為 None
+        """
+        results = self.batch_call([("eth_getTransactionCount", [addr, block]) for addr in addresses])
+        nonces: Dict[str, Optional[int]] = {}
+        for addr, result in zip(addresses, results):
+            try:
+                nonces[addr] = None if isinstance(result, RpcError) else int(result, 16)
+            except (TypeError, ValueError):
+                nonces[addr] = None
+        return nonces
+
+    def get_wallet_snapshots(self, addresses: List[str], block: str = "latest") -> Dict[str, Dict]:
+        """
+        批次取得多個地址的 nonce（交易次數）與餘額
+
+        Returns:
+            address → {"tx_count", "balance_wei"} 或 {"error"}
+        """
+        calls = []
+        for addr in addresses:
+            calls.append(("eth_getTransactionCount", [addr, block]))
+            calls.append(("eth_getBalance", [addr, block]))
+
+        results = self.batch_call(calls)
+        snapshots = {}
+        for i, addr in enumerate(addresses):
+            tx_count, balance = results[2 * i], results[2 * i + 1]
+            error = next((r for r in (tx_count, balance) if isinstance(r, RpcError)), None)
+            if error is not None:
+                snapshots[addr] = {"error": str(error)}
+                continue
+            try:
+                snapshots[addr] = {"tx_count": int(tx_count, 16), "balance_wei": int(balance, 16)}
+            except (TypeError, ValueError) as e:
+                snapshots[addr] = {"error": f"無法解析 RPC 回應: {e}"}
+        return snapshots
@@ -2,16 +2,25 @@
 空投情報收集器
 從多個空投追蹤網站收集空投活動資訊
 """
-import yaml
+import argparse
 import json
 import os
 import logging
+import threading
 import time
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional
 
-import requests
-from bs4 import BeautifulSoup
+import config_store
+import metrics
+import profiling
+import streaming
+import tracing
+
+# requests / bs4 / yaml 皆於使用處才 import，僅型別標註需要 requests
+if TYPE_CHECKING:
+    import requests
+    from checkpoints import RunManifest
 
 # 設定日誌
 logging.basicConfig(
@@ -21,8 +30,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 ROOT = Path(__file__).resolve().parents[1]
-CONFIG_TOKENS = ROOT / "config" / "tokens.yml"
-CONFIG_SOURCES = ROOT / "config" / "sources.yml"
 OUTPUT_DIR = ROOT / "output"
 OUTPUT_DIR.mkdir(exist_ok=True, parents=True)
 
@@ -31,32 +38,26 @@ MAX_RETRIES = 3
 RETRY_DELAY = 2  # 秒
 # 請求間隔（避免被 rate limit）
 REQUEST_DELAY = 1  # 秒，在請求之間等待
+FEED_ACCEPT = "application/rss+xml, application/atom+xml, application/xml;q=0.9, */*;q=0.8"
+
+_api_cache = None
+_api_cache_lock = threading.Lock()
 
 
 def load_tokens() -> List[Dict]:
     """載入追蹤的幣種配置"""
-    try:
-        with open(CONFIG_TOKENS, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            return data.get("tokens", [])
-    except Exception as e:
-        logger.error(f"載入 tokens.yml 失敗: {e}")
-        return []
+    return config_store.load_config()["tokens"]
 
 
 def load_sources() -> Dict:
     """載入來源配置"""
-    try:
-        with open(CONFIG_SOURCES, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            return data.get("sources", {})
-    except Exception as e:
-        logger.error(f"載入 sources.yml 失敗: {e}")
-        return {}
+    return config_store.load_config()["sources"]
 
 
-def fetch_with_retry(url: str, timeout: int = 20, headers: Optional[Dict] = None) -> Optional[requests.Response]:
+def fetch_with_retry(url: str, timeout: int = 20, headers: Optional[Dict] = None) -> Optional["requests.Response"]:
     """帶重試機制的 HTTP GET 請求"""
+    import requests
+
     # 預設 headers，模擬瀏覽器請求以避免被阻擋
     default_headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -69,9 +70,15 @@ def fetch_with_retry(url: str, timeout: int = 20, headers: Optional[Dict] = None
     # 合併 headers
     final_headers = {**default_headers, **(headers or {})}
 
+    # 呼叫端的 url span：記錄最後一次嘗試的狀態碼、大小與重試次數
+    url_span = tracing.current()
     for attempt in range(MAX_RETRIES):
+        url_span.set("retries", attempt)
         try:
-            resp = requests.get(url, timeout=timeout, headers=final_headers)
+            with tracing.span("attempt", attempt=attempt + 1) as attempt_span:
+                resp = requests.get(url, timeout=timeout, headers=final_headers)
+                attempt_span.update(status=resp.status_code, bytes=len(resp.content))
+            url_span.update(status=resp.status_code, bytes=len(resp.content))
             # 對於 404，直接返回 None，不需要重試
             if resp.status_code == 404:
                 logger.warning(f"URL 不存在 (404): {url}")
@@ -99,13 +106,284 @@ def fetch_with_retry(url: str, timeout: int = 20, headers: Optional[Dict] = None
     return None
 
 
-def fetch_airdrops_io(src_cfg: Dict) -> List[Dict]:
-    """抓取 Airdrops.io 的空投列表"""
+def get_api_cache():
+    """API 回應快取（同一行程共用，由 save_api_cache 寫回）"""
+    global _api_cache
+    with _api_cache_lock:
+        if _api_cache is None:
+            from source_apis import ApiCache
+            _api_cache = ApiCache()
+        return _api_cache
+
+
+def save_api_cache():
+    if _api_cache is not None:
+        _api_cache.save()
+
+
+def fetch_api_json(url: str, headers: Optional[Dict] = None) -> Optional[Any]:
+    """GET JSON API（在呼叫端的 url span 內）；請求失敗或回應不是 JSON 時回傳 None"""
+    import embedded_json
+
+    resp = fetch_with_retry(url, headers={"Accept": "application/json", **(headers or {})})
+    if not resp:
+        return None
+    try:
+        return embedded_json.loads(resp.content)
+    except ValueError as e:
+        logger.warning(f"API 回應不是 JSON: {url} - {e}")
+        return None
+
+
+def fetch_api_events(source: str, src_cfg: Dict) -> Optional[List[Dict]]:
+    """
+    依來源的 api 設定以 API / feed 取得 events（每個請求依 ttl 快取轉換後的 events）
+
+    未設定 api、缺少 API key、請求失敗或沒有資料時回傳 None，呼叫端改用爬蟲。
+    """
+    api = src_cfg.get("api")
+    if not api:
+        return None
+    import source_apis
+
+    kind = api["type"]
+    if kind == "cmc_airdrops":
+        headers = source_apis.cmc_headers()
+        if headers is None:
+            logger.info(f"{source} 未設定 CMC_API_KEY，改用爬蟲")
+            return None
+        symbols = {t["coinmarketcap_id"]: t["symbol"] for t in load_tokens() if t.get("coinmarketcap_id")}
+        urls = [source_apis.cmc_airdrops_url(status, api.get("url")) for status in api.get("statuses", ["active"])]
+
+        def fetch(url: str) -> Optional[List[Dict]]:
+            payload = fetch_api_json(url, headers)
+            return None if payload is None else source_apis.cmc_airdrop_events(payload, source, symbols)
+    else:  # feed
+        urls = [api["url"]]
+
+        def fetch(url: str) -> Optional[List[Dict]]:
+            resp = fetch_with_retry(url, headers={"Accept": FEED_ACCEPT})
+            return None if not resp else source_apis.feed_events(resp.content, source, url, api.get("status", "active"))
+
+    cache = get_api_cache()
+    ttl = api.get("ttl", source_apis.DEFAULT_TTL)
+    events: List[Dict] = []
+    for url in urls:
+        key = f"{kind}:{url}"
+        page = cache.get(key, ttl)
+        if page is not None:
+            metrics.incr("api_cache", "hits")
+        else:
+            metrics.incr("api_cache", "misses")
+            with tracing.span("url", url=url, api=kind) as span:
+                try:
+                    page = fetch(url)
+                except Exception as e:
+                    logger.warning(f"{source} API 回應無法解析: {e}")
+                    page = None
+                if page is None:
+                    logger.warning(f"{source} API（{kind}）請求失敗，改用爬蟲")
+                    return None
+                span.set("events", len(page))
+            cache.put(key, page)
+        events.extend(page)
+
+    if not events:
+        logger.info(f"{source} API（{kind}）沒有資料，改用爬蟲")
+        return None
+    logger.info(f"{source} 以 API（{kind}）取得 {len(events)} 個事件")
+    return events
+
+
+def fetch_token_markets(tokens: List[Dict]) -> Dict[str, Dict]:
+    """
+    追蹤幣種的行情（symbol → 行情），以 tokens.yml 的 coinmarketcap_id / coingecko_id 批次查詢
+
+    有 CMC_API_KEY 時優先使用 CoinMarketCap，沒有 key 或查不到的幣種改用 CoinGecko；
+    每個幣種依 MARKET_TTL 快取，批次請求只包含快取已過期的 id。查詢失敗的幣種不列出。
+    """
+    import source_apis
+
+    cmc_headers = source_apis.cmc_headers()
+    providers = [("coingecko_id", "coingecko_market", source_apis.coingecko_markets_url,
+                  source_apis.coingecko_markets, source_apis.coingecko_headers())]
+    if cmc_headers is not None:
+        providers.insert(0, ("coinmarketcap_id", "cmc_quote", source_apis.cmc_quotes_url,
+                             source_apis.cmc_quotes, cmc_headers))
+
+    cache = get_api_cache()
+    markets: Dict[str, Dict] = {}
+    for id_field, kind, build_url, parse, headers in providers:
+        pending = {str(t[id_field]): t["symbol"] for t in tokens if t.get(id_field) and t["symbol"] not in markets}
+        stale = []
+        for token_id, symbol in pending.items():
+            cached = cache.get(f"{kind}:{token_id}", source_apis.MARKET_TTL)
+            if cached is not None:
+                markets[symbol] = cached
+            else:
+                stale.append(token_id)
+        metrics.incr("api_cache", "hits", len(pending) - len(stale))
+        metrics.incr("api_cache", "misses", len(stale))
+
+        for batch in source_apis.chunks(stale):
+            url = build_url(batch)
+            with tracing.span("url", url=url, api=kind, ids=len(batch)) as span:
+                payload = fetch_api_json(url, headers)
+                try:
+                    fetched = parse(payload) if payload is not None else {}
+                except Exception as e:
+                    logger.warning(f"{kind} 行情回應無法解析: {e}")
+                    fetched = {}
+                span.set("found", len(fetched))
+            for token_id in batch:
+                if token_id in fetched:
+                    cache.put(f"{kind}:{token_id}", fetched[token_id])
+                    markets[pending[token_id]] = fetched[token_id]
+
+    save_api_cache()
+    failed = count_market_failures(tokens, markets)
+    metrics.set_value("markets", "failed", failed)
+    if failed:
+        logger.warning(f"{failed} 個設有 coinmarketcap_id / coingecko_id 的幣種沒有取得行情")
+    logger.info(f"取得 {len(markets)}/{len(tokens)} 個追蹤幣種的行情")
+    return markets
+
+
+def count_market_failures(tokens: List[Dict], markets: Dict[str, Dict]) -> int:
+    """設有行情 id 但沒有取得行情的追蹤幣種數"""
+    return sum(1 for t in tokens if (t.get("coinmarketcap_id") or t.get("coingecko_id")) and t["symbol"] not in markets)
+
+
+def write_token_markets(markets: Dict[str, Dict]):
+    """寫出 output/token_markets.json（symbol → 行情）"""
+    path = OUTPUT_DIR / "token_markets.json"
+    try:
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(markets, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+        logger.info(f"成功寫入 {len(markets)} 個幣種行情到 {path}")
+    except Exception as e:
+        logger.error(f"寫入 token_markets.json 失敗: {e}")
+
+
+def _parse_html(html: str):
+    """以 BeautifulSoup 解析 HTML（延遲載入 bs4）"""
+    from bs4 import BeautifulSoup
+
+    with tracing.span("parse", chars=len(html)):
+        return BeautifulSoup(html, "html.parser")
+
+
+def _extract_page(html: str, src_cfg: Dict, source: str, url: str,
+                  extract_css: Callable[..., List[Dict]], defaults: Optional[Dict] = None) -> List[Dict]:
+    """
+    頁面 HTML → events
+
+    來源設定 extractor.type 為 embedded_json 時先從頁面內嵌的 JSON 擷取（不建立 DOM），
+    沒有擷取到 events 時退回以 CSS selector 解析的 extract_css(soup)。
+    """
+    extractor = src_cfg.get("extractor") or {}
+    if extractor.get("type") == "embedded_json":
+        import embedded_json
+
+        events = embedded_json.extract_events(html, extractor, source, url, defaults)
+        if events:
+            return events
+        logger.info(f"{source} embedded JSON 沒有擷取到事件，改用 CSS selector")
+    return extract_css(_parse_html(html))
+
+
+def _extract_airdrops_io(soup, url: str, status: str) -> List[Dict]:
+    """Airdrops.io 列表卡片 → events"""
+    # 嘗試多種可能的 CSS selector
+    cards = (
+        soup.select(".airdrops-list .airdrop-item") or
+        soup.select(".airdrop-item") or
+        soup.select("article") or
+        soup.select(".card") or
+        soup.select("[class*='airdrop']")
+    )
+
+    logger.info(f"Airdrops.io ({status}) 找到 {len(cards)} 個可能的項目")
+
+    events = []
+    with tracing.span("extract", cards=len(cards)) as extract:
+        for card in cards:
+            try:
+                # 嘗試多種方式找標題
+                title_el = (
+                    card.select_one(".airdrop-title") or
+                    card.select_one("h2") or
+                    card.select_one("h3") or
+                    card.select_one("h4") or
+                    card.select_one("a[href*='airdrop']") or
+                    card.select_one("a")
+                )
+                proj_name = title_el.get_text(strip=True) if title_el else "Unknown"
+
+                if proj_name == "Unknown":
+                    # 如果還是找不到，跳過這個項目
+                    continue
+
+                detail_url = url
+                if title_el and title_el.has_attr("href"):
+                    detail_url = title_el["href"]
+                    if not detail_url.startswith("http"):
+                        detail_url = f"https://airdrops.io{detail_url}"
+
+                # 嘗試從標題或標籤推 token symbol
+                token_symbol = None
+                badge_el = (
+                    card.select_one(".token-symbol") or
+                    card.select_one(".symbol") or
+                    card.select_one("[class*='token']")
+                )
+                if badge_el:
+                    token_symbol = badge_el.get_text(strip=True)
+
+                # 抓描述文字
+                desc_el = (
+                    card.select_one(".airdrop-desc") or
+                    card.select_one("p") or
+                    card.select_one(".description")
+                )
+                desc_text = desc_el.get_text(" ", strip=True) if desc_el else ""
+
+                events.append({
+                    "token": token_symbol,
+                    "project": proj_name,
+                    "campaign_name": proj_name,
+                    "source": "airdrops_io",
+                    "status": status,
+                    "type": "airdrop",
+                    "reward_type": "token",
+                    "est_value_usd": None,
+                    "deadline": None,
+                    "requirements": [desc_text] if desc_text else [],
+                    "links": {
+                        "details": detail_url,
+                    },
+                })
+            except Exception as e:
+                logger.debug(f"解析 Airdrops.io 卡片失敗: {e}")
+                continue
+        extract.set("events", len(events))
+    return events
+
+
+def fetch_airdrops_io(src_cfg: Dict) -> Iterator[Dict]:
+    """抓取 Airdrops.io 的空投列表（逐頁產生 events）"""
     if not src_cfg.get("enabled"):
         logger.info("Airdrops.io 已停用，跳過")
-        return []
+        return
 
-    events = []
+    api_events = fetch_api_events("airdrops_io", src_cfg)
+    if api_events is not None:
+        yield from api_events
+        return
+
+    total = 0
     urls = src_cfg.get("urls", {})
 
     for status, url in urls.items():
@@ -114,131 +392,49 @@ def fetch_airdrops_io(src_cfg: Dict) -> List[Dict]:
 
         logger.info(f"抓取 Airdrops.io - {status}: {url}")
         # 在請求之間增加延遲，避免被 rate limit
-        if events:  # 不是第一個請求
+        if total:  # 不是第一個請求
             time.sleep(REQUEST_DELAY)
-        resp = fetch_with_retry(url)
-        if not resp:
-            logger.warning(f"Airdrops.io ({status}) 請求失敗，跳過")
-            continue
-
-        # 檢查是否是 404，如果是則跳過（URL 可能不存在）
-        if hasattr(resp, 'status_code') and resp.status_code == 404:
-            logger.warning(f"Airdrops.io ({status}) URL 不存在 (404)，跳過")
-            continue
-
-        try:
-            soup = BeautifulSoup(resp.text, "html.parser")
-            # 嘗試多種可能的 CSS selector
-            cards = (
-                soup.select(".airdrops-list .airdrop-item") or
-                soup.select(".airdrop-item") or
-                soup.select("article") or
-                soup.select(".card") or
-                soup.select("[class*='airdrop']")
-            )
-
-            logger.info(f"Airdrops.io ({status}) 找到 {len(cards)} 個可能的項目")
+        with tracing.span("url", url=url, listing=status):
+            resp = fetch_with_retry(url)
+            if not resp:
+                logger.warning(f"Airdrops.io ({status}) 請求失敗，跳過")
+                continue
 
-            for card in cards:
-                try:
-                    # 嘗試多種方式找標題
-                    title_el = (
-                        card.select_one(".airdrop-title") or
-                        card.select_one("h2") or
-                        card.select_one("h3") or
-                        card.select_one("h4") or
-                        card.select_one("a[href*='airdrop']") or
-                        card.select_one("a")
-                    )
-                    proj_name = title_el.get_text(strip=True) if title_el else "Unknown"
-
-                    if proj_name == "Unknown":
-                        # 如果還是找不到，跳過這個項目
-                        continue
-
-                    detail_url = url
-                    if title_el and title_el.has_attr("href"):
-                        detail_url = title_el["href"]
-                        if not detail_url.startswith("http"):
-                            detail_url = f"https://airdrops.io{detail_url}"
-
-                    # 嘗試從標題或標籤推 token symbol
-                    token_symbol = None
-                    badge_el = (
-                        card.select_one(".token-symbol") or
-                        card.select_one(".symbol") or
-                        card.select_one("[class*='token']")
-                    )
-                    if badge_el:
-                        token_symbol = badge_el.get_text(strip=True)
-
-                    # 抓描述文字
-                    desc_el = (
-                        card.select_one(".airdrop-desc") or
-                        card.select_one("p") or
-                        card.select_one(".description")
-                    )
-                    desc_text = desc_el.get_text(" ", strip=True) if desc_el else ""
-
-                    events.append({
-                        "token": token_symbol,
-                        "project": proj_name,
-                        "campaign_name": proj_name,
-                        "source": "airdrops_io",
-                        "status": status,
-                        "type": "airdrop",
-                        "reward_type": "token",
-                        "est_value_usd": None,
-                        "deadline": None,
-                        "requirements": [desc_text] if desc_text else [],
-                        "links": {
-                            "details": detail_url,
-                        },
-                    })
-                except Exception as e:
-                    logger.debug(f"解析 Airdrops.io 卡片失敗: {e}")
-                    continue
+            # 檢查是否是 404，如果是則跳過（URL 可能不存在）
+            if hasattr(resp, 'status_code') and resp.status_code == 404:
+                logger.warning(f"Airdrops.io ({status}) URL 不存在 (404)，跳過")
+                continue
 
-        except Exception as e:
-            logger.error(f"解析 Airdrops.io HTML 失敗 ({status}): {e}")
-            continue
+            try:
+                page = _extract_page(resp.text, src_cfg, "airdrops_io", url,
+                                     lambda soup: _extract_airdrops_io(soup, url, status), {"status": status})
+            except Exception as e:
+                logger.error(f"解析 Airdrops.io HTML 失敗 ({status}): {e}")
+                continue
 
-    logger.info(f"Airdrops.io 總共收集到 {len(events)} 個事件")
-    return events
+        # span 結束後才交出本頁 events，下游處理時間不計入請求
+        total += len(page)
+        yield from page
 
+    logger.info(f"Airdrops.io 總共收集到 {total} 個事件")
 
-def fetch_cmc_airdrops(src_cfg: Dict) -> List[Dict]:
-    """抓取 CoinMarketCap Airdrops"""
-    if not src_cfg.get("enabled"):
-        logger.info("CoinMarketCap Airdrops 已停用，跳過")
-        return []
 
-    url = src_cfg.get("urls", {}).get("main")
-    if not url:
-        logger.warning("CoinMarketCap Airdrops URL 未設定")
-        return []
+def _extract_cmc_airdrops(soup, url: str) -> List[Dict]:
+    """CoinMarketCap Airdrops 表格列 → events"""
+    # 嘗試多種可能的 CSS selector
+    rows = (
+        soup.select("table tbody tr") or
+        soup.select(".cmc-table-row") or
+        soup.select(".airdrop-row") or
+        soup.select("tr[data-symbol]") or
+        soup.select("article") or
+        soup.select("[class*='airdrop']")
+    )
 
-    logger.info(f"抓取 CoinMarketCap Airdrops: {url}")
-    resp = fetch_with_retry(url)
-    if not resp:
-        logger.warning("CoinMarketCap Airdrops 請求失敗")
-        return []
+    logger.info(f"CoinMarketCap Airdrops 找到 {len(rows)} 個可能的項目")
 
     events = []
-    try:
-        soup = BeautifulSoup(resp.text, "html.parser")
-        # 嘗試多種可能的 CSS selector
-        rows = (
-            soup.select("table tbody tr") or
-            soup.select(".cmc-table-row") or
-            soup.select(".airdrop-row") or
-            soup.select("tr[data-symbol]") or
-            soup.select("article") or
-            soup.select("[class*='airdrop']")
-        )
-
-        logger.info(f"CoinMarketCap Airdrops 找到 {len(rows)} 個可能的項目")
-
+    with tracing.span("extract", cards=len(rows)) as extract:
         for row in rows:
             try:
                 # 嘗試多種方式找專案名稱
@@ -302,46 +498,60 @@ def fetch_cmc_airdrops(src_cfg: Dict) -> List[Dict]:
             except Exception as e:
                 logger.debug(f"解析 CMC Airdrops 行失敗: {e}")
                 continue
-
-    except Exception as e:
-        logger.error(f"解析 CoinMarketCap Airdrops HTML 失敗: {e}")
-
-    logger.info(f"CoinMarketCap Airdrops 總共收集到 {len(events)} 個事件")
+        extract.set("events", len(events))
     return events
 
 
-def fetch_airdrop_checklist(src_cfg: Dict) -> List[Dict]:
-    """抓取 Airdrop Checklist"""
+def fetch_cmc_airdrops(src_cfg: Dict) -> Iterator[Dict]:
+    """抓取 CoinMarketCap Airdrops"""
     if not src_cfg.get("enabled"):
-        logger.info("Airdrop Checklist 已停用，跳過")
-        return []
+        logger.info("CoinMarketCap Airdrops 已停用，跳過")
+        return
+
+    api_events = fetch_api_events("cmc_airdrops", src_cfg)
+    if api_events is not None:
+        yield from api_events
+        return
 
     url = src_cfg.get("urls", {}).get("main")
     if not url:
-        logger.warning("Airdrop Checklist URL 未設定")
-        return []
+        logger.warning("CoinMarketCap Airdrops URL 未設定")
+        return
 
-    logger.info(f"抓取 Airdrop Checklist: {url}")
-    resp = fetch_with_retry(url)
-    if not resp:
-        logger.warning("Airdrop Checklist 請求失敗")
-        return []
+    logger.info(f"抓取 CoinMarketCap Airdrops: {url}")
+    with tracing.span("url", url=url):
+        resp = fetch_with_retry(url)
+        if not resp:
+            logger.warning("CoinMarketCap Airdrops 請求失敗")
+            return
+
+        events = []
+        try:
+            events = _extract_page(resp.text, src_cfg, "cmc_airdrops", url,
+                                   lambda soup: _extract_cmc_airdrops(soup, url))
+        except Exception as e:
+            logger.error(f"解析 CoinMarketCap Airdrops HTML 失敗: {e}")
+
+    logger.info(f"CoinMarketCap Airdrops 總共收集到 {len(events)} 個事件")
+    yield from events
 
-    events = []
-    try:
-        soup = BeautifulSoup(resp.text, "html.parser")
-        # 嘗試多種可能的 CSS selector
-        cards = (
-            soup.select(".project-card") or
-            soup.select(".card") or
-            soup.select(".airdrop-card") or
-            soup.select("article") or
-            soup.select("[class*='project']") or
-            soup.select("[class*='airdrop']")
-        )
-
-        logger.info(f"Airdrop Checklist 找到 {len(cards)} 個可能的項目")
 
+def _extract_airdrop_checklist(soup, url: str) -> List[Dict]:
+    """Airdrop Checklist 專案卡片 → events"""
+    # 嘗試多種可能的 CSS selector
+    cards = (
+        soup.select(".project-card") or
+        soup.select(".card") or
+        soup.select(".airdrop-card") or
+        soup.select("article") or
+        soup.select("[class*='project']") or
+        soup.select("[class*='airdrop']")
+    )
+
+    logger.info(f"Airdrop Checklist 找到 {len(cards)} 個可能的項目")
+
+    events = []
+    with tracing.span("extract", cards=len(cards)) as extract:
         for card in cards:
             try:
                 # 嘗試多種方式找標題
@@ -389,89 +599,110 @@ def fetch_airdrop_checklist(src_cfg: Dict) -> List[Dict]:
             except Exception as e:
                 logger.debug(f"解析 Airdrop Checklist 卡片失敗: {e}")
                 continue
-
-    except Exception as e:
-        logger.error(f"解析 Airdrop Checklist HTML 失敗: {e}")
-
-    logger.info(f"Airdrop Checklist 總共收集到 {len(events)} 個事件")
+        extract.set("events", len(events))
     return events
 
 
-def fetch_generic_list_site(src_name: str, src_cfg: Dict, css_card: str, css_title: str) -> List[Dict]:
-    """
-    通用函式處理 AltcoinTrading / AirdropsAlert / ICOMarks
-
-    Args:
-        css_card: CSS selector 字串，可以是多個選擇器用逗號分隔
-        css_title: CSS selector 字串，可以是多個選擇器用逗號分隔
-    """
+def fetch_airdrop_checklist(src_cfg: Dict) -> Iterator[Dict]:
+    """抓取 Airdrop Checklist"""
     if not src_cfg.get("enabled"):
-        logger.info(f"{src_name} 已停用，跳過")
-        return []
+        logger.info("Airdrop Checklist 已停用，跳過")
+        return
+
+    api_events = fetch_api_events("airdrop_checklist", src_cfg)
+    if api_events is not None:
+        yield from api_events
+        return
 
     url = src_cfg.get("urls", {}).get("main")
     if not url:
-        logger.warning(f"{src_name} URL 未設定")
-        return []
-
-    logger.info(f"抓取 {src_name}: {url}")
-    resp = fetch_with_retry(url)
-    if not resp:
-        logger.warning(f"{src_name} 請求失敗")
-        return []
+        logger.warning("Airdrop Checklist URL 未設定")
+        return
 
-    events = []
-    try:
-        soup = BeautifulSoup(resp.text, "html.parser")
+    logger.info(f"抓取 Airdrop Checklist: {url}")
+    with tracing.span("url", url=url):
+        resp = fetch_with_retry(url)
+        if not resp:
+            logger.warning("Airdrop Checklist 請求失敗")
+            return
 
-        # 如果 css_card 包含多個選擇器（用逗號分隔），分別嘗試
-        card_selectors = [s.strip() for s in css_card.split(",")] if "," in css_card else [css_card]
+        events = []
+        try:
+            events = _extract_page(resp.text, src_cfg, "airdrop_checklist", url,
+                                   lambda soup: _extract_airdrop_checklist(soup, url))
+        except Exception as e:
+            logger.error(f"解析 Airdrop Checklist HTML 失敗: {e}")
 
-        cards = []
-        for selector in card_selectors:
+    logger.info(f"Airdrop Checklist 總共收集到 {len(events)} 個事件")
+    yield from events
+
+
+# AltcoinTrading / AirdropsAlert / ICOMarks 的 (卡片, 標題) selector
+# 使用更通用的選擇器，並針對每個網站優化
+GENERIC_SOURCES = {
+    "altcointrading_airdrops": (".airdrop-item", "a"),
+    "airdropsalert": (
+        # airdropsalert 網站可能使用不同的結構，嘗試多種選擇器
+        ".airdrop-card, .card, article, .item, .post, .entry, [class*='airdrop'], [class*='card'], div[class*='airdrop'], section[class*='airdrop'], .list-item, .airdrop-item, tr[class*='airdrop'], li[class*='airdrop']",
+        "a, h2, h3, h4, h5, .title, [class*='title'], strong, b, .name, [class*='name']"
+    ),
+    "icomarks_airdrops": (".airdrop-item", "a"),
+}
+
+
+def _extract_generic_cards(soup, src_name: str, url: str, css_card: str, css_title: str) -> List[Dict]:
+    """通用列表頁 → events（AltcoinTrading / AirdropsAlert / ICOMarks）"""
+
+    # 如果 css_card 包含多個選擇器（用逗號分隔），分別嘗試
+    card_selectors = [s.strip() for s in css_card.split(",")] if "," in css_card else [css_card]
+
+    cards = []
+    for selector in card_selectors:
+        found = soup.select(selector)
+        if found:
+            cards.extend(found)
+            logger.debug(f"{src_name} 使用 selector '{selector}' 找到 {len(found)} 個項目")
+            break
+
+    # 如果還是沒找到，嘗試通用選擇器
+    if not cards:
+        fallback_selectors = ["article", ".card", "[class*='airdrop']", "[class*='item']", "tr", "li", ".post", ".entry"]
+        for selector in fallback_selectors:
             found = soup.select(selector)
-            if found:
-                cards.extend(found)
-                logger.debug(f"{src_name} 使用 selector '{selector}' 找到 {len(found)} 個項目")
+            if found and len(found) > 0:
+                cards = found
+                logger.info(f"{src_name} 使用 fallback selector '{selector}' 找到 {len(found)} 個項目")
                 break
 
-        # 如果還是沒找到，嘗試通用選擇器
-        if not cards:
-            fallback_selectors = ["article", ".card", "[class*='airdrop']", "[class*='item']", "tr", "li", ".post", ".entry"]
-            for selector in fallback_selectors:
-                found = soup.select(selector)
-                if found and len(found) > 0:
-                    cards = found
-                    logger.info(f"{src_name} 使用 fallback selector '{selector}' 找到 {len(found)} 個項目")
-                    break
-
-        logger.info(f"{src_name} 找到 {len(cards)} 個可能的項目")
-
-        if len(cards) == 0:
-            logger.warning(f"{src_name} 未找到任何項目，可能需要調整 CSS selector")
-            # 嘗試找出可能的選擇器
-            soup_debug = BeautifulSoup(resp.text, "html.parser")
-            # 檢查常見的容器元素
-            possible_containers = soup_debug.select("article, .card, .item, .post, .entry, [class*='airdrop'], [class*='list'], div[class], section[class]")
-            if possible_containers:
-                logger.info(f"{src_name} 找到 {len(possible_containers)} 個可能的容器元素，但 selector 不匹配")
-                # 輸出前幾個容器的 class 供參考
-                classes_found = []
-                for container in possible_containers[:5]:
-                    if container.get("class"):
-                        classes_found.append(".".join(container.get("class", [])))
-                if classes_found:
-                    logger.info(f"{src_name} 發現的 class 範例: {', '.join(set(classes_found)[:5])}")
-            else:
-                logger.warning(f"{src_name} 頁面結構可能使用 JavaScript 動態載入，或結構完全不同")
-                # 檢查是否有 script 標籤（可能使用 JS 載入）
-                scripts = soup_debug.find_all("script")
-                if len(scripts) > 5:
-                    logger.info(f"{src_name} 頁面包含 {len(scripts)} 個 script 標籤，可能使用 JavaScript 動態載入內容")
+    logger.info(f"{src_name} 找到 {len(cards)} 個可能的項目")
+
+    if len(cards) == 0:
+        logger.warning(f"{src_name} 未找到任何項目，可能需要調整 CSS selector")
+        # 嘗試找出可能的選擇器（沿用同一份解析結果，不重新解析）
+        # 檢查常見的容器元素
+        possible_containers = soup.select("article, .card, .item, .post, .entry, [class*='airdrop'], [class*='list'], div[class], section[class]")
+        if possible_containers:
+            logger.info(f"{src_name} 找到 {len(possible_containers)} 個可能的容器元素，但 selector 不匹配")
+            # 輸出前幾個容器的 class 供參考
+            classes_found = []
+            for container in possible_containers[:5]:
+                if container.get("class"):
+                    classes_found.append(".".join(container.get("class", [])))
+            if classes_found:
+                logger.info(f"{src_name} 發現的 class 範例: {', '.join(set(classes_found)[:5])}")
+        else:
+            logger.warning(f"{src_name} 頁面結構可能使用 JavaScript 動態載入，或結構完全不同")
+            # 檢查是否有 script 標籤（可能使用 JS 載入）
+            scripts = soup.find_all("script")
+            if len(scripts) > 5:
+                logger.info(f"{src_name} 頁面包含 {len(scripts)} 個 script 標籤，可能使用 JavaScript 動態載入內容")
+
+    # 處理 css_title，可能是多個選擇器
+    title_selectors = [s.strip() for s in css_title.split(",")] if "," in css_title else [css_title]
 
-        # 處理 css_title，可能是多個選擇器
-        title_selectors = [s.strip() for s in css_title.split(",")] if "," in css_title else [css_title]
 
+    events = []
+    with tracing.span("extract", cards=len(cards)) as extract:
         for card in cards:
             try:
                 # 嘗試多種方式找標題
@@ -530,23 +761,109 @@ def fetch_generic_list_site(src_name: str, src_cfg: Dict, css_card: str, css_tit
             except Exception as e:
                 logger.debug(f"解析 {src_name} 卡片失敗: {e}")
                 continue
+        extract.set("events", len(events))
+    return events
 
-    except Exception as e:
-        logger.error(f"解析 {src_name} HTML 失敗: {e}")
+
+def fetch_generic_list_site(src_name: str, src_cfg: Dict, css_card: str, css_title: str) -> Iterator[Dict]:
+    """
+    通用函式處理 AltcoinTrading / AirdropsAlert / ICOMarks
+
+    Args:
+        css_card: CSS selector 字串，可以是多個選擇器用逗號分隔
+        css_title: CSS selector 字串，可以是多個選擇器用逗號分隔
+    """
+    if not src_cfg.get("enabled"):
+        logger.info(f"{src_name} 已停用，跳過")
+        return
+
+    api_events = fetch_api_events(src_name, src_cfg)
+    if api_events is not None:
+        yield from api_events
+        return
+
+    url = src_cfg.get("urls", {}).get("main")
+    if not url:
+        logger.warning(f"{src_name} URL 未設定")
+        return
+
+    logger.info(f"抓取 {src_name}: {url}")
+    with tracing.span("url", url=url):
+        resp = fetch_with_retry(url)
+        if not resp:
+            logger.warning(f"{src_name} 請求失敗")
+            return
+
+        events = []
+        try:
+            events = _extract_page(resp.text, src_cfg, src_name, url,
+                                   lambda soup: _extract_generic_cards(soup, src_name, url, css_card, css_title))
+        except Exception as e:
+            logger.error(f"解析 {src_name} HTML 失敗: {e}")
 
     logger.info(f"{src_name} 總共收集到 {len(events)} 個事件")
-    return events
+    yield from events
 
 
-def run():
-    """主執行函式"""
-    logger.info("=" * 60)
-    logger.info("開始收集空投情報...")
-    logger.info("=" * 60)
+def _stream_source(name: str, label: str, source_stats: Dict[str, int],
+                   fetch: Callable[..., Iterator[Dict]], *args,
+                   manifest: Optional["RunManifest"] = None, delay: bool = False) -> Iterator[Dict]:
+    """
+    在 source span 內逐筆產生單一來源的 events，完成後把筆數記到 source_stats
+
+    抓取途中失敗時記錄錯誤並結束該來源（已產生的 events 保留），不影響其他來源。
+    有 manifest 時 events 同時寫到來源的 checkpoint；--resume 時已完成的來源直接重播 checkpoint，不再請求。
+    delay 為 True 時實際抓取前先等待 REQUEST_DELAY。
+    """
+    unit = f"source:{name}"
+    count = 0
+    with tracing.span("source", source=name) as span:
+        if manifest is not None and manifest.reusable(unit):
+            manifest.mark_reused(unit)
+            span.set("resumed", True)
+            for event in manifest.read_records(unit):
+                count += 1
+                yield event
+            logger.info(f"{label} 沿用 checkpoint: {count} 個事件")
+            span.set("events", count)
+            source_stats[name] = count
+            return
+
+        if delay:
+            time.sleep(REQUEST_DELAY)
+        writer = manifest.open_records(unit) if manifest is not None else None
+        try:
+            for event in fetch(*args):
+                count += 1
+                if writer is not None:
+                    writer.write(event)
+                yield event
+        except Exception as e:
+            logger.error(f"抓取 {label} 失敗: {e}", exc_info=True)
+            if writer is not None:
+                writer.abort()
+                manifest.fail(unit, str(e))
+        except GeneratorExit:
+            # 下游停止讀取（例如 fetch 階段失敗）：不留下未完成的 checkpoint
+            if writer is not None:
+                writer.abort()
+            raise
+        else:
+            logger.info(f"{label} 完成: {count} 個事件")
+            if writer is not None:
+                # 沒有資料多半是連線或解析失敗，--resume 時重新抓取
+                manifest.complete_records(unit, writer, status="ok" if count else "empty")
+        span.set("events", count)
+    source_stats[name] = count
 
-    sources = load_sources()
-    all_events = []
-    source_stats = {}
+
+def collect_events(sources: Dict, manifest: Optional["RunManifest"] = None) -> Iterator[Dict]:
+    """
+    依來源配置依序抓取所有列表來源，逐筆產生統一格式的 events（不寫檔，也不累積在記憶體中）
+
+    manifest 為 pipeline 的 RunManifest 時每個來源各自寫 checkpoint（見 _stream_source）。
+    """
+    source_stats: Dict[str, int] = {}
 
     # 記錄所有啟用的來源
     enabled_sources = [
@@ -558,28 +875,16 @@ def run():
     # Airdrops.io
     if "airdrops_io" in sources:
         logger.info("--- 開始處理 Airdrops.io ---")
-        try:
-            events = fetch_airdrops_io(sources["airdrops_io"])
-            all_events.extend(events)
-            source_stats["airdrops_io"] = len(events)
-            logger.info(f"Airdrops.io 完成: {len(events)} 個事件")
-        except Exception as e:
-            logger.error(f"抓取 Airdrops.io 失敗: {e}", exc_info=True)
-            source_stats["airdrops_io"] = 0
+        yield from _stream_source("airdrops_io", "Airdrops.io", source_stats, fetch_airdrops_io, sources["airdrops_io"],
+                                  manifest=manifest)
     else:
         logger.info("Airdrops.io 未在配置中")
 
     # CoinMarketCap Airdrops
     if "cmc_airdrops" in sources:
         logger.info("--- 開始處理 CoinMarketCap Airdrops ---")
-        try:
-            events = fetch_cmc_airdrops(sources["cmc_airdrops"])
-            all_events.extend(events)
-            source_stats["cmc_airdrops"] = len(events)
-            logger.info(f"CoinMarketCap Airdrops 完成: {len(events)} 個事件")
-        except Exception as e:
-            logger.error(f"抓取 CoinMarketCap Airdrops 失敗: {e}", exc_info=True)
-            source_stats["cmc_airdrops"] = 0
+        yield from _stream_source("cmc_airdrops", "CoinMarketCap Airdrops", source_stats,
+                                  fetch_cmc_airdrops, sources["cmc_airdrops"], manifest=manifest)
     else:
         logger.info("CoinMarketCap Airdrops 未在配置中")
 
@@ -588,16 +893,9 @@ def run():
         if sources["airdrop_checklist"].get("enabled"):
             logger.info("--- 開始處理 Airdrop Checklist ---")
             # 在請求之間增加延遲
-            if all_events:
-                time.sleep(REQUEST_DELAY)
-            try:
-                events = fetch_airdrop_checklist(sources["airdrop_checklist"])
-                all_events.extend(events)
-                source_stats["airdrop_checklist"] = len(events)
-                logger.info(f"Airdrop Checklist 完成: {len(events)} 個事件")
-            except Exception as e:
-                logger.error(f"抓取 Airdrop Checklist 失敗: {e}", exc_info=True)
-                source_stats["airdrop_checklist"] = 0
+            yield from _stream_source("airdrop_checklist", "Airdrop Checklist", source_stats,
+                                      fetch_airdrop_checklist, sources["airdrop_checklist"],
+                                      manifest=manifest, delay=any(source_stats.values()))
         else:
             logger.info("Airdrop Checklist 已停用，跳過")
             # 不加入統計，避免顯示 0 個事件
@@ -605,18 +903,7 @@ def run():
         logger.info("Airdrop Checklist 未在配置中")
 
     # AltcoinTrading / AirdropsAlert / ICOMarks
-    # 使用更通用的選擇器，並針對每個網站優化
-    generic_sources = {
-        "altcointrading_airdrops": (".airdrop-item", "a"),
-        "airdropsalert": (
-            # airdropsalert 網站可能使用不同的結構，嘗試多種選擇器
-            ".airdrop-card, .card, article, .item, .post, .entry, [class*='airdrop'], [class*='card'], div[class*='airdrop'], section[class*='airdrop'], .list-item, .airdrop-item, tr[class*='airdrop'], li[class*='airdrop']",
-            "a, h2, h3, h4, h5, .title, [class*='title'], strong, b, .name, [class*='name']"
-        ),
-        "icomarks_airdrops": (".airdrop-item", "a"),
-    }
-
-    for src_name, selector_tuple in generic_sources.items():
+    for src_name, selector_tuple in GENERIC_SOURCES.items():
         if src_name in sources:
             # 檢查是否啟用
             if not sources[src_name].get("enabled"):
@@ -624,29 +911,25 @@ def run():
                 continue
 
             logger.info(f"--- 開始處理 {src_name} ---")
-            # 在請求之間增加延遲
-            if all_events:  # 不是第一個來源
-                time.sleep(REQUEST_DELAY)
-            try:
-                # 處理 selector_tuple，可能是 tuple 或單一字串
-                if isinstance(selector_tuple, tuple):
-                    css_card, css_title = selector_tuple
-                else:
-                    css_card = selector_tuple
-                    css_title = "a"
-
-                events = fetch_generic_list_site(
-                    src_name,
-                    sources[src_name],
-                    css_card,
-                    css_title
-                )
-                all_events.extend(events)
-                source_stats[src_name] = len(events)
-                logger.info(f"{src_name} 完成: {len(events)} 個事件")
-            except Exception as e:
-                logger.error(f"抓取 {src_name} 失敗: {e}", exc_info=True)
-                source_stats[src_name] = 0
+            # 處理 selector_tuple，可能是 tuple 或單一字串
+            if isinstance(selector_tuple, tuple):
+                css_card, css_title = selector_tuple
+            else:
+                css_card = selector_tuple
+                css_title = "a"
+
+            yield from _stream_source(
+                src_name,
+                src_name,
+                source_stats,
+                fetch_generic_list_site,
+                src_name,
+                sources[src_name],
+                css_card,
+                css_title,
+                manifest=manifest,
+                delay=any(source_stats.values()),  # 不是第一個來源時在請求之間增加延遲
+            )
         else:
             logger.info(f"{src_name} 未在配置中")
 
@@ -657,7 +940,7 @@ def run():
     for src_name, count in sorted(source_stats.items()):
         status = "✓" if count > 0 else "✗"
         logger.info(f"  {status} {src_name}: {count} 個事件")
-    logger.info(f"總計: {len(all_events)} 個事件")
+    logger.info(f"總計: {sum(source_stats.values())} 個事件")
 
     # 檢查是否有來源沒有資料（只檢查啟用的來源）
     enabled_sources = {name: cfg for name, cfg in sources.items() if cfg.get("enabled", True)}
@@ -667,17 +950,46 @@ def run():
         logger.warning("可能原因: CSS selector 不正確、網頁結構改變、或網站有反爬蟲機制")
 
     logger.info("=" * 60)
+    save_api_cache()
+
 
-    # 寫出統一 events JSON
-    output_file = OUTPUT_DIR / "events_sources.json"
+def open_events_writer() -> streaming.RecordWriter:
+    """逐筆寫出 events_sources.json（與 NDJSON 版本），commit() 後才取代上一次的輸出"""
+    return streaming.RecordWriter(OUTPUT_DIR / "events_sources.json")
+
+
+def write_events(events: Iterable[Dict]):
+    """逐筆寫出統一 events JSON（不需要先收集成 list）"""
     try:
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(all_events, f, ensure_ascii=False, indent=2)
-        logger.info(f"成功寫入 {len(all_events)} 個事件到 {output_file}")
+        with open_events_writer() as writer:
+            for event in events:
+                writer.write(event)
+        logger.info(f"成功寫入 {writer.count} 個事件到 {writer.path}")
     except Exception as e:
         logger.error(f"寫入 events_sources.json 失敗: {e}")
 
 
+def run(profile: bool = False, trace: bool = False):
+    """主執行函式"""
+    logger.info("=" * 60)
+    logger.info("開始收集空投情報...")
+    logger.info("=" * 60)
+
+    with tracing.session("fetch_sources", trace), profiling.profile_stage("fetch_sources", profile):
+        # 抓取在背景執行緒進行，寫檔同時進行；佇列滿時抓取端等待
+        write_events(streaming.produce(collect_events(load_sources()), name="fetch", metrics_section="stream_events"))
+        write_token_markets(fetch_token_markets(load_tokens()))
+    metrics.write()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="從列表來源收集空投事件")
+    profiling.add_argument(parser)
+    tracing.add_argument(parser)
+    args = parser.parse_args()
+    run(args.profile, args.trace)
+
+
 if __name__ == "__main__":
-    run()
+    main()
 
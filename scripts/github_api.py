@@ -0,0 +1,310 @@
+"""
+GitHub REST API 客戶端與 Issue 寫入器
+直接以 requests 呼叫 REST API（不經 PyGithub），在所有工作執行緒間共用速率限制狀態：
+
+- 主要限制：讀取 `X-RateLimit-Remaining` / `X-RateLimit-Reset`，額度用盡時暫停到重置時間
+- 次要限制：403 / 429 帶 `Retry-After`（或訊息提到 secondary rate limit）時全部執行緒一起暫停後重試
+- 寫入請求（POST / PATCH）之間保持最小間隔，GitHub 建議大量寫入時每秒不超過一個
+
+API 位址預設讀取 `GITHUB_API_URL`（GitHub Actions 會自動設定），可指向本機替身測試。
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+import metrics
+import tracing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = "https://api.github.com"
+MAX_RETRIES = 5
+# 沒有 Retry-After 的次要限制回應，依 GitHub 文件至少等待一分鐘
+SECONDARY_LIMIT_WAIT = 60.0
+# 主要額度剩餘不多時預留給其他步驟（例如 workflow 中的其他 API 呼叫）
+RATE_LIMIT_RESERVE = 10
+WRITE_INTERVAL = 1.0  # 秒
+DEFAULT_WORKERS = 4
+
+# 預先建立的標籤顏色；未列出的標籤使用 DEFAULT_LABEL_COLOR
+LABEL_COLORS = {
+    "airdrop": "0e8a16",
+    "launchpool": "1d76db",
+    "wallet-profile": "5319e7",
+    "eligibility": "fbca04",
+}
+DEFAULT_LABEL_COLOR = "ededed"
+
+
+class GitHubAPIError(Exception):
+    """GitHub API 請求失敗"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class RateLimiter:
+    """執行緒間共用的 GitHub 速率限制狀態"""
+
+    def __init__(self, write_interval: float = WRITE_INTERVAL, reserve: int = RATE_LIMIT_RESERVE):
+        self.write_interval = write_interval
+        self.reserve = reserve
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.throttled = 0
+        self.waited = 0.0
+        self._paused_until = 0.0
+        self._next_write = 0.0
+        self._lock = threading.Lock()
+
+    def _sleep(self, seconds: float):
+        if seconds > 0:
+            with self._lock:
+                self.waited += seconds
+            time.sleep(seconds)
+
+    def before_request(self, write: bool):
+        """等待暫停結束；寫入請求另外依 write_interval 排隊"""
+        with self._lock:
+            now = time.time()
+            wait = self._paused_until - now
+            if write and self.write_interval > 0:
+                slot = max(self._next_write, now + max(wait, 0.0))
+                self._next_write = slot + self.write_interval
+                wait = slot - now
+        self._sleep(wait)
+
+    def update(self, headers):
+        """依回應的 X-RateLimit-* 更新剩餘額度；低於保留量時暫停到重置時間"""
+        remaining, reset = headers.get("X-RateLimit-Remaining"), headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        with self._lock:
+            self.remaining, self.reset_at = int(remaining), float(reset)
+            if self.remaining <= self.reserve:
+                self._pause(self.reset_at - time.time(), "主要額度即將用盡")
+
+    def throttle(self, seconds: float, reason: str):
+        """收到限制回應：所有執行緒暫停 seconds 秒"""
+        with self._lock:
+            self.throttled += 1
+            self._pause(seconds, reason)
+
+    def _pause(self, seconds: float, reason: str):
+        until = time.time() + max(seconds, 0.0)
+        if until > self._paused_until:
+            self._paused_until = until
+            logger.warning(f"GitHub API {reason}，暫停 {seconds:.1f} 秒")
+
+
+class GitHubClient:
+    """單一 repository 的 GitHub REST API 客戶端（執行緒安全，可由多個寫入執行緒共用）"""
+
+    def __init__(self, token: str, repo: str, api_url: Optional[str] = None,
+                 limiter: Optional[RateLimiter] = None, session=None):
+        import requests
+
+        self.repo = repo
+        self.api_url = (api_url or os.environ.get("GITHUB_API_URL") or DEFAULT_API_URL).rstrip("/")
+        self.limiter = limiter or RateLimiter()
+        self.session = session or requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+        })
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _retry_delay(self, resp, attempt: int) -> Optional[float]:
+        """限制類回應的等待秒數；不是速率限制時回傳 None"""
+        if resp.status_code not in (403, 429):
+            return None
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after is not None:
+            return float(retry_after)
+        if resp.headers.get("X-RateLimit-Remaining") == "0":
+            return float(resp.headers.get("X-RateLimit-Reset", time.time())) - time.time()
+        if "secondary rate limit" in resp.text.lower():
+            return SECONDARY_LIMIT_WAIT * (attempt + 1)
+        return None
+
+    def request(self, method: str, path: str, **kwargs):
+        """
+        發出請求，遇到速率限制時等待後重試
+
+        Returns:
+            requests.Response（2xx）
+
+        Raises:
+            GitHubAPIError: 非限制類的錯誤回應或重試次數用盡
+        """
+        import requests
+
+        url = path if path.startswith("http") else f"{self.api_url}{path}"
+        method = method.upper()
+        write = method != "GET"
+        # POST 不是冪等的：連線錯誤或 5xx 時 issue 可能已建立，不重試以免重複（下次同步索引時會找到）
+        idempotent = method != "POST"
+        with tracing.span("github.request", method=method, path=path) as span:
+            for attempt in range(MAX_RETRIES):
+                self.limiter.before_request(write)
+                with self._lock:
+                    self.requests += 1
+                try:
+                    resp = self.session.request(method, url, timeout=30, **kwargs)
+                except requests.exceptions.RequestException as e:
+                    if not idempotent:
+                        raise GitHubAPIError(f"{method} {path} 失敗: {e}")
+                    logger.warning(f"GitHub API 請求失敗 (嘗試 {attempt + 1}/{MAX_RETRIES}): {method} {path} - {e}")
+                    time.sleep(2 * (attempt + 1))
+                    continue
+                self.limiter.update(resp.headers)
+                span.update(status=resp.status_code, retries=attempt)
+
+                delay = self._retry_delay(resp, attempt)
+                if delay is not None:
+                    self.limiter.throttle(delay, f"速率限制 ({resp.status_code})")
+                    continue
+                if resp.status_code >= 500 and idempotent:
+                    logger.warning(f"GitHub API 伺服器錯誤 {resp.status_code} (嘗試 {attempt + 1}/{MAX_RETRIES})")
+                    time.sleep(2 * (attempt + 1))
+                    continue
+                if resp.status_code >= 400:
+                    raise GitHubAPIError(f"{method} {path} 失敗 ({resp.status_code}): {resp.text[:200]}", resp.status_code)
+                return resp
+            raise GitHubAPIError(f"{method} {path} 重試次數用盡")
+
+    def paginate(self, path: str, params: Optional[Dict] = None) -> Iterator[Dict]:
+        """依 Link header 逐頁產生項目"""
+        resp = self.request("GET", path, params={"per_page": 100, **(params or {})})
+        while True:
+            yield from resp.json()
+            next_url = resp.links.get("next", {}).get("url")
+            if not next_url:
+                return
+            resp = self.request("GET", next_url)
+
+    def iter_issues(self, since: Optional[str] = None) -> Iterator[Dict]:
+        """依 updated 遞增產生 issue（含已關閉，不含 pull request）"""
+        params = {"state": "all", "sort": "updated", "direction": "asc"}
+        if since:
+            params["since"] = since
+        for issue in self.paginate(f"/repos/{self.repo}/issues", params):
+            if "pull_request" not in issue:
+                yield issue
+
+    def list_labels(self) -> List[str]:
+        return [label["name"] for label in self.paginate(f"/repos/{self.repo}/labels")]
+
+    def create_label(self, name: str, color: str = DEFAULT_LABEL_COLOR):
+        """建立標籤；已存在（422 already_exists）視為成功"""
+        try:
+            self.request("POST", f"/repos/{self.repo}/labels", json={"name": name, "color": color})
+        except GitHubAPIError as e:
+            if e.status != 422:
+                raise
+
+    def create_issue(self, title: str, body: str, labels: List[str]) -> Dict:
+        return self.request("POST", f"/repos/{self.repo}/issues",
+                            json={"title": title, "body": body, "labels": labels}).json()
+
+    def update_issue(self, number: int, **fields) -> Dict:
+        return self.request("PATCH", f"/repos/{self.repo}/issues/{number}", json=fields).json()
+
+    def add_labels(self, number: int, labels: List[str]) -> List[Dict]:
+        """在 issue 既有的標籤上加上 labels（不取代手動加上的標籤）"""
+        return self.request("POST", f"/repos/{self.repo}/issues/{number}/labels", json={"labels": labels}).json()
+
+
+def ensure_labels(client: GitHubClient, needed: Iterable[str], known: Set[str]) -> Set[str]:
+    """
+    確保 needed 中的標籤都存在
+
+    known 為快取的已存在標籤（來自 issue 索引）；只有出現未知標籤時才列出 repository 的標籤並建立缺少的，
+    因此建立 issue 時不會因標籤不存在而失敗。回傳更新後的已知標籤。
+    """
+    missing = set(needed) - known
+    if not missing:
+        return known
+    known = known | set(client.list_labels())
+    for name in sorted(missing - known):
+        client.create_label(name, LABEL_COLORS.get(name, DEFAULT_LABEL_COLOR))
+        logger.info(f"建立標籤: {name}")
+        known.add(name)
+    return known
+
+
+class IssueWriter:
+    """
+    以有界佇列與固定數量的工作執行緒執行 issue 寫入
+
+    submit 在佇列滿時阻塞（背壓），避免一次累積大量待寫入的請求；
+    每個工作完成後以 on_done(job, result) 回報（在工作執行緒中呼叫，呼叫端需自行加鎖）。
+    """
+
+    _STOP = object()
+
+    def __init__(self, client: GitHubClient, on_done: Callable[[Dict, Dict], None],
+                 workers: int = DEFAULT_WORKERS, queue_size: Optional[int] = None):
+        self.client = client
+        self.on_done = on_done
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size or workers * 2)
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=tracing.propagate(self._work), name=f"issue-writer-{i}", daemon=True)
+                         for i in range(max(workers, 1))]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, job: Dict):
+        """
+        job：{"action": "create" | "update", "number", "title", "body", "labels", "reopen"}
+
+        update 只改 title / body，labels 以新增方式加上，reopen 為 True 時才重新開啟。
+        """
+        self.queue.put(job)
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is self._STOP:
+                    return
+                with tracing.span("issue", action=job["action"], number=job.get("number")):
+                    if job["action"] == "create":
+                        result = self.client.create_issue(job["title"], job["body"], job["labels"])
+                    else:
+                        if job["labels"]:
+                            self.client.add_labels(job["number"], job["labels"])
+                        fields = {"title": job["title"], "body": job["body"]}
+                        if job.get("reopen"):
+                            fields["state"] = "open"
+                        result = self.client.update_issue(job["number"], **fields)
+                self.on_done(job, result)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                logger.error(f"{'建立' if job['action'] == 'create' else '更新'} Issue 失敗: {job['title']} - {e}")
+            finally:
+                self.queue.task_done()
+
+    def close(self):
+        """等待所有工作完成並結束執行緒"""
+        for _ in self._threads:
+            self.queue.put(self._STOP)
+        for t in self._threads:
+            t.join()
+
+
+def record_rate_metrics(client: GitHubClient):
+    limiter = client.limiter
+    metrics.incr("github_issues", "api_requests", client.requests)
+    metrics.incr("github_issues", "throttled", limiter.throttled)
+    metrics.incr("github_issues", "rate_wait_seconds", round(limiter.waited, 3))
+    if limiter.remaining is not None:
+        metrics.set_value("github_issues", "rate_limit_remaining", limiter.remaining)
@@ -0,0 +1,170 @@
+"""
+GitHub Issue 索引
+在 output/cache/github_issue_index.json 保存 alert 指紋 → issue 的對應（含已關閉的 issue），
+每次執行只以 `since`（updated 時間）增量同步有變動的 issue，不再逐頁掃描所有 open issue。
+
+每個由 pipeline 建立的 issue body 結尾帶有隱藏標記：
+
+    <!-- airdrop-intel:fp=<指紋>;v=<內容雜湊>;s=<狀態雜湊> -->
+
+指紋由 alert 的識別欄位決定（與標題無關），內容雜湊用來判斷 alert 內容是否有變化（需要更新 body）；
+狀態雜湊只涵蓋 REOPEN_FIELDS，用來判斷已關閉的 issue 是否需要重新開啟（tx_count、notes 等變動不會重新開啟）。
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+INDEX_FILE = ROOT / "output" / "cache" / "github_issue_index.json"
+
+INDEX_VERSION = 1
+MARKER_RE = re.compile(r"<!-- airdrop-intel:fp=([0-9a-f]+);v=([0-9a-f]+)(?:;s=([0-9a-f]+))? -->")
+# 增量同步時往前多取的時間，避免與 GitHub 伺服器時間的些微落差漏掉更新
+SYNC_OVERLAP = timedelta(minutes=5)
+
+# 決定「同一個 alert」的欄位；內容（notes、status、連結等）變動不影響指紋
+IDENTITY_FIELDS = ("type", "token", "project", "source", "exchange", "pair", "wallet_name", "wallet_chain")
+# 實質狀態：這些欄位變動時才重新開啟已被關閉的 issue
+REOPEN_FIELDS = ("status", "priority")
+
+
+def alert_fingerprint(alert: Dict) -> str:
+    identity = {k: str(alert.get(k) or "").strip().lower() for k in IDENTITY_FIELDS}
+    raw = json.dumps(identity, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def content_hash(title: str, body: str, labels: Iterable[str]) -> str:
+    raw = json.dumps({"title": title, "body": body, "labels": sorted(labels)}, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def status_hash(alert: Dict) -> str:
+    raw = json.dumps({k: str(alert.get(k) or "").strip().lower() for k in REOPEN_FIELDS}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def make_marker(fingerprint: str, version: str, status: str) -> str:
+    return f"<!-- airdrop-intel:fp={fingerprint};v={version};s={status} -->"
+
+
+def parse_marker(body: Optional[str]):
+    """從 issue body 取出 (指紋, 內容雜湊, 狀態雜湊)；沒有標記時回傳 None，舊標記沒有狀態雜湊"""
+    match = MARKER_RE.search(body or "")
+    return (match.group(1), match.group(2), match.group(3)) if match else None
+
+
+class IssueIndex:
+    """
+    指紋 → issue 的本機索引
+
+    issues：指紋 → {"number", "state", "title", "version", "status", "labels", "updated_at"}
+    legacy_titles：沒有標記的舊 issue（標題 → {"number", "state"}），第一次更新時補上標記
+    """
+
+    def __init__(self, repo: str, path: Path = INDEX_FILE):
+        self.repo = repo
+        self.path = path
+        self.issues: Dict[str, Dict] = {}
+        self.legacy_titles: Dict[str, Dict] = {}
+        # 已確認存在的標籤，避免每次執行都列出 / 建立標籤
+        self.labels: Set[str] = set()
+        self.synced_at: Optional[str] = None
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"讀取 issue 索引失敗，將重新完整同步: {e}")
+            return
+        if data.get("version") != INDEX_VERSION or data.get("repo") != self.repo:
+            logger.info("issue 索引版本或 repository 不同，將重新完整同步")
+            return
+        self.issues = data.get("issues") or {}
+        self.legacy_titles = data.get("legacy_titles") or {}
+        self.labels = set(data.get("labels") or [])
+        self.synced_at = data.get("synced_at")
+
+    def save(self):
+        """原子寫入索引檔"""
+        data = {
+            "version": INDEX_VERSION,
+            "repo": self.repo,
+            "synced_at": self.synced_at,
+            "issues": self.issues,
+            "legacy_titles": self.legacy_titles,
+            "labels": sorted(self.labels),
+        }
+        try:
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"寫入 issue 索引失敗（下次執行將重新同步）: {e}")
+
+    def since(self) -> Optional[datetime]:
+        """增量同步的起點；尚未同步過時回傳 None（完整同步）"""
+        if not self.synced_at:
+            return None
+        return datetime.fromisoformat(self.synced_at.replace("Z", "+00:00")) - SYNC_OVERLAP
+
+    def record(self, number: int, title: str, state: str, body: Optional[str], updated_at: Optional[str] = None,
+               labels: Optional[List[str]] = None):
+        """記錄一個 issue 的最新狀態（同步或建立 / 更新後呼叫）；labels 為 issue 目前的全部標籤（含手動加上的）"""
+        marker = parse_marker(body)
+        if marker is None:
+            self.legacy_titles[title] = {"number": number, "state": state}
+            return
+        fingerprint, version, status = marker
+        self.issues[fingerprint] = {
+            "number": number,
+            "state": state,
+            "title": title,
+            "version": version,
+            "status": status,
+            "labels": labels,
+            "updated_at": updated_at,
+        }
+        if self.legacy_titles.get(title, {}).get("number") == number:
+            del self.legacy_titles[title]
+
+    def sync(self, issues: Iterable[Dict]) -> int:
+        """
+        併入自上次同步後有變動的 issue
+
+        issues 為 {"number", "title", "state", "body", "labels", "updated_at"}（ISO 8601 字串）；回傳處理的數量。
+        """
+        count = 0
+        latest = self.synced_at
+        for issue in issues:
+            self.record(issue["number"], issue["title"], issue["state"], issue.get("body"), issue.get("updated_at"),
+                        issue.get("labels"))
+            if issue.get("updated_at") and (latest is None or issue["updated_at"] > latest):
+                latest = issue["updated_at"]
+            count += 1
+        # 以 GitHub 回傳的 updated_at 作為下次起點，不依賴本機時鐘
+        self.synced_at = latest or datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return count
+
+    def lookup(self, fingerprint: str, title: str) -> Optional[Dict]:
+        """以指紋查找 issue；找不到時退回比對沒有標記的舊 issue 標題"""
+        entry = self.issues.get(fingerprint)
+        if entry is not None:
+            return entry
+        legacy = self.legacy_titles.get(title)
+        if legacy is not None:
+            return {**legacy, "title": title, "version": None, "status": None, "labels": None}
+        return None
@@ -0,0 +1,82 @@
+"""
+RFC 6902 JSON Patch（只產生 add / remove / replace）
+diff 比對兩份 JSON：物件逐鍵遞迴、等長陣列逐項遞迴，其餘（型別不同、長度不同的陣列、純量）整個 replace。
+apply 套用 patch，供驗證 patch feed 使用；網站端的套用在 website/lib/bundle.ts。
+"""
+import copy
+from typing import Any, Dict, List
+
+
+def escape(token: str) -> str:
+    """JSON Pointer 的 reference token（~ → ~0、/ → ~1）"""
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def same(a: Any, b: Any) -> bool:
+    """依 JSON 值比較（型別也需相同）：Python 的 1 == True、1 == 1.0，序列化後卻是不同的 JSON"""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same(v, b[k]) for k, v in a.items())
+    if isinstance(a, list):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def diff(old: Any, new: Any, path: str = "") -> List[Dict]:
+    """把 old 變成 new 的操作列表（相同時為空）"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = [{"op": "remove", "path": f"{path}/{escape(key)}"} for key in old if key not in new]
+        for key, value in new.items():
+            child = f"{path}/{escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            elif not same(old[key], value):
+                ops.extend(diff(old[key], value, child))
+        return ops
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        ops = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            if not same(a, b):
+                ops.extend(diff(a, b, f"{path}/{i}"))
+        return ops
+    if same(old, new):
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def apply(doc: Any, ops: List[Dict]) -> Any:
+    """套用 add / remove / replace（不修改傳入的 doc），路徑不存在時拋出 KeyError / IndexError"""
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        tokens = [unescape(t) for t in op["path"].split("/")[1:]]
+        if not tokens:
+            if op["op"] == "remove":
+                doc = None
+            else:
+                doc = copy.deepcopy(op["value"])
+            continue
+        parent = doc
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            if op["op"] == "add":
+                parent.insert(len(parent) if last == "-" else int(last), copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del parent[int(last)]
+            else:
+                parent[int(last)] = copy.deepcopy(op["value"])
+        elif op["op"] == "remove":
+            del parent[last]
+        elif op["op"] == "replace":
+            if last not in parent:
+                raise KeyError(op["path"])
+            parent[last] = copy.deepcopy(op["value"])
+        else:
+            parent[last] = copy.deepcopy(op["value"])
+    return doc
@@ -0,0 +1,62 @@
+"""
+Pipeline 指標收集
+各階段以 incr / set_value 記錄計數與耗時，執行結束時寫出 output/metrics.json
+"""
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+OUTPUT_DIR = ROOT / "output"
+METRICS_FILE = OUTPUT_DIR / "metrics.json"
+
+_lock = threading.Lock()
+_data: Dict[str, Dict[str, float]] = {}
+
+
+def incr(section: str, key: str, amount: float = 1):
+    """累加計數"""
+    with _lock:
+        bucket = _data.setdefault(section, {})
+        bucket[key] = bucket.get(key, 0) + amount
+
+
+def set_value(section: str, key: str, value):
+    """設定單一指標值"""
+    with _lock:
+        _data.setdefault(section, {})[key] = value
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    """取得目前所有指標的副本"""
+    with _lock:
+        return {section: dict(values) for section, values in _data.items()}
+
+
+def write(path: Optional[Path] = None):
+    """
+    寫出指標檔
+
+    以 section 為單位合併既有檔案內容，讓個別腳本分別執行時不會互相覆蓋。
+    """
+    path = path or METRICS_FILE
+    merged: Dict[str, Dict] = {}
+    if path.exists():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                merged = json.load(f)
+        except Exception as e:
+            logger.warning(f"讀取既有 metrics.json 失敗，將覆寫: {e}")
+            merged = {}
+
+    merged.update(snapshot())
+    try:
+        path.parent.mkdir(exist_ok=True, parents=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(merged, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        logger.error(f"寫入 metrics.json 失敗: {e}")
@@ -0,0 +1,151 @@
+"""
+通知帳本
+以「alert 指紋 × 頻道」記錄已送出的 alert 與其內容版本（output/cache/notification_ledger.json），
+每次執行只送出新出現或內容有實質變化的 alert：
+
+- config/notifications.yml 的 immediate_priorities 內的 alert 立即發送
+- 其餘累積到摘要佇列，距離上次摘要超過 digest.interval_hours 時合併成一批訊息
+
+alert 指紋沿用 GitHub issue 索引（scripts/issue_index.py）的定義，兩個通知器對「同一個 alert」的判斷一致。
+"""
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from issue_index import alert_fingerprint
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+LEDGER_FILE = ROOT / "output" / "cache" / "notification_ledger.json"
+
+LEDGER_VERSION = 1
+# 視為實質變化的欄位；notes 含每次都會變的交易數等細節，不列入
+MATERIAL_FIELDS = ("type", "priority", "status", "exchange", "pair")
+# 超過此時間沒有再出現的 alert 從帳本移除（之後再出現會視為新 alert）
+FORGET_AFTER = timedelta(days=30)
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+
+def material_version(alert: Dict) -> str:
+    """alert 實質內容的雜湊"""
+    material = {k: alert.get(k) for k in MATERIAL_FIELDS}
+    material["link"] = (alert.get("links") or {}).get("details")
+    material["campaigns"] = sorted(c.get("id") for c in alert.get("eligible_campaigns") or [])
+    raw = json.dumps(material, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
+
+@dataclass
+class DeliveryPlan:
+    """單一頻道本次要送出的內容"""
+    immediate: List[Dict] = field(default_factory=list)
+    digest: List[Dict] = field(default_factory=list)
+    queued: int = 0
+    unchanged: int = 0
+    digest_pending: int = 0
+
+
+class SentLedger:
+    """
+    已送出 alert 的帳本
+
+    channels：頻道 → {"sent": {指紋: {"version", "priority", "sent_at", "last_seen_at"}},
+                       "digest": {"last_sent_at", "pending": {指紋: {"version", "queued_at", "alert"}}}}
+    """
+
+    def __init__(self, path: Path = LEDGER_FILE):
+        self.path = path
+        self.channels: Dict[str, Dict] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"讀取通知帳本失敗，所有 alert 將視為新 alert: {e}")
+            return
+        if data.get("version") == LEDGER_VERSION:
+            self.channels = data.get("channels") or {}
+
+    def save(self):
+        """原子寫入帳本"""
+        try:
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": LEDGER_VERSION, "channels": self.channels}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.error(f"寫入通知帳本失敗: {e}")
+
+    def plan(self, channel: str, alerts: List[Dict], policy: Dict, now: Optional[datetime] = None) -> DeliveryPlan:
+        """
+        決定本次要送出的 alert 並更新帳本（加入 outbox 即視為已送出，重送由 outbox 負責）
+
+        policy 為 notifications.yml 的 discord 區段：immediate_priorities、digest.enabled / interval_hours / max_items。
+        """
+        now = now or datetime.now(timezone.utc)
+        state = self.channels.setdefault(channel, {"sent": {}, "digest": {"last_sent_at": None, "pending": {}}})
+        sent, digest = state["sent"], state["digest"]
+        pending = digest["pending"]
+        immediate_priorities = set(policy.get("immediate_priorities", ["high"]))
+        digest_cfg = policy.get("digest") or {}
+        plan = DeliveryPlan()
+
+        for alert in alerts:
+            fingerprint, version = alert_fingerprint(alert), material_version(alert)
+            entry = sent.get(fingerprint)
+            if entry is not None:
+                entry["last_seen_at"] = _iso(now)
+            if entry is not None and entry["version"] == version:
+                plan.unchanged += 1
+                continue
+            if pending.get(fingerprint, {}).get("version") == version:
+                # 摘要送出時使用最新的 alert 內容（例如更新後的 notes）
+                pending[fingerprint]["alert"] = alert
+                plan.unchanged += 1
+                continue
+
+            if alert.get("priority", "medium") in immediate_priorities:
+                plan.immediate.append(alert)
+                pending.pop(fingerprint, None)
+                sent[fingerprint] = {"version": version, "priority": alert.get("priority"),
+                                     "sent_at": _iso(now), "last_seen_at": _iso(now)}
+            elif digest_cfg.get("enabled", True):
+                pending[fingerprint] = {"version": version, "queued_at": _iso(now), "alert": alert}
+                plan.queued += 1
+
+        last_digest = _parse(digest.get("last_sent_at"))
+        interval = timedelta(hours=digest_cfg.get("interval_hours", 24))
+        if pending and (last_digest is None or now - last_digest >= interval):
+            items = sorted(pending.items(), key=lambda kv: (
+                PRIORITY_ORDER.get(kv[1]["alert"].get("priority", "low"), 2), kv[1]["queued_at"]))
+            for fingerprint, item in items[:digest_cfg.get("max_items", 200)]:
+                plan.digest.append(item["alert"])
+                sent[fingerprint] = {"version": item["version"], "priority": item["alert"].get("priority"),
+                                     "sent_at": _iso(now), "last_seen_at": _iso(now)}
+                del pending[fingerprint]
+            digest["last_sent_at"] = _iso(now)
+        plan.digest_pending = len(pending)
+
+        cutoff = now - FORGET_AFTER
+        for fingerprint in [fp for fp, e in sent.items() if _parse(e["last_seen_at"]) < cutoff]:
+            del sent[fingerprint]
+        return plan
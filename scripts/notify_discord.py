@@ -1,14 +1,23 @@
 """
 Discord Webhook 通知器
-發送高優先級 alerts 到 Discord channel
+依訂閱者（config/subscriptions.yml）的 Discord 目標把 alerts 分到各頻道，以通知帳本（scripts/notification_ledger.py）
+只發送各頻道新出現或有變化的 alerts，並產生每次執行的 mini-report；實際投遞（長度限制、rate-limit bucket、outbox 重送）由 scripts/discord_delivery.py 處理。
+
+用法：
+    python scripts/notify_discord.py            # 發送 output/alerts.json
+    python scripts/notify_discord.py --report   # 發送 output/stats.json 的執行摘要
 """
+import argparse
 import json
 import os
 import logging
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
-import requests
+import metrics
+import profiling
+import tracing
 
 # 設定日誌
 logging.basicConfig(
@@ -19,7 +28,11 @@ logger = logging.getLogger(__name__)
 
 ROOT = Path(__file__).resolve().parents[1]
 OUTPUT_DIR = ROOT / "output"
-WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL")
+DEFAULT_WEBHOOK_ENV = "DISCORD_WEBHOOK_URL"
+WEBHOOK_URL = os.environ.get(DEFAULT_WEBHOOK_ENV)
+# outbox 中的頻道名稱（對應 DISCORD_WEBHOOK_URL）；其他訂閱的頻道名稱為其 webhook 環境變數名稱的小寫
+DEFAULT_CHANNEL = "default"
+REPORT_PREVIEW_CHARS = 300
 
 
 def load_alerts() -> List[Dict]:
@@ -36,77 +49,229 @@ def load_alerts() -> List[Dict]:
         return []
 
 
-def format_discord_message(alerts: List[Dict]) -> str:
-    """格式化 Discord 訊息"""
-    if not alerts:
-        return "**Airdrop / Launchpool Alerts (High Priority)**\n目前沒有高優先級 alerts。"
-
-    lines = ["**Airdrop / Launchpool Alerts (High Priority)**\n"]
-    
-    for i, a in enumerate(alerts, 1):
-        project = a.get("project", "Unknown")
-        alert_type = a.get("type", "Unknown")
-        priority = a.get("priority", "medium").upper()
-        notes = a.get("notes", "N/A")
-        
-        # 截斷過長的 notes
-        if len(notes) > 200:
-            notes = notes[:200] + "..."
-        
-        line = f"**{i}. [{priority}] {project}**\n"
-        line += f"   Type: {alert_type}\n"
-        line += f"   {notes}\n"
-        
-        if a.get("links", {}).get("details"):
-            line += f"   🔗 {a.get('links', {}).get('details')}\n"
-        
-        lines.append(line)
-    
-    return "\n".join(lines)
-
-
-def send_discord_webhook(webhook_url: str, content: str) -> bool:
-    """發送 Discord Webhook"""
-    try:
-        payload = {"content": content}
-        resp = requests.post(webhook_url, json=payload, timeout=10)
-        resp.raise_for_status()
-        return True
-    except requests.exceptions.RequestException as e:
-        logger.error(f"發送 Discord Webhook 失敗: {e}")
-        return False
+def format_alert_header(alerts: List[Dict]) -> str:
+    """第一則訊息的 content：alerts 數量摘要"""
+    high = sum(1 for a in alerts if a.get("priority") == "high")
+    return f"**Airdrop / Launchpool Alerts** — {len(alerts)} alerts (High: {high})"
 
 
-def run():
-    """主執行函式"""
-    if not WEBHOOK_URL:
-        logger.info("未設定 DISCORD_WEBHOOK_URL，跳過 Discord 通知")
+def channel_name(webhook_env: str) -> str:
+    """webhook 環境變數 → outbox 頻道名稱"""
+    return DEFAULT_CHANNEL if webhook_env == DEFAULT_WEBHOOK_ENV else webhook_env.lower()
+
+
+def route_alerts(alerts: List[Dict], subscriptions: List[Dict]) -> Tuple[Dict[str, List[Dict]], Dict[str, str]]:
+    """
+    依 alert 的訂閱者分頻道，回傳 (頻道 → alerts, 頻道 → webhook URL)
+
+    同一頻道的多個訂閱者只收到一次；沒有 subscribers 欄位的 alert（舊版 alerts.json）送到預設頻道。
+    未設定 webhook 環境變數的頻道不列入。
+    """
+    channel_of = {s["id"]: channel_name(s["discord"]) for s in subscriptions if s.get("discord")}
+    webhooks = {channel_name(s["discord"]): os.environ.get(s["discord"]) for s in subscriptions if s.get("discord")}
+    webhooks = {channel: url for channel, url in webhooks.items() if url}
+    routed: Dict[str, List[Dict]] = {}
+    for alert in alerts:
+        if "subscribers" in alert:
+            channels = {channel_of[sid] for sid in alert["subscribers"] if sid in channel_of}
+        else:
+            channels = {DEFAULT_CHANNEL}
+        for channel in sorted(channels & webhooks.keys()):
+            routed.setdefault(channel, []).append(alert)
+    return routed, webhooks
+
+
+def deliver(payloads: Dict[str, List[Dict]], webhooks: Optional[Dict[str, str]] = None,
+            metrics_section: str = "discord") -> Optional[Dict]:
+    """
+    把各頻道的 payloads 加入 outbox 並投遞（含先前未送達的訊息）
+
+    webhooks 為頻道 → URL，預設只有 DISCORD_WEBHOOK_URL；沒有 URL 的頻道訊息留在 outbox。
+    """
+    from discord_delivery import DiscordDelivery, Outbox
+
+    outbox = Outbox()
+    added = sum(outbox.add(channel, items) for channel, items in payloads.items())
+    if not outbox.messages:
+        return None
+    logger.info(f"Discord outbox: 新增 {added} 則訊息，共 {len(outbox.messages)} 則待投遞")
+    webhooks = webhooks if webhooks is not None else {DEFAULT_CHANNEL: WEBHOOK_URL}
+    result = DiscordDelivery(webhooks, outbox, metrics_section=metrics_section).deliver()
+    logger.info(f"Discord 投遞完成: 送出 {result['sent']} 則（{result['embeds']} 個 embed），"
+                f"失敗 {result['failed']} 則，剩餘 {result['pending']} 則")
+    return result
+
+
+def load_policy() -> Dict:
+    """通知策略（config/notifications.yml 的 discord 區段）"""
+    import config_store
+
+    return config_store.load_config()["notifications"]["discord"]
+
+
+def load_subscriptions() -> List[Dict]:
+    import config_store
+
+    return config_store.load_config()["subscriptions"]
+
+
+def notify(alerts: List[Dict], policy: Optional[Dict] = None, subscriptions: Optional[List[Dict]] = None):
+    """
+    依訂閱者把 alerts 發送到各自的 Discord 頻道
+
+    每個頻道各自以通知帳本只送新出現或內容有實質變化的 alert：immediate_priorities 的 alert 立即以 embed 發送，
+    其餘累積到定期摘要（digest）合併發送。
+    """
+    routed, webhooks = route_alerts(alerts, subscriptions if subscriptions is not None else load_subscriptions())
+    if not webhooks:
+        logger.info("訂閱的 Discord webhook 環境變數都未設定，跳過 Discord 通知")
         return
 
-    alerts = load_alerts()
-    if not alerts:
-        logger.info("沒有 alerts 需要發送")
+    from discord_delivery import alert_payloads, digest_payloads
+    from notification_ledger import SentLedger
+
+    policy = policy or load_policy()
+    ledger = SentLedger()
+    payloads: Dict[str, List[Dict]] = {}
+    digest_pending = 0
+    for channel in sorted(webhooks):
+        channel_alerts = routed.get(channel, [])
+        plan = ledger.plan(channel, channel_alerts, policy)
+        items = []
+        if plan.immediate:
+            items += alert_payloads(plan.immediate, format_alert_header(plan.immediate))
+        if plan.digest:
+            items += digest_payloads(plan.digest, f"**Airdrop Intel Digest** — {len(plan.digest)} alerts")
+        payloads[channel] = items
+        logger.info(f"[{channel}] {len(channel_alerts)} 個 alerts：立即發送 {len(plan.immediate)} 個，"
+                    f"摘要發送 {len(plan.digest)} 個，加入摘要佇列 {plan.queued} 個，未變化 {plan.unchanged} 個"
+                    f"（{len(items)} 則訊息）")
+
+        metrics.incr("discord", "alerts_immediate", len(plan.immediate))
+        metrics.incr("discord", "alerts_digested", len(plan.digest))
+        metrics.incr("discord", "alerts_unchanged", plan.unchanged)
+        digest_pending += plan.digest_pending
+    metrics.set_value("discord", "channels", len(webhooks))
+    metrics.set_value("discord", "digest_pending", digest_pending)
+
+    deliver(payloads, webhooks)
+    ledger.save()
+
+
+def _code(value) -> str:
+    return f"`{value}`"
+
+
+def _names(items: List[str]) -> str:
+    return ", ".join(items) if items else "None"
+
+
+def build_report_payload(stats: Dict, report_preview: str = "", run_url: Optional[str] = None,
+                         pipeline_time: Optional[str] = None) -> Dict:
+    """
+    stats.json → mini-report 訊息（單一 embed，各欄位依 Discord 上限截斷）
+
+    取代 workflow 中以 jq / head -c 組字串的做法。
+    """
+    from discord_delivery import fit_embed
+
+    events, wallets, alerts = stats.get("events", {}), stats.get("wallets", {}), stats.get("alerts", {})
+    by_status, by_priority = events.get("by_status", {}), alerts.get("by_priority", {})
+    pipeline_time = pipeline_time or datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    wallet_lines = [
+        f"• Checked: {_code(wallets.get('total', 0))} | With DeFi Activity: {_code(wallets.get('with_defi_activity', 0))}"
+        f" | Total TX: {_code(wallets.get('total_tx', 0))}"
+    ]
+    wallet_lines += [
+        f"• {w['name']} ({w['chain']}): {w['tx_count']} TX, DeFi: {'Yes' if w['has_defi_activity'] else 'No'}"
+        for w in wallets.get("summary", [])
+    ]
+
+    fields = [
+        {"name": "📊 Events Summary", "value": (
+            f"• **Total Events:** {_code(events.get('total', 0))}\n"
+            f"• Active: {_code(by_status.get('active', 0))} | Upcoming: {_code(by_status.get('upcoming', 0))}"
+            f" | Ended: {_code(by_status.get('ended', 0))} | Potential: {_code(by_status.get('potential', 0))}")},
+        {"name": "🔍 By Source", "value": " | ".join(
+            f"{k}: {_code(v)}" for k, v in events.get("by_source", {}).items()) or "None"},
+        {"name": "💼 Wallets Analyzed", "value": "\n".join(wallet_lines)},
+        {"name": "🚨 Alerts Generated", "value": (
+            f"{_code(alerts.get('total', 0))} (High: {_code(by_priority.get('high', 0))}"
+            f" | Medium: {_code(by_priority.get('medium', 0))} | Low: {_code(by_priority.get('low', 0))})")},
+    ]
+    if alerts.get("top_high"):
+        fields.append({"name": "High Priority Alerts", "value": "\n".join(
+            f"• **{a['project']}**: {a['type']} - {a['notes']}" for a in alerts["top_high"])})
+    fields += [
+        {"name": "🎯 Top Active Airdrops", "value": _names(events.get("top_active", []))},
+        {"name": "🔮 Upcoming Airdrops", "value": _names(events.get("top_upcoming", []))},
+    ]
+    if report_preview:
+        preview = report_preview[:REPORT_PREVIEW_CHARS].replace("```", "`")
+        fields.append({"name": "📄 Report Preview", "value": f"```\n{preview}...\n```"})
+    if run_url:
+        fields.append({"name": "📎 Full Details", "value": f"[GitHub Actions]({run_url})"})
+
+    embed = {
+        "title": "✅ Airdrop Intel Pipeline Report",
+        "description": f"📅 **Execution Time:** {_code(pipeline_time)} UTC",
+        "color": 0x2ECC71,
+        "fields": fields,
+    }
+    if run_url:
+        embed["url"] = run_url
+    return {"embeds": [fit_embed(embed)], "allowed_mentions": {"parse": []}}
+
+
+def actions_run_url() -> Optional[str]:
+    """GitHub Actions 執行頁面（在 workflow 外執行時回傳 None）"""
+    repo = os.environ.get("GITHUB_REPOSITORY")
+    if not repo:
+        return None
+    server = os.environ.get("GITHUB_SERVER_URL", "https://github.com")
+    run_id = os.environ.get("GITHUB_RUN_ID")
+    return f"{server}/{repo}/actions/runs/{run_id}" if run_id else f"{server}/{repo}/actions"
+
+
+def send_report():
+    """發送 mini-report（workflow 在 pipeline 失敗時也會執行）"""
+    if not WEBHOOK_URL:
+        logger.info("未設定 DISCORD_WEBHOOK_URL，跳過 Discord report")
         return
 
-    # 篩選高優先級 alerts（最多 3 筆）
-    high_priority = [a for a in alerts if a.get("priority", "medium") == "high"][:3]
-    
-    if not high_priority:
-        logger.info("沒有高優先級 alerts 需要發送")
+    stats_file = OUTPUT_DIR / "stats.json"
+    if not stats_file.exists():
+        logger.info("stats.json 不存在，跳過 Discord report")
         return
+    with open(stats_file, "r", encoding="utf-8") as f:
+        stats = json.load(f)
+    report_file = OUTPUT_DIR / "latest_report.md"
+    preview = report_file.read_text(encoding="utf-8")[:REPORT_PREVIEW_CHARS] if report_file.exists() else ""
+
+    deliver({DEFAULT_CHANNEL: [build_report_payload(stats, preview, actions_run_url())]},
+            metrics_section="discord_report")
+    metrics.write()
 
-    logger.info(f"準備發送 {len(high_priority)} 個高優先級 alerts 到 Discord")
 
-    # 格式化訊息
-    message = format_discord_message(high_priority)
+def run(profile: bool = False, trace: bool = False):
+    """主執行函式"""
+    with tracing.session("notify_discord", trace), profiling.profile_stage("notify_discord", profile):
+        notify(load_alerts())
+    metrics.write()
 
-    # 發送 Webhook
-    if send_discord_webhook(WEBHOOK_URL, message):
-        logger.info("成功發送 Discord 通知")
+
+def main():
+    parser = argparse.ArgumentParser(description="發送 alerts / 執行摘要到 Discord")
+    parser.add_argument("--report", action="store_true", help="發送 output/stats.json 的 mini-report")
+    profiling.add_argument(parser)
+    tracing.add_argument(parser)
+    args = parser.parse_args()
+    if args.report:
+        send_report()
     else:
-        logger.error("發送 Discord 通知失敗")
+        run(args.profile, args.trace)
 
 
 if __name__ == "__main__":
-    run()
-
+    main()
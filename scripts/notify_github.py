@@ -1,15 +1,21 @@
 """
 GitHub Issues 通知器
-將 alerts 轉換為 GitHub Issues，包含去重邏輯
+將訂閱者（config/subscriptions.yml）開啟 GitHub 目標的 alerts 轉換為 GitHub Issues；以 alert 指紋與本機 issue 索引（scripts/issue_index.py）去重與原地更新，
+透過 scripts/github_api.py 的 REST 客戶端並行寫入並遵守 GitHub 速率限制
 """
+import argparse
 import json
 import os
 import logging
+import threading
+import time
 from pathlib import Path
-from typing import List, Dict, Set
+from typing import List, Dict, Optional
 
-from github import Github
-from github.GithubException import GithubException
+import metrics
+import profiling
+import tracing
+from github_api import DEFAULT_WORKERS
 
 # 設定日誌
 logging.basicConfig(
@@ -36,18 +42,32 @@ def load_alerts() -> List[Dict]:
         return []
 
 
-def get_existing_issues(repo) -> Set[str]:
-    """取得現有 Issues 的標題集合（用於去重）"""
-    existing_titles = set()
-    try:
-        # 只檢查 open 的 issues
-        issues = repo.get_issues(state="open")
-        for issue in issues:
-            existing_titles.add(issue.title)
-        logger.info(f"找到 {len(existing_titles)} 個現有的 open issues")
-    except Exception as e:
-        logger.warning(f"取得現有 issues 失敗: {e}")
-    return existing_titles
+def sync_issue_index(client, index) -> int:
+    """
+    以 `since` 增量同步 issue 索引（含已關閉的 issue）
+
+    第一次執行（沒有索引）時完整掃描一次，之後只取上次同步後有更新的 issue。
+    """
+    since = index.since()
+    issues = (
+        {
+            "number": issue["number"],
+            "title": issue["title"],
+            "state": issue["state"],
+            "body": issue.get("body"),
+            "labels": label_names(issue),
+            "updated_at": issue.get("updated_at"),
+        }
+        for issue in client.iter_issues(since.strftime("%Y-%m-%dT%H:%M:%SZ") if since else None)
+    )
+    count = index.sync(issues)
+    metrics.incr("github_issues", "index_synced", count)
+    logger.info(f"issue 索引同步 {count} 個有變動的 issue（{'增量' if since else '完整'}），共追蹤 {len(index.issues)} 個")
+    return count
+
+
+def label_names(issue: Dict) -> List[str]:
+    return [label["name"] if isinstance(label, dict) else label for label in issue.get("labels") or []]
 
 
 def create_issue_title(alert: Dict) -> str:
@@ -99,89 +119,165 @@ def create_issue_body(alert: Dict) -> str:
     return "\n".join(body_lines)
 
 
-def run():
-    """主執行函式"""
-    alerts = load_alerts()
+def build_issue(alert: Dict):
+    """產生 (指紋, 內容雜湊, 狀態雜湊, 標題, 含標記的 body, labels)"""
+    from issue_index import alert_fingerprint, content_hash, make_marker, status_hash
+
+    title = create_issue_title(alert)
+    body = create_issue_body(alert)
+    labels = alert.get("labels", ["airdrop"])
+    fingerprint = alert_fingerprint(alert)
+    version = content_hash(title, body, labels)
+    status = status_hash(alert)
+    return fingerprint, version, status, title, f"{body}\n\n{make_marker(fingerprint, version, status)}", labels
+
+
+def github_alerts(alerts: List[Dict], subscriptions: List[Dict]) -> List[Dict]:
+    """
+    只保留至少一個訂閱者開啟 GitHub 目標的 alerts，並加上這些訂閱者的 labels
+
+    沒有 subscribers 欄位的 alert（舊版 alerts.json）原樣保留。
+    """
+    targets = {s["id"]: s.get("github_labels", []) for s in subscriptions if s.get("github")}
+    selected = []
+    for alert in alerts:
+        if "subscribers" not in alert:
+            selected.append(alert)
+            continue
+        subscribers = [sid for sid in alert["subscribers"] if sid in targets]
+        if not subscribers:
+            continue
+        extra = [label for sid in subscribers for label in targets[sid]]
+        if extra:
+            labels = list(alert.get("labels", ["airdrop"]))
+            alert = {**alert, "labels": labels + [label for label in dict.fromkeys(extra) if label not in labels]}
+        selected.append(alert)
+    return selected
+
+
+def notify(alerts: List[Dict], workers: int = DEFAULT_WORKERS, client=None, index_path: Optional[Path] = None,
+           subscriptions: Optional[List[Dict]] = None):
+    """
+    將 alerts 同步為 GitHub Issues（只包含訂閱者開啟 GitHub 目標的 alerts）
+
+    以指紋查找既有 issue（含已關閉的）：不存在時建立；內容有變化時原地更新 body，並加上缺少的 labels（保留手動加上的）；
+    已關閉的 issue 只在實質狀態（issue_index.REOPEN_FIELDS）改變時重新開啟，tx_count、notes 等變動不會；內容相同則略過。
+    建立 / 更新由 IssueWriter 以有界佇列並行寫入，所有執行緒共用速率限制狀態。
+    """
+    if subscriptions is None and any("subscribers" in a for a in alerts):
+        import config_store
+        subscriptions = config_store.load_config()["subscriptions"]
+    if subscriptions is not None:
+        alerts = github_alerts(alerts, subscriptions)
     if not alerts:
         logger.info("沒有 alerts 需要建立 issues")
         return
 
-    token = os.environ.get("GITHUB_TOKEN")
-    if not token:
-        logger.warning("未設定 GITHUB_TOKEN，跳過 GitHub Issues 建立")
-        return
+    if client is None:
+        token = os.environ.get("GITHUB_TOKEN")
+        if not token:
+            logger.warning("未設定 GITHUB_TOKEN，跳過 GitHub Issues 建立")
+            return
 
-    repo_name = os.environ.get("GITHUB_REPOSITORY")
-    if not repo_name:
-        logger.warning("未設定 GITHUB_REPOSITORY，跳過 GitHub Issues 建立")
-        return
+        repo_name = os.environ.get("GITHUB_REPOSITORY")
+        if not repo_name:
+            logger.warning("未設定 GITHUB_REPOSITORY，跳過 GitHub Issues 建立")
+            return
 
-    try:
-        g = Github(token)
-        repo = g.get_repo(repo_name)
-        logger.info(f"連線到 repository: {repo_name}")
+        from github_api import GitHubClient
+        client = GitHubClient(token, repo_name)
 
-        # 取得現有 issues 標題（用於去重）
-        existing_titles = get_existing_issues(repo)
+    from github_api import GitHubAPIError, IssueWriter, ensure_labels, record_rate_metrics
+    from issue_index import IssueIndex
 
-        created_count = 0
-        skipped_count = 0
+    start = time.perf_counter()
+    try:
+        logger.info(f"連線到 repository: {client.repo}（{client.api_url}）")
+        index = IssueIndex(client.repo, index_path) if index_path else IssueIndex(client.repo)
+        with tracing.span("github.sync") as span:
+            span.set("synced", sync_issue_index(client, index))
 
+        jobs = []
+        skipped_count = 0
         for alert in alerts:
-            title = create_issue_title(alert)
-
-            # 檢查是否已存在
-            if title in existing_titles:
-                logger.info(f"Issue 已存在，跳過: {title}")
+            fingerprint, version, status, title, body, labels = build_issue(alert)
+            existing = index.lookup(fingerprint, title)
+            if existing is not None and existing.get("version") == version:
+                logger.info(f"Issue 已存在且內容未變，跳過: #{existing['number']} {title}")
                 skipped_count += 1
                 continue
-
+            if existing is None:
+                jobs.append({"action": "create", "title": title, "body": body, "labels": labels})
+            else:
+                # 沒有狀態雜湊的舊 issue 無從判斷是否有實質變化，不重新開啟
+                reopen = existing.get("state") == "closed" and existing.get("status") not in (None, status)
+                current = existing.get("labels")
+                missing = labels if current is None else [l for l in labels if l not in current]
+                jobs.append({"action": "update", "number": existing["number"], "title": title, "body": body,
+                             "labels": missing, "reopen": reopen})
+
+        # 預先建立所有需要的標籤，建立 issue 時不會因標籤不存在而失敗
+        if jobs:
+            index.labels = ensure_labels(client, {l for job in jobs for l in job["labels"]}, index.labels)
+
+        counts = {"create": 0, "update": 0}
+        lock = threading.Lock()
+
+        def on_done(job: Dict, issue: Dict):
+            with lock:
+                # 立即更新索引，避免同一次執行中重複建立
+                index.record(issue["number"], job["title"], issue.get("state") or "open", job["body"],
+                             issue.get("updated_at"), label_names(issue))
+                counts[job["action"]] += 1
+            if job["action"] == "create":
+                logger.info(f"成功建立 Issue #{issue['number']}: {job['title']}")
+            else:
+                logger.info(f"更新 Issue #{issue['number']}{'（重新開啟）' if job['reopen'] else ''}: {job['title']}")
+
+        with tracing.span("github.write", jobs=len(jobs), workers=workers):
+            writer = IssueWriter(client, on_done, workers=workers)
+            write_start = time.perf_counter()
             try:
-                body = create_issue_body(alert)
-                labels = alert.get("labels", ["airdrop"])
-
-                # 建立 issue
-                issue = repo.create_issue(
-                    title=title,
-                    body=body,
-                    labels=labels
-                )
-                logger.info(f"成功建立 Issue #{issue.number}: {title}")
-                created_count += 1
-
-                # 加入現有標題集合，避免同一次執行中重複建立
-                existing_titles.add(title)
-
-            except GithubException as e:
-                if e.status == 422:
-                    # 可能是標籤不存在或其他驗證錯誤
-                    logger.warning(f"建立 Issue 失敗 (422): {title} - {e.data}")
-                    # 嘗試不帶標籤建立
-                    try:
-                        body = create_issue_body(alert)
-                        issue = repo.create_issue(
-                            title=title,
-                            body=body
-                        )
-                        logger.info(f"成功建立 Issue #{issue.number} (無標籤): {title}")
-                        created_count += 1
-                        existing_titles.add(title)
-                    except Exception as e2:
-                        logger.error(f"建立 Issue 最終失敗: {title} - {e2}")
-                else:
-                    logger.error(f"建立 Issue 失敗: {title} - {e}")
-
-            except Exception as e:
-                logger.error(f"建立 Issue 時發生未預期錯誤: {title} - {e}")
-
-        logger.info(f"Issue 建立完成: 成功 {created_count} 個, 跳過 {skipped_count} 個")
-
-    except GithubException as e:
+                for job in jobs:
+                    writer.submit(job)
+            finally:
+                writer.close()
+        write_elapsed = time.perf_counter() - write_start
+
+        index.save()
+        written = counts["create"] + counts["update"]
+        metrics.incr("github_issues", "created", counts["create"])
+        metrics.incr("github_issues", "updated", counts["update"])
+        metrics.incr("github_issues", "skipped", skipped_count)
+        metrics.incr("github_issues", "failed", writer.failed)
+        if written:
+            metrics.set_value("github_issues", "writes_per_second", round(written / max(write_elapsed, 1e-9), 2))
+        logger.info(f"Issue 同步完成: 建立 {counts['create']} 個, 更新 {counts['update']} 個, "
+                    f"跳過 {skipped_count} 個, 失敗 {writer.failed} 個")
+
+    except GitHubAPIError as e:
         logger.error(f"GitHub API 錯誤: {e}")
     except Exception as e:
         logger.error(f"執行失敗: {e}")
+    finally:
+        record_rate_metrics(client)
+        metrics.set_value("github_issues", "seconds", round(time.perf_counter() - start, 3))
+
+
+def run(profile: bool = False, trace: bool = False):
+    """主執行函式"""
+    with tracing.session("notify_github", trace), profiling.profile_stage("notify_github", profile):
+        notify(load_alerts())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="將 alerts 同步為 GitHub Issues")
+    profiling.add_argument(parser)
+    tracing.add_argument(parser)
+    args = parser.parse_args()
+    run(args.profile, args.trace)
 
 
 if __name__ == "__main__":
-    run()
+    main()
 
@@ -0,0 +1,283 @@
+"""
+Pipeline 協調器
+在單一行程內以相依圖（DAG）執行所有階段，資料在記憶體中傳遞：
+
+    fetch ──┐                ┌─→ notify_github
+            ├─→ aggregate ───┼─→ notify_discord
+    wallets ┘                └─→ write_artifacts ←── markets
+                                   ├─→ history
+                                   └─→ bundle
+
+fetch、wallets 與 markets（追蹤幣種行情）互不相依、同時執行；兩個通知器也平行執行。
+fetch 階段是串流：抓取在背景執行緒逐筆產生 events，經有界佇列流過寫檔、統計與 listing 規則，
+events 不會整份留在記憶體中；aggregate 階段只需再加入錢包報告。
+JSON 產出檔（供網站使用）在 write_artifacts 階段一次寫出（events 檔於 fetch 階段寫到暫存檔，在此才取代正式檔案）。
+history 階段把本次的 events 與 alerts 記為歷史快照（scripts/event_history.py），
+bundle 階段由產出檔發佈網站用的分頁資料 bundle（scripts/publish_bundle.py）。
+
+每個階段與 fetch 內的每個來源完成後寫 checkpoint 與執行清單（scripts/checkpoints.py）；
+--resume 時只重新執行上一次失敗或缺少的單位，其餘沿用 checkpoint（fetch 重播已完成來源的 events）。
+"""
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import aggregate
+import check_wallets
+import checkpoints
+import event_history
+import fetch_sources
+import metrics
+import notify_discord
+import notify_github
+import profiling
+import publish_bundle
+import streaming
+import tracing
+
+# 設定日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 4
+
+
+class Stage:
+    """
+    DAG 中的一個階段：func 接收相依階段的結果 dict，回傳本階段結果
+
+    checkpoint 為 True 時結果（需可 JSON 序列化）寫到 checkpoint，--resume 且輸入未變時直接沿用；
+    為 False 的階段每次都執行（可自行以 manifest.record 記錄內容雜湊供下游比對）。
+    status 由結果判斷 checkpoint 狀態：自行吞下錯誤的階段（部分查詢失敗）回傳 partial / empty，
+    結果照常交給下游，但 --resume 時重新執行。
+    """
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: List[str] = None,
+                 checkpoint: bool = True, status: Optional[Callable[[Any], str]] = None):
+        self.name = name
+        self.func = func
+        self.deps = deps or []
+        self.checkpoint = checkpoint
+        self.status = status
+
+
+def _run_stage(stage: Stage, inputs: Dict[str, Any], profile: bool = False) -> Any:
+    """執行單一階段並記錄耗時"""
+    logger.info(f"▶ 階段開始: {stage.name}")
+    start = time.perf_counter()
+    try:
+        with tracing.span("stage", stage=stage.name), profiling.profile_stage(stage.name, profile):
+            return stage.func(inputs)
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.set_value("pipeline", f"{stage.name}_seconds", round(elapsed, 3))
+        logger.info(f"■ 階段結束: {stage.name} ({elapsed:.2f}s)")
+
+
+def run_dag(stages: List[Stage], max_workers: int = MAX_WORKERS, profile: bool = False,
+            manifest: Optional[checkpoints.RunManifest] = None) -> Dict[str, Any]:
+    """
+    依相依關係執行所有階段
+
+    相依階段全部完成後立即排入執行緒池；某階段失敗時，其下游階段會被略過。
+    profile 為 True 時剖析每個階段，並改為一次只執行一個階段，讓各階段的統計互不混雜。
+    有 manifest 時每個階段的結果與狀態寫到 checkpoint；輸入（上游的內容雜湊）與上一次相同的已完成階段不再執行。
+
+    Returns:
+        各成功階段的結果，key 為階段名稱
+    """
+    names = {s.name for s in stages}
+    for stage in stages:
+        unknown = [d for d in stage.deps if d not in names]
+        if unknown:
+            raise ValueError(f"階段 {stage.name} 相依未定義的階段: {', '.join(unknown)}")
+
+    pending = {s.name: s for s in stages}
+    stages_by_name = dict(pending)
+    results: Dict[str, Any] = {}
+    failed: Set[str] = set()
+    resumed: Set[str] = set()
+    degraded: Dict[str, str] = {}
+    running = {}
+    inputs_of: Dict[str, Dict[str, Optional[str]]] = {}
+
+    with ThreadPoolExecutor(max_workers=1 if profile else max_workers) as pool:
+        while pending or running:
+            # 沿用 checkpoint 的階段立即完成，可能讓下游也能排入，重複掃描直到沒有變化
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, stage in list(pending.items()):
+                    if any(d in failed for d in stage.deps):
+                        logger.error(f"上游階段失敗，略過: {name}")
+                        failed.add(name)
+                        del pending[name]
+                        progressed = True
+                        if manifest is not None:
+                            manifest.fail(name, "上游階段失敗", status="skipped")
+                    elif all(d in results for d in stage.deps):
+                        del pending[name]
+                        if manifest is not None:
+                            inputs_of[name] = {d: manifest.digest(d) for d in stage.deps}
+                            if stage.checkpoint and manifest.reusable(name, inputs_of[name]):
+                                results[name] = manifest.load(name)
+                                manifest.mark_reused(name)
+                                resumed.add(name)
+                                progressed = True
+                                logger.info(f"↺ 沿用 checkpoint: {name}")
+                                continue
+                        inputs = {d: results[d] for d in stage.deps}
+                        running[pool.submit(tracing.propagate(_run_stage), stage, inputs, profile)] = name
+
+            if not running:
+                if pending:
+                    raise ValueError(f"階段相依形成循環: {', '.join(sorted(pending))}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.error(f"階段 {name} 失敗: {e}", exc_info=True)
+                    failed.add(name)
+                    if manifest is not None:
+                        manifest.fail(name, str(e))
+                    continue
+                stage = stages_by_name[name]
+                if stage.status is not None:
+                    degraded[name] = stage.status(results[name])
+                    if degraded[name] != "ok":
+                        logger.warning(f"階段 {name} 部分失敗（{degraded[name]}），--resume 時會重新執行")
+                if manifest is not None and stage.checkpoint:
+                    manifest.complete(name, results[name], inputs_of.get(name), status=degraded.get(name, "ok"))
+
+    for name in sorted(names):
+        status = "failed" if name in failed else "resumed" if name in resumed else degraded.get(name, "ok")
+        metrics.set_value("pipeline_status", name, status)
+    return results
+
+
+def failure_status(failed: int, total: int) -> str:
+    """checkpoint 狀態：沒有失敗為 ok，全部失敗為 empty，其餘為 partial"""
+    if not failed:
+        return "ok"
+    return "empty" if failed >= total else "partial"
+
+
+def build_stages(merged_wallets: bool = False, manifest: Optional[checkpoints.RunManifest] = None) -> List[Stage]:
+    """
+    建立 pipeline 各階段（設定檔只在此讀取一次）
+
+    merged_wallets 為 True 時不查詢錢包，改用已合併的 wallets_report.json（錢包由分片 job 查詢）。
+    有 manifest 時 fetch 階段每個來源各自寫 checkpoint，並以各來源的雜湊記錄 fetch 的內容雜湊。
+    """
+    sources = fetch_sources.load_sources()
+    wallets = check_wallets.load_wallets()
+    rules = aggregate.load_rules()
+    tokens = aggregate.load_tokens()
+    campaigns = aggregate.load_campaigns()
+    subscriptions = aggregate.load_subscriptions()
+
+    engine = aggregate.RuleEngine(rules, tokens, subscriptions)
+    event_stats = aggregate.EventStats()
+
+    def stream_events(r: Dict[str, Any]) -> streaming.RecordWriter:
+        writer = fetch_sources.open_events_writer()
+        try:
+            events = streaming.produce(fetch_sources.collect_events(sources, manifest), name="fetch",
+                                       metrics_section="stream_events")
+            aggregate.consume_events(events, engine, event_stats, writer)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        if manifest is not None:
+            manifest.record("fetch", checkpoints.combine(manifest.digests("source:")), count=writer.count)
+        return writer
+
+    def apply_wallet_rules(r: Dict[str, Any]) -> List[Dict]:
+        with tracing.span("aggregate", events=engine.events, wallets=len(r["wallets"]), rules=len(rules)) as span:
+            engine.add_wallets(r["wallets"], campaigns)
+            span.update(alerts=len(engine.alerts), deliveries=engine.deliveries)
+        logger.info(f"規則引擎產生 {len(engine.alerts)} 個 alerts（分送 {engine.deliveries} 次）")
+        return engine.alerts
+
+    def market_status(markets: Dict[str, Dict]) -> str:
+        failed = fetch_sources.count_market_failures(tokens, markets)
+        return failure_status(failed, len(markets) + failed)
+
+    def write_artifacts(r: Dict[str, Any]):
+        r["fetch"].commit()
+        logger.info(f"成功寫入 {r['fetch'].count} 個事件到 {r['fetch'].path}")
+        check_wallets.write_wallets_report(r["wallets"])
+        fetch_sources.write_token_markets(r["markets"])
+        aggregate.write_outputs(event_stats, r["wallets"], r["aggregate"], sources, r["markets"])
+
+    return [
+        # fetch 的結果是 events 檔的寫入器，由來源 checkpoint 重播；write_artifacts 每次都寫出正式檔案
+        Stage("fetch", stream_events, checkpoint=False),
+        Stage(
+            "wallets",
+            (lambda r: check_wallets.load_wallets_report()) if merged_wallets
+            else (lambda r: check_wallets.check_wallets(wallets)),
+            status=lambda reports: failure_status(check_wallets.count_failures(reports), len(reports)),
+        ),
+        Stage("markets", lambda r: fetch_sources.fetch_token_markets(tokens), status=market_status),
+        Stage("aggregate", apply_wallet_rules, deps=["fetch", "wallets"]),
+        Stage("notify_github", lambda r: notify_github.notify(r["aggregate"], subscriptions=subscriptions),
+              deps=["aggregate"]),
+        Stage("notify_discord", lambda r: notify_discord.notify(r["aggregate"], subscriptions=subscriptions),
+              deps=["aggregate"]),
+        Stage("write_artifacts", write_artifacts, deps=["fetch", "wallets", "aggregate", "markets"], checkpoint=False),
+        # 以最初那次執行的 id 記錄，--resume 時取代原本的快照而不是重複記錄
+        Stage("history", lambda r: event_history.record_run(streaming.read_records(r["fetch"].path), r["aggregate"],
+                                                            run_id=manifest.data["origin_run_id"] if manifest else None),
+              deps=["fetch", "aggregate", "write_artifacts"], checkpoint=False),
+        Stage("bundle", lambda r: publish_bundle.publish(), deps=["write_artifacts"], checkpoint=False),
+    ]
+
+
+def run(merged_wallets: bool = False, profile: bool = False, trace: bool = False, resume: bool = False) -> bool:
+    """
+    主執行函式，所有階段成功時回傳 True；trace 為 True 時追蹤結果寫到 output/traces/pipeline.trace.json
+
+    resume 為 True 時沿用上一次執行仍有效的 checkpoint，只重新執行失敗或缺少的階段與來源。
+    """
+    logger.info("=" * 60)
+    logger.info(f"Airdrop Intel Pipeline 開始執行{'（--resume）' if resume else ''}")
+    logger.info("=" * 60)
+
+    start = time.perf_counter()
+    manifest = checkpoints.RunManifest(resume)
+    stages = build_stages(merged_wallets, manifest)
+    with tracing.session("pipeline", trace):
+        results = run_dag(stages, profile=profile, manifest=manifest)
+    metrics.set_value("pipeline", "total_seconds", round(time.perf_counter() - start, 3))
+    metrics.set_value("checkpoints", "reused", len(manifest.reused))
+    metrics.set_value("checkpoints", "resumed_from", manifest.data["resumed_from"])
+    metrics.write()
+
+    ok = len(results) == len(stages)
+    manifest.finish(ok)
+    logger.info(f"Pipeline 結束: {len(results)}/{len(stages)} 個階段成功")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="執行 Airdrop Intel Pipeline")
+    parser.add_argument("--merged-wallets", action="store_true",
+                        help="使用分片合併後的 output/wallets_report.json，不在此行程查詢錢包")
+    parser.add_argument("--resume", action="store_true",
+                        help="沿用上一次執行的 checkpoint（output/cache/checkpoints/），只重新執行失敗或缺少的階段與來源")
+    profiling.add_argument(parser)
+    tracing.add_argument(parser)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.merged_wallets, args.profile, args.trace, args.resume) else 1)
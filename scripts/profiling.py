@@ -0,0 +1,210 @@
+"""
+階段效能剖析（--profile）
+以 profile_stage 包住一個階段：cProfile 量測 CPU、tracemalloc 追蹤記憶體配置，
+另有取樣執行緒定期擷取所有執行緒的堆疊，輸出 collapsed stack 供產生火焰圖。
+
+每個階段在 output/profiles/ 產生：
+
+- <stage>.prof：cProfile 原始統計（`python -m pstats` 或 snakeviz 檢視）
+- <stage>.cpu.txt：依累計時間排序的前 TOP_N 個函式
+- <stage>.alloc.txt：階段結束時仍存活的配置，依配置位置排序的前 TOP_N 名，以及階段內的記憶體峰值
+- <stage>.collapsed：牆鐘取樣的 collapsed stack（含等待 I/O 的執行緒），可交給 flamegraph.pl 或 speedscope
+- summary.json：各階段耗時、峰值與 CPU 前幾名的摘要（多個腳本分別執行時依階段合併）
+
+未啟用時 profile_stage 不做任何事；cProfile / tracemalloc 只在啟用時才載入。
+啟用時每次函式呼叫與記憶體配置都有額外成本，純 Python 迴圈可能慢上一個數量級，
+耗時請看各函式之間的比例，不要與未剖析的執行直接比較。
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE_DIR = ROOT / "output" / "profiles"
+
+TOP_N = 30
+SUMMARY_TOP_N = 5
+SAMPLE_INTERVAL = 0.005  # 秒
+TRACE_FRAMES = 10
+# 取樣堆疊的最大深度（過深的遞迴截斷，避免 collapsed 檔過大）
+MAX_STACK_DEPTH = 128
+
+
+def add_argument(parser):
+    """替腳本的 argparse 加上 --profile"""
+    parser.add_argument("--profile", action="store_true",
+                        help="以 cProfile / tracemalloc / 堆疊取樣剖析此階段，結果寫到 output/profiles/")
+
+
+class StackSampler:
+    """
+    背景取樣器：每 interval 秒以 sys._current_frames() 擷取所有執行緒的堆疊
+
+    samples 為 collapsed stack（`執行緒;外層函式;...;內層函式`）→ 次數。
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples: Dict[str, int] = {}
+        self.count = 0
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _sample(self):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            key = ";".join(reversed(stack))
+            self.samples[key] = self.samples.get(key, 0) + 1
+        self.count += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+
+
+def _cpu_top(profiler, limit: int) -> List[Dict]:
+    """cProfile 結果中累計時間最高的函式"""
+    import pstats
+
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{func} ({os.path.basename(filename)}:{line})", "calls": calls,
+                     "tottime": round(tottime, 4), "cumtime": round(cumtime, 4)})
+    rows.sort(key=lambda r: r["cumtime"], reverse=True)
+    return rows[:limit]
+
+
+def _write_alloc(path: Path, snapshot, peak: int, limit: int) -> int:
+    """寫出配置位置前幾名，回傳仍存活的配置總量（bytes）"""
+    import tracemalloc
+
+    # 排除 tracemalloc 與 importlib 本身的配置
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+    stats = snapshot.statistics("traceback")
+    retained = sum(s.size for s in stats)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"peak: {peak / 1024:.1f} KiB, retained: {retained / 1024:.1f} KiB\n\n")
+        for rank, stat in enumerate(stats[:limit], 1):
+            f.write(f"#{rank}: {stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            for line in stat.traceback.format(most_recent_first=True)[:TRACE_FRAMES * 2]:
+                f.write(f"    {line}\n")
+            f.write("\n")
+    return retained
+
+
+def _update_summary(directory: Path, stage: str, entry: Dict):
+    path = directory / "summary.json"
+    summary: Dict[str, Dict] = {}
+    if path.exists():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                summary = json.load(f)
+        except Exception as e:
+            logger.warning(f"讀取既有 profiles/summary.json 失敗，將覆寫: {e}")
+    summary[stage] = entry
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def profile_stage(stage: str, enabled: bool = True, directory: Optional[Path] = None) -> Iterator[None]:
+    """
+    剖析 with 區塊內的執行；enabled 為 False 時直接執行
+
+    cProfile 只記錄進入階段的執行緒（Python 3.12 起為整個行程），
+    同時剖析多個並行階段時 CPU 統計會互相混雜，pipeline 在 --profile 時因此改為依序執行各階段。
+    """
+    if not enabled:
+        yield
+        return
+
+    import cProfile
+    import tracemalloc
+
+    directory = directory or PROFILE_DIR
+    directory.mkdir(exist_ok=True, parents=True)
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACE_FRAMES)
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # 已有其他剖析器在執行（例如 python -m cProfile），只保留取樣與配置追蹤
+        logger.warning(f"無法啟用 cProfile（{stage}）: {e}")
+        profiler = None
+    sampler = StackSampler()
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+        sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        if started_tracing:
+            tracemalloc.stop()
+
+        try:
+            entry = {"seconds": round(elapsed, 3), "samples": sampler.count, "peak_kb": round(peak / 1024, 1)}
+            if profiler is not None:
+                profiler.dump_stats(str(directory / f"{stage}.prof"))
+                top = _cpu_top(profiler, TOP_N)
+                with open(directory / f"{stage}.cpu.txt", "w", encoding="utf-8") as f:
+                    f.write(f"{'cumtime':>10} {'tottime':>10} {'calls':>10}  function\n")
+                    for row in top:
+                        f.write(f"{row['cumtime']:>10.4f} {row['tottime']:>10.4f} {row['calls']:>10}  {row['function']}\n")
+                entry["cpu_top"] = top[:SUMMARY_TOP_N]
+            entry["retained_kb"] = round(_write_alloc(directory / f"{stage}.alloc.txt", snapshot, peak, TOP_N) / 1024, 1)
+            sampler.write(directory / f"{stage}.collapsed")
+            _update_summary(directory, stage, entry)
+            logger.info(f"剖析結果已寫入 {directory}/{stage}.*（{elapsed:.2f}s，峰值 {peak / 1024 / 1024:.1f} MiB）")
+        except Exception as e:
+            logger.error(f"寫出剖析結果失敗（{stage}）: {e}")
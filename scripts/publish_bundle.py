@@ -0,0 +1,319 @@
+"""
+網站資料 bundle
+把 output/ 的 events、alerts 與 stats 發佈成網站用的資料 bundle（output/bundle/，部署時位於 website/public/data/bundle/）：
+
+- events 依狀態與來源分組，每組再依指紋的雜湊分到固定數量的頁面（約 PAGE_SIZE 筆一頁）：
+  某個 event 新增或變動只影響它所在的那一頁，其他頁的內容與檔名不變
+- 檔名帶內容雜湊（<名稱>.<雜湊>.json），內容不變時檔名不變，瀏覽器可長期快取
+- manifest.json 列出每個檔案的路徑（含雜湊）、筆數與大小；網站每次刷新只重新讀取 manifest，再下載目前檢視、且檔名有變的檔案
+- 精簡 JSON（無空白、省略 null 欄位），並寫出 .gz 與 .br（需安裝 brotli）預壓縮版本，供支援的伺服器直接回傳
+
+版本與 patch feed（PatchFeed）：上一版的內容保存在 output/cache/bundle/（隨 pipeline cache 保存），
+每次發佈與上一版比對，有差異時版本加一並寫出 RFC 6902 patch（patch.<lineage>.<版本>.json）。
+網站每次刷新只讀取 head.json（數十 bytes）：落後 N 版且 patch 鏈仍涵蓋時依序套用 N 個 patch，
+落後太多（patch 已被壓縮掉）或 lineage 不同時才重新讀取 manifest 與目前檢視的檔案。
+events 頁面與 alerts 以指紋為鍵的物件保存，單一 event 的變動在 patch 中只是一個路徑。
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import secrets
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import json_patch
+import metrics
+import streaming
+from issue_index import alert_fingerprint
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+OUTPUT_DIR = ROOT / "output"
+BUNDLE_DIR = OUTPUT_DIR / "bundle"
+STATE_DIR = OUTPUT_DIR / "cache" / "bundle"
+MANIFEST_NAME = "manifest.json"
+HEAD_NAME = "head.json"
+
+BUNDLE_VERSION = 2
+PAGE_SIZE = 100
+HASH_LENGTH = 12
+# 網站用到的 alert 欄位（完整的 alerts.json 仍隨 pipeline-reports artifact 上傳）
+ALERT_FIELDS = ("type", "priority", "project", "token", "status", "links")
+# patch 鏈的壓縮：最多保留 MAX_PATCHES 個版本，且總大小不超過完整內容的 MAX_CHAIN_RATIO；
+# 落後更多的網站重新讀取 manifest，比逐一套用 patch 便宜
+MAX_PATCHES = 48
+MAX_CHAIN_RATIO = 0.5
+
+_brotli = None
+
+
+def compact_json(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _compress_brotli(raw: bytes) -> Optional[bytes]:
+    """brotli 壓縮（延遲載入）；未安裝 brotli 時回傳 None，只寫 .gz"""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = False
+    return _brotli.compress(raw, quality=11) if _brotli else None
+
+
+def _write_atomic(path: Path, raw: bytes):
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(raw)
+    os.replace(tmp, path)
+
+
+def write_variants(path: Path, raw: bytes) -> Dict[str, int]:
+    """寫出檔案與 .gz / .br 預壓縮版本，回傳各版本的大小"""
+    sizes = {"bytes": len(raw)}
+    _write_atomic(path, raw)
+    # mtime=0：內容相同時壓縮檔也相同
+    gz = gzip.compress(raw, compresslevel=9, mtime=0)
+    _write_atomic(path.with_name(f"{path.name}.gz"), gz)
+    sizes["gzip_bytes"] = len(gz)
+    br = _compress_brotli(raw)
+    if br is not None:
+        _write_atomic(path.with_name(f"{path.name}.br"), br)
+        sizes["br_bytes"] = len(br)
+    return sizes
+
+
+class BundleWriter:
+    """以內容雜湊命名寫出 bundle 檔案；同名檔案已存在（內容相同）時不重寫"""
+
+    def __init__(self, dest: Path):
+        dest.mkdir(exist_ok=True, parents=True)
+        self.dest = dest
+        self.written = 0
+        self.reused = 0
+        # key → 內容，PatchFeed 以此比對版本
+        self.documents: Dict[str, Any] = {}
+
+    def write(self, stem: str, data: Any, **info) -> Dict:
+        self.documents[stem] = data
+        raw = compact_json(data)
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self.dest / f"{stem}.{digest[:HASH_LENGTH]}.json"
+        gz = path.with_name(f"{path.name}.gz")
+        if path.exists() and gz.exists():
+            sizes = {"bytes": len(raw), "gzip_bytes": gz.stat().st_size}
+            br = path.with_name(f"{path.name}.br")
+            if br.exists():
+                sizes["br_bytes"] = br.stat().st_size
+            self.reused += 1
+        else:
+            sizes = write_variants(path, raw)
+            self.written += 1
+        return {"key": stem, "path": path.name, **sizes, **info}
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """刪除 manifest 不再引用的檔案（含預壓縮版本）"""
+        keep = set(keep) | {MANIFEST_NAME, HEAD_NAME}
+        removed = 0
+        for path in self.dest.iterdir():
+            name = path.name
+            for suffix in (".gz", ".br"):
+                if name.endswith(suffix):
+                    name = name[:-len(suffix)]
+            if path.is_file() and name not in keep:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def _slim(record: Dict, fields: Optional[Tuple[str, ...]] = None) -> Dict:
+    """省略 null 欄位；指定 fields 時只保留這些欄位"""
+    return {k: v for k, v in record.items() if v is not None and (fields is None or k in fields)}
+
+
+def _safe(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name) or "unknown"
+
+
+def group_events(events: Iterable[Dict]) -> Dict[Tuple[str, str], List[Tuple[str, Dict]]]:
+    """events → (狀態, 來源) → [(指紋, event)]；同一指紋只保留第一筆"""
+    groups: Dict[Tuple[str, str], List[Tuple[str, Dict]]] = {}
+    seen = set()
+    for ev in events:
+        fingerprint = alert_fingerprint(ev)
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+        key = (str(ev.get("status") or "unknown"), str(ev.get("source") or "unknown"))
+        groups.setdefault(key, []).append((fingerprint, _slim(ev)))
+    return groups
+
+
+def paginate(items: List[Tuple[str, Dict]], page_size: int = PAGE_SIZE) -> List[Dict[str, Dict]]:
+    """依指紋雜湊分頁（指紋 → event）：頁數只隨筆數跨過 page_size 的倍數而改變，頁內依專案名稱排序"""
+    pages: List[List[Tuple[str, Dict]]] = [[] for _ in range(max(1, -(-len(items) // page_size)))]
+    for fingerprint, ev in items:
+        pages[int(fingerprint[:8], 16) % len(pages)].append((fingerprint, ev))
+    return [dict(sorted(page, key=lambda x: (str(x[1].get("project", "")).lower(), x[0]))) for page in pages]
+
+
+class PatchFeed:
+    """
+    bundle 內容的版本與 patch 鏈（output/cache/bundle/：state.json 為目前版本的內容，patches/ 為 patch 鏈）
+
+    lineage 在狀態重建（cache 遺失、格式變更）時更換；網站看到不同的 lineage 時不套用 patch。
+    """
+
+    def __init__(self, directory: Path = STATE_DIR):
+        self.directory = directory
+        self.state_path = directory / "state.json"
+        self.patch_dir = directory / "patches"
+
+    def _load_state(self) -> Optional[Dict]:
+        if not self.state_path.exists():
+            return None
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except Exception as e:
+            logger.warning(f"讀取 bundle 狀態失敗，重新開始 patch 鏈: {e}")
+            return None
+        return state if state.get("version") == BUNDLE_VERSION else None
+
+    def publish(self, document: Dict) -> Tuple[Dict, List[Tuple[int, bytes]]]:
+        """
+        記錄新版本的內容，回傳 head（lineage / revision / oldest）與目前的 patch 鏈 [(版本, patch)]
+
+        oldest 為仍可用 patch 更新的最舊版本；內容與上一版相同時版本不變。
+        """
+        self.patch_dir.mkdir(exist_ok=True, parents=True)
+        state = self._load_state()
+        if state is None:
+            lineage, revision = secrets.token_hex(4), 1
+            for path in self.patch_dir.glob("*.json"):
+                path.unlink()
+        else:
+            lineage, revision = state["lineage"], state["revision"]
+            ops = json_patch.diff(state["document"], document)
+            if ops:
+                revision += 1
+                _write_atomic(self.patch_dir / f"{revision}.json",
+                              compact_json({"from": revision - 1, "to": revision, "ops": ops}))
+        raw_document = compact_json({"version": BUNDLE_VERSION, "lineage": lineage, "revision": revision,
+                                     "document": document})
+        chain = self._compact(revision, len(raw_document))
+        _write_atomic(self.state_path, raw_document)
+        head = {"lineage": lineage, "revision": revision, "oldest": chain[0][0] - 1 if chain else revision}
+        return head, chain
+
+    def _compact(self, revision: int, snapshot_bytes: int) -> List[Tuple[int, bytes]]:
+        """只保留連續到目前版本的 patch，並依 MAX_PATCHES / MAX_CHAIN_RATIO 刪除最舊的"""
+        available = {int(p.stem): p for p in self.patch_dir.glob("*.json") if p.stem.isdigit()}
+        chain: List[Tuple[int, bytes]] = []
+        total = 0
+        r = revision
+        while r in available and len(chain) < MAX_PATCHES:
+            raw = available[r].read_bytes()
+            if total + len(raw) > snapshot_bytes * MAX_CHAIN_RATIO:
+                break
+            del available[r]
+            chain.append((r, raw))
+            total += len(raw)
+            r -= 1
+        for path in available.values():
+            path.unlink(missing_ok=True)
+        return chain[::-1]
+
+
+def build_bundle(events: Iterable[Dict], alerts: List[Dict], stats: Dict, dest: Path = BUNDLE_DIR,
+                 page_size: int = PAGE_SIZE, state_dir: Path = STATE_DIR) -> Dict:
+    """
+    寫出 bundle 並回傳 manifest
+
+    寫入順序：內容檔案 → patch → manifest → head.json，網站不會讀到引用不存在檔案的 manifest 或 head。
+    """
+    writer = BundleWriter(dest)
+    groups = []
+    total = 0
+    for (status, source), items in sorted(group_events(events).items()):
+        stem = f"events.{_safe(status)}.{_safe(source)}"
+        pages = [writer.write(f"{stem}.{i}", page, count=len(page))
+                 for i, page in enumerate(paginate(items, page_size))]
+        groups.append({"status": status, "source": source, "count": len(items), "pages": pages})
+        total += len(items)
+
+    slim_alerts: Dict[str, Dict] = {}
+    for alert in alerts:
+        slim_alerts.setdefault(alert_fingerprint(alert), _slim(alert, ALERT_FIELDS))
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "generated_at": stats.get("generated_at") or datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "page_size": page_size,
+        "events": {"total": total, "groups": groups},
+        "alerts": writer.write("alerts", slim_alerts, count=len(slim_alerts)),
+        "stats": writer.write("stats", stats),
+    }
+    files = [page["path"] for group in groups for page in group["pages"]]
+    files += [manifest["alerts"]["path"], manifest["stats"]["path"]]
+
+    # patch 的對象是各檔案的內容加上 manifest 本身（網站據此更新檔案路徑與分組）
+    head, chain = PatchFeed(state_dir).publish({**writer.documents, "manifest": manifest})
+    for revision, raw in chain:
+        name = f"patch.{head['lineage']}.{revision}.json"
+        write_variants(dest / name, raw)
+        files.append(name)
+    manifest = {**manifest, **head}
+    write_variants(dest / MANIFEST_NAME, compact_json(manifest))
+    write_variants(dest / HEAD_NAME, compact_json({"version": BUNDLE_VERSION, **head}))
+    removed = writer.prune(files)
+
+    metrics.set_value("bundle", "files", len(files))
+    metrics.set_value("bundle", "written", writer.written)
+    metrics.set_value("bundle", "unchanged", writer.reused)
+    metrics.set_value("bundle", "removed", removed)
+    metrics.set_value("bundle", "revision", head["revision"])
+    metrics.set_value("bundle", "patches", len(chain))
+    if chain and chain[-1][0] == head["revision"]:
+        metrics.set_value("bundle", "patch_bytes", len(chain[-1][1]))
+    logger.info(f"網站 bundle: {total} 個 events、{len(files)} 個檔案（新寫入 {writer.written}、未變 {writer.reused}），"
+                f"版本 {head['revision']}（可用 patch 更新自版本 {head['oldest']}）")
+    return manifest
+
+
+def _load_json(path: Path, default: Any) -> Any:
+    if not path.exists():
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def publish(output_dir: Path = OUTPUT_DIR, dest: Path = BUNDLE_DIR, state_dir: Path = STATE_DIR) -> Dict:
+    """由 output/ 的 events_sources.json、alerts.json 與 stats.json 發佈 bundle"""
+    return build_bundle(
+        streaming.read_records(output_dir / "events_sources.json"),
+        _load_json(output_dir / "alerts.json", []),
+        _load_json(output_dir / "stats.json", {}),
+        dest,
+        state_dir=state_dir,
+    )
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="發佈網站資料 bundle（output/bundle/）")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR, help="pipeline 輸出目錄")
+    parser.add_argument("--dest", type=Path, default=BUNDLE_DIR, help="bundle 目錄")
+    parser.add_argument("--state-dir", type=Path, default=STATE_DIR, help="上一版內容與 patch 鏈的保存目錄")
+    args = parser.parse_args()
+    publish(args.output_dir, args.dest, args.state_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+API / feed 來源轉接
+有結構化 API 或 RSS / Atom feed 的來源優先使用這些端點：回應只有 HTML 頁面的一小部分大小，也不需要解析 DOM；
+爬蟲（fetch_sources.py 的 CSS / embedded JSON 擷取）只在 API 無法使用、失敗或沒有資料時才執行。
+
+- CoinMarketCap：/v1/cryptocurrency/airdrops（需要 CMC_API_KEY）→ events；
+  /v2/cryptocurrency/quotes/latest 以 tokens.yml 的 coinmarketcap_id 一次查詢多個幣種的行情
+- CoinGecko：/coins/markets 以 tokens.yml 的 coingecko_id 一次查詢多個幣種的行情（公開 API，COINGECKO_API_KEY 選用）
+- RSS 2.0 / Atom feed → events
+
+此模組只負責組成請求與轉換回應，HTTP 由 fetch_sources.py 執行；轉換後的結果以 ApiCache 依 TTL 快取，
+行情以幣種 id 為 key，批次查詢只包含已過期的 id。
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_FILE = ROOT / "output" / "cache" / "api_cache.json"
+
+# 可指向 python scripts/standins.py pages 離線測試
+CMC_API_URL = os.environ.get("CMC_API_URL", "https://pro-api.coinmarketcap.com")
+COINGECKO_API_URL = os.environ.get("COINGECKO_API_URL", "https://api.coingecko.com/api/v3")
+
+# sources.yml 的 api 未設定 ttl 時的快取秒數
+DEFAULT_TTL = 3 * 3600
+# 行情快取秒數（pipeline 每小時執行，同一小時內的手動執行沿用）
+MARKET_TTL = 30 * 60
+# 單一批次查詢的最多 id 數
+MARKET_BATCH = 100
+# 超過此秒數未更新的快取項目在保存時移除
+MAX_ENTRY_AGE = 7 * 24 * 3600
+
+CACHE_VERSION = 1
+
+# event status → CoinMarketCap airdrops API 的 status
+CMC_STATUSES = {"active": "ONGOING", "upcoming": "UPCOMING", "ended": "ENDED"}
+_CMC_EVENT_STATUS = {v: k for k, v in CMC_STATUSES.items()}
+CMC_AIRDROP_LIMIT = 500
+
+_SYMBOL = re.compile(r"\(\$?([A-Z0-9]{2,10})\)")
+_AIRDROP_SUFFIX = re.compile(r"\s*[-–|:]?\s*airdrop\b.*$", re.IGNORECASE)
+
+
+class ApiCache:
+    """
+    API 回應快取（output/cache/api_cache.json）
+
+    項目格式：{"fetched_at", "data"}，data 為轉換後的結果（events 或單一幣種行情），不保存原始回應。
+    """
+
+    def __init__(self, path: Path = CACHE_FILE):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"讀取 API 快取失敗，將重新查詢: {e}")
+            return
+        if data.get("version") != CACHE_VERSION:
+            logger.info("API 快取格式已變更，捨棄舊快取")
+            return
+        self.entries = data.get("entries") or {}
+
+    def get(self, key: str, ttl: float, now: Optional[float] = None) -> Optional[Any]:
+        """未過期的快取資料；沒有或已過期時回傳 None"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry is None or now - entry.get("fetched_at", 0) >= ttl:
+            return None
+        return entry["data"]
+
+    def put(self, key: str, data: Any):
+        with self._lock:
+            self.entries[key] = {"fetched_at": time.time(), "data": data}
+
+    def save(self):
+        """原子寫回，並移除過久未更新的項目"""
+        cutoff = time.time() - MAX_ENTRY_AGE
+        with self._lock:
+            self.entries = {k: v for k, v in self.entries.items() if v.get("fetched_at", 0) >= cutoff}
+            data = {"version": CACHE_VERSION, "entries": self.entries}
+            try:
+                self.path.parent.mkdir(exist_ok=True, parents=True)
+                tmp = self.path.with_suffix(".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            except Exception as e:
+                logger.error(f"寫入 API 快取失敗: {e}")
+
+
+def chunks(items: List, size: int = MARKET_BATCH) -> List[List]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# ---- CoinMarketCap ----
+
+def cmc_headers() -> Optional[Dict]:
+    """CoinMarketCap API 的認證 header；未設定 CMC_API_KEY 時回傳 None"""
+    key = os.environ.get("CMC_API_KEY")
+    return {"X-CMC_PRO_API_KEY": key} if key else None
+
+
+def cmc_airdrops_url(status: str, base_url: Optional[str] = None, limit: int = CMC_AIRDROP_LIMIT) -> str:
+    return (f"{(base_url or CMC_API_URL).rstrip('/')}/v1/cryptocurrency/airdrops?"
+            f"{urlencode({'status': CMC_STATUSES[status], 'limit': limit})}")
+
+
+def cmc_airdrop_events(payload: Dict, source: str, symbols_by_cmc_id: Optional[Dict[int, str]] = None) -> List[Dict]:
+    """
+    /v1/cryptocurrency/airdrops 回應 → events（與爬蟲產生的格式相同）
+
+    coin.id 對應到 tokens.yml 的 coinmarketcap_id 時使用追蹤清單中的 symbol。
+    """
+    symbols_by_cmc_id = symbols_by_cmc_id or {}
+    events = []
+    for item in payload.get("data") or []:
+        coin = item.get("coin") or {}
+        project = (item.get("project_name") or coin.get("name") or "").strip()
+        if not project:
+            continue
+        status = _CMC_EVENT_STATUS.get(str(item.get("status", "")).upper(), "active")
+        details = item.get("link") or (
+            f"https://coinmarketcap.com/currencies/{coin['slug']}/airdrop/" if coin.get("slug") else None)
+        events.append({
+            "token": symbols_by_cmc_id.get(coin.get("id")) or coin.get("symbol"),
+            "project": project,
+            "campaign_name": project,
+            "source": source,
+            "status": status,
+            "type": "airdrop",
+            "reward_type": "token",
+            "est_value_usd": None,
+            "deadline": item.get("end_date"),
+            "requirements": [],
+            "links": {"details": details or "https://coinmarketcap.com/airdrop/"},
+        })
+    return events
+
+
+def cmc_quotes_url(ids: List[int], base_url: Optional[str] = None) -> str:
+    return (f"{(base_url or CMC_API_URL).rstrip('/')}/v2/cryptocurrency/quotes/latest?"
+            f"{urlencode({'id': ','.join(str(i) for i in ids), 'convert': 'USD', 'skip_invalid': 'true'})}")
+
+
+def cmc_quotes(payload: Dict) -> Dict[str, Dict]:
+    """/v2/cryptocurrency/quotes/latest 回應 → coinmarketcap_id（字串）→ 行情"""
+    markets = {}
+    for key, item in (payload.get("data") or {}).items():
+        # v2 以 id 查詢時每個 key 對應單一幣種（以 symbol 查詢時才是 list）
+        if isinstance(item, list):
+            item = item[0] if item else None
+        if not item:
+            continue
+        usd = (item.get("quote") or {}).get("USD") or {}
+        markets[str(key)] = {
+            "name": item.get("name"),
+            "price_usd": usd.get("price"),
+            "market_cap_usd": usd.get("market_cap"),
+            "volume_24h_usd": usd.get("volume_24h"),
+            "change_24h_pct": usd.get("percent_change_24h"),
+            "updated": usd.get("last_updated"),
+            "source": "coinmarketcap",
+            "url": f"https://coinmarketcap.com/currencies/{item['slug']}/" if item.get("slug") else None,
+        }
+    return markets
+
+
+# ---- CoinGecko ----
+
+def coingecko_headers() -> Dict:
+    key = os.environ.get("COINGECKO_API_KEY")
+    return {"x-cg-demo-api-key": key} if key else {}
+
+
+def coingecko_markets_url(ids: List[str], base_url: Optional[str] = None) -> str:
+    return (f"{(base_url or COINGECKO_API_URL).rstrip('/')}/coins/markets?"
+            f"{urlencode({'vs_currency': 'usd', 'ids': ','.join(ids), 'per_page': len(ids)})}")
+
+
+def coingecko_markets(payload: List[Dict]) -> Dict[str, Dict]:
+    """/coins/markets 回應 → coingecko_id → 行情"""
+    markets = {}
+    for item in payload or []:
+        if not item.get("id"):
+            continue
+        markets[item["id"]] = {
+            "name": item.get("name"),
+            "price_usd": item.get("current_price"),
+            "market_cap_usd": item.get("market_cap"),
+            "volume_24h_usd": item.get("total_volume"),
+            "change_24h_pct": item.get("price_change_percentage_24h"),
+            "updated": item.get("last_updated"),
+            "source": "coingecko",
+            "url": f"https://www.coingecko.com/en/coins/{item['id']}",
+        }
+    return markets
+
+
+# ---- RSS / Atom ----
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child_text(el, name: str) -> Optional[str]:
+    for child in el:
+        if _local(child.tag) == name:
+            return (child.text or "").strip() or None
+    return None
+
+
+def feed_events(content: bytes, source: str, url: str, status: str = "active") -> List[Dict]:
+    """
+    RSS 2.0 / Atom feed → events
+
+    標題中的 "(SYM)" 視為 token symbol，去掉 "Airdrop ..." 字尾作為專案名稱；分類（category）放到 requirements。
+    """
+    from xml.etree import ElementTree
+
+    root = ElementTree.fromstring(content)
+    items = [el for el in root.iter() if _local(el.tag) in ("item", "entry")]
+    events = []
+    for item in items:
+        title = _child_text(item, "title")
+        if not title:
+            continue
+        link = _child_text(item, "link")
+        if link is None:
+            # Atom：<link rel="alternate" href="..."/>
+            links = [el for el in item if _local(el.tag) == "link" and el.get("href")]
+            alternate = [el for el in links if el.get("rel", "alternate") == "alternate"]
+            link = (alternate or links)[0].get("href") if links else None
+        symbol = _SYMBOL.search(title)
+        project = _SYMBOL.sub("", _AIRDROP_SUFFIX.sub("", title)).strip() or title
+        categories = [el.text or el.get("term") for el in item if _local(el.tag) == "category"]
+        events.append({
+            "token": symbol.group(1) if symbol else None,
+            "project": project,
+            "campaign_name": title,
+            "source": source,
+            "status": status,
+            "type": "airdrop",
+            "reward_type": "token",
+            "est_value_usd": None,
+            "deadline": None,
+            "requirements": [c.strip() for c in categories if c and c.strip()],
+            "links": {"details": link or url},
+        })
+    return events
@@ -0,0 +1,661 @@
+"""
+本機 API 替身（stand-in）
+在 127.0.0.1 上啟動輕量 HTTP 伺服器，模擬外部 API 的行為，
+讓錢包查詢等路徑可以在離線環境下執行與量測。
+
+用法：
+    python scripts/standins.py rpc --port 8545 --wallets 100
+    python scripts/standins.py explorer --port 8546 --wallets 10 --txs 5000
+    python scripts/standins.py github --port 8547 --secondary-every 20
+    python scripts/standins.py discord --port 8548
+    python scripts/standins.py pages --port 8549 --cards 1000
+"""
+import argparse
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Standin:
+    """在背景執行緒執行的本機 HTTP 替身，可作為 context manager 使用"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.request_log: List[Dict] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def request_count(self) -> int:
+        with self._lock:
+            return len(self.request_log)
+
+    def record(self, entry: Dict):
+        with self._lock:
+            self.request_log.append(entry)
+
+    def handle(self, handler: BaseHTTPRequestHandler, method: str, body: bytes):
+        """由子類別實作：處理一個請求並透過 handler 寫出回應"""
+        raise NotImplementedError
+
+    def _make_handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _dispatch(self, method: str):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                standin.handle(self, method, body)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self) -> "Standin":
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "Standin":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def send_json(handler: BaseHTTPRequestHandler, status: int, payload, headers: Optional[Dict[str, str]] = None):
+    """寫出 JSON 回應"""
+    body = json.dumps(payload).encode("utf-8")
+    handler.send_response(status)
+    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Content-Length", str(len(body)))
+    for key, value in (headers or {}).items():
+        handler.send_header(key, value)
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+class JsonRpcStandin(Standin):
+    """
+    EVM JSON-RPC 替身
+
+    支援 batch 與單一請求，方法：eth_blockNumber、eth_getTransactionCount、eth_getBalance。
+    accounts 為 address（小寫）→ {"nonce", "balance"}；未知地址視為 nonce / balance 皆為 0。
+    max_batch_size 超過時回傳單一 error 物件，模擬節點的 batch 上限。
+    """
+
+    def __init__(self, accounts: Optional[Dict[str, Dict]] = None, block_number: int = 19_000_000,
+                 max_batch_size: int = 1000, **kwargs):
+        super().__init__(**kwargs)
+        self.accounts = {k.lower(): v for k, v in (accounts or {}).items()}
+        self.block_number = block_number
+        self.max_batch_size = max_batch_size
+
+    def _result(self, method: str, params: list):
+        if method == "eth_blockNumber":
+            return hex(self.block_number)
+        if method in ("eth_getTransactionCount", "eth_getBalance"):
+            address = str(params[0]).lower() if params else ""
+            if not (address.startswith("0x") and len(address) == 42):
+                raise ValueError(f"invalid address: {address}")
+            account = self.accounts.get(address, {})
+            return hex(account.get("nonce" if method == "eth_getTransactionCount" else "balance", 0))
+        raise LookupError(f"the method {method} does not exist/is not available")
+
+    def _answer(self, call: Dict) -> Dict:
+        base = {"jsonrpc": "2.0", "id": call.get("id")}
+        try:
+            return {**base, "result": self._result(call.get("method"), call.get("params") or [])}
+        except LookupError as e:
+            return {**base, "error": {"code": -32601, "message": str(e)}}
+        except ValueError as e:
+            return {**base, "error": {"code": -32602, "message": str(e)}}
+
+    def handle(self, handler, method, body):
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError:
+            send_json(handler, 200, {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}})
+            return
+
+        calls = payload if isinstance(payload, list) else [payload]
+        self.record({"method": method, "calls": len(calls)})
+        if isinstance(payload, list):
+            if len(payload) > self.max_batch_size:
+                send_json(handler, 200, {"jsonrpc": "2.0", "id": None,
+                                         "error": {"code": -32005, "message": "batch too large"}})
+                return
+            # 刻意反轉順序，確保客戶端依 id 對應而非依位置
+            send_json(handler, 200, [self._answer(c) for c in reversed(calls)])
+        else:
+            send_json(handler, 200, self._answer(payload))
+
+
+class ExplorerStandin(Standin):
+    """
+    Etherscan 相容區塊瀏覽器替身（module=account&action=txlist）
+
+    transactions 為 address（小寫）→ 依區塊遞增排序的交易列表；支援 startblock / endblock / page / offset，
+    page * offset 超過 10000 時回傳錯誤，與實際 API 相同。
+    """
+
+    def __init__(self, transactions: Optional[Dict[str, List[Dict]]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.transactions = {k.lower(): v for k, v in (transactions or {}).items()}
+
+    def handle(self, handler, method, body):
+        from urllib.parse import parse_qs, urlparse
+
+        query = {k: v[0] for k, v in parse_qs(urlparse(handler.path).query).items()}
+        self.record({"method": method, **{k: v for k, v in query.items() if k != "apikey"}})
+        if query.get("module") != "account" or query.get("action") != "txlist":
+            send_json(handler, 200, {"status": "0", "message": "NOTOK", "result": "Error! Invalid action"})
+            return
+
+        page, offset = int(query.get("page", 1)), int(query.get("offset", 10000))
+        if page * offset > 10000:
+            send_json(handler, 200, {"status": "0", "message": "NOTOK",
+                                     "result": "Result window is too large, PageNo x Offset size must be less than or equal to 10000"})
+            return
+        start, end = int(query.get("startblock", 0)), int(query.get("endblock", 99999999))
+        txs = [tx for tx in self.transactions.get(query.get("address", "").lower(), [])
+               if start <= int(tx["blockNumber"]) <= end]
+        result = txs[(page - 1) * offset:page * offset]
+        if not result:
+            send_json(handler, 200, {"status": "0", "message": "No transactions found", "result": []})
+            return
+        send_json(handler, 200, {"status": "1", "message": "OK", "result": result})
+
+
+class GitHubStandin(Standin):
+    """
+    GitHub REST API 替身（單一 repository 的 issues 與 labels）
+
+    支援：GET / POST /repos/{repo}/issues（state、since、sort=updated、per_page、page 與 Link header）、
+    PATCH /repos/{repo}/issues/{number}、POST /repos/{repo}/issues/{number}/labels（加上標籤）、GET / POST /repos/{repo}/labels。
+    建立或更新 issue 時標籤必須已存在（否則 422），建立已存在的標籤回傳 422 already_exists。
+
+    速率限制：每 rate_window 秒 rate_limit 個請求（X-RateLimit-* header，用盡時 403）；
+    secondary_every > 0 時每第 N 個寫入請求回傳 403 次要限制與 Retry-After。
+    latency 為每個請求的處理延遲（秒），用來觀察並行寫入的效果。
+    """
+
+    def __init__(self, repo: str = "owner/repo", labels: Optional[List[str]] = None, rate_limit: int = 5000,
+                 rate_window: float = 3600.0, secondary_every: int = 0, retry_after: float = 1.0,
+                 latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.repo = repo
+        self.issues: Dict[int, Dict] = {}
+        self.labels = set(labels or [])
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.secondary_every = secondary_every
+        self.retry_after = retry_after
+        self.latency = latency
+        self.writes = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._remaining = rate_limit
+        self._window_reset = 0.0
+
+    @staticmethod
+    def _now() -> str:
+        from datetime import datetime, timezone
+
+        return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def _rate_headers(self) -> Dict[str, str]:
+        import time
+
+        now = time.time()
+        if now >= self._window_reset:
+            self._window_reset = now + self.rate_window
+            self._remaining = self.rate_limit
+        self._remaining -= 1
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(max(self._remaining, 0)),
+            "X-RateLimit-Reset": str(int(self._window_reset) + 1),
+        }
+
+    def _page(self, handler, items: List[Dict], query: Dict, base: str, headers: Dict[str, str]):
+        from urllib.parse import urlencode
+
+        per_page, page = min(int(query.get("per_page", 30)), 100), int(query.get("page", 1))
+        result = items[(page - 1) * per_page:page * per_page]
+        if page * per_page < len(items):
+            next_query = urlencode({**query, "page": page + 1})
+            headers = {**headers, "Link": f'<{self.url}{base}?{next_query}>; rel="next"'}
+        send_json(handler, 200, result, headers)
+
+    def handle(self, handler, method, body):
+        from urllib.parse import parse_qs, urlparse
+        import time
+
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            self._handle(handler, method, body, urlparse(handler.path), parse_qs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _handle(self, handler, method, body, url, parse_qs):
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        payload = json.loads(body) if body else {}
+        prefix = f"/repos/{self.repo}"
+
+        with self._lock:
+            headers = self._rate_headers()
+            if self._remaining < 0:
+                send_json(handler, 403, {"message": "API rate limit exceeded"}, headers)
+                status = 403
+            elif method != "GET" and self.secondary_every and (self.writes + 1) % self.secondary_every == 0:
+                self.writes += 1
+                send_json(handler, 403, {"message": "You have exceeded a secondary rate limit. Please wait a few minutes before you try again."},
+                          {**headers, "Retry-After": f"{self.retry_after:g}"})
+                status = 403
+            else:
+                if method != "GET":
+                    self.writes += 1
+                status = self._route(handler, method, url.path[len(prefix):] if url.path.startswith(prefix) else None,
+                                     query, payload, headers)
+        self.record({"method": method, "path": url.path, "status": status})
+
+    def _route(self, handler, method, path, query, payload, headers) -> int:
+        def reply(status, data):
+            send_json(handler, status, data, headers)
+            return status
+
+        if path == "/labels":
+            if method == "GET":
+                self._page(handler, [{"name": n} for n in sorted(self.labels)], query, f"/repos/{self.repo}/labels", headers)
+                return 200
+            if payload.get("name") in self.labels:
+                return reply(422, {"message": "Validation Failed", "errors": [{"resource": "Label", "code": "already_exists"}]})
+            self.labels.add(payload["name"])
+            return reply(201, {"name": payload["name"], "color": payload.get("color")})
+
+        if path == "/issues" and method == "GET":
+            items = sorted(self.issues.values(), key=lambda i: (i["updated_at"], i["number"]))
+            if query.get("since"):
+                items = [i for i in items if i["updated_at"] >= query["since"]]
+            if query.get("state", "open") != "all":
+                items = [i for i in items if i["state"] == query.get("state", "open")]
+            self._page(handler, items, query, f"/repos/{self.repo}/issues", headers)
+            return 200
+
+        unknown = set(payload.get("labels") or []) - self.labels
+        if unknown:
+            return reply(422, {"message": "Validation Failed",
+                               "errors": [{"resource": "Label", "code": "invalid", "value": sorted(unknown)}]})
+
+        if path == "/issues" and method == "POST":
+            number = len(self.issues) + 1
+            self.issues[number] = {
+                "number": number,
+                "title": payload["title"],
+                "body": payload.get("body"),
+                "labels": [{"name": n} for n in payload.get("labels") or []],
+                "state": "open",
+                "updated_at": self._now(),
+            }
+            return reply(201, self.issues[number])
+
+        if path and path.startswith("/issues/") and path.endswith("/labels") and method == "POST":
+            issue = self.issues.get(int(path.split("/")[2]))
+            if issue is None:
+                return reply(404, {"message": "Not Found"})
+            names = [label["name"] for label in issue["labels"]]
+            issue["labels"] = [{"name": n} for n in dict.fromkeys(names + list(payload.get("labels") or []))]
+            issue["updated_at"] = self._now()
+            return reply(200, issue["labels"])
+
+        if path and path.startswith("/issues/") and method == "PATCH":
+            issue = self.issues.get(int(path.rsplit("/", 1)[1]))
+            if issue is None:
+                return reply(404, {"message": "Not Found"})
+            for key in ("title", "body", "state"):
+                if key in payload:
+                    issue[key] = payload[key]
+            if "labels" in payload:
+                issue["labels"] = [{"name": n} for n in payload["labels"]]
+            issue["updated_at"] = self._now()
+            return reply(200, issue)
+
+        return reply(404, {"message": "Not Found"})
+
+
+class DiscordStandin(Standin):
+    """
+    Discord Webhook 替身（POST /api/webhooks/{id}/{token}）
+
+    每個 webhook 為一個 bucket：每 window 秒 limit 則訊息，回應帶 X-RateLimit-* header，超過時回傳 429 與 retry_after。
+    驗證訊息長度限制（content 2000、10 個 embed、embed 合計 6000 字元等），違反時回傳 400。
+    fail_next > 0 時接下來的請求回傳 500，用來模擬暫時故障。
+    """
+
+    def __init__(self, limit: int = 5, window: float = 2.0, latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.limit = limit
+        self.window = window
+        self.latency = latency
+        self.fail_next = 0
+        self.messages: List[Dict] = []
+        self.rate_limited = 0
+        self._buckets: Dict[str, Dict] = {}
+
+    def webhook_url(self, webhook_id: str = "1", token: str = "token") -> str:
+        return f"{self.url}/api/webhooks/{webhook_id}/{token}"
+
+    @staticmethod
+    def _invalid(payload: Dict) -> Optional[str]:
+        from discord_delivery import embed_length
+
+        embeds = payload.get("embeds") or []
+        if not payload.get("content") and not embeds:
+            return "Cannot send an empty message"
+        if len(payload.get("content") or "") > 2000:
+            return "content: Must be 2000 or fewer in length."
+        if len(embeds) > 10:
+            return "embeds: Must be 10 or fewer in length."
+        if sum(embed_length(e) for e in embeds) > 6000:
+            return "embeds: Embed size exceeds maximum size of 6000"
+        for e in embeds:
+            if len(e.get("title", "")) > 256 or len(e.get("description", "")) > 4096 or len(e.get("fields", [])) > 25:
+                return "embeds: Invalid embed"
+            for f in e.get("fields", []):
+                if not f.get("name") or not f.get("value") or len(f["name"]) > 256 or len(f["value"]) > 1024:
+                    return "embeds.fields: Invalid field"
+        return None
+
+    def handle(self, handler, method, body):
+        from urllib.parse import urlparse
+        import time
+
+        if self.latency:
+            time.sleep(self.latency)
+        path = urlparse(handler.path).path
+        parts = path.strip("/").split("/")
+        if method != "POST" or len(parts) != 4 or parts[:2] != ["api", "webhooks"]:
+            send_json(handler, 404, {"message": "Unknown Webhook", "code": 10015})
+            return
+
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                status, payload, headers = 500, {"message": "Internal Server Error"}, {}
+            else:
+                now = time.monotonic()
+                bucket = self._buckets.get(parts[2])
+                if bucket is None or now >= bucket["reset_at"]:
+                    bucket = self._buckets[parts[2]] = {"remaining": self.limit, "reset_at": now + self.window}
+                reset_after = max(bucket["reset_at"] - now, 0.0)
+                headers = {
+                    "X-RateLimit-Bucket": f"bucket-{parts[2]}",
+                    "X-RateLimit-Limit": str(self.limit),
+                    "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+                }
+                if bucket["remaining"] <= 0:
+                    self.rate_limited += 1
+                    status = 429
+                    payload = {"message": "You are being rate limited.", "retry_after": round(reset_after, 3), "global": False}
+                    headers["X-RateLimit-Remaining"] = "0"
+                else:
+                    bucket["remaining"] -= 1
+                    headers["X-RateLimit-Remaining"] = str(bucket["remaining"])
+                    message = json.loads(body or b"{}")
+                    error = self._invalid(message)
+                    if error:
+                        status, payload = 400, {"message": "Invalid Form Body", "code": 50035, "errors": error}
+                    else:
+                        self.messages.append(message)
+                        status, payload = 200, {"id": str(len(self.messages)), **message}
+        self.record({"method": method, "webhook": parts[2], "status": status})
+        send_json(handler, status, payload, headers)
+
+
+class PageStandin(Standin):
+    """
+    靜態網頁替身（GET）
+
+    pages 為路徑 → HTML；未知路徑回傳 404，與來源網站移除頁面時相同。
+    """
+
+    def __init__(self, pages: Optional[Dict[str, str]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.pages = {path: html.encode("utf-8") for path, html in (pages or {}).items()}
+
+    def page_url(self, path: str) -> str:
+        return f"{self.url}{path}"
+
+    def handle(self, handler, method, body):
+        from urllib.parse import urlparse
+
+        path = urlparse(handler.path).path
+        page = self.pages.get(path) if method == "GET" else None
+        self.record({"method": method, "path": path, "status": 200 if page is not None else 404})
+        if page is None:
+            page = b"<html><body><h1>404 Not Found</h1></body></html>"
+            handler.send_response(404)
+        else:
+            handler.send_response(200)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(page)))
+        handler.end_headers()
+        handler.wfile.write(page)
+
+
+# 各列表來源的卡片結構（對應 scripts/fetch_sources.py 中各 fetch_* 的第一組 selector）
+LISTING_CARDS = {
+    "airdrops_io": (
+        '<div class="airdrop-item"><a class="airdrop-title" href="/project-{i}/">Project {i}</a>'
+        '<span class="token-symbol">TK{i}</span><p class="airdrop-desc">{desc}</p></div>'
+    ),
+    "cmc_airdrops": (
+        '<tr><td><a class="cmc-link" href="/currencies/project-{i}/airdrop/">Project {i}</a></td>'
+        '<td class="airdrop-status">{status}</td><td><span class="airdrop-token-symbol">TK{i}</span></td></tr>'
+    ),
+    "airdrop_checklist": (
+        '<div class="project-card"><a class="project-title" href="/projects/{i}">Project {i}</a>'
+        '<p class="project-desc">{desc}</p></div>'
+    ),
+    "generic": (
+        '<div class="airdrop-card airdrop-item"><a href="/airdrop/project-{i}">Project {i}</a>'
+        '<p>{desc}</p><span class="reward">{i} TK{i}</span></div>'
+    ),
+}
+LISTING_WRAPPERS = {
+    "airdrops_io": '<div class="airdrops-list">{cards}</div>',
+    "cmc_airdrops": "<table><thead><tr><th>Project</th><th>Status</th><th>Token</th></tr></thead><tbody>{cards}</tbody></table>",
+}
+
+
+def synthetic_listing(site: str, count: int) -> str:
+    """產生 count 張卡片的列表頁（含導覽列、script 與頁尾，接近實際頁面的雜訊）"""
+    card = LISTING_CARDS[site]
+    statuses = ("Ongoing", "Upcoming", "Ended")
+    cards = "".join(
+        card.format(i=i, status=statuses[i % 3],
+                    desc=f"Complete {1 + i % 5} tasks and hold the token to qualify. " * (1 + i % 3))
+        for i in range(count)
+    )
+    nav = "".join(f'<li><a href="/section-{n}">Section {n}</a></li>' for n in range(20))
+    scripts = "".join(f'<script src="/static/chunk-{n}.js"></script>' for n in range(8))
+    return (
+        f"<!DOCTYPE html><html><head><title>{site}</title>{scripts}</head><body>"
+        f"<header><nav><ul>{nav}</ul></nav></header><main>"
+        f"{LISTING_WRAPPERS.get(site, '{cards}').format(cards=cards)}"
+        f"</main><footer><p>&copy; {site}</p></footer></body></html>"
+    )
+
+
+def synthetic_next_data(count: int) -> str:
+    """
+    Next.js 版的 CoinMarketCap 列表頁：伺服端渲染的表格（同 synthetic_listing）加上 __NEXT_DATA__ 中的相同資料
+
+    欄位名稱對應 config/sources.yml 中 cmc_airdrops 的 extractor，兩種擷取方式應得到相同的 events。
+    """
+    statuses = ("Ongoing", "Upcoming", "Ended")
+    airdrops = [{"id": i, "projectName": f"Project {i}", "symbol": f"TK{i}", "slug": f"project-{i}",
+                 "status": statuses[i % 3], "participants": 1000 + i, "totalAirdropAmount": str(i * 1000)}
+                for i in range(count)]
+    data = {"props": {"pageProps": {"airdrops": airdrops, "pageSize": count}},
+            "page": "/airdrop", "query": {}, "buildId": "standin"}
+    page = synthetic_listing("cmc_airdrops", count)
+    return page.replace("</body>", f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(data)}</script></body>')
+
+
+def synthetic_cmc_airdrops(count: int) -> str:
+    """CoinMarketCap /v1/cryptocurrency/airdrops 的回應（與 synthetic_listing("cmc_airdrops") 相同的專案）"""
+    statuses = ("ONGOING", "UPCOMING", "ENDED")
+    data = [{"id": f"{i:024x}", "project_name": f"Project {i}",
+             "description": f"Complete {1 + i % 5} tasks and hold the token to qualify.",
+             "status": statuses[i % 3], "coin": {"id": 100000 + i, "name": f"Project {i}", "slug": f"project-{i}",
+                                                 "symbol": f"TK{i}"},
+             "start_date": "2024-01-01T00:00:00.000Z", "end_date": "2024-12-31T00:00:00.000Z",
+             "total_prize": i * 1000, "winner_count": 100 + i,
+             "link": f"https://coinmarketcap.com/currencies/project-{i}/airdrop/"}
+            for i in range(count)]
+    return json.dumps({"status": {"error_code": 0, "error_message": None}, "data": data})
+
+
+def synthetic_cmc_quotes(ids: List[int]) -> str:
+    """CoinMarketCap /v2/cryptocurrency/quotes/latest 的回應"""
+    data = {str(i): {"id": i, "name": f"Coin {i}", "symbol": f"C{i}", "slug": f"coin-{i}",
+                     "quote": {"USD": {"price": i / 100, "volume_24h": i * 1e5, "percent_change_24h": (i % 21) - 10,
+                                       "market_cap": i * 1e7, "last_updated": "2024-01-01T00:00:00.000Z"}}}
+            for i in ids}
+    return json.dumps({"status": {"error_code": 0, "error_message": None}, "data": data})
+
+
+def synthetic_coingecko_markets(ids: List[str]) -> str:
+    """CoinGecko /coins/markets 的回應"""
+    return json.dumps([{"id": coin, "symbol": coin[:4], "name": coin.title(), "current_price": 1.5 + n,
+                        "market_cap": (n + 1) * 1e8, "total_volume": (n + 1) * 1e6,
+                        "price_change_percentage_24h": -1.25 * n, "last_updated": "2024-01-01T00:00:00.000Z"}
+                       for n, coin in enumerate(ids)])
+
+
+def synthetic_feed(count: int) -> str:
+    """RSS 2.0 feed（WordPress 格式），每篇文章一個空投"""
+    items = "".join(
+        f"<item><title>Project {i} (TK{i}) Airdrop</title><link>https://example.com/project-{i}/</link>"
+        f"<pubDate>Mon, 01 Jan 2024 00:00:00 +0000</pubDate><category><![CDATA[Airdrops]]></category>"
+        f"<description><![CDATA[Complete {1 + i % 5} tasks and hold the token to qualify.]]></description></item>"
+        for i in range(count)
+    )
+    return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>Airdrops</title>'
+            f"<link>https://example.com/</link>{items}</channel></rss>")
+
+
+def synthetic_transactions(address: str, count: int, contracts: List[str], start_block: int = 1_000_000,
+                           per_block: int = 3) -> List[Dict]:
+    """產生 count 筆可預測的送出交易（每個區塊 per_block 筆，依序輪流呼叫 contracts）"""
+    txs = []
+    for i in range(count):
+        block = start_block + i // per_block
+        txs.append({
+            "blockNumber": str(block),
+            "timeStamp": str(1_600_000_000 + block * 12),
+            "hash": f"0x{i:064x}",
+            "from": address.lower(),
+            "to": contracts[i % len(contracts)],
+            "input": "0xa9059cbb",
+            "isError": "0",
+        })
+    return txs
+
+
+def synthetic_accounts(count: int) -> Dict[str, Dict]:
+    """產生 count 個可預測的測試帳戶"""
+    return {
+        f"0x{i:040x}": {"nonce": i % 97, "balance": (i % 13) * 10 ** 17}
+        for i in range(1, count + 1)
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="啟動本機 API 替身")
+    sub = parser.add_subparsers(dest="kind", required=True)
+    rpc = sub.add_parser("rpc", help="EVM JSON-RPC 替身")
+    rpc.add_argument("--port", type=int, default=8545)
+    rpc.add_argument("--wallets", type=int, default=100, help="預先建立的測試帳戶數")
+    explorer = sub.add_parser("explorer", help="Etherscan 相容區塊瀏覽器替身")
+    explorer.add_argument("--port", type=int, default=8546)
+    explorer.add_argument("--wallets", type=int, default=10, help="預先建立交易的測試帳戶數")
+    explorer.add_argument("--txs", type=int, default=1000, help="每個帳戶的交易數")
+    discord = sub.add_parser("discord", help="Discord Webhook 替身")
+    discord.add_argument("--port", type=int, default=8548)
+    discord.add_argument("--limit", type=int, default=5, help="每個 bucket 每個時間窗的訊息數")
+    discord.add_argument("--window", type=float, default=2.0, help="bucket 時間窗（秒）")
+    pages = sub.add_parser("pages", help="合成的列表來源網頁（/{來源名稱}）、CMC airdrops API 與 RSS feed（/feed）")
+    pages.add_argument("--port", type=int, default=8549)
+    pages.add_argument("--cards", type=int, default=100, help="每頁的卡片數")
+    github = sub.add_parser("github", help="GitHub REST API 替身（issues / labels）")
+    github.add_argument("--port", type=int, default=8547)
+    github.add_argument("--repo", default="owner/repo")
+    github.add_argument("--secondary-every", type=int, default=0, help="每第 N 個寫入請求回傳次要限制")
+    github.add_argument("--latency", type=float, default=0.0, help="每個請求的延遲（秒）")
+    args = parser.parse_args()
+
+    if args.kind == "rpc":
+        standin = JsonRpcStandin(accounts=synthetic_accounts(args.wallets), port=args.port).start()
+    elif args.kind == "discord":
+        standin = DiscordStandin(limit=args.limit, window=args.window, port=args.port).start()
+        logger.info(f"webhook URL: {standin.webhook_url()}")
+    elif args.kind == "pages":
+        pages = {f"/{site}": synthetic_listing(site, args.cards) for site in LISTING_CARDS}
+        pages["/v1/cryptocurrency/airdrops"] = synthetic_cmc_airdrops(args.cards)
+        pages["/feed"] = synthetic_feed(args.cards)
+        standin = PageStandin(pages, port=args.port).start()
+    elif args.kind == "github":
+        standin = GitHubStandin(repo=args.repo, secondary_every=args.secondary_every, latency=args.latency,
+                                port=args.port).start()
+    else:
+        contracts = [f"0x{i:040x}" for i in range(0xc0, 0xd0)]
+        standin = ExplorerStandin(
+            transactions={addr: synthetic_transactions(addr, args.txs, contracts) for addr in synthetic_accounts(args.wallets)},
+            port=args.port,
+        ).start()
+    logger.info(f"{args.kind} 替身已啟動: {standin.url}（Ctrl+C 結束）")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
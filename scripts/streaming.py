@@ -0,0 +1,185 @@
+"""
+串流處理工具
+events 由產生器逐筆流過整條 pipeline（抓取 → 寫檔 / 統計 / 規則評估），任何階段都不保留全部 events：
+
+- produce()：在背景執行緒消耗來源產生器，經有界佇列交給下游；佇列滿時生產端等待（backpressure），
+  記憶體上限由佇列大小決定，而不是 events 總數
+- batched()：把串流切成固定大小的批次（規則引擎逐批評估）
+- RecordWriter：逐筆寫出 JSON 陣列（內容與 json.dump(indent=2) 相同）與 NDJSON，commit() 時原子替換
+- read_records()：逐筆讀回 NDJSON；沒有 NDJSON 時退回讀取整個 JSON 陣列
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import metrics
+import tracing
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = 1000
+# 佇列已滿時生產端檢查下游是否已停止的間隔（秒）
+PUT_POLL = 0.1
+
+_DONE = object()
+
+
+def produce(source: Iterable, maxsize: int = BUFFER_SIZE, name: str = "producer",
+            metrics_section: Optional[str] = None) -> Iterator:
+    """
+    在背景執行緒逐筆消耗 source，經最多 maxsize 筆的佇列產生給呼叫端
+
+    呼叫時立即開始生產（生產端的 span 接在呼叫當下的 span 之下），呼叫端應逐筆取用到結束。
+    生產端的例外會在呼叫端重新拋出；呼叫端提前結束（break / close）時生產端隨之停止。
+    metrics_section 有值時記錄筆數、佇列最高水位與生產端被擋住的秒數。
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    state = {"error": None, "blocked": 0.0}
+
+    def put(item) -> bool:
+        try:
+            buffer.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        start = time.perf_counter()
+        try:
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=PUT_POLL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            state["blocked"] += time.perf_counter() - start
+
+    def work():
+        it = iter(source)
+        try:
+            for item in it:
+                if not put(item):
+                    return
+        except BaseException as e:
+            state["error"] = e
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+            put(_DONE)
+
+    def drain() -> Iterator:
+        count = peak = 0
+        try:
+            while True:
+                peak = max(peak, buffer.qsize())
+                item = buffer.get()
+                if item is _DONE:
+                    break
+                count += 1
+                yield item
+            if state["error"] is not None:
+                raise state["error"]
+        finally:
+            stop.set()
+            thread.join()
+            if metrics_section:
+                metrics.set_value(metrics_section, "records", count)
+                metrics.set_value(metrics_section, "buffer_size", maxsize)
+                metrics.set_value(metrics_section, "buffer_peak", peak)
+                metrics.set_value(metrics_section, "producer_blocked_seconds", round(state["blocked"], 3))
+
+    thread = threading.Thread(target=tracing.propagate(work), name=f"{name}-producer", daemon=True)
+    thread.start()
+    return drain()
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """依序切成最多 size 筆的批次（Python 3.12 的 itertools.batched，回傳 list）"""
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ndjson_path(path: Path) -> Path:
+    """JSON 陣列檔對應的 NDJSON 檔（events_sources.json → events_sources.ndjson）"""
+    return path.with_suffix(".ndjson")
+
+
+class RecordWriter:
+    """
+    逐筆寫出 JSON 陣列檔與同名的 NDJSON 檔
+
+    寫入時使用暫存檔，commit() 才原子替換正式檔案；未 commit 時（例如下游階段失敗）保留上一次的輸出。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.count = 0
+        self._tmp = path.with_name(f"{path.name}.tmp")
+        self._ndjson_tmp = ndjson_path(path).with_name(f"{ndjson_path(path).name}.tmp")
+        path.parent.mkdir(exist_ok=True, parents=True)
+        self._json = open(self._tmp, "w", encoding="utf-8")
+        self._ndjson = open(self._ndjson_tmp, "w", encoding="utf-8")
+        self._json.write("[")
+
+    def write(self, record: Dict):
+        # 與 json.dump(records, f, ensure_ascii=False, indent=2) 的排版相同（JSON 字串內不會有換行）
+        text = json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        self._json.write(f"{',' if self.count else ''}\n  {text}")
+        self._ndjson.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        self._ndjson.write("\n")
+        self.count += 1
+
+    def close(self):
+        if self._json.closed:
+            return
+        self._json.write("\n]" if self.count else "]")
+        self._json.close()
+        self._ndjson.close()
+
+    def commit(self):
+        """結束寫入並以暫存檔取代正式檔案（NDJSON 先、JSON 陣列後）"""
+        self.close()
+        os.replace(self._ndjson_tmp, ndjson_path(self.path))
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        """放棄本次寫入，刪除暫存檔"""
+        self.close()
+        for tmp in (self._tmp, self._ndjson_tmp):
+            tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+
+def read_records(path: Path) -> Iterator[Dict]:
+    """逐筆讀取 RecordWriter 寫出的資料；只有 JSON 陣列（例如舊版輸出）時整份載入後逐筆產生"""
+    ndjson = ndjson_path(path)
+    if ndjson.exists():
+        with open(ndjson, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
@@ -0,0 +1,237 @@
+"""
+輕量 span 追蹤
+以 contextvars 記錄巢狀 span（run → source → url → attempt / parse / extract、aggregate → rule → alert、通知器呼叫），
+每個 span 可附帶屬性（狀態碼、位元組數、卡片數、重試次數等），結束後匯出成 Chrome Trace Event 格式的 JSON，
+可直接用 Perfetto（ui.perfetto.dev）、chrome://tracing 或 speedscope 開啟，檢視關鍵路徑與拖慢整體的請求。
+
+未啟用（沒有 session）時 span() 回傳共用的 no-op 物件，不記錄任何資料。
+
+用法：
+    with tracing.session("pipeline", enabled):
+        with tracing.span("source", source=name) as s:
+            ...
+            s.set("events", len(events))
+"""
+import contextvars
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+TRACE_DIR = ROOT / "output" / "traces"
+# 單次執行最多記錄的 span 數，超過後丟棄（避免異常情況下 trace 檔無限成長）
+MAX_SPANS = 200_000
+
+
+def add_argument(parser):
+    """替腳本的 argparse 加上 --trace"""
+    parser.add_argument("--trace", action="store_true",
+                        help="記錄 span 追蹤，結果寫到 output/traces/（Chrome Trace 格式）")
+
+
+class Span:
+    """一段有開始與結束時間的工作；attrs 會出現在 trace viewer 的 args 欄位"""
+
+    __slots__ = ("name", "attrs", "span_id", "parent_id", "thread_id", "start_ns", "end_ns")
+
+    def __init__(self, name: str, attrs: Dict[str, Any], span_id: int, parent_id: Optional[int]):
+        self.name = name
+        self.attrs = attrs
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.thread_id = threading.get_ident()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+
+    def set(self, key: str, value: Any):
+        self.attrs[key] = value
+
+    def update(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _NoopSpan:
+    """未啟用追蹤時的 span：所有操作都不做事"""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def update(self, **attrs):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """收集已結束的 span 與瞬間事件（執行緒安全）"""
+
+    def __init__(self, max_spans: int = MAX_SPANS):
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.events: List[Dict] = []
+        self.dropped = 0
+        self.origin_ns = time.perf_counter_ns()
+        self.thread_names: Dict[int, str] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def _keep(self) -> bool:
+        if len(self.spans) + len(self.events) >= self.max_spans:
+            self.dropped += 1
+            return False
+        return True
+
+    def finish(self, span: Span):
+        with self._lock:
+            if self._keep():
+                self.spans.append(span)
+                self.thread_names.setdefault(span.thread_id, threading.current_thread().name)
+
+    def mark(self, name: str, parent: Optional[Span], attrs: Dict[str, Any]):
+        with self._lock:
+            if self._keep():
+                thread_id = threading.get_ident()
+                self.events.append({"name": name, "ts_ns": time.perf_counter_ns(), "thread_id": thread_id,
+                                    "parent_id": parent.span_id if parent else None, "attrs": attrs})
+                self.thread_names.setdefault(thread_id, threading.current_thread().name)
+
+    def to_chrome(self) -> Dict:
+        """Chrome Trace Event 格式：span 為 complete event（ph=X），mark 為 instant event（ph=i）"""
+        pid = os.getpid()
+        tids = {ident: n for n, ident in enumerate(sorted(self.thread_names), 1)}
+        events: List[Dict] = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tids[ident], "args": {"name": name}}
+            for ident, name in self.thread_names.items()
+        ]
+        for s in sorted(self.spans, key=lambda s: s.start_ns):
+            events.append({
+                "name": s.name, "cat": s.name.split(".")[0], "ph": "X", "pid": pid, "tid": tids[s.thread_id],
+                "ts": (s.start_ns - self.origin_ns) / 1000, "dur": ((s.end_ns or s.start_ns) - s.start_ns) / 1000,
+                "args": {**s.attrs, "span_id": s.span_id, "parent_id": s.parent_id},
+            })
+        for e in self.events:
+            events.append({
+                "name": e["name"], "cat": e["name"].split(".")[0], "ph": "i", "s": "t", "pid": pid,
+                "tid": tids[e["thread_id"]], "ts": (e["ts_ns"] - self.origin_ns) / 1000,
+                "args": {**e["attrs"], "parent_id": e["parent_id"]},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"dropped": self.dropped}}
+
+    def export(self, path: Path):
+        """原子寫出 trace JSON"""
+        path.parent.mkdir(exist_ok=True, parents=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome(), f, ensure_ascii=False, default=str)
+        os.replace(tmp, path)
+
+
+_tracer: Optional[Tracer] = None
+_current: contextvars.ContextVar = contextvars.ContextVar("tracing_span", default=None)
+
+
+class _ActiveSpan:
+    __slots__ = ("tracer", "span", "token")
+
+    def __init__(self, tracer: Tracer, name: str, attrs: Dict[str, Any]):
+        parent = _current.get()
+        self.tracer = tracer
+        self.span = Span(name, attrs, tracer.next_id(), parent.span_id if parent else None)
+        self.token = None
+
+    def __enter__(self) -> Span:
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.span.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        _current.reset(self.token)
+        self.tracer.finish(self.span)
+        return False
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **attrs):
+    """開始一個子 span（context manager，產出可 set 屬性的 span）"""
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return _ActiveSpan(tracer, name, attrs)
+
+
+def current():
+    """目前所在的 span；不在任何 span 內或未啟用時回傳 no-op span"""
+    return (_current.get() if _tracer is not None else None) or NOOP_SPAN
+
+
+def mark(name: str, **attrs):
+    """在目前的 span 下記錄一個瞬間事件（例如產生一個 alert）"""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.mark(name, _current.get(), attrs)
+
+
+def propagate(fn: Callable) -> Callable:
+    """
+    讓 fn 在其他執行緒中延續目前的 span（contextvars 不會自動傳入執行緒池）
+
+    未啟用時原樣回傳 fn。
+    """
+    if _tracer is None:
+        return fn
+    ctx = contextvars.copy_context()
+    # 每次呼叫各自複製一份，同一個函式可同時在多個執行緒執行
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+
+@contextmanager
+def session(name: str, enabled: bool = True, path: Optional[Path] = None) -> Iterator[Span]:
+    """
+    開始一次追蹤：建立根 span（run），結束時匯出到 path（預設 output/traces/<name>.trace.json）
+
+    enabled 為 False 或已在其他 session 中時只產出 no-op / 外層的 span。
+    """
+    global _tracer
+    if not enabled or _tracer is not None:
+        with span("run", script=name) as root:
+            yield root
+        return
+
+    tracer = _tracer = Tracer()
+    try:
+        with span("run", script=name) as root:
+            yield root
+    finally:
+        _tracer = None
+        path = path or TRACE_DIR / f"{name}.trace.json"
+        try:
+            tracer.export(path)
+            logger.info(f"追蹤結果已寫入 {path}（{len(tracer.spans)} 個 span"
+                        f"{f'，丟棄 {tracer.dropped} 個' if tracer.dropped else ''}）")
+        except Exception as e:
+            logger.error(f"寫出追蹤結果失敗: {e}")
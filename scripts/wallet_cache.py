@@ -0,0 +1,100 @@
+"""
+錢包查詢結果快取
+以 (chain, address) 為 key 保存上次查到的 nonce、餘額與當時的區塊高度，存在 output/cache/wallet_cache.json。
+
+check_wallets 先以廉價的探測（最新區塊高度、僅 nonce 的 batch 查詢）判斷錢包是否有變化，
+只對有變化或超過 TTL 的錢包重新做完整查詢，讓每次執行的 API 用量隨活躍錢包數成長，而非設定的錢包數。
+"""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_FILE = ROOT / "output" / "cache" / "wallet_cache.json"
+
+# 未在 chains.yml 設定 cache_ttl 時的預設值：超過此秒數即使 nonce 未變也重新查詢（更新餘額）
+DEFAULT_TTL = 6 * 3600
+# 超過此秒數未再確認的項目在保存時移除（例如已從 wallets.yml 刪除的錢包）
+MAX_ENTRY_AGE = 30 * 24 * 3600
+
+CACHE_VERSION = 1
+
+
+def cache_key(chain: str, address: str) -> str:
+    return f"{chain.lower()}:{address.lower()}"
+
+
+class WalletCache:
+    """
+    錢包結果快取
+
+    項目格式：{"tx_count", "balance_wei", "block", "checked_at"}；
+    checked_at 為上次完整查詢的時間，nonce 探測命中時只更新 block，不延長 TTL。
+    """
+
+    def __init__(self, path: Path = CACHE_FILE):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"讀取錢包快取失敗，將重新查詢所有錢包: {e}")
+            return
+        if data.get("version") != CACHE_VERSION:
+            logger.info("錢包快取格式已變更，捨棄舊快取")
+            return
+        self.entries = data.get("entries") or {}
+
+    def get(self, chain: str, address: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self.entries.get(cache_key(chain, address))
+            return dict(entry) if entry else None
+
+    def is_expired(self, entry: Dict, ttl: float, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return now - entry.get("checked_at", 0) >= ttl
+
+    def put(self, chain: str, address: str, tx_count: int, balance_wei: int, block: Optional[int]):
+        """記錄一次完整查詢的結果"""
+        with self._lock:
+            self.entries[cache_key(chain, address)] = {
+                "tx_count": tx_count,
+                "balance_wei": balance_wei,
+                "block": block,
+                "checked_at": time.time(),
+            }
+
+    def touch(self, chain: str, address: str, block: int):
+        """探測確認錢包沒有變化：更新觀察到的區塊高度（不延長 TTL）"""
+        with self._lock:
+            entry = self.entries.get(cache_key(chain, address))
+            if entry:
+                entry["block"] = block
+
+    def save(self):
+        """原子寫入快取檔，並移除過久未確認的項目"""
+        cutoff = time.time() - MAX_ENTRY_AGE
+        with self._lock:
+            self.entries = {k: v for k, v in self.entries.items() if v.get("checked_at", 0) >= cutoff}
+            data = {"version": CACHE_VERSION, "entries": self.entries}
+            try:
+                self.path.parent.mkdir(exist_ok=True, parents=True)
+                tmp = self.path.with_suffix(".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            except Exception as e:
+                logger.warning(f"寫入錢包快取失敗（不影響執行）: {e}")
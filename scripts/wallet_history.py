@@ -0,0 +1,351 @@
+"""
+錢包交易歷史增量同步
+透過區塊瀏覽器（Etherscan 相容 API 的 account/txlist）分頁讀取錢包送出的交易，
+以每個錢包的 checkpoint（已同步到的區塊）只抓新交易，並增量更新互動特徵：
+互動過的合約、使用的協議（config/protocols.yml）、活躍月份、跨鏈橋使用次數。
+
+特徵以彙總形式存在 output/cache/wallet_history.sqlite，不保存完整交易列表，
+每次執行的成本取決於新活動量，而非完整歷史長度。
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+DB_FILE = ROOT / "output" / "cache" / "wallet_history.sqlite"
+
+# txlist 單頁筆數；Etherscan 的 page * offset 上限為 10000，因此以區塊遊標分段而非翻頁
+PAGE_SIZE = 1000
+MAX_RETRIES = 3
+RETRY_DELAY = 2  # 秒
+# 未在 chains.yml 的 explorer.rps 設定時，每把 API key 每秒的請求數（免費方案上限約 5）
+DEFAULT_RPS = 4.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    last_block INTEGER NOT NULL,
+    nonce INTEGER,
+    tx_out INTEGER NOT NULL DEFAULT 0,
+    first_ts INTEGER,
+    last_ts INTEGER,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (chain, address)
+);
+CREATE TABLE IF NOT EXISTS contracts (
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    contract TEXT NOT NULL,
+    tx_count INTEGER NOT NULL,
+    first_ts INTEGER NOT NULL,
+    last_ts INTEGER NOT NULL,
+    PRIMARY KEY (chain, address, contract)
+);
+CREATE TABLE IF NOT EXISTS months (
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    month TEXT NOT NULL,
+    tx_count INTEGER NOT NULL,
+    PRIMARY KEY (chain, address, month)
+);
+"""
+
+
+class ExplorerError(Exception):
+    """區塊瀏覽器 API 請求失敗"""
+
+
+class ExplorerClient:
+    """
+    Etherscan 相容的區塊瀏覽器 API（V2 以 chainid 參數區分鏈，同一把 API key 可查多條鏈）
+
+    chains.yml 的 explorer 設定：api、chain_id、api_key（可用 ${ENV_VAR}）、rps（每秒請求數）
+    """
+
+    def __init__(self, api: str, api_key: str, chain_id: Optional[int] = None, rps: float = DEFAULT_RPS,
+                 session=None):
+        import requests
+
+        self.api = api
+        self.api_key = api_key
+        self.chain_id = chain_id
+        self.min_interval = 1.0 / rps if rps > 0 else 0.0
+        self.session = session or requests.Session()
+        self.requests = 0
+        self._last_request = 0.0
+
+    def _get(self, params: Dict) -> List[Dict]:
+        import requests
+
+        if self.chain_id is not None:
+            params = {"chainid": self.chain_id, **params}
+        params = {**params, "apikey": self.api_key}
+        for attempt in range(MAX_RETRIES):
+            wait = self.min_interval - (time.monotonic() - self._last_request)
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.monotonic()
+            self.requests += 1
+            try:
+                resp = self.session.get(self.api, params=params, timeout=30)
+                resp.raise_for_status()
+                data = resp.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.warning(f"區塊瀏覽器 API 請求失敗 (嘗試 {attempt + 1}/{MAX_RETRIES}): {e}")
+                if attempt < MAX_RETRIES - 1:
+                    time.sleep(RETRY_DELAY * (attempt + 1))
+                continue
+
+            result = data.get("result")
+            if data.get("status") == "1" and isinstance(result, list):
+                return result
+            # 沒有交易時 status 為 0、message 為 "No transactions found"
+            if isinstance(result, list) and not result:
+                return []
+            message = result if isinstance(result, str) else data.get("message", "Unknown error")
+            if "rate limit" in str(message).lower() and attempt < MAX_RETRIES - 1:
+                time.sleep(RETRY_DELAY * (attempt + 1))
+                continue
+            raise ExplorerError(f"區塊瀏覽器 API 回應錯誤: {message}")
+        raise ExplorerError("區塊瀏覽器 API 重試次數用盡")
+
+    def iter_transactions(self, address: str, start_block: int) -> Iterator[Tuple[List[Dict], int]]:
+        """
+        依區塊遞增逐頁產生 address 自 start_block 起的交易
+
+        Yields:
+            (交易列表, 已完整同步到的區塊)
+
+        滿頁時最後一個區塊的交易可能不完整，先保留不產生，下一頁以該區塊為 startblock 重新取得，
+        因此每筆交易只會產生一次，也不受 page * offset 的 10000 筆上限限制。
+        """
+        cursor = start_block
+        while True:
+            page = self._get({
+                "module": "account",
+                "action": "txlist",
+                "address": address,
+                "startblock": cursor,
+                "endblock": 99999999,
+                "page": 1,
+                "offset": PAGE_SIZE,
+                "sort": "asc",
+            })
+            if not page:
+                return
+            last_block = int(page[-1]["blockNumber"])
+            if len(page) < PAGE_SIZE:
+                yield page, last_block
+                return
+            if last_block == cursor:
+                # 單一區塊內超過一頁的交易（極少見），無法再以區塊分段，跳到下一個區塊
+                logger.warning(f"{address} 在區塊 {cursor} 的交易超過 {PAGE_SIZE} 筆，部分交易未同步")
+                yield page, cursor
+                cursor += 1
+                continue
+            yield [tx for tx in page if int(tx["blockNumber"]) < last_block], last_block - 1
+            cursor = last_block
+
+
+def _month(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m")
+
+
+class HistoryStore:
+    """錢包交易特徵的 sqlite 儲存（checkpoint 與彙總同一個 transaction 內更新）"""
+
+    def __init__(self, path: Path = DB_FILE):
+        path.parent.mkdir(exist_ok=True, parents=True)
+        self.path = path
+        # 多個分片行程可能同時寫入，等待鎖而非立即失敗
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._conn.close()
+
+    def checkpoint(self, chain: str, address: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_block, nonce FROM checkpoints WHERE chain = ? AND address = ?",
+                (chain, address.lower()),
+            ).fetchone()
+        return {"last_block": row[0], "nonce": row[1]} if row else None
+
+    def apply(self, chain: str, address: str, txs: List[Dict], last_block: int, nonce: Optional[int] = None):
+        """
+        把一頁交易併入彙總並推進 checkpoint
+
+        只計入由錢包送出、且帶有 calldata 的交易為合約互動；所有送出的交易都計入活躍月份。
+        """
+        address = address.lower()
+        outgoing = [tx for tx in txs if str(tx.get("from", "")).lower() == address and tx.get("isError") != "1"]
+        contract_updates: Dict[str, List[int]] = {}
+        month_updates: Dict[str, int] = {}
+        for tx in outgoing:
+            ts = int(tx.get("timeStamp") or 0)
+            month_updates[_month(ts)] = month_updates.get(_month(ts), 0) + 1
+            to = str(tx.get("to") or "").lower()
+            if to and tx.get("input", "0x") not in ("", "0x"):
+                agg = contract_updates.setdefault(to, [0, ts, ts])
+                agg[0] += 1
+                agg[1], agg[2] = min(agg[1], ts), max(agg[2], ts)
+        timestamps = [int(tx.get("timeStamp") or 0) for tx in outgoing]
+        now = int(time.time())
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """INSERT INTO contracts (chain, address, contract, tx_count, first_ts, last_ts)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (chain, address, contract) DO UPDATE SET
+                       tx_count = tx_count + excluded.tx_count,
+                       first_ts = MIN(first_ts, excluded.first_ts),
+                       last_ts = MAX(last_ts, excluded.last_ts)""",
+                [(chain, address, c, n, first, last) for c, (n, first, last) in contract_updates.items()],
+            )
+            self._conn.executemany(
+                """INSERT INTO months (chain, address, month, tx_count) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (chain, address, month) DO UPDATE SET tx_count = tx_count + excluded.tx_count""",
+                [(chain, address, m, n) for m, n in month_updates.items()],
+            )
+            self._conn.execute(
+                """INSERT INTO checkpoints (chain, address, last_block, nonce, tx_out, first_ts, last_ts, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (chain, address) DO UPDATE SET
+                       last_block = MAX(last_block, excluded.last_block),
+                       nonce = COALESCE(excluded.nonce, nonce),
+                       tx_out = tx_out + excluded.tx_out,
+                       first_ts = COALESCE(MIN(first_ts, excluded.first_ts), first_ts, excluded.first_ts),
+                       last_ts = COALESCE(MAX(last_ts, excluded.last_ts), last_ts, excluded.last_ts),
+                       updated_at = excluded.updated_at""",
+                (chain, address, last_block, nonce, len(outgoing),
+                 min(timestamps) if timestamps else None, max(timestamps) if timestamps else None, now),
+            )
+
+    def features(self, chain: str, address: str, protocols_by_contract: Optional[Dict[str, Dict]] = None) -> Dict:
+        """
+        計算錢包的互動特徵
+
+        protocols_by_contract：合約地址 → {"protocol", "category"}（來自 protocols.yml 的索引）；
+        協議對應在讀取時套用，修改 protocols.yml 不需要重新同步歷史。
+        """
+        address = address.lower()
+        protocols_by_contract = protocols_by_contract or {}
+        with self._lock:
+            contracts = self._conn.execute(
+                "SELECT contract, tx_count FROM contracts WHERE chain = ? AND address = ?", (chain, address)
+            ).fetchall()
+            active_months = self._conn.execute(
+                "SELECT COUNT(*) FROM months WHERE chain = ? AND address = ?", (chain, address)
+            ).fetchone()[0]
+            row = self._conn.execute(
+                "SELECT tx_out, first_ts, last_ts FROM checkpoints WHERE chain = ? AND address = ?", (chain, address)
+            ).fetchone()
+
+        protocols = set()
+        bridge_tx = 0
+        for contract, tx_count in contracts:
+            proto = protocols_by_contract.get(contract)
+            if not proto:
+                continue
+            protocols.add(proto["protocol"])
+            if proto["category"] == "bridge":
+                bridge_tx += tx_count
+        tx_out, first_ts, last_ts = row if row else (0, None, None)
+        return {
+            "tx_out": tx_out,
+            "unique_contracts": len(contracts),
+            "protocols": sorted(protocols),
+            "active_months": active_months,
+            "bridge_tx": bridge_tx,
+            "first_tx_at": datetime.fromtimestamp(first_ts, tz=timezone.utc).isoformat() if first_ts else None,
+            "last_tx_at": datetime.fromtimestamp(last_ts, tz=timezone.utc).isoformat() if last_ts else None,
+        }
+
+
+def build_explorer_client(chain_cfg: Dict, rate_share: float = 1.0) -> Optional[ExplorerClient]:
+    """
+    依 chains.yml 的 explorer 設定建立客戶端（展開 api_key 中的 ${ENV_VAR}）
+
+    rate_share 為此行程可使用的額度比例（多個分片共用同一把 key 時小於 1）。
+    未設定 explorer 或缺少 API key 時回傳 None。
+    """
+    explorer = chain_cfg.get("explorer")
+    if not explorer:
+        return None
+    api_key = os.path.expandvars(explorer.get("api_key", ""))
+    if not api_key or "$" in api_key:
+        return None
+    rps = float(explorer.get("rps", DEFAULT_RPS)) * rate_share
+    return ExplorerClient(explorer["api"], api_key, explorer.get("chain_id"), rps=rps)
+
+
+def sync_wallet(store: HistoryStore, client: ExplorerClient, chain: str, address: str,
+                nonce: Optional[int] = None) -> int:
+    """
+    增量同步單一錢包，回傳新同步的交易數
+
+    nonce 與上次同步時相同代表錢包沒有送出新交易，直接略過（不發出任何請求）。
+    每頁交易與 checkpoint 在同一個 transaction 內寫入，中斷時下次從 checkpoint 繼續。
+    """
+    cp = store.checkpoint(chain, address)
+    if cp and nonce is not None and cp["nonce"] == nonce:
+        metrics.incr("wallet_history", "skipped_unchanged")
+        return 0
+
+    last_block = cp["last_block"] if cp else -1
+    synced = 0
+    for txs, synced_through in client.iter_transactions(address, last_block + 1):
+        store.apply(chain, address, txs, synced_through)
+        last_block = synced_through
+        synced += len(txs)
+    # 同步到最新後才記錄 nonce
+    store.apply(chain, address, [], max(last_block, 0), nonce=nonce)
+    metrics.incr("wallet_history", "synced_tx", synced)
+    return synced
+
+
+def sync_wallets(reports: List[Dict], chains: Dict, protocols_index: Dict[str, Dict[str, Dict]],
+                 path: Path = DB_FILE, rate_shares: Optional[Dict[str, float]] = None) -> None:
+    """
+    同步 reports 中所有錢包的交易歷史，並把特徵寫入各 report 的 history 欄位
+
+    只處理 chains.yml 設有 explorer 且 API key 可用的鏈；單一錢包失敗不影響其他錢包。
+    rate_shares 為各鏈可使用的 API 額度比例（分片執行時使用）。
+    """
+    store = HistoryStore(path)
+    clients: Dict[str, Optional[ExplorerClient]] = {}
+    try:
+        for report in reports:
+            chain, address = report.get("chain", ""), report.get("address", "")
+            if not address or "error" in report:
+                continue
+            if chain not in clients:
+                clients[chain] = build_explorer_client(chains.get(chain, {}), (rate_shares or {}).get(chain, 1.0))
+            client = clients[chain]
+            if client is None:
+                continue
+            try:
+                synced = sync_wallet(store, client, chain, address, nonce=report.get("tx_count"))
+                if synced:
+                    logger.info(f"錢包 {report.get('name')} 同步 {synced} 筆新交易")
+            except ExplorerError as e:
+                logger.warning(f"錢包 {report.get('name')} 交易歷史同步失敗，沿用已同步的部分: {e}")
+                metrics.incr("wallet_history", "errors")
+            report["history"] = store.features(chain, address, protocols_index.get(chain))
+        for client in clients.values():
+            if client is not None:
+                metrics.incr("wallet_history", "explorer_requests", client.requests)
+    finally:
+        store.close()
@@ -0,0 +1,159 @@
+"""
+錢包分片
+依地址的穩定雜湊把 wallets.yml 分成 N 個分片，讓多個 workflow matrix job 或本機行程各自查詢一部分錢包，
+每個分片寫出部分報告到 output/shards/，最後由合併步驟依 wallets.yml 的順序產生 wallets_report.json。
+
+分片專用的環境變數以 `_SHARD_<i>` 結尾（例如 ETHERSCAN_API_KEY_SHARD_0），
+執行該分片時會覆蓋同名但不含後綴的變數，讓各分片使用各自的 API key 與額度。
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+SHARDS_DIR = ROOT / "output" / "shards"
+
+SHARD_ENV_SUFFIX = "_SHARD_{}"
+_ENV_REF = re.compile(r"\$\{?(\w+)\}?")
+
+
+class ShardError(Exception):
+    """分片參數錯誤或部分報告不完整"""
+
+
+def shard_of(wallet: Dict, num_shards: int) -> int:
+    """
+    錢包所屬的分片
+
+    以小寫地址（沒有地址時用名稱）的 SHA-256 決定，與執行順序、Python hash seed 無關；
+    同一地址在不同鏈上會落在同一分片，共用該分片的快取與 API key。
+    """
+    key = (wallet.get("address") or wallet.get("name") or "").lower()
+    return int(hashlib.sha256(key.encode("utf-8")).hexdigest()[:16], 16) % num_shards
+
+
+def select_shard(wallets: List[Dict], shard: int, num_shards: int) -> List[Dict]:
+    """取出屬於 shard 的錢包（維持原順序）"""
+    if num_shards < 1 or not 0 <= shard < num_shards:
+        raise ShardError(f"分片參數錯誤: shard={shard}, num_shards={num_shards}")
+    return [w for w in wallets if shard_of(w, num_shards) == shard]
+
+
+def apply_shard_env(shard: int) -> Set[str]:
+    """以 `<NAME>_SHARD_<i>` 覆蓋 `<NAME>`，回傳被覆蓋的變數名稱"""
+    suffix = SHARD_ENV_SUFFIX.format(shard)
+    overridden = set()
+    for key, value in list(os.environ.items()):
+        if key.endswith(suffix) and len(key) > len(suffix):
+            base = key[:-len(suffix)]
+            os.environ[base] = value
+            overridden.add(base)
+    if overridden:
+        logger.info(f"分片 {shard} 使用專用環境變數: {', '.join(sorted(overridden))}")
+    return overridden
+
+
+def rate_share(template: str, overridden: Set[str], num_shards: int) -> float:
+    """
+    分片可使用的 API 額度比例
+
+    template 引用的環境變數（例如 explorer.api_key 的 ${ETHERSCAN_API_KEY}）都有分片專用值時可用完整額度，
+    否則與其他分片共用同一把 key，額度平均分配。
+    """
+    refs = set(_ENV_REF.findall(template or ""))
+    if refs and refs <= overridden:
+        return 1.0
+    return 1.0 / num_shards
+
+
+def shard_report_path(shard: int, num_shards: int, shards_dir: Path = SHARDS_DIR) -> Path:
+    return shards_dir / f"wallets_report.shard-{shard}-of-{num_shards}.json"
+
+
+def write_shard_report(reports: List[Dict], shard: int, num_shards: int, metrics_snapshot: Optional[Dict] = None,
+                       shards_dir: Path = SHARDS_DIR) -> Path:
+    """原子寫出單一分片的部分報告（含該分片的指標，合併時加總）"""
+    path = shard_report_path(shard, num_shards, shards_dir)
+    path.parent.mkdir(exist_ok=True, parents=True)
+    data = {
+        "shard": shard,
+        "num_shards": num_shards,
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "wallets": reports,
+        "metrics": metrics_snapshot or {},
+    }
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    logger.info(f"分片 {shard}/{num_shards} 寫出 {len(reports)} 個錢包報告到 {path}")
+    return path
+
+
+def _wallet_key(w: Dict) -> tuple:
+    return (str(w.get("chain", "")).lower(), str(w.get("address", "")).lower(), w.get("name", ""))
+
+
+def merge_shard_reports(wallets: List[Dict], num_shards: Optional[int] = None, allow_partial: bool = False,
+                        shards_dir: Path = SHARDS_DIR) -> Dict:
+    """
+    合併所有分片的部分報告
+
+    輸出順序依 wallets.yml（不在設定中的錢包依 chain / address 排序接在後面），
+    與分片數、分片完成順序無關；同一組分片重複合併會得到相同結果。
+
+    Returns:
+        {"wallets": [...], "metrics": {...}, "shards": [...]}
+
+    Raises:
+        ShardError: 找不到部分報告、分片數不一致，或缺少分片（allow_partial 為 False 時）
+    """
+    files = sorted(shards_dir.glob("wallets_report.shard-*-of-*.json"))
+    partials = []
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if num_shards is None or data.get("num_shards") == num_shards:
+            partials.append(data)
+    if not partials:
+        raise ShardError(f"{shards_dir} 中沒有分片報告")
+
+    counts = {p["num_shards"] for p in partials}
+    if len(counts) > 1:
+        raise ShardError(f"分片報告的分片數不一致: {sorted(counts)}（請指定 --num-shards）")
+    total = counts.pop()
+    present = {p["shard"] for p in partials}
+    missing = sorted(set(range(total)) - present)
+    if missing:
+        message = f"缺少分片: {missing}（共 {total} 個）"
+        if not allow_partial:
+            raise ShardError(message)
+        logger.warning(message)
+
+    by_key: Dict[tuple, Dict] = {}
+    merged_metrics: Dict[str, Dict] = {}
+    for p in sorted(partials, key=lambda p: p["shard"]):
+        for report in p.get("wallets", []):
+            by_key[_wallet_key(report)] = report
+        for section, values in (p.get("metrics") or {}).items():
+            bucket = merged_metrics.setdefault(section, {})
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    bucket[key] = bucket.get(key, 0) + value
+                else:
+                    bucket[key] = value
+
+    ordered = []
+    for w in wallets:
+        report = by_key.pop(_wallet_key(w), None)
+        if report is not None:
+            ordered.append(report)
+    ordered.extend(by_key[k] for k in sorted(by_key))
+    return {"wallets": ordered, "metrics": merged_metrics, "shards": sorted(present), "num_shards": total}
@@ -3,108 +3,65 @@
 import { useEffect, useState } from 'react'
 import { motion } from 'framer-motion'
 import AirdropList from '@/components/AirdropList'
-import StatsPanel from '@/components/StatsPanel'
+import StatsPanel, { EMPTY_STATS, PipelineStats } from '@/components/StatsPanel'
 import Header from '@/components/Header'
 import LoadingScreen from '@/components/LoadingScreen'
+import { BundleManifest, fetchManifest, loadFile, sameManifest } from '@/lib/bundle'
 import './globals.css'
 
-interface AirdropEvent {
-  token: string | null
-  project: string
-  campaign_name: string
-  source: string
-  status: 'active' | 'upcoming' | 'ended' | 'potential'
-  type: string
-  reward_type: string
-  est_value_usd: number | null
-  deadline: string | null
-  requirements: string[]
-  links: {
-    details: string
-  }
-}
-
-interface WalletReport {
-  name: string
-  chain: string
-  address: string
-  tx_count: number
-  has_defi_activity: boolean
-}
-
+// bundle 中的 alert 只保留網站用到的欄位（publish_bundle.ALERT_FIELDS），以指紋為鍵
 interface Alert {
-  id: string
   type: string
   priority: 'high' | 'medium' | 'low'
   project: string
-  message: string
-  links: Record<string, string>
+  token?: string
+  status?: string
+  links?: Record<string, string>
 }
 
 export default function Home() {
-  const [events, setEvents] = useState<AirdropEvent[]>([])
-  const [wallets, setWallets] = useState<WalletReport[]>([])
+  const [manifest, setManifest] = useState<BundleManifest | null>(null)
   const [alerts, setAlerts] = useState<Alert[]>([])
+  const [stats, setStats] = useState<PipelineStats>(EMPTY_STATS)
   const [loading, setLoading] = useState(true)
   const [lastUpdate, setLastUpdate] = useState<string>('')
 
   useEffect(() => {
     loadData()
-    // 每 5 分鐘自動刷新
+    // 每 5 分鐘自動刷新（只讀取 head.json，有新版本時下載 patch）
     const interval = setInterval(loadData, 5 * 60 * 1000)
     return () => clearInterval(interval)
   }, [])
 
   const loadData = async () => {
     try {
-      const [eventsRes, walletsRes, alertsRes] = await Promise.all([
-        fetch('/data/events_sources.json').catch(() => ({ ok: false } as Response)),
-        fetch('/data/wallets_report.json').catch(() => ({ ok: false } as Response)),
-        fetch('/data/alerts.json').catch(() => ({ ok: false } as Response)),
-      ])
-
-      if (eventsRes.ok) {
-        try {
-          const eventsData = await eventsRes.json()
-          setEvents(Array.isArray(eventsData) ? eventsData : [])
-        } catch (e) {
-          console.error('解析 events_sources.json 失敗:', e)
-          setEvents([])
-        }
-      } else {
-        setEvents([])
-      }
-
-      if (walletsRes?.ok) {
-        try {
-          const walletsData = await walletsRes.json()
-          setWallets(Array.isArray(walletsData) ? walletsData : [])
-        } catch (e) {
-          console.error('解析 wallets_report.json 失敗:', e)
-          setWallets([])
-        }
-      } else {
-        setWallets([])
-      }
-
-      if (alertsRes?.ok) {
-        try {
-          const alertsData = await alertsRes.json()
-          setAlerts(Array.isArray(alertsData) ? alertsData : [])
-        } catch (e) {
-          console.error('解析 alerts.json 失敗:', e)
-          setAlerts([])
-        }
-      } else {
+      const next = await fetchManifest()
+      if (!next) {
+        setManifest(null)
         setAlerts([])
+        setStats(EMPTY_STATS)
+        return
       }
-
+      const [alertsData, statsData] = await Promise.all([
+        loadFile<Record<string, Alert>>(next.alerts).catch((e) => {
+          console.error('載入 alerts 失敗:', e)
+          return {}
+        }),
+        loadFile<PipelineStats>(next.stats).catch((e) => {
+          console.error('載入 stats 失敗:', e)
+          return EMPTY_STATS
+        }),
+      ])
+      setAlerts(alertsData && typeof alertsData === 'object' ? Object.values(alertsData) : [])
+      setStats(statsData?.events ? statsData : EMPTY_STATS)
+      // 內容沒變時沿用同一個物件，列表不重新載入
+      setManifest((prev) => (sameManifest(prev, next) ? prev : next))
       setLastUpdate(new Date().toLocaleString('zh-TW'))
     } catch (error) {
       console.error('載入數據失敗:', error)
-      setEvents([])
-      setWallets([])
+      setManifest(null)
       setAlerts([])
+      setStats(EMPTY_STATS)
     } finally {
       setLoading(false)
     }
@@ -128,7 +85,7 @@ export default function Home() {
           animate={{ opacity: 1, y: 0 }}
           transition={{ duration: 0.5 }}
         >
-          <StatsPanel events={events} wallets={wallets} alerts={alerts} />
+          <StatsPanel stats={stats} />
         </motion.div>
 
         <motion.div
@@ -136,7 +93,7 @@ export default function Home() {
           animate={{ opacity: 1, y: 0 }}
           transition={{ duration: 0.5, delay: 0.2 }}
         >
-          <AirdropList events={events} alerts={alerts} />
+          <AirdropList manifest={manifest} alerts={alerts} />
         </motion.div>
       </main>
 
@@ -1,8 +1,9 @@
 'use client'
 
-import { useState } from 'react'
+import { useEffect, useMemo, useState } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import AirdropCard from './AirdropCard'
+import { BundleManifest, loadFiles } from '@/lib/bundle'
 
 interface AirdropEvent {
   token: string | null
@@ -26,20 +27,46 @@ interface Alert {
 }
 
 interface AirdropListProps {
-  events: AirdropEvent[]
+  manifest: BundleManifest | null
   alerts: Alert[]
 }
 
-export default function AirdropList({ events, alerts }: AirdropListProps) {
-  const [filter, setFilter] = useState<'all' | 'active' | 'upcoming' | 'ended' | 'potential'>('all')
+type StatusFilter = 'all' | 'active' | 'upcoming' | 'ended' | 'potential'
+
+export default function AirdropList({ manifest, alerts }: AirdropListProps) {
+  const [filter, setFilter] = useState<StatusFilter>('all')
   const [sortBy, setSortBy] = useState<'name' | 'status' | 'source'>('name')
+  // 每個 (狀態, 來源) 分組目前載入的頁數；LOAD MORE 時加一
+  const [pagesShown, setPagesShown] = useState(1)
+  const [events, setEvents] = useState<AirdropEvent[]>([])
 
-  const filteredEvents = events.filter(event => {
-    if (filter === 'all') return true
-    return event.status === filter
-  })
+  // events 已在 bundle 中依狀態分組，只下載目前篩選條件需要的頁面
+  const groups = useMemo(
+    () => (manifest?.events.groups ?? []).filter(group => filter === 'all' || group.status === filter),
+    [manifest, filter]
+  )
+  const total = groups.reduce((sum, group) => sum + group.count, 0)
+  const hasMore = groups.some(group => group.pages.length > pagesShown)
 
-  const sortedEvents = [...filteredEvents].sort((a, b) => {
+  useEffect(() => {
+    let cancelled = false
+    // 每頁為指紋 → event（publish_bundle.paginate），頁內已依專案名稱排序
+    loadFiles<Record<string, AirdropEvent>>(groups.flatMap(group => group.pages.slice(0, pagesShown)))
+      .then(pages => {
+        if (!cancelled) setEvents(pages.flatMap(page => Object.values(page)))
+      })
+      .catch(e => console.error('載入 events 失敗:', e))
+    return () => {
+      cancelled = true
+    }
+  }, [groups, pagesShown])
+
+  const selectFilter = (status: StatusFilter) => {
+    setFilter(status)
+    setPagesShown(1)
+  }
+
+  const sortedEvents = [...events].sort((a, b) => {
     switch (sortBy) {
       case 'name':
         return a.project.localeCompare(b.project)
@@ -52,23 +79,26 @@ export default function AirdropList({ events, alerts }: AirdropListProps) {
     }
   })
 
-  const getAlertPriority = (project: string): 'high' | 'medium' | 'low' | null => {
-    const alert = alerts.find(a => a.project === project)
-    return alert?.priority || null
-  }
+  const alertPriority = useMemo(() => {
+    const byProject = new Map<string, Alert['priority']>()
+    alerts.forEach(a => {
+      if (!byProject.has(a.project)) byProject.set(a.project, a.priority)
+    })
+    return byProject
+  }, [alerts])
 
   return (
     <div className="pixel-border bg-[var(--bg-secondary)] p-6">
       <div className="flex flex-col md:flex-row justify-between items-center mb-6 gap-4">
         <h2 className="text-2xl pixel-text text-[var(--pixel-white)]">
-          🎯 AIRDROP LIST ({sortedEvents.length})
+          🎯 AIRDROP LIST ({sortedEvents.length < total ? `${sortedEvents.length}/${total}` : total})
         </h2>
         
         <div className="flex flex-wrap gap-2">
           {(['all', 'active', 'upcoming', 'ended', 'potential'] as const).map(status => (
             <button
               key={status}
-              onClick={() => setFilter(status)}
+              onClick={() => selectFilter(status)}
               className={`pixel-button text-xs ${
                 filter === status ? 'bg-[var(--pixel-yellow)]' : ''
               }`}
@@ -97,17 +127,25 @@ export default function AirdropList({ events, alerts }: AirdropListProps) {
               initial={{ opacity: 0, y: 20 }}
               animate={{ opacity: 1, y: 0 }}
               exit={{ opacity: 0, scale: 0.8 }}
-              transition={{ delay: index * 0.05 }}
+              transition={{ delay: Math.min(index, 20) * 0.05 }}
             >
               <AirdropCard
                 event={event}
-                alertPriority={getAlertPriority(event.project)}
+                alertPriority={alertPriority.get(event.project) || null}
               />
             </motion.div>
           ))}
         </AnimatePresence>
       </div>
 
+      {hasMore && (
+        <div className="text-center mt-6">
+          <button onClick={() => setPagesShown(n => n + 1)} className="pixel-button text-xs">
+            LOAD MORE
+          </button>
+        </div>
+      )}
+
       {sortedEvents.length === 0 && (
         <div className="text-center py-12">
           <p className="text-xl text-[var(--pixel-gray)] pixel-text">
@@ -2,51 +2,67 @@
 
 import { motion } from 'framer-motion'
 
-interface AirdropEvent {
-  status: 'active' | 'upcoming' | 'ended' | 'potential'
-  source: string
+export interface PipelineStats {
+  generated_at?: string
+  events: {
+    total: number
+    by_status: Record<string, number>
+    by_source: Record<string, number>
+    top_active: string[]
+    top_upcoming: string[]
+  }
+  wallets: {
+    total: number
+    with_defi_activity: number
+    total_tx: number
+    by_chain: Record<string, number>
+  }
+  alerts: {
+    total: number
+    by_priority: Record<string, number>
+  }
 }
 
-interface WalletReport {
-  has_defi_activity: boolean
+export const EMPTY_STATS: PipelineStats = {
+  events: { total: 0, by_status: {}, by_source: {}, top_active: [], top_upcoming: [] },
+  wallets: { total: 0, with_defi_activity: 0, total_tx: 0, by_chain: {} },
+  alerts: { total: 0, by_priority: {} },
 }
 
-interface Alert {
-  priority: 'high' | 'medium' | 'low'
+// 已知來源的顯示名稱，未列出的來源直接顯示 key
+const SOURCE_LABELS: Record<string, string> = {
+  airdrops_io: 'Airdrops.io',
+  cmc_airdrops: 'CoinMarketCap',
+  icomarks_airdrops: 'ICOMarks',
+  altcointrading_airdrops: 'AltcoinTrading',
+  airdrop_checklist: 'Airdrop Checklist',
+  airdropsalert: 'AirdropsAlert',
 }
 
+const SOURCE_COLORS = [
+  'var(--pixel-green)',
+  'var(--pixel-cyan)',
+  'var(--pixel-yellow)',
+  'var(--pixel-purple)',
+]
+
 interface StatsPanelProps {
-  events: AirdropEvent[]
-  wallets: WalletReport[]
-  alerts: Alert[]
+  stats: PipelineStats
 }
 
-export default function StatsPanel({ events, wallets, alerts }: StatsPanelProps) {
-  const stats = {
-    total: events.length,
-    active: events.filter(e => e.status === 'active').length,
-    upcoming: events.filter(e => e.status === 'upcoming').length,
-    ended: events.filter(e => e.status === 'ended').length,
-    potential: events.filter(e => e.status === 'potential').length,
-    sources: {
-      airdrops_io: events.filter(e => e.source === 'airdrops_io').length,
-      cmc: events.filter(e => e.source === 'cmc_airdrops').length,
-      icomarks: events.filter(e => e.source === 'icomarks_airdrops').length,
-      altcoin: events.filter(e => e.source === 'altcointrading_airdrops').length,
-    },
-    wallets: wallets.length,
-    walletsWithActivity: wallets.filter(w => w.has_defi_activity).length,
-    alerts: alerts.length,
-    highAlerts: alerts.filter(a => a.priority === 'high').length,
-  }
+export default function StatsPanel({ stats }: StatsPanelProps) {
+  const byStatus = stats.events.by_status
+  const byPriority = stats.alerts.by_priority
 
   const statItems = [
-    { label: 'TOTAL EVENTS', value: stats.total, color: 'var(--pixel-cyan)' },
-    { label: 'ACTIVE', value: stats.active, color: 'var(--pixel-green)' },
-    { label: 'UPCOMING', value: stats.upcoming, color: 'var(--pixel-yellow)' },
-    { label: 'ALERTS', value: stats.alerts, color: 'var(--pixel-red)' },
+    { label: 'TOTAL EVENTS', value: stats.events.total, color: 'var(--pixel-cyan)' },
+    { label: 'ACTIVE', value: byStatus.active ?? 0, color: 'var(--pixel-green)' },
+    { label: 'UPCOMING', value: byStatus.upcoming ?? 0, color: 'var(--pixel-yellow)' },
+    { label: 'ALERTS', value: stats.alerts.total, color: 'var(--pixel-red)' },
   ]
 
+  const sourceItems = Object.entries(stats.events.by_source)
+
   return (
     <div className="pixel-border bg-[var(--bg-secondary)] p-6 mb-8">
       <h2 className="text-2xl mb-6 pixel-text text-[var(--pixel-white)] text-center">
@@ -76,44 +92,38 @@ export default function StatsPanel({ events, wallets, alerts }: StatsPanelProps)
       <div className="grid grid-cols-2 md:grid-cols-4 gap-4 text-xs">
         <div className="pixel-card">
           <div className="opacity-70 mb-1">ENDED</div>
-          <div className="text-xl status-ended">{stats.ended}</div>
+          <div className="text-xl status-ended">{byStatus.ended ?? 0}</div>
         </div>
         <div className="pixel-card">
           <div className="opacity-70 mb-1">POTENTIAL</div>
-          <div className="text-xl status-potential">{stats.potential}</div>
+          <div className="text-xl status-potential">{byStatus.potential ?? 0}</div>
         </div>
         <div className="pixel-card">
           <div className="opacity-70 mb-1">WALLETS</div>
-          <div className="text-xl text-[var(--pixel-cyan)]">{stats.wallets}</div>
+          <div className="text-xl text-[var(--pixel-cyan)]">{stats.wallets.total}</div>
         </div>
         <div className="pixel-card">
           <div className="opacity-70 mb-1">HIGH PRIORITY</div>
-          <div className="text-xl text-[var(--pixel-red)]">{stats.highAlerts}</div>
+          <div className="text-xl text-[var(--pixel-red)]">{byPriority.high ?? 0}</div>
         </div>
       </div>
 
       <div className="mt-6 pt-6 border-t-2 border-[var(--pixel-white)]">
         <h3 className="text-sm mb-4 text-center opacity-70">BY SOURCE</h3>
         <div className="grid grid-cols-2 md:grid-cols-4 gap-4 text-xs">
-          <div className="pixel-card text-center">
-            <div className="opacity-70 mb-1">Airdrops.io</div>
-            <div className="text-lg text-[var(--pixel-green)]">{stats.sources.airdrops_io}</div>
-          </div>
-          <div className="pixel-card text-center">
-            <div className="opacity-70 mb-1">CoinMarketCap</div>
-            <div className="text-lg text-[var(--pixel-cyan)]">{stats.sources.cmc}</div>
-          </div>
-          <div className="pixel-card text-center">
-            <div className="opacity-70 mb-1">ICOMarks</div>
-            <div className="text-lg text-[var(--pixel-yellow)]">{stats.sources.icomarks}</div>
-          </div>
-          <div className="pixel-card text-center">
-            <div className="opacity-70 mb-1">AltcoinTrading</div>
-            <div className="text-lg text-[var(--pixel-purple)]">{stats.sources.altcoin}</div>
-          </div>
+          {sourceItems.map(([source, count], index) => (
+            <div key={source} className="pixel-card text-center">
+              <div className="opacity-70 mb-1">{SOURCE_LABELS[source] ?? source}</div>
+              <div
+                className="text-lg"
+                style={{ color: SOURCE_COLORS[index % SOURCE_COLORS.length] }}
+              >
+                {count}
+              </div>
+            </div>
+          ))}
         </div>
       </div>
     </div>
   )
 }
-
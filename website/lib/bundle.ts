@@ -0,0 +1,173 @@
+// 網站資料 bundle（由 scripts/publish_bundle.py 產生）
+// 每次刷新只讀取 head.json：版本有變且 patch 鏈仍涵蓋目前版本時，下載各版本的 JSON Patch（RFC 6902）
+// 更新 manifest 與已載入的檔案；lineage 不同、落後太多或套用失敗時才重新讀取 manifest。
+// 其餘檔名帶內容雜湊，讀過的檔案直接沿用，不重新下載
+
+export interface BundleFile {
+  key: string
+  path: string
+  bytes: number
+  gzip_bytes?: number
+  br_bytes?: number
+  count?: number
+}
+
+export interface EventGroup {
+  status: string
+  source: string
+  count: number
+  pages: BundleFile[]
+}
+
+export interface BundleHead {
+  version: number
+  lineage: string
+  revision: number
+  // 仍可用 patch 更新的最舊版本
+  oldest: number
+}
+
+export interface BundleManifest extends BundleHead {
+  generated_at: string
+  page_size: number
+  events: {
+    total: number
+    groups: EventGroup[]
+  }
+  alerts: BundleFile
+  stats: BundleFile
+}
+
+interface PatchOp {
+  op: 'add' | 'remove' | 'replace'
+  path: string
+  value?: unknown
+}
+
+interface BundlePatch {
+  from: number
+  to: number
+  ops: PatchOp[]
+}
+
+const BUNDLE_URL = '/data/bundle'
+
+// key → 目前的路徑與解析後的內容（進行中的請求也放在這裡，同一個檔案只下載一次）
+const files = new Map<string, { path: string; data: Promise<unknown> }>()
+let current: BundleManifest | null = null
+
+async function fetchJson<T>(name: string, init?: RequestInit): Promise<T> {
+  const res = await fetch(`${BUNDLE_URL}/${name}`, init)
+  if (!res.ok) throw new Error(`${name}: HTTP ${res.status}`)
+  return res.json()
+}
+
+function listFiles(manifest: BundleManifest): BundleFile[] {
+  return [manifest.alerts, manifest.stats, ...manifest.events.groups.flatMap((group) => group.pages)]
+}
+
+// JSON Pointer → reference tokens（~1 → /、~0 → ~）
+function parsePointer(pointer: string): string[] {
+  return pointer.split('/').slice(1).map((token) => token.replace(/~1/g, '/').replace(/~0/g, '~'))
+}
+
+// 套用單一操作（直接修改 doc，呼叫端先複製）；路徑不存在時拋出錯誤
+function applyOp(doc: any, tokens: string[], op: PatchOp): any {
+  if (tokens.length === 0) return op.op === 'remove' ? undefined : op.value
+  let parent = doc
+  for (const token of tokens.slice(0, -1)) {
+    parent = parent[Array.isArray(parent) ? Number(token) : token]
+    if (parent === null || typeof parent !== 'object') throw new Error(`patch 路徑不存在: ${op.path}`)
+  }
+  const last = tokens[tokens.length - 1]
+  if (Array.isArray(parent)) {
+    const index = last === '-' ? parent.length : Number(last)
+    if (op.op === 'add') parent.splice(index, 0, op.value)
+    else if (op.op === 'remove') parent.splice(index, 1)
+    else parent[index] = op.value
+  } else if (op.op === 'remove') {
+    delete parent[last]
+  } else {
+    parent[last] = op.value
+  }
+  return doc
+}
+
+// 依序套用 manifest.revision+1 … head.revision 的 patch；未載入的檔案略過，之後依新路徑下載
+async function applyPatches(manifest: BundleManifest, head: BundleHead): Promise<BundleManifest> {
+  const revisions = Array.from({ length: head.revision - manifest.revision }, (_, i) => manifest.revision + 1 + i)
+  const patches = await Promise.all(
+    revisions.map((revision) => fetchJson<BundlePatch>(`patch.${head.lineage}.${revision}.json`))
+  )
+
+  const docs = new Map<string, unknown>([['manifest', structuredClone(manifest)]])
+  const loaded = new Map(Array.from(files.entries()).map(([key, file]) => [key, file.path]))
+  for (const patch of patches) {
+    for (const op of patch.ops) {
+      const [key, ...tokens] = parsePointer(op.path)
+      if (!docs.has(key)) {
+        if (!loaded.has(key)) continue
+        docs.set(key, structuredClone(await files.get(key)!.data))
+      }
+      docs.set(key, applyOp(docs.get(key), tokens, op))
+    }
+  }
+
+  const next = { ...(docs.get('manifest') as BundleManifest), ...head }
+  const paths = new Map(listFiles(next).map((file) => [file.key, file.path]))
+  loaded.forEach((path, key) => {
+    const nextPath = paths.get(key)
+    if (nextPath && docs.get(key) !== undefined) {
+      files.set(key, { path: nextPath, data: Promise.resolve(docs.get(key)) })
+    } else if (nextPath !== path) {
+      files.delete(key)
+    }
+  })
+  return next
+}
+
+export async function fetchManifest(): Promise<BundleManifest | null> {
+  const head = await fetchJson<BundleHead>('head.json', { cache: 'no-cache' }).catch(() => null)
+  if (current && head && head.version === current.version && head.lineage === current.lineage) {
+    if (head.revision === current.revision) return current
+    if (head.revision > current.revision && current.revision >= head.oldest) {
+      try {
+        current = await applyPatches(current, head)
+        return current
+      } catch (e) {
+        console.warn('套用 bundle patch 失敗，重新讀取 manifest:', e)
+      }
+    }
+  }
+  current = await fetchJson<BundleManifest>('manifest.json', { cache: 'no-cache' }).catch(() => null)
+  if (current) retain(current)
+  return current
+}
+
+export function loadFile<T>(file: BundleFile): Promise<T> {
+  const cached = files.get(file.key)
+  if (cached?.path === file.path) return cached.data as Promise<T>
+  const data = fetchJson<unknown>(file.path)
+  // 失敗的請求不留在快取，下次刷新時重試
+  data.catch(() => {
+    if (files.get(file.key)?.data === data) files.delete(file.key)
+  })
+  files.set(file.key, { path: file.path, data })
+  return data as Promise<T>
+}
+
+export function loadFiles<T>(list: BundleFile[]): Promise<T[]> {
+  return Promise.all(list.map((file) => loadFile<T>(file)))
+}
+
+// 新 manifest 不再引用（或路徑已變）的檔案從快取移除
+export function retain(manifest: BundleManifest) {
+  const keep = new Map(listFiles(manifest).map((file) => [file.key, file.path]))
+  Array.from(files.entries()).forEach(([key, file]) => {
+    if (keep.get(key) !== file.path) files.delete(key)
+  })
+}
+
+export function sameManifest(a: BundleManifest | null, b: BundleManifest | null): boolean {
+  return JSON.stringify(a) === JSON.stringify(b)
+}